@@ -147,11 +147,22 @@ def _compile_gy_package(ctx):
     args += [f.path for f in ctx.files.srcs]
     inputs += ctx.files.srcs
     args += ctx.attr.flags
+
+    # Arguments are passed in a file so the compiler can run as a persistent worker
+    # (with --strategy=GyCompile=worker). Bazel sends the contents of the file to the
+    # worker with each request.
+    args_file = ctx.new_file(ctx.outputs.pkg, ctx.outputs.pkg.basename + ".args")
+    ctx.file_action(
+        output = args_file,
+        content = "\n".join(args) + "\n",
+    )
     ctx.action(
-        inputs = inputs,
+        inputs = inputs + [args_file],
         outputs = [ctx.outputs.pkg],
-        arguments = args,
+        arguments = ["@" + args_file.path],
         executable = ctx.executable._gy_compiler,
+        mnemonic = "GyCompile",
+        execution_requirements = {"supports-workers": "1"},
         progress_message = "Compiling Gypsum package %s" % ctx.outputs.pkg.path,
     )
 
@@ -10,27 +10,53 @@ import re
 import sys
 
 import ast
+from compile_cache import CompileCache, DEFAULT_MAX_CACHE_SIZE, DEFINITIONS_DIR_NAME
 from compile_info import CompileInfo, STD_NAME
 from compiler import compile
-from errors import CompileException
+from definition_cache import DefinitionCache, StaleDefinitionError
+from devirtualization import Devirtualizer
+from errors import CompileException, PackageException
 from externalization import externalize
 from ids import AstId, TARGET_PACKAGE_ID
 from inheritance_analysis import analyzeInheritance
+from inlining import inlineFunctions
 from ir import Package, PackageVersion, PackageDependency, Name
 from lexer import *
 from location import NoLoc
 from package_loader import PackageLoader
+from parse_cache import ParseCache
 from parser import *
+from profiler import DEFAULT_FUNCTION_COUNT, Profiler, measurePhase
 from scope_analysis import *
-from serialize import serialize
+from serialize import serialize, writeExportIndex
+import stats
+from tail_calls import eliminateTailCalls
 from type_analysis import analyzeTypeDeclarations, analyzeTypes
+from worker import isWorkerCommand, runWorkerCommand
 
 
 def main():
     sys.setrecursionlimit(10000)
+    argv = sys.argv[1:]
+    if isWorkerCommand(argv):
+        sys.exit(runWorkerCommand(argv, compileMain))
+    sys.exit(compileMain(argv))
 
+
+def compileMain(argv, loaderPool=None):
+    """Compiles a package, given command line arguments.
+
+    Args:
+        argv (list[str]): command line arguments, not including the program name.
+        loaderPool (LoaderPool?): if given, dependency packages are loaded using a loader
+            from this pool, and packages loaded by earlier calls are reused.
+
+    Returns:
+        (int): the exit code. 0 means the package was compiled successfully.
+    """
     PackageName = lambda s: Name.fromString(s, isPackageName=True)
-    cmdline = argparse.ArgumentParser(description="Compile source files into CodeSwitch packages")
+    cmdline = argparse.ArgumentParser(description="Compile source files into CodeSwitch packages",
+                                      fromfile_prefix_chars="@")
     cmdline.add_argument("sources", metavar="source", type=str, nargs="+",
                          help="Source file names")
     cmdline.add_argument("-p", "--package-name", action="store", type=PackageName,
@@ -48,6 +74,40 @@ def main():
     cmdline.add_argument("-o", "--output", action="store",
                          default="out.csp",
                          help="Name of the output file")
+    cmdline.add_argument("-O", "--optimize", action="store_true",
+                         help="Optimize generated code")
+    cmdline.add_argument("--stream-functions", action="store_true",
+                         help="Encode each function as soon as it's compiled and release " +
+                              "its instructions and syntax tree. This limits memory used " +
+                              "for large packages. Can't be used with -O or --print-ir.")
+    cmdline.add_argument("--export-index", action="store_true",
+                         help="Write an index of exported definitions next to the output " +
+                              "file to speed up linking against it")
+    cmdline.add_argument("--cache-dir", action="store",
+                         help="Directory where compiled packages are cached. If the sources, " +
+                              "dependencies, and options are the same as a previous " +
+                              "compilation, the cached package is used. Otherwise, " +
+                              "definitions that haven't changed aren't parsed again.")
+    cmdline.add_argument("--cache-size", action="store", type=int,
+                         default=DEFAULT_MAX_CACHE_SIZE // (1024 * 1024),
+                         help="Maximum size of the cache in MiB")
+    cmdline.add_argument("--load-threads", action="store", type=int, default=4,
+                         help="Number of threads used to read dependency packages. " +
+                              "Use 1 to read them one at a time.")
+    cmdline.add_argument("--profile", action="store", metavar="FILE",
+                         help="Measure time and memory used by each phase of the compiler. " +
+                              "A report is written to FILE as JSON, and a summary is " +
+                              "printed to stderr. The cache isn't used.")
+    cmdline.add_argument("--profile-pstats", action="store", metavar="DIR",
+                         help="With --profile, run each phase with cProfile and write " +
+                              "statistics to a .pstats file for each phase in DIR")
+    cmdline.add_argument("--profile-functions", action="store", type=int,
+                         default=DEFAULT_FUNCTION_COUNT, metavar="N",
+                         help="With --profile, report the N functions that took longest " +
+                              "to analyze and compile")
+    cmdline.add_argument("--stats", action="store", metavar="FILE",
+                         help="Count operations inside the compiler and write the counts " +
+                              "to FILE as JSON. The cache isn't used.")
     cmdline.add_argument("--print-tokens", action="store_true",
                          help="Print tokens after lexical analysis")
     cmdline.add_argument("--print-ast", action="store_true",
@@ -58,61 +118,265 @@ def main():
                          help="Print types after type analysis")
     cmdline.add_argument("--print-ir", action="store_true",
                          help="Print intermediate representation after compilation")
+    cmdline.add_argument("--print-optimizations", action="store_true",
+                         help="Print a report of optimizations applied with --optimize")
     cmdline.add_argument("--print-stack", action="store_true",
                          help="Print compiler stack on error")
-    args = cmdline.parse_args()
+    args = cmdline.parse_args(argv)
+    if args.export_index and args.output == "-":
+        cmdline.error("--export-index can't be used when writing to stdout")
+    if args.cache_dir is not None and args.output == "-":
+        cmdline.error("--cache-dir can't be used when writing to stdout")
+    if args.profile is None and args.profile_pstats is not None:
+        cmdline.error("--profile-pstats can only be used with --profile")
+    if args.stream_functions and (args.optimize or args.print_ir):
+        cmdline.error("--stream-functions can't be used with -O or --print-ir")
+
+    # Output requested by --print-* options is only produced by a full compilation, so the
+    # cache isn't used with them. Profiling and counting measure a full compilation, too.
+    isPrinting = any(getattr(args, name) for name in vars(args) if name.startswith("print_"))
+    isMeasuring = args.profile is not None or args.stats is not None
+    cache = None
+    if args.cache_dir is not None and not isPrinting and not isMeasuring:
+        cache = CompileCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    profiler = Profiler(args.profile_pstats, args.profile_functions) \
+               if args.profile is not None \
+               else None
+
+    if args.stats is not None:
+        stats.reset()
+        stats.enabled = True
+    try:
+        exitCode = compileWithArgs(args, cache, loaderPool, profiler)
+    finally:
+        stats.enabled = False
+    if args.stats is not None:
+        try:
+            stats.writeCounters(args.stats)
+        except IOError as err:
+            sys.stderr.write("%s: error: %s\n" % (args.stats, err))
+            exitCode = exitCode or 1
+    if profiler is not None:
+        try:
+            profiler.writeReport(args.profile)
+        except IOError as err:
+            sys.stderr.write("%s: error: %s\n" % (args.profile, err))
+            exitCode = exitCode or 1
+        profiler.writeSummary(sys.stderr)
+    return exitCode
+
 
+def compileWithArgs(args, cache, loaderPool, profiler):
+    """Compiles a package, given parsed command line arguments. Returns the exit code."""
+    loader = None
+    isLoaderReusable = False
     try:
-        astModules = []
-        for sourceFileName in args.sources:
-            with open(sourceFileName) as inFile:
-                source = inFile.read()
-            tokens = lex(sourceFileName, source)
-            if args.print_tokens:
+        sources = []
+        with measurePhase(profiler, "readSources"):
+            for sourceFileName in args.sources:
+                with open(sourceFileName) as inFile:
+                    sources.append((sourceFileName, inFile.read()))
+
+        # Package directory listings are cached along with compiled packages.
+        indexCacheDirName = os.path.join(args.cache_dir, "package-dirs") \
+                            if args.cache_dir is not None \
+                            else None
+        packagePath = args.package_path if len(args.package_path) > 0 else None
+        if loaderPool is not None:
+            loader = loaderPool.getLoader(packagePath, indexCacheDirName, args.load_threads,
+                                          args.depends)
+        else:
+            loader = PackageLoader(packagePath, indexCacheDirName, args.load_threads)
+        with measurePhase(profiler, "indexPackages"):
+            loader.ensurePackageInfo()
+        if cache is not None:
+            flags = ["no-std=%s" % args.no_std,
+                     "optimize=%s" % args.optimize,
+                     "export-index=%s" % args.export_index] + \
+                    ["depends=%s" % os.path.abspath(d) for d in args.depends]
+            cacheKey = cache.computeKey(sources, args.package_name, args.package_version,
+                                        flags, loader)
+            if cache.fetch(cacheKey, args.output, withIndex=args.export_index):
+                isLoaderReusable = True
+                return 0
+
+        printOptions = frozenset(name[len("print_"):] for name, value in vars(args).iteritems()
+                                 if name.startswith("print_") and value)
+        # If the package isn't cached, definitions that haven't changed since the last
+        # compilation still don't need to be parsed, analyzed, or compiled again.
+        parseCache = None
+        definitionCache = None
+        if cache is not None:
+            definitionsDirName = os.path.join(args.cache_dir, DEFINITIONS_DIR_NAME)
+            parseCache = ParseCache(definitionsDirName)
+            if len(printOptions) == 0:
+                definitionKey = cache.computeKey([], args.package_name, args.package_version,
+                                                 flags, loader)
+                definitionCache = DefinitionCache(
+                    os.path.join(definitionsDirName, definitionKey[:2], definitionKey))
+        package = compilePackage(sources, args.package_name, args.package_version, loader,
+                                 args.depends, not args.no_std, args.optimize, printOptions,
+                                 parseCache, profiler, args.stream_functions, definitionCache)
+        if args.print_ir:
+            sys.stdout.write("%s\n" % str(package))
+        with measurePhase(profiler, "serialize"):
+            serialize(package, args.output)
+        if args.export_index:
+            with measurePhase(profiler, "writeExportIndex"):
+                writeExportIndex(args.output, loader)
+        if cache is not None:
+            cache.store(cacheKey, args.output, loader.getLoadedPackageFileNames(),
+                        withIndex=args.export_index)
+            if definitionCache is not None:
+                definitionCache.save(loader.getLoadedPackageFileNames())
+        isLoaderReusable = True
+        return 0
+
+    except (CompileException, IOError) as err:
+        # A package may have been partially loaded, so the loader isn't reused after an
+        # error loading one.
+        isLoaderReusable = not isinstance(err, (PackageException, IOError))
+        if args.print_stack:
+            raise
+        if isinstance(err, CompileException):
+            sys.stderr.write("%s\n" % str(err))
+        else:
+            sys.stderr.write("%s: error: %s\n" % (sourceFileName, str(err)))
+        return 1
+
+    finally:
+        # The loader is always taken out of the pool's checked out set. After an unexpected
+        # error, it may be in an inconsistent state, so it's dropped.
+        if loaderPool is not None and loader is not None:
+            if isLoaderReusable:
+                loaderPool.release(loader)
+            else:
+                loaderPool.discard(loader)
+
+
+def compilePackage(sources, packageName, packageVersion, loader, dependFileNames=(),
+                   isUsingStd=True, optimize=False, printOptions=frozenset(),
+                   parseCache=None, profiler=None, streaming=False, definitionCache=None):
+    """Compiles source files into a package.
+
+    Args:
+        sources (list[(str, str)]): the name and contents of each source file, in order.
+        packageName (Name): the name of the package being compiled.
+        packageVersion (PackageVersion): the version of the package being compiled.
+        loader (BasePackageLoader): loads packages the new package depends on.
+        dependFileNames (list[str]): files of packages to add as dependencies, in addition
+            to std and any packages that are imported.
+        isUsingStd (bool): whether to add a dependency on std.
+        optimize (bool): whether to optimize the generated code.
+        printOptions (frozenset[str]): intermediate results to print, named like the
+            --print-* options without the prefix (for example, "ast").
+        parseCache (ParseCache?): if given, syntax trees of definitions that haven't changed
+            since they were last parsed are loaded from here. Can't be used when printing
+            tokens.
+        profiler (Profiler?): if given, time and memory used by each phase are recorded.
+        streaming (bool): if true, each function is encoded as soon as it's compiled, and
+            its instructions and syntax tree are released. The returned package can still
+            be serialized, but functions don't have `blocks`. Can't be used with `optimize`.
+        definitionCache (DefinitionCache?): if given, type information and instructions of
+            functions that haven't changed since the last compilation are restored from
+            here instead of being analyzed and compiled again. Can't be used when printing.
+
+    Returns:
+        (Package): the compiled package. Its id is `TARGET_PACKAGE_ID`.
+
+    Raises:
+        CompileException: if there's an error in the source code or a dependency is missing.
+        IOError: if a dependency can't be loaded.
+    """
+    if definitionCache is not None:
+        assert len(printOptions) == 0
+        try:
+            return _compilePackage(sources, packageName, packageVersion, loader,
+                                   dependFileNames, isUsingStd, optimize, printOptions,
+                                   parseCache, profiler, streaming, definitionCache)
+        except (CompileException, StaleDefinitionError):
+            if not definitionCache.hasRestored():
+                raise
+            # A restored function may depend on a type that changed, which is only known
+            # after type analysis, and errors must be reported as they would be without
+            # the cache. So the package is compiled again without restoring anything.
+            definitionCache.discard()
+            for package in loader.getLoadedPackages():
+                package.resetDependencyState()
+    return _compilePackage(sources, packageName, packageVersion, loader, dependFileNames,
+                           isUsingStd, optimize, printOptions, parseCache, profiler,
+                           streaming, definitionCache)
+
+
+def _compilePackage(sources, packageName, packageVersion, loader, dependFileNames,
+                    isUsingStd, optimize, printOptions, parseCache, profiler, streaming,
+                    definitionCache):
+    astModules = []
+    for sourceFileName, source in sources:
+        if parseCache is not None:
+            assert "tokens" not in printOptions
+            with measurePhase(profiler, "parse"):
+                astModule = parseCache.parse(sourceFileName, source)
+        else:
+            with measurePhase(profiler, "lex"):
+                tokens = lex(sourceFileName, source)
+            if "tokens" in printOptions:
                 for tok in tokens:
                     sys.stdout.write(str(tok) + "\n")
-            astModule = parse(sourceFileName, tokens)
-            if args.print_ast:
-                printer = ast.Printer(sys.stdout)
-                printer.visit(astModule)
-            astModules.append(astModule)
-        astPackage = ast.Package(astModules, NoLoc)
-        astPackage.id = AstId(-1)
-
-        package = Package(TARGET_PACKAGE_ID, args.package_name, args.package_version)
-        loader = PackageLoader(args.package_path if len(args.package_path) > 0 else None)
-        loader.ensurePackageInfo()
-        if len(args.depends) > 0:
-            depPackages = loader.loadPackageFiles(args.depends)
+            with measurePhase(profiler, "parse"):
+                astModule = parse(sourceFileName, tokens)
+        if "ast" in printOptions:
+            printer = ast.Printer(sys.stdout)
+            printer.visit(astModule)
+        astModules.append(astModule)
+    astPackage = ast.Package(astModules, NoLoc)
+    astPackage.id = AstId(-1)
+
+    package = Package(TARGET_PACKAGE_ID, packageName, packageVersion)
+    with measurePhase(profiler, "loadDependencies"):
+        if len(dependFileNames) > 0:
+            depPackages = loader.loadPackageFiles(dependFileNames)
             each(package.ensureDependency, depPackages)
-        isUsingStd = not args.no_std
         if isUsingStd:
             stdPackage = loader.loadPackage(STD_NAME, NoLoc)
             package.ensureDependency(stdPackage)
-        info = CompileInfo(astPackage, package, loader, isUsingStd=isUsingStd)
+    info = CompileInfo(astPackage, package, loader, isUsingStd=isUsingStd)
 
+    with measurePhase(profiler, "analyzeDeclarations"):
         analyzeDeclarations(info)
-        if args.print_scope:
-            sys.stderr.write("--print-scope not supported right now\n")
+    if "scope" in printOptions:
+        sys.stderr.write("--print-scope not supported right now\n")
+    with measurePhase(profiler, "analyzeTypeDeclarations"):
         analyzeTypeDeclarations(info)
+    with measurePhase(profiler, "analyzeInheritance"):
         analyzeInheritance(info)
-        analyzeTypes(info)
-        if args.print_types:
-            sys.stderr.write("--print-types not supported right now\n")
+    if definitionCache is not None:
+        with measurePhase(profiler, "prepareDefinitionCache"):
+            definitionCache.prepare(info, sources)
+    with measurePhase(profiler, "analyzeTypes"):
+        analyzeTypes(info, profiler, definitionCache)
+        if definitionCache is not None:
+            definitionCache.checkRestored()
+    if "types" in printOptions:
+        sys.stderr.write("--print-types not supported right now\n")
+    with measurePhase(profiler, "convertClosures"):
         convertClosures(info)
+    with measurePhase(profiler, "externalize"):
         externalize(info)
-        compile(info)
+    assert not (streaming and optimize)
+    devirtualizer = Devirtualizer(package) if optimize else None
+    with measurePhase(profiler, "compile"):
+        compile(info, devirtualizer, optimizeMatches=optimize, profiler=profiler,
+                streaming=streaming,
+                definitionCache=definitionCache if devirtualizer is None else None)
+    with measurePhase(profiler, "eliminateTailCalls"):
+        tailCallCount = eliminateTailCalls(info)
+    if optimize:
+        with measurePhase(profiler, "inlineFunctions"):
+            inlinedCount = inlineFunctions(info)
+        if "optimizations" in printOptions:
+            sys.stdout.write(devirtualizer.report())
+            sys.stdout.write("eliminated %d tail calls\n" % tailCallCount)
+            sys.stdout.write("inlined %d call sites\n" % inlinedCount)
 
-        package = info.package
-        if args.print_ir:
-            sys.stdout.write("%s\n" % str(package))
-        serialize(package, args.output)
-
-    except (CompileException, IOError) as err:
-        if args.print_stack:
-            raise
-        if isinstance(err, CompileException):
-            sys.stderr.write("%s\n" % str(err))
-        else:
-            sys.stderr.write("%s: error: %s\n" % (sourceFileName, str(err)))
-        sys.exit(1)
+    return info.package
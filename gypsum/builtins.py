@@ -4,7 +4,6 @@
 # the GPL license that can be found in the LICENSE.txt file.
 
 import re
-import yaml
 
 import flags
 import ids
@@ -214,8 +213,7 @@ def _initialize():
     def buildFlags(flagsData):
         return frozenset(map(flags.canonicalizeFlagName, flagsData))
 
-    with utils.openCommonFile("builtins.yaml") as builtinsFile:
-        classes, functions = yaml.load_all(builtinsFile.read())
+    classes, functions = utils.loadCommonData("builtins.yaml")
     for ty in classes:
         declareClass(ty)
     for ty in classes:
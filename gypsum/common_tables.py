@@ -0,0 +1,1361 @@
+# DO NOT MODIFY
+# This file was automatically generated by gen_common_tables.py.
+#
+# Each entry maps the name of a YAML file to the SHA-1 hash of its contents and the list of
+# documents in it. See utils.loadCommonData.
+
+TABLES = {
+    'builtins.yaml': (
+        '8a6a5cd517ef83029ab9f2cf2b183c69ebd3aa45',
+        [[{'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_ROOT_CLASS_CTOR_ID',
+                             'parameterTypes': ['Object'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC'],
+           'id': 'BUILTIN_ROOT_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [{'flags': ['PUBLIC', 'FINAL', 'METHOD'],
+                        'id': 'BUILTIN_ROOT_CLASS_EQ_OP_ID',
+                        'insts': ['eqp'],
+                        'name': '===',
+                        'parameterTypes': ['Object?', 'Object?'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'FINAL', 'METHOD'],
+                        'id': 'BUILTIN_ROOT_CLASS_NE_OP_ID',
+                        'insts': ['nep'],
+                        'name': '!==',
+                        'parameterTypes': ['Object?', 'Object?'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_ROOT_CLASS_TYPEOF_ID',
+                        'name': 'typeof',
+                        'parameterTypes': ['Object'],
+                        'returnType': 'Type'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_ROOT_CLASS_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['Object'],
+                        'returnType': 'String'}],
+           'name': 'Object',
+           'supertype': None},
+          {'constructors': [],
+           'fields': [],
+           'flags': ['PUBLIC'],
+           'id': 'BUILTIN_NOTHING_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'Nothing',
+           'supertype': None},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['Exception'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC'],
+           'id': 'BUILTIN_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'Exception',
+           'supertype': 'Object'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_NULL_POINTER_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['NullPointerException'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_NULL_POINTER_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'NullPointerException',
+           'supertype': 'Exception'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_UNINITIALIZED_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['UninitializedException'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_UNINITIALIZED_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'UninitializedException',
+           'supertype': 'Exception'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_MATCH_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['MatchException'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_MATCH_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'MatchException',
+           'supertype': 'Exception'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_CAST_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['CastException'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_CAST_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'CastException',
+           'supertype': 'Exception'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'ARRAY_INDEX_OUT_OF_BOUNDS_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['ArrayIndexOutOfBoundsException'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_ARRAY_INDEX_OUT_OF_BOUNDS_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'ArrayIndexOutOfBoundsException',
+           'supertype': 'Exception'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_OUT_OF_MEMORY_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['OutOfMemoryException'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_OUT_OF_MEMORY_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'OutOfMemoryException',
+           'supertype': 'Exception'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_ILLEGAL_ARGUMENT_EXCEPTION_CTOR_ID',
+                             'parameterTypes': ['IllegalArgumentException'],
+                             'returnType': 'unit'}],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_ILLEGAL_ARGUMENT_EXCEPTION_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'IllegalArgumentException',
+           'supertype': 'Exception'},
+          {'constructors': [{'flags': ['PUBLIC', 'CONSTRUCTOR', 'METHOD'],
+                             'id': 'BUILTIN_TYPE_CTOR_ID',
+                             'parameterTypes': ['Type', 'Object'],
+                             'returnType': 'unit'}],
+           'elements': 'Object',
+           'fields': [{'flags': ['PRIVATE', 'LET', 'ARRAY'],
+                       'name': 'length',
+                       'type': 'i32'},
+                      {'flags': ['PRIVATE', 'LET'], 'name': 'flags', 'type': 'i32'}],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_TYPE_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_TYPE_IS_SUBTYPE_OF_ID',
+                        'name': 'is-subtype-of',
+                        'parameterTypes': ['Type', 'Type'],
+                        'returnType': 'boolean'}],
+           'name': 'Type',
+           'supertype': 'Object'},
+          {'constructors': [],
+           'elements': 'i8',
+           'fields': [{'flags': ['PUBLIC', 'LET', 'ARRAY'],
+                       'name': 'length',
+                       'type': 'i32'}],
+           'flags': ['PUBLIC'],
+           'id': 'BUILTIN_STRING_CLASS_ID',
+           'isPrimitive': False,
+           'methods': [{'flags': ['PUBLIC', 'METHOD', 'OVERRIDE'],
+                        'id': 'BUILTIN_STRING_TO_STRING_ID',
+                        'name': 'to-string',
+                        'overrides': ['BUILTIN_ROOT_CLASS_TO_STRING_ID'],
+                        'parameterTypes': ['String'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD', 'ARRAY'],
+                        'id': 'BUILTIN_STRING_GET_ID',
+                        'insts': ['swap', 'lde'],
+                        'name': 'get',
+                        'parameterTypes': ['String', 'i32'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'STATIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_FROM_UTF8_ID',
+                        'name': 'from-utf8',
+                        'parameterTypes': ['Object'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_CONCAT_OP_ID',
+                        'name': '+',
+                        'parameterTypes': ['String', 'String'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_LT_OP_ID',
+                        'name': '<',
+                        'parameterTypes': ['String', 'String'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_LE_OP_ID',
+                        'name': '<=',
+                        'parameterTypes': ['String', 'String'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_GT_OP_ID',
+                        'name': '>',
+                        'parameterTypes': ['String', 'String'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_GE_OP_ID',
+                        'name': '>=',
+                        'parameterTypes': ['String', 'String'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_EQ_OP_ID',
+                        'name': '==',
+                        'parameterTypes': ['String', 'String'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_STRING_NE_OP_ID',
+                        'name': '!=',
+                        'parameterTypes': ['String', 'String'],
+                        'returnType': 'boolean'}],
+           'name': 'String',
+           'supertype': 'Object'},
+          {'constructors': [],
+           'fields': [],
+           'flags': ['PUBLIC', 'FINAL'],
+           'id': 'BUILTIN_PACKAGE_CLASS_ID',
+           'isOpaque': True,
+           'isPrimitive': False,
+           'methods': [],
+           'name': 'Package',
+           'supertype': 'Object'},
+          {'flags': [],
+           'id': 'BUILTIN_UNIT_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_UNIT_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['unit'],
+                        'returnType': 'String'}],
+           'name': 'unit'},
+          {'flags': [],
+           'id': 'BUILTIN_BOOLEAN_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_BOOLEAN_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['boolean'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_BOOLEAN_EQ_OP_ID',
+                        'insts': ['eqi8'],
+                        'name': '==',
+                        'parameterTypes': ['boolean', 'boolean'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_BOOLEAN_NE_OP_ID',
+                        'insts': ['nei8'],
+                        'name': '!=',
+                        'parameterTypes': ['boolean', 'boolean'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_BOOLEAN_NOT_OP_ID',
+                        'insts': ['notb'],
+                        'name': '!',
+                        'parameterTypes': ['boolean'],
+                        'returnType': 'boolean'}],
+           'name': 'boolean'},
+          {'flags': [],
+           'id': 'BUILTIN_I8_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_ADD_OP_ID',
+                        'insts': ['addi8'],
+                        'name': '+',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_SUB_OP_ID',
+                        'insts': ['subi8'],
+                        'name': '-',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_MUL_OP_ID',
+                        'insts': ['muli8'],
+                        'name': '*',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_DIV_OP_ID',
+                        'insts': ['divi8'],
+                        'name': '/',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_MOD_OP_ID',
+                        'insts': ['modi8'],
+                        'name': '%',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_LSL_OP_ID',
+                        'insts': ['lsli8'],
+                        'name': '<<',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_LSR_OP_ID',
+                        'insts': ['lsri8'],
+                        'name': '>>>',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_ASR_OP_ID',
+                        'insts': ['asri8'],
+                        'name': '>>',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_AND_OP_ID',
+                        'insts': ['andi8'],
+                        'name': '&',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_OR_OP_ID',
+                        'insts': ['ori8'],
+                        'name': '|',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_XOR_OP_ID',
+                        'insts': ['xori8'],
+                        'name': '^',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_LT_OP_ID',
+                        'insts': ['lti8'],
+                        'name': '<',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_LE_OP_ID',
+                        'insts': ['lei8'],
+                        'name': '<=',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_GT_OP_ID',
+                        'insts': ['gti8'],
+                        'name': '>',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_GE_OP_ID',
+                        'insts': ['gei8'],
+                        'name': '>=',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_EQ_OP_ID',
+                        'insts': ['eqi8'],
+                        'name': '==',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_NE_OP_ID',
+                        'insts': ['nei8'],
+                        'name': '!=',
+                        'parameterTypes': ['i8', 'i8'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_NEG_OP_ID',
+                        'insts': ['negi8'],
+                        'name': '-',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_INV_OP_ID',
+                        'insts': ['invi8'],
+                        'name': '~',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_SEXTI16_OP_ID',
+                        'insts': ['sexti16_8'],
+                        'name': 'to-i16',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_ZEXTI16_OP_ID',
+                        'insts': ['zexti16'],
+                        'name': 'to-u16',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_SEXTI32_OP_ID',
+                        'insts': ['sexti32_8'],
+                        'name': 'to-i32',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_ZEXTI32_OP_ID',
+                        'insts': ['zexti32'],
+                        'name': 'to-u32',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_SEXTI64_OP_ID',
+                        'insts': ['sexti64_8'],
+                        'name': 'to-i64',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_ZEXTI64_OP_ID',
+                        'insts': ['zexti64'],
+                        'name': 'to-u64',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_ICVTF32_OP_ID',
+                        'insts': ['sexti32_8', 'icvtf32'],
+                        'name': 'to-f32',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I8_ICVTF64_OP_ID',
+                        'insts': ['sexti64_8', 'icvtf64'],
+                        'name': 'to-f64',
+                        'parameterTypes': ['i8'],
+                        'returnType': 'f64'}],
+           'name': 'i8'},
+          {'flags': [],
+           'id': 'BUILTIN_I16_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_ADD_OP_ID',
+                        'insts': ['addi16'],
+                        'name': '+',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_SUB_OP_ID',
+                        'insts': ['subi16'],
+                        'name': '-',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_MUL_OP_ID',
+                        'insts': ['muli16'],
+                        'name': '*',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_DIV_OP_ID',
+                        'insts': ['divi16'],
+                        'name': '/',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_MOD_OP_ID',
+                        'insts': ['modi16'],
+                        'name': '%',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_LSL_OP_ID',
+                        'insts': ['lsli16'],
+                        'name': '<<',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_LSR_OP_ID',
+                        'insts': ['lsri16'],
+                        'name': '>>>',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_ASR_OP_ID',
+                        'insts': ['asri16'],
+                        'name': '>>',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_AND_OP_ID',
+                        'insts': ['andi16'],
+                        'name': '&',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_OR_OP_ID',
+                        'insts': ['ori16'],
+                        'name': '|',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_XOR_OP_ID',
+                        'insts': ['xori16'],
+                        'name': '^',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_LT_OP_ID',
+                        'insts': ['lti16'],
+                        'name': '<',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_LE_OP_ID',
+                        'insts': ['lei16'],
+                        'name': '<=',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_GT_OP_ID',
+                        'insts': ['gti16'],
+                        'name': '>',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_GE_OP_ID',
+                        'insts': ['gei16'],
+                        'name': '>=',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_EQ_OP_ID',
+                        'insts': ['eqi16'],
+                        'name': '==',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_NE_OP_ID',
+                        'insts': ['nei16'],
+                        'name': '!=',
+                        'parameterTypes': ['i16', 'i16'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_NEG_OP_ID',
+                        'insts': ['negi16'],
+                        'name': '-',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_INV_OP_ID',
+                        'insts': ['invi16'],
+                        'name': '~',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_TRUNCI8_OP_ID',
+                        'insts': ['trunci8'],
+                        'name': 'to-i8',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_SEXTI32_OP_ID',
+                        'insts': ['sexti32_16'],
+                        'name': 'to-i32',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_ZEXTI32_OP_ID',
+                        'insts': ['zexti32'],
+                        'name': 'to-u32',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_SEXTI64_OP_ID',
+                        'insts': ['sexti64_16'],
+                        'name': 'to-i64',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_ZEXTI64_OP_ID',
+                        'insts': ['zexti64'],
+                        'name': 'to-u64',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_ICVTF32_OP_ID',
+                        'insts': ['sexti32_16', 'icvtf32'],
+                        'name': 'to-f32',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I16_ICVTF64_OP_ID',
+                        'insts': ['sexti64_16', 'icvtf64'],
+                        'name': 'to-f64',
+                        'parameterTypes': ['i16'],
+                        'returnType': 'f64'}],
+           'name': 'i16'},
+          {'flags': [],
+           'id': 'BUILTIN_I32_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_ADD_OP_ID',
+                        'insts': ['addi32'],
+                        'name': '+',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_SUB_OP_ID',
+                        'insts': ['subi32'],
+                        'name': '-',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_MUL_OP_ID',
+                        'insts': ['muli32'],
+                        'name': '*',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_DIV_OP_ID',
+                        'insts': ['divi32'],
+                        'name': '/',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_MOD_OP_ID',
+                        'insts': ['modi32'],
+                        'name': '%',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_LSL_OP_ID',
+                        'insts': ['lsli32'],
+                        'name': '<<',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_LSR_OP_ID',
+                        'insts': ['lsri32'],
+                        'name': '>>>',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_ASR_OP_ID',
+                        'insts': ['asri32'],
+                        'name': '>>',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_AND_OP_ID',
+                        'insts': ['andi32'],
+                        'name': '&',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_OR_OP_ID',
+                        'insts': ['ori32'],
+                        'name': '|',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_XOR_OP_ID',
+                        'insts': ['xori32'],
+                        'name': '^',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_LT_OP_ID',
+                        'insts': ['lti32'],
+                        'name': '<',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_LE_OP_ID',
+                        'insts': ['lei32'],
+                        'name': '<=',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_GT_OP_ID',
+                        'insts': ['gti32'],
+                        'name': '>',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_GE_OP_ID',
+                        'insts': ['gei32'],
+                        'name': '>=',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_EQ_OP_ID',
+                        'insts': ['eqi32'],
+                        'name': '==',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_NE_OP_ID',
+                        'insts': ['nei32'],
+                        'name': '!=',
+                        'parameterTypes': ['i32', 'i32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_NEG_OP_ID',
+                        'insts': ['negi32'],
+                        'name': '-',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_INV_OP_ID',
+                        'insts': ['invi32'],
+                        'name': '~',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_TRUNCI8_OP_ID',
+                        'insts': ['trunci8'],
+                        'name': 'to-i8',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_TRUNCI16_OP_ID',
+                        'insts': ['trunci16'],
+                        'name': 'to-i16',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_SEXTI64_OP_ID',
+                        'insts': ['sexti64_32'],
+                        'name': 'to-i64',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_ZEXTI64_OP_ID',
+                        'insts': ['zexti64'],
+                        'name': 'to-u64',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_ICVTF32_OP_ID',
+                        'insts': ['icvtf32'],
+                        'name': 'to-f32',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_ICVTF64_OP_ID',
+                        'insts': ['sexti64_32', 'icvtf64'],
+                        'name': 'to-f64',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I32_ITOF32_OP_ID',
+                        'insts': ['itof32'],
+                        'name': 'to-f32-bits',
+                        'parameterTypes': ['i32'],
+                        'returnType': 'f32'}],
+           'name': 'i32'},
+          {'flags': [],
+           'id': 'BUILTIN_I64_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_ADD_OP_ID',
+                        'insts': ['addi64'],
+                        'name': '+',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_SUB_OP_ID',
+                        'insts': ['subi64'],
+                        'name': '-',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_MUL_OP_ID',
+                        'insts': ['muli64'],
+                        'name': '*',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_DIV_OP_ID',
+                        'insts': ['divi64'],
+                        'name': '/',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_MOD_OP_ID',
+                        'insts': ['modi64'],
+                        'name': '%',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_LSL_OP_ID',
+                        'insts': ['lsli64'],
+                        'name': '<<',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_LSR_OP_ID',
+                        'insts': ['lsri64'],
+                        'name': '>>>',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_ASR_OP_ID',
+                        'insts': ['asri64'],
+                        'name': '>>',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_AND_OP_ID',
+                        'insts': ['andi64'],
+                        'name': '&',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_OR_OP_ID',
+                        'insts': ['ori64'],
+                        'name': '|',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_XOR_OP_ID',
+                        'insts': ['xori64'],
+                        'name': '^',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_LT_OP_ID',
+                        'insts': ['lti64'],
+                        'name': '<',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_LE_OP_ID',
+                        'insts': ['lei64'],
+                        'name': '<=',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_GT_OP_ID',
+                        'insts': ['gti64'],
+                        'name': '>',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_GE_OP_ID',
+                        'insts': ['gei64'],
+                        'name': '>=',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_EQ_OP_ID',
+                        'insts': ['eqi64'],
+                        'name': '==',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_NE_OP_ID',
+                        'insts': ['nei64'],
+                        'name': '!=',
+                        'parameterTypes': ['i64', 'i64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_NEG_OP_ID',
+                        'insts': ['negi64'],
+                        'name': '-',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_INV_OP_ID',
+                        'insts': ['invi64'],
+                        'name': '~',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_TRUNCI8_OP_ID',
+                        'insts': ['trunci8'],
+                        'name': 'to-i8',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_TRUNCI16_OP_ID',
+                        'insts': ['trunci16'],
+                        'name': 'to-i16',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_TRUNCI32_OP_ID',
+                        'insts': ['trunci32'],
+                        'name': 'to-i32',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_ICVTF32_OP_ID',
+                        'insts': ['icvtf64', 'truncf32'],
+                        'name': 'to-f32',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_ICVTF64_OP_ID',
+                        'insts': ['icvtf64'],
+                        'name': 'to-f64',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_I64_ITOF64_OP_ID',
+                        'insts': ['itof64'],
+                        'name': 'to-f64-bits',
+                        'parameterTypes': ['i64'],
+                        'returnType': 'f64'}],
+           'name': 'i64'},
+          {'flags': [],
+           'id': 'BUILTIN_F32_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_ADD_OP_ID',
+                        'insts': ['addf32'],
+                        'name': '+',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_SUB_OP_ID',
+                        'insts': ['subf32'],
+                        'name': '-',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_MUL_OP_ID',
+                        'insts': ['mulf32'],
+                        'name': '*',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_DIV_OP_ID',
+                        'insts': ['divf32'],
+                        'name': '/',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_LT_OP_ID',
+                        'insts': ['ltf32'],
+                        'name': '<',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_LE_OP_ID',
+                        'insts': ['lef32'],
+                        'name': '<=',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_GT_OP_ID',
+                        'insts': ['gtf32'],
+                        'name': '>',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_GE_OP_ID',
+                        'insts': ['gef32'],
+                        'name': '>=',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_EQ_OP_ID',
+                        'insts': ['eqf32'],
+                        'name': '==',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_NE_OP_ID',
+                        'insts': ['nef32'],
+                        'name': '!=',
+                        'parameterTypes': ['f32', 'f32'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_NEG_OP_ID',
+                        'insts': ['negf32'],
+                        'name': '-',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_EXTF64_OP_ID',
+                        'insts': ['extf64'],
+                        'name': 'to-f64',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_FCVTI8_OP_ID',
+                        'insts': ['fcvti32', 'trunci8'],
+                        'name': 'to-i8',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_FCVTI16_OP_ID',
+                        'insts': ['fcvti32', 'trunci16'],
+                        'name': 'to-i16',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_FCVTI32_OP_ID',
+                        'insts': ['fcvti32'],
+                        'name': 'to-i32',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_FCVTI64_OP_ID',
+                        'insts': ['fcvti32', 'sexti64_32'],
+                        'name': 'to-i64',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F32_FTOI32_OP_ID',
+                        'insts': ['ftoi32'],
+                        'name': 'to-i32-bits',
+                        'parameterTypes': ['f32'],
+                        'returnType': 'i32'}],
+           'name': 'f32'},
+          {'flags': [],
+           'id': 'BUILTIN_F64_TYPE_ID',
+           'isPrimitive': True,
+           'methods': [{'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_TO_STRING_ID',
+                        'name': 'to-string',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'String'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_ADD_OP_ID',
+                        'insts': ['addf64'],
+                        'name': '+',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_SUB_OP_ID',
+                        'insts': ['subf64'],
+                        'name': '-',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_MUL_OP_ID',
+                        'insts': ['mulf64'],
+                        'name': '*',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_DIV_OP_ID',
+                        'insts': ['divf64'],
+                        'name': '/',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_LT_OP_ID',
+                        'insts': ['ltf64'],
+                        'name': '<',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_LE_OP_ID',
+                        'insts': ['lef64'],
+                        'name': '<=',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_GT_OP_ID',
+                        'insts': ['gtf64'],
+                        'name': '>',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_GE_OP_ID',
+                        'insts': ['gef64'],
+                        'name': '>=',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_EQ_OP_ID',
+                        'insts': ['eqf64'],
+                        'name': '==',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_NE_OP_ID',
+                        'insts': ['nef64'],
+                        'name': '!=',
+                        'parameterTypes': ['f64', 'f64'],
+                        'returnType': 'boolean'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_NEG_OP_ID',
+                        'insts': ['negf64'],
+                        'name': '-',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'f64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_TRUNCF32_OP_ID',
+                        'insts': ['truncf32'],
+                        'name': 'to-f32',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'f32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_FCVTI8_OP_ID',
+                        'insts': ['fcvti64', 'trunci8'],
+                        'name': 'to-i8',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'i8'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_FCVTI16_OP_ID',
+                        'insts': ['fcvti64', 'trunci16'],
+                        'name': 'to-i16',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'i16'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_FCVTI32_OP_ID',
+                        'insts': ['fcvti64', 'trunci32'],
+                        'name': 'to-i32',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'i32'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_FCVTI64_OP_ID',
+                        'insts': ['fcvti64'],
+                        'name': 'to-i64',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'i64'},
+                       {'flags': ['PUBLIC', 'METHOD'],
+                        'id': 'BUILTIN_F64_FTOI64_OP_ID',
+                        'insts': ['ftoi64'],
+                        'name': 'to-i64-bits',
+                        'parameterTypes': ['f64'],
+                        'returnType': 'i64'}],
+           'name': 'f64'}],
+         [{'flags': ['PUBLIC'],
+           'id': 'BUILTIN_PRINT_FUNCTION_ID',
+           'name': 'print',
+           'parameterTypes': ['String'],
+           'returnType': 'unit'},
+          {'flags': ['PUBLIC'],
+           'id': 'BUILTIN_READ_FUNCTION_ID',
+           'name': 'read',
+           'parameterTypes': [],
+           'returnType': 'String'},
+          {'flags': ['PUBLIC'],
+           'id': 'BUILTIN_GC_FUNCTION_ID',
+           'name': 'gc',
+           'parameterTypes': [],
+           'returnType': 'unit'}]]
+    ),
+    'flags.yaml': (
+        '23682e2fa0e9f19591751b8df9f3d699f0b3767f',
+        [['ABSTRACT',
+          'FINAL',
+          'EXTERN',
+          'CONTRAVARIANT',
+          'COVARIANT',
+          'LET',
+          'PUBLIC',
+          'PROTECTED',
+          'PRIVATE',
+          'STATIC',
+          'CONSTRUCTOR',
+          'METHOD',
+          'INITIALIZER',
+          'ARRAY',
+          'ARRAY_FINAL',
+          'OVERRIDE',
+          'NATIVE']]
+    ),
+    'opcodes.yaml': (
+        'c35d6f63cf55ed9885d63247a4588693923c870e',
+        [[{'iops': 0, 'name': 'nop', 'pop': 0, 'push': 0, 'term': False},
+          {'iops': 0, 'name': 'ret', 'pop': 1, 'push': 0, 'term': True},
+          {'iops': 1, 'name': 'branch', 'pop': 0, 'push': 0, 'term': True},
+          {'iops': 2, 'name': 'branchif', 'pop': 1, 'push': 0, 'term': True},
+          {'iops': 1, 'name': 'label', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': None, 'name': 'branchl', 'pop': 1, 'push': 0, 'term': True},
+          {'iops': 2, 'name': 'pushtry', 'pop': 0, 'push': 0, 'term': True},
+          {'iops': 1, 'name': 'poptry', 'pop': 0, 'push': 0, 'term': True},
+          {'iops': 0, 'name': 'throw', 'pop': 1, 'push': 0, 'term': True},
+          {'iops': 0, 'name': 'drop', 'pop': 1, 'push': 0, 'term': False},
+          {'iops': 1, 'name': 'dropi', 'pop': None, 'push': 0, 'term': False},
+          {'iops': 0, 'name': 'dup', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'dupi', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'swap', 'pop': 2, 'push': 2, 'term': False},
+          {'iops': 0, 'name': 'swap2', 'pop': 3, 'push': 3, 'term': False},
+          {'iops': 0, 'name': 'unit', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'true', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'false', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'null', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'uninitialized', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'i8', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'i16', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'i32', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'i64', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'f32', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'f64', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'string', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'ldlocal', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'stlocal', 'pop': 1, 'push': 0, 'term': False},
+          {'iops': 1, 'name': 'ldg', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 2, 'name': 'ldgf', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'stg', 'pop': 1, 'push': 0, 'term': False},
+          {'iops': 2, 'name': 'stgf', 'pop': 1, 'push': 0, 'term': False},
+          {'iops': 2, 'name': 'ldf', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 3, 'name': 'ldff', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 2, 'name': 'stf', 'pop': 2, 'push': 0, 'term': False},
+          {'iops': 3, 'name': 'stff', 'pop': 2, 'push': 0, 'term': False},
+          {'iops': 0, 'name': 'lde', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ste', 'pop': 3, 'push': 0, 'term': False},
+          {'iops': 1, 'name': 'allocobj', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 2, 'name': 'allocobjf', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'allocarr', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 2, 'name': 'allocarrf', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'pkg', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'tys', 'pop': 0, 'push': 0, 'term': False},
+          {'iops': 1, 'name': 'tyd', 'pop': 0, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'cast', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'castc', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 2, 'name': 'castcbr', 'pop': 2, 'push': 1, 'term': True},
+          {'iops': 1, 'name': 'callg', 'pop': None, 'push': 1, 'term': False},
+          {'iops': 2, 'name': 'callgf', 'pop': None, 'push': 1, 'term': False},
+          {'iops': 1, 'name': 'callv', 'pop': None, 'push': 1, 'term': False},
+          {'iops': 2, 'name': 'callvf', 'pop': None, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'eqp', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'nep', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'addi8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'addi16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'addi32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'addi64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'addf32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'addf64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'subi8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'subi16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'subi32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'subi64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'subf32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'subf64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'muli8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'muli16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'muli32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'muli64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'mulf32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'mulf64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'divi8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'divi16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'divi32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'divi64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'divf32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'divf64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'modi8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'modi16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'modi32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'modi64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsli8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsli16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsli32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsli64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsri8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsri16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsri32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lsri64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'asri8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'asri16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'asri32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'asri64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'andi8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'andi16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'andi32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'andi64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ori8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ori16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ori32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ori64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'xori8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'xori16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'xori32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'xori64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'eqi8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'eqi16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'eqi32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'eqi64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'eqf32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'eqf64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'nei8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'nei16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'nei32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'nei64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'nef32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'nef64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lti8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lti16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lti32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lti64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ltf32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ltf64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lei8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lei16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lei32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lei64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lef32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'lef64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gti8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gti16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gti32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gti64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gtf32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gtf64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gei8', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gei16', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gei32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gei64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gef32', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'gef64', 'pop': 2, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'negi8', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'negi16', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'negi32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'negi64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'negf32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'negf64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'invi8', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'invi16', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'invi32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'invi64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'notb', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'trunci8', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'trunci16', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'trunci32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'truncf32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'sexti16_8', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'sexti32_8', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'sexti64_8', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'sexti32_16', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'sexti64_16', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'sexti64_32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'zexti16', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'zexti32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'zexti64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'extf64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'fcvti32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'fcvti64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'icvtf32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'icvtf64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ftoi32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'ftoi64', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'itof32', 'pop': 1, 'push': 1, 'term': False},
+          {'iops': 0, 'name': 'itof64', 'pop': 1, 'push': 1, 'term': False}]]
+    ),
+}
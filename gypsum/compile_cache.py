@@ -0,0 +1,256 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import glob
+import hashlib
+import marshal
+import os
+import os.path
+import shutil
+
+from package_index import indexFileName
+import utils
+
+
+CACHE_VERSION = 1
+DEFAULT_MAX_CACHE_SIZE = 256 * 1024 * 1024
+
+PACKAGE_SUFFIX = ".csp"
+INDEX_SUFFIX = ".csi"
+MANIFEST_SUFFIX = ".deps"
+ENTRY_SUFFIXES = (MANIFEST_SUFFIX, PACKAGE_SUFFIX, INDEX_SUFFIX)
+
+# Subdirectory of the cache holding files saved for individual source files and packages
+# between compilations (see `ParseCache` and `DefinitionCache`).
+DEFINITIONS_DIR_NAME = "definitions"
+
+
+class CompileCache(object):
+    """An on-disk cache of compiled packages.
+
+    Packages are stored under a key which is a hash of everything that determines the
+    compiler's output (see `computeKey`) except for dependency packages, since the compiler
+    doesn't know which dependencies a package uses until it's compiled. Instead, each
+    entry has a manifest listing the files of the dependencies that were loaded and a hash
+    of each one. An entry is only used if all of those files are unchanged.
+
+    Each entry consists of a package file, a manifest, and optionally an export index. The
+    manifest is written last, so an entry without one is incomplete and is ignored.
+    Entries are evicted in least-recently-used order when the total size of the cache
+    exceeds `maxSize`. The modification time of the manifest records when an entry was
+    last used.
+
+    Attributes:
+        dirName (str): the directory containing the cache.
+        maxSize (int): the maximum total size of the cache in bytes.
+    """
+
+    def __init__(self, dirName, maxSize=DEFAULT_MAX_CACHE_SIZE):
+        self.dirName = dirName
+        self.maxSize = maxSize
+
+    def computeKey(self, sources, packageName, packageVersion, flags, packageLoader):
+        """Computes the key for a compiler invocation.
+
+        Args:
+            sources (list[(str, str)]): the name and contents of each source file, in the
+                order they're compiled.
+            packageName (Name): the name of the package being compiled.
+            packageVersion (PackageVersion): the version of the package being compiled.
+            flags (list[str]): other options which affect the compiler's output.
+            packageLoader (PackageLoader): used to find packages which could be imported.
+                The name, version, and file name of each package it indexes are part of the
+                key, since these determine which files dependencies are loaded from.
+
+        Returns:
+            (str): the key, as a hex string.
+        """
+        h = hashlib.sha1()
+        h.update("%d\0%s\0" % (CACHE_VERSION, getCompilerHash()))
+        h.update("%s\0%s\0" % (packageName, packageVersion))
+        for flag in flags:
+            h.update("%s\0" % flag)
+        for fileName, source in sources:
+            h.update("%s\0%d\0" % (fileName, len(source)))
+            h.update(source)
+        packageLoader.ensurePackageInfo()
+        for info in sorted(packageLoader.packageInfoByName.itervalues(),
+                           key=lambda info: info.fileName):
+            h.update("%s\0%s\0%s\0" % (info.name, info.version, info.fileName))
+        return h.hexdigest()
+
+    def fetch(self, key, outputFileName, withIndex=False):
+        """Copies a cached package to an output file, if there's a valid entry.
+
+        The package is hard linked to the output file if possible. The link is made under
+        a temporary name and renamed over the output file, so the cached copy is never
+        modified.
+
+        Args:
+            key (str): the key from `computeKey`.
+            outputFileName (str): the file to write the package to.
+            withIndex (bool): whether the export index should be written, too. If it is,
+                but the entry doesn't have an index, this is a miss.
+
+        Returns:
+            (bool): whether the output file was written.
+        """
+        manifestFileName = self.entryFileName(key, MANIFEST_SUFFIX)
+        manifest = readManifest(manifestFileName)
+        if manifest is None:
+            return False
+        for fileName, fileHash in manifest:
+            currentHash = hashFile(fileName)
+            if currentHash is None or currentHash != fileHash:
+                return False
+        outputs = [(PACKAGE_SUFFIX, outputFileName)]
+        if withIndex:
+            outputs.append((INDEX_SUFFIX, indexFileName(outputFileName)))
+        try:
+            for suffix, fileName in outputs:
+                installFile(self.entryFileName(key, suffix), fileName)
+            os.utime(manifestFileName, None)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def store(self, key, outputFileName, dependencyFileNames, withIndex=False):
+        """Adds a compiled package to the cache, then evicts old entries if needed.
+
+        Errors are ignored, since the cache is only an optimization.
+
+        Args:
+            key (str): the key from `computeKey`.
+            outputFileName (str): the compiled package file.
+            dependencyFileNames (list[str]): files of all packages that were loaded while
+                compiling the package.
+            withIndex (bool): whether an export index was written next to the package.
+        """
+        try:
+            manifest = [(fileName, hashFile(fileName))
+                        for fileName in sorted(set(dependencyFileNames))]
+            if any(fileHash is None for _, fileHash in manifest):
+                return
+            entryDirName = os.path.dirname(self.entryFileName(key, ""))
+            if not os.path.isdir(entryDirName):
+                os.makedirs(entryDirName)
+            inputs = [(PACKAGE_SUFFIX, outputFileName)]
+            if withIndex:
+                inputs.append((INDEX_SUFFIX, indexFileName(outputFileName)))
+            for suffix, fileName in inputs:
+                with open(fileName, "rb") as inFile:
+                    utils.writeFileAtomically(self.entryFileName(key, suffix), inFile.read())
+            utils.writeFileAtomically(self.entryFileName(key, MANIFEST_SUFFIX),
+                                      marshal.dumps((CACHE_VERSION, manifest)))
+            self.evict()
+        except (IOError, OSError):
+            pass
+
+    def evict(self):
+        """Removes least recently used entries until the cache is within its size limit.
+
+        Files saved in `DEFINITIONS_DIR_NAME` by `ParseCache` and `DefinitionCache` count
+        toward the limit, too. Each of them is evicted on its own; its modification time
+        records when it was last used.
+        """
+        entries = {}
+        for fileName in glob.glob(os.path.join(self.dirName, "*", "*")):
+            key, _, suffix = os.path.basename(fileName).partition(".")
+            suffix = "." + suffix
+            if suffix not in ENTRY_SUFFIXES:
+                continue
+            try:
+                stat = os.stat(fileName)
+            except OSError:
+                continue
+            # Remove the manifest first, so the entry is invalid if this is interrupted.
+            entryFileNames = [self.entryFileName(key, s) for s in ENTRY_SUFFIXES]
+            size, lastUsed, _ = entries.get(key, (0, 0, entryFileNames))
+            size += stat.st_size
+            if suffix == MANIFEST_SUFFIX:
+                lastUsed = stat.st_mtime
+            entries[key] = (size, lastUsed, entryFileNames)
+        for fileName in glob.glob(os.path.join(self.dirName, DEFINITIONS_DIR_NAME, "*", "*")):
+            try:
+                stat = os.stat(fileName)
+            except OSError:
+                continue
+            entries[fileName] = (stat.st_size, stat.st_mtime, [fileName])
+        totalSize = sum(size for size, _, _ in entries.itervalues())
+        for size, _, fileNames in sorted(entries.itervalues(), key=lambda e: e[1]):
+            if totalSize <= self.maxSize:
+                break
+            for fileName in fileNames:
+                try:
+                    os.remove(fileName)
+                except OSError:
+                    pass
+            totalSize -= size
+
+    def entryFileName(self, key, suffix):
+        return os.path.join(self.dirName, key[:2], key + suffix)
+
+
+def readManifest(fileName):
+    try:
+        with open(fileName, "rb") as manifestFile:
+            version, manifest = marshal.loads(manifestFile.read())
+    except (IOError, EOFError, ValueError, TypeError):
+        return None
+    if version != CACHE_VERSION:
+        return None
+    return manifest
+
+
+def hashFile(fileName):
+    try:
+        with open(fileName, "rb") as inFile:
+            return hashlib.sha1(inFile.read()).hexdigest()
+    except IOError:
+        return None
+
+
+def installFile(sourceFileName, destFileName):
+    if os.path.exists(destFileName) and os.path.samefile(sourceFileName, destFileName):
+        # Already linked by an earlier hit. Renaming a link over itself would do nothing.
+        return
+    tempFileName = "%s.%d.tmp" % (destFileName, os.getpid())
+    try:
+        os.link(sourceFileName, tempFileName)
+    except (AttributeError, OSError):
+        # Hard links aren't supported on this platform or across file systems.
+        shutil.copyfile(sourceFileName, tempFileName)
+    try:
+        if os.name == "nt" and os.path.exists(destFileName):
+            os.remove(destFileName)
+        os.rename(tempFileName, destFileName)
+    except OSError:
+        os.remove(tempFileName)
+        raise
+
+
+_compilerHash = None
+
+def getCompilerHash():
+    """Returns a hash of the compiler's own source and data files.
+
+    Cached packages are only valid for the compiler that produced them.
+    """
+    global _compilerHash
+    if _compilerHash is None:
+        h = hashlib.sha1()
+        dirName = os.path.dirname(os.path.abspath(__file__))
+        fileNames = glob.glob(os.path.join(dirName, "*.py")) + \
+                    glob.glob(os.path.join(dirName, "*.yaml"))
+        for fileName in sorted(fileNames):
+            h.update(os.path.basename(fileName) + "\0")
+            with open(fileName, "rb") as inFile:
+                h.update(inFile.read())
+        _compilerHash = h.hexdigest()
+    return _compilerHash
+
+
+__all__ = ["CompileCache", "DEFAULT_MAX_CACHE_SIZE", "DEFINITIONS_DIR_NAME"]
@@ -58,6 +58,10 @@ class CompileInfo(object):
         self.generatedNames = {}  # keyed by Name
         self.typeCheckFunction = None
 
+        # While a definition is analyzed for `DefinitionCache`, this is notified of everything
+        # added to the tables above and of names that are looked up (see `DefinitionRecorder`).
+        self.recorder = None
+
     def languageMode(self):
         if self.isUsingStd:
             return NORMAL_MODE
@@ -186,20 +190,26 @@ def _addDictMethods(elemName, dictName, types):
         return getattr(self, dictName)[key]
     setattr(CompileInfo, "getAll" + elemName, getAll)
 
+    setName = "set" + elemName
     def set(self, key, value):
         key = cleanKey(self, key)
         assert any(isinstance(key, type) for type in types)
+        if self.recorder is not None:
+            self.recorder.record(setName, key, value)
         getattr(self, dictName)[key] = [value]
-    setattr(CompileInfo, "set" + elemName, set)
+    setattr(CompileInfo, setName, set)
 
+    addName = "add" + elemName
     def add(self, key, value):
         key = cleanKey(self, key)
         assert any(isinstance(key, type) for type in types)
+        if self.recorder is not None:
+            self.recorder.record(addName, key, value)
         table = getattr(self, dictName)
         if key not in table:
             table[key] = []
         table[key].append(value)
-    setattr(CompileInfo, "add" + elemName, add)
+    setattr(CompileInfo, addName, add)
 
     def iter(self):
         table = getattr(self, dictName)
@@ -259,12 +269,35 @@ class ClosureInfo(data.Data):
         # Variable | None: for functions converted to closures defined inside other functions,
         # a Variable in the parent function containing an instance of the closure class.
         "irClosureVar",
+
+        # {Field | Variable -> DefnInfo}: for closures which capture immutable values from
+        # outer scopes, maps fields in irClosureClass holding the values to the definitions
+        # the values are loaded from when the closure object is created. The closure object
+        # is the context for these fields; it's stored in irClosureContexts, keyed by the
+        # closure class id. For lifted functions, maps captured parameters to the
+        # definitions loaded when the function is called.
+        "irCapturedValues",
+
+        # [Variable]: for local functions which are called directly instead of being
+        # converted to closures (lifted functions), parameters added to pass captured values
+        # and contexts, in order. Each parameter is either a key in irCapturedValues or a
+        # value in irClosureContexts.
+        "irCapturedParameters",
+
+        # Global | None: for closures which don't capture anything, a global holding the only
+        # instance of irClosureClass. The instance is created by the package initializer and
+        # loaded wherever the closure would otherwise be allocated.
+        "irClosureInstance",
     ]
 
-    def __init__(self, irClosureClass=None, irClosureContexts=None, irClosureVar=None):
+    def __init__(self, irClosureClass=None, irClosureContexts=None, irClosureVar=None,
+                 irCapturedValues=None, irCapturedParameters=None, irClosureInstance=None):
         self.irClosureClass = irClosureClass
         self.irClosureContexts = irClosureContexts if irClosureContexts else {}
         self.irClosureVar = irClosureVar
+        self.irCapturedValues = irCapturedValues if irCapturedValues else {}
+        self.irCapturedParameters = irCapturedParameters if irCapturedParameters else []
+        self.irClosureInstance = irClosureInstance
 
     def __repr__(self):
         irClosureClassStr = self.irClosureClass.name if self.irClosureClass else "None"
@@ -8,6 +8,7 @@ from functools import partial
 
 import ast
 from bytecode import W8, W16, W32, W64, BUILTIN_TYPE_CLASS_ID, BUILTIN_TYPE_CTOR_ID, instInfoByCode, BUILTIN_MATCH_EXCEPTION_CLASS_ID, BUILTIN_MATCH_EXCEPTION_CTOR_ID, BUILTIN_STRING_EQ_OP_ID
+from control_flow import ControlFlowGraph, reorderBlocks
 from externalization import externalizeType
 from ir import IrTopDefn, Class, Field, Function, Global, LOCAL, Package, Trait, Variable
 from ir_types import Type, NoType, UnitType, BooleanType, I8Type, I16Type, I32Type, I64Type, F32Type, F64Type, ObjectType, ClassType, VariableType, ExistentialType, NULLABLE_TYPE_FLAG, getExceptionClassType, getClassFromType, getStringType, getRootClassType
@@ -16,6 +17,9 @@ from compile_info import CONTEXT_CONSTRUCTOR_HINT, CLOSURE_CONSTRUCTOR_HINT, PAC
 from flags import ABSTRACT, STATIC, LET, ARRAY, NATIVE
 from errors import SemanticException
 from builtins import getTypeClass, getExceptionClass, getRootClass, getStringClass, getBuiltinFunctionById, getBuiltinClassById
+from serialize import encodeFunctionBody
+import stats
+from tail_calls import eliminateTailCallsInFunction, isEligible as isEligibleForTailCalls
 import type_analysis
 from utils import (
     COMPILE_FOR_EFFECT,
@@ -28,21 +32,95 @@ from utils import (
     listOpt,
 )
 from name import (
+    INSTANCE_SUFFIX,
     PACKAGE_INIT_NAME,
     RECEIVER_SUFFIX,
 )
 
 
-def compile(info):
+def compile(info, devirtualizer=None, optimizeMatches=False, profiler=None, streaming=False,
+            definitionCache=None):
+    """Generates instructions for each function in the package being compiled.
+
+    Args:
+        info (CompileInfo): the package being compiled, after closure conversion and
+            externalization.
+        devirtualizer (Devirtualizer?): if set, this is consulted to compile virtual method
+            calls as direct calls where possible.
+        optimizeMatches (bool): if true, match expressions and other partial functions are
+            compiled as decision trees, which share tests between adjacent cases.
+        profiler (Profiler?): if set, time spent compiling each function is recorded.
+        streaming (bool): if true, each function is passed to `emitFunction` as soon as it's
+            compiled, so its instructions are encoded and released instead of being kept
+            for the whole package. Passes that need instructions after this (inlining,
+            printing IR) can't be used.
+        definitionCache (DefinitionCache?): if set, instructions of functions that were
+            restored from this cache during type analysis are restored, too, if nothing they
+            refer to changed. Instructions of other functions are recorded in it. Can't be
+            used with `devirtualizer`.
+    """
+    assert devirtualizer is None or definitionCache is None
     for clas in info.package.classes:
         assignFieldIndices(clas, info)
+    addClosureInstances(info)
     init = info.package.addFunction(PACKAGE_INIT_NAME, returnType=UnitType,
                                     typeParameters=[], parameterTypes=[], variables=[],
                                     compileHint=PACKAGE_INITIALIZER_HINT)
     info.package.initFunction = init.id
     for function in info.package.functions:
-        compiler = CompileVisitor(function, info)
-        compiler.compile()
+        if profiler is not None:
+            profiler.enterFunction(function)
+        if definitionCache is None or not definitionCache.restoreCode(function):
+            compiler = CompileVisitor(function, info, devirtualizer, optimizeMatches)
+            if definitionCache is not None:
+                compiler.instructionLog = []
+            compiler.compile()
+            if definitionCache is not None:
+                definitionCache.recordCode(function, compiler.instructionLog)
+        if streaming:
+            emitFunction(function, info)
+        if profiler is not None:
+            profiler.exitFunction()
+
+
+def emitFunction(function, info):
+    """Encodes a compiled function and releases what was used to generate it.
+
+    Tail calls are eliminated (as `eliminateTailCalls` would do later), then the function's
+    body is encoded into `encodedBody`, and its blocks and instruction types are dropped.
+    The body of the function's definition in the syntax tree is dropped, too, along with
+    type, use, and call information recorded for it. Definitions nested inside the body
+    (lambdas, local functions, and classes) are kept, since they're compiled as separate
+    functions later. So the memory needed to compile a package is bounded by its largest
+    function, not the total size of its functions.
+    """
+    if isEligibleForTailCalls(function):
+        eliminateTailCallsInFunction(function)
+    if function.blocks is not None:
+        function.encodedBody = encodeFunctionBody(info.package, function)
+        function.blocks = None
+        function.instTypes = None
+
+    astDefn = function.astDefn
+    if isinstance(astDefn, (ast.FunctionDefinition, ast.LambdaExpression)) and \
+       astDefn.body is not None:
+        releaseNodeInfo(astDefn.body, info)
+        astDefn.body = None
+
+
+def releaseNodeInfo(node, info):
+    """Drops information about a syntax tree that's only needed to compile it."""
+    if isinstance(node, (ast.FunctionDefinition, ast.LambdaExpression,
+                         ast.ClassDefinition, ast.TraitDefinition)):
+        return
+    for key in (getattr(node, "id", None), getattr(node, "matcherId", None)):
+        if key is not None:
+            info.typeInfo.pop(key, None)
+            info.useInfo.pop(key, None)
+            info.callInfo.pop(key, None)
+    for child in node.children():
+        if child is not None:
+            releaseNodeInfo(child, info)
 
 
 def assignFieldIndices(clas, info):
@@ -51,6 +129,40 @@ def assignFieldIndices(clas, info):
         field.index = index
 
 
+def addClosureInstances(info):
+    """Creates globals to hold shared instances of closures that don't capture anything.
+
+    A closure class with no fields and no type parameters has no state, so all of its
+    instances are interchangeable. Rather than allocating a new instance each time a lambda
+    or local function is evaluated (possibly in a loop), one instance is created by the
+    package initializer and loaded from a global.
+    """
+    for clas in list(info.package.classes):
+        if not isClosureClass(clas) or \
+           len(clas.fields) > 0 or \
+           len(clas.typeParameters) > 0:
+            continue
+        closureInfo = info.getClosureInfo(clas)
+        closureInfo.irClosureInstance = info.package.addGlobal(
+            clas.name.withSuffix(INSTANCE_SUFFIX),
+            type=ClassType(clas),
+            flags=frozenset([LET]))
+
+
+def isClosureClass(clas):
+    return len(clas.constructors) == 1 and \
+           clas.constructors[0].compileHint is CLOSURE_CONSTRUCTOR_HINT
+
+
+def getIntegerLiteralValue(lit):
+    """Returns the signed value of an integer literal."""
+    value = lit.value
+    if value >= 2 ** (lit.width - 1):
+        value -= 2 ** lit.width
+    assert -(2 ** (lit.width - 1)) <= value and value < 2 ** (lit.width - 1)
+    return value
+
+
 class TryState(object):
     def __init__(self, parent, ast, mode, tryStackHeight, finallyBlock):
         self.parent = parent
@@ -101,12 +213,14 @@ class TryState(object):
 
 
 class CompileVisitor(ast.NodeVisitor):
-    def __init__(self, function, info):
+    def __init__(self, function, info, devirtualizer=None, optimizeMatches=False):
         self.function = function
         self.astDefn = function.astDefn if hasattr(function, "astDefn") else None
         self.compileHint = function.compileHint if hasattr(function, "compileHint") else None
         assert self.astDefn is not None or self.compileHint is not None
         self.info = info
+        self.devirtualizer = devirtualizer
+        self.optimizeMatches = optimizeMatches
         self.blocks = []
         self.types = []
         self.stackHeights = []
@@ -115,7 +229,9 @@ class CompileVisitor(ast.NodeVisitor):
         self.currentStackHeight = None
         self.unreachable = False
         self.tryStateStack = []
-        self.labels = []
+        # If set, each instruction that's built is appended along with the operands it was
+        # built from, including instructions that are dropped because they're unreachable.
+        self.instructionLog = None
 
         firstBlock = self.newBlock()
         self.setStackHeightForBlock(firstBlock, 0)
@@ -175,7 +291,15 @@ class CompileVisitor(ast.NodeVisitor):
             self.unit()
             self.ret()
         elif self.compileHint is PACKAGE_INITIALIZER_HINT:
-            # This function initializes all the global variables.
+            # This function initializes all the global variables. Shared closure instances
+            # are created first, since other globals' initializers may load them.
+            for clas in self.info.package.classes:
+                if not isClosureClass(clas):
+                    continue
+                closureInfo = self.info.getClosureInfo(clas)
+                if closureInfo.irClosureInstance is not None:
+                    self.allocateClosure(closureInfo, COMPILE_FOR_VALUE)
+                    self.storeGlobal(closureInfo.irClosureInstance)
             for module in self.info.ast.modules:
                 for defn in module.definitions:
                     if isinstance(defn, ast.VariableDefinition):
@@ -1081,18 +1205,14 @@ class CompileVisitor(ast.NodeVisitor):
                 self.drop()
 
     def visitPartialFunctionExpression(self, expr, mode, ty, doneBlock, failBlock):
+        if self.optimizeMatches:
+            self.buildMatchDecisionTree(expr, mode, ty, doneBlock, failBlock)
+            return
+
         doneIsReachable = False
 
         def handleCase(case, failBlock):
-            with UnreachableScope(self):
-                self.visitPartialFunctionCase(case, mode, ty, doneBlock, failBlock)
-                caseTerminates = self.unreachable
-            mustMatch = type_analysis.partialFunctionCaseMustMatch(case, ty, self.info)
-            doneIsReachable = not self.unreachable and not caseTerminates
-            if mustMatch:
-                # Later cases are not reachable.
-                self.setUnreachable()
-            return doneIsReachable
+            return self.buildMatchCase(case, mode, ty, doneBlock, failBlock)
 
         cases = expr.realCases()
         with UnreachableScope(self):
@@ -1137,6 +1257,315 @@ class CompileVisitor(ast.NodeVisitor):
         self.branch(doneBlock.id)
         self.detach()
 
+    def buildMatchCase(self, case, mode, ty, doneBlock, failBlock):
+        """Compiles a single case of a partial function.
+
+        If the case must match, the code after it is marked unreachable.
+
+        Returns:
+            (bool): whether `doneBlock` is reachable from this case.
+        """
+        with UnreachableScope(self):
+            self.visitPartialFunctionCase(case, mode, ty, doneBlock, failBlock)
+            caseTerminates = self.unreachable
+        mustMatch = type_analysis.partialFunctionCaseMustMatch(case, ty, self.info)
+        doneIsReachable = not self.unreachable and not caseTerminates
+        if mustMatch:
+            # Later cases are not reachable.
+            self.setUnreachable()
+        return doneIsReachable
+
+    SINGLE_CASE = "SINGLE_CASE"
+    INTEGER_SWITCH = "INTEGER_SWITCH"
+    TYPE_TEST = "TYPE_TEST"
+    DESTRUCTURE = "DESTRUCTURE"
+
+    # Minimum number of adjacent integer literal cases to compile as a binary search.
+    MIN_SWITCH_CASES = 4
+
+    # Maximum number of integer literal cases to test one after another in a binary search.
+    LINEAR_SWITCH_CASES = 3
+
+    def buildMatchDecisionTree(self, expr, mode, ty, doneBlock, failBlock):
+        """Compiles a partial function so that adjacent cases share tests where possible.
+
+        Cases are still tried in order, so the first matching case is selected, but
+        adjacent cases which start with the same test are grouped together:
+
+        - Integer literal cases without conditions are dispatched with a binary search on
+          the value instead of being compared one at a time.
+        - Cases with a type test for the same type share a single `castcbr`. If the test
+          fails, the whole group is skipped. If it succeeds, later cases in the group don't
+          need to test again.
+        - Destructuring cases with the same matcher share a single call to the matcher
+          and a single check of its result. The unpacked value is matched against each
+          case's sub-patterns in turn.
+
+        Cases which can't be grouped are compiled the same way as
+        `visitPartialFunctionExpression` compiles them.
+        """
+        cases = [c for c in expr.realCases() if isinstance(c, ast.PartialFunctionCase)]
+        groups = self.groupMatchCases(cases, ty)
+        doneIsReachable = False
+        with UnreachableScope(self):
+            for i, (kind, key, groupCases) in enumerate(groups):
+                if self.unreachable:
+                    break
+                nextBlock = failBlock if i == len(groups) - 1 else self.newBlock()
+                if kind is self.SINGLE_CASE:
+                    doneIsReachable |= self.buildMatchCase(groupCases[0], mode, ty,
+                                                           doneBlock, nextBlock)
+                else:
+                    with UnreachableScope(self):
+                        if kind is self.INTEGER_SWITCH:
+                            doneIsReachable |= self.buildIntegerSwitch(groupCases, mode, ty,
+                                                                       doneBlock, nextBlock)
+                        elif kind is self.TYPE_TEST:
+                            doneIsReachable |= self.buildTypeTestGroup(groupCases, mode, key,
+                                                                       doneBlock, nextBlock)
+                        else:
+                            assert kind is self.DESTRUCTURE
+                            doneIsReachable |= self.buildDestructureGroup(groupCases, mode,
+                                                                          doneBlock, nextBlock)
+                if nextBlock is not failBlock:
+                    self.setCurrentBlock(nextBlock)
+        if not doneIsReachable:
+            self.setUnreachable()
+        self.detach()
+
+    def groupMatchCases(self, cases, ty):
+        """Splits the cases of a partial function into groups of adjacent cases which can
+        share tests.
+
+        Returns:
+            (list[(symbol, object, list[PartialFunctionCase])]): a list of groups. Each group
+            has a kind, a key (the type being tested for `TYPE_TEST` groups), and a list of
+            cases.
+        """
+        def getGroupKey(case):
+            pat = case.pattern
+            while isinstance(pat, ast.GroupPattern):
+                pat = pat.pattern
+            if isinstance(pat, ast.LiteralPattern) and \
+               isinstance(pat.literal, ast.IntegerLiteral) and \
+               case.condition is None and \
+               ty in (I8Type, I16Type, I32Type, I64Type) and \
+               self.info.getType(pat) == ty:
+                return self.INTEGER_SWITCH, None
+            if isinstance(pat, (ast.VariablePattern, ast.BlankPattern)) and \
+               pat.ty is not None and \
+               not self.info.hasUseInfo(pat) and \
+               not type_analysis.patternMustMatch(pat, ty, self.info):
+                testType = self.info.getType(pat if isinstance(pat, ast.VariablePattern)
+                                             else pat.ty)
+                return self.TYPE_TEST, testType
+            if isinstance(pat, ast.DestructurePattern) and \
+               len(pat.prefix) == 1 and \
+               not self.info.hasUseInfo(pat.prefix[0]):
+                # Only matchers without an explicit receiver are grouped. Evaluating a prefix
+                # could have side effects.
+                irDefn = self.info.getUseInfo(pat).defnInfo.irDefn
+                callInfo = self.info.getCallInfo(pat)
+                return self.DESTRUCTURE, (irDefn.id, callInfo.receiverType,
+                                          tuple(callInfo.typeArguments))
+            return self.SINGLE_CASE, None
+
+        minGroupSizes = {
+            self.INTEGER_SWITCH: self.MIN_SWITCH_CASES,
+            self.TYPE_TEST: 2,
+            self.DESTRUCTURE: 2,
+        }
+        groups = []
+        i = 0
+        while i < len(cases):
+            kind, key = getGroupKey(cases[i])
+            j = i + 1
+            if kind is not self.SINGLE_CASE:
+                while j < len(cases) and getGroupKey(cases[j]) == (kind, key):
+                    j += 1
+            if kind is self.SINGLE_CASE or j - i < minGroupSizes[kind]:
+                groups.extend((self.SINGLE_CASE, None, [case]) for case in cases[i:j])
+            else:
+                groups.append((kind, key, cases[i:j]))
+            i = j
+        return groups
+
+    def buildIntegerSwitch(self, cases, mode, ty, doneBlock, failBlock):
+        """Compiles a group of integer literal cases as a binary search on the value.
+
+        If several cases have the same value, only the first is reachable.
+
+        Returns:
+            (bool): whether `doneBlock` is reachable from any of the cases.
+        """
+        entries = []
+        values = set()
+        for case in cases:
+            pat = case.pattern
+            while isinstance(pat, ast.GroupPattern):
+                pat = pat.pattern
+            value = getIntegerLiteralValue(pat.literal)
+            if value in values:
+                continue
+            values.add(value)
+            entries.append((value, pat.literal, self.newBlock(), case))
+
+        self.buildIntegerSwitchTree(sorted(entries), ty, failBlock)
+
+        doneIsReachable = False
+        for _, _, caseBlock, case in entries:
+            with UnreachableScope(self):
+                self.setCurrentBlock(caseBlock)
+                self.drop()
+                self.visit(case.expression, mode)
+                self.branch(doneBlock.id)
+                caseTerminates = self.unreachable
+            doneIsReachable |= not caseTerminates
+            self.detach()
+        return doneIsReachable
+
+    def buildIntegerSwitchTree(self, entries, ty, failBlock):
+        if len(entries) <= self.LINEAR_SWITCH_CASES:
+            for i, (_, lit, caseBlock, _) in enumerate(entries):
+                self.dup()
+                self.buildLiteral(lit)
+                self.buildEquals(ty)
+                nextBlock = failBlock if i == len(entries) - 1 else self.newBlock()
+                self.branchif(caseBlock.id, nextBlock.id)
+                if nextBlock is not failBlock:
+                    self.setCurrentBlock(nextBlock)
+            self.detach()
+            return
+
+        middle = len(entries) // 2
+        self.dup()
+        self.buildLiteral(entries[middle][1])
+        self.buildCallNamedMethod(ty, "<", COMPILE_FOR_VALUE)
+        lessBlock = self.newBlock()
+        greaterBlock = self.newBlock()
+        self.branchif(lessBlock.id, greaterBlock.id)
+        self.setCurrentBlock(lessBlock)
+        self.buildIntegerSwitchTree(entries[:middle], ty, failBlock)
+        self.setCurrentBlock(greaterBlock)
+        self.buildIntegerSwitchTree(entries[middle:], ty, failBlock)
+
+    def buildTypeTestGroup(self, cases, mode, testType, doneBlock, failBlock):
+        """Compiles a group of cases which all test whether the value has `testType`.
+
+        The test is performed once. If it fails, none of the cases can match. If it succeeds,
+        the cases are compiled knowing the value has `testType`, so they don't test again.
+
+        Returns:
+            (bool): whether `doneBlock` is reachable from any of the cases.
+        """
+        self.buildType(testType)
+        successBlock = self.newBlock()
+        self.castcbr(successBlock.id, failBlock.id)
+        self.setCurrentBlock(successBlock)
+        doneIsReachable = False
+        for i, case in enumerate(cases):
+            if self.unreachable:
+                break
+            nextBlock = failBlock if i == len(cases) - 1 else self.newBlock()
+            doneIsReachable |= self.buildMatchCase(case, mode, testType, doneBlock, nextBlock)
+            if nextBlock is not failBlock:
+                self.setCurrentBlock(nextBlock)
+        return doneIsReachable
+
+    def buildDestructureGroup(self, cases, mode, doneBlock, failBlock):
+        """Compiles a group of destructuring cases which use the same matcher.
+
+        The matcher is called once, and its result is checked once. If it doesn't return
+        `Some`, none of the cases can match. Otherwise, the value inside is kept on the stack
+        (above the value being matched) while each case's sub-patterns are tried.
+
+        Returns:
+            (bool): whether `doneBlock` is reachable from any of the cases.
+        """
+        pat = cases[0].pattern
+        while isinstance(pat, ast.GroupPattern):
+            pat = pat.pattern
+        irDefn = self.info.getUseInfo(pat).defnInfo.irDefn
+        callInfo = self.info.getCallInfo(pat)
+        optionType, valueType = self.buildMatcherCall(irDefn, callInfo.receiverType, False,
+                                                      callInfo.typeArguments, pat.location)
+        self.dup()
+        self.buildStaticTypeArgument(valueType)
+        self.buildCallNamedMethod(optionType, "is-defined", COMPILE_FOR_VALUE)
+        matcherSuccessBlock = self.newBlock()
+        dropOptionBlock = self.newBlock()
+        self.branchif(matcherSuccessBlock.id, dropOptionBlock.id)
+
+        self.setCurrentBlock(dropOptionBlock)
+        self.drop()
+        self.branch(failBlock.id)
+
+        self.setCurrentBlock(matcherSuccessBlock)
+        self.buildStaticTypeArgument(valueType)
+        self.buildCallNamedMethod(optionType, "get", COMPILE_FOR_VALUE)
+
+        dropValueBlock = self.newBlock()
+        doneIsReachable = False
+        for i, case in enumerate(cases):
+            if self.unreachable:
+                break
+            nextBlock = dropValueBlock if i == len(cases) - 1 else self.newBlock()
+            doneIsReachable |= self.buildDestructureGroupCase(case, mode, valueType,
+                                                              doneBlock, nextBlock)
+            self.setCurrentBlock(nextBlock)
+
+        if not self.unreachable:
+            self.drop()
+            self.branch(failBlock.id)
+        return doneIsReachable
+
+    def buildDestructureGroupCase(self, case, mode, valueType, doneBlock, failBlock):
+        """Compiles one case of a group built by `buildDestructureGroup`.
+
+        The value being matched and the value returned by the matcher should be on the stack.
+        On failure, code branches to `failBlock` with both values still on the stack. If the
+        case must match, the code after it is marked unreachable.
+
+        Returns:
+            (bool): whether `doneBlock` is reachable from this case.
+        """
+        pat = case.pattern
+        while isinstance(pat, ast.GroupPattern):
+            pat = pat.pattern
+        valueTypes = [valueType] if len(pat.patterns) == 1 else valueType.getTypeArguments()
+        mustMatch = case.condition is None and \
+                    all(type_analysis.patternMustMatch(subPat, subTy, self.info)
+                        for subPat, subTy in zip(pat.patterns, valueTypes))
+
+        with UnreachableScope(self):
+            self.dup()
+            subPatternFailBlock = self.newBlock()
+            self.buildDestructureSubPatterns(pat.patterns, valueType, subPatternFailBlock)
+            if self.stackHeights[subPatternFailBlock.id] is not None:
+                successState = self.saveCurrentBlock()
+                self.setCurrentBlock(subPatternFailBlock)
+                self.drop()
+                self.branch(failBlock.id)
+                self.restoreCurrentBlock(successState)
+
+            if case.condition is not None:
+                self.visit(case.condition, COMPILE_FOR_VALUE)
+                successBlock = self.newBlock()
+                self.branchif(successBlock.id, failBlock.id)
+                self.setCurrentBlock(successBlock)
+
+            # Drop the matcher's result and the value being matched.
+            self.drop()
+            self.drop()
+            self.visit(case.expression, mode)
+            self.branch(doneBlock.id)
+            self.detach()
+            caseTerminates = self.unreachable
+        doneIsReachable = not self.unreachable and not caseTerminates
+        if mustMatch:
+            self.setUnreachable()
+        return doneIsReachable
+
     def visitLambdaExpression(self, expr, mode):
         closureInfo = self.info.getClosureInfo(expr)
         assert closureInfo.irClosureClass is not None
@@ -1274,6 +1703,11 @@ class CompileVisitor(ast.NodeVisitor):
                     defnInfo = self.info.getDefnInfo(param.pattern)
                     if isinstance(defnInfo.irDefn, Variable):
                        defnInfo.irDefn.index = index + implicitParamCount
+        if self.info.hasClosureInfo(self.getScopeId()):
+            capturedParams = self.info.getClosureInfo(self.getScopeId()).irCapturedParameters
+            firstIndex = implicitParamCount + len(listOpt(parameters))
+            for index, param in enumerate(capturedParams):
+                param.index = firstIndex + index
 
     def unpackParameters(self, parameters):
         implicitParameterCount = 1 if self.function.isMethod() else 0
@@ -1368,6 +1802,8 @@ class CompileVisitor(ast.NodeVisitor):
                 self.callMethod(irDefn, callInfo.receiverType)
             else:
                 assert not receiverIsExplicit
+                if self.info.hasScope(irDefn) and self.info.hasClosureInfo(irDefn):
+                    self.buildCapturedArguments(self.info.getClosureInfo(irDefn))
                 self.buildStaticTypeArguments(callInfo.typeArguments)
                 self.callFunction(irDefn)
         else:
@@ -1506,30 +1942,56 @@ class CompileVisitor(ast.NodeVisitor):
                 raise NotImplementedError
 
     def buildClosure(self, closureInfo, mode):
+        if closureInfo.irClosureInstance is not None:
+            if mode is COMPILE_FOR_VALUE:
+                self.loadGlobal(closureInfo.irClosureInstance)
+        else:
+            self.allocateClosure(closureInfo, mode)
+
+    def allocateClosure(self, closureInfo, mode):
         closureClass = closureInfo.irClosureClass
         assert not closureClass.isForeign() and len(closureClass.constructors) == 1
         closureCtor = closureClass.constructors[0]
         assert closureClass.typeParameters == closureCtor.typeParameters
-        capturedScopeIds = closureInfo.capturedScopeIds()
-        assert len(closureCtor.parameterTypes) == len(capturedScopeIds) + 1
+        assert len(closureCtor.parameterTypes) == len(closureClass.fields) + 1
         self.buildImplicitStaticTypeArguments(closureClass.typeParameters)
         self.allocobj(closureClass)
         if mode is COMPILE_FOR_VALUE:
             self.dup()
-        for id in capturedScopeIds:
-            self.loadContext(id)
+
+        # The constructor stores its arguments in the closure's fields, in order. Each field
+        # holds either a captured context or a captured value.
+        contextScopeIds = {field: scopeId
+                           for scopeId, field in closureInfo.irClosureContexts.iteritems()
+                           if isinstance(field, Field)}
+        for field in closureClass.fields:
+            if field in closureInfo.irCapturedValues:
+                self.loadVariable(closureInfo.irCapturedValues[field])
+            else:
+                self.loadContext(contextScopeIds[field])
         self.buildImplicitStaticTypeArguments(closureCtor.typeParameters)
         self.callg(closureCtor)
         self.drop()
 
+    def buildCapturedArguments(self, closureInfo):
+        # Local functions called directly instead of through closures receive captured
+        # values and contexts as extra parameters after the normal ones.
+        if len(closureInfo.irCapturedParameters) == 0:
+            return
+        contextScopeIds = {param: scopeId
+                           for scopeId, param in closureInfo.irClosureContexts.iteritems()
+                           if isinstance(param, Variable)}
+        for param in closureInfo.irCapturedParameters:
+            if param in closureInfo.irCapturedValues:
+                self.loadVariable(closureInfo.irCapturedValues[param])
+            else:
+                self.loadContext(contextScopeIds[param])
+
     def buildLiteral(self, lit):
         if isinstance(lit, ast.UnitLiteral):
             self.unit()
         elif isinstance(lit, ast.IntegerLiteral):
-            value = lit.value
-            if value >= 2 ** (lit.width - 1):
-                value -= 2 ** lit.width
-            assert -(2 ** (lit.width - 1)) <= value and value < 2 ** (lit.width - 1)
+            value = getIntegerLiteralValue(lit)
             if lit.width == 8:
                 self.i8(value)
             elif lit.width == 16:
@@ -1592,8 +2054,8 @@ class CompileVisitor(ast.NodeVisitor):
         """Builds a call to a non-static method.
 
         If the method has instructions specified (nearly all primitive methods), those are
-        inlined directly. If the method is final, it is called statically. If the method is
-        defined in a class or the receiver type is a class, it will be called virtually.
+        inlined directly. If the method is final, or if the devirtualizer can prove which
+        method will be called, it is called statically. Otherwise, it will be called virtually.
 
         Args:
             method (Function): the method to call.
@@ -1605,7 +2067,9 @@ class CompileVisitor(ast.NodeVisitor):
 
         if method.insts is not None:
             self.addBuiltinInstructions(method.insts)
-        elif method.isFinal():
+        elif method.isFinal() or \
+             (self.devirtualizer is not None and
+              self.devirtualizer.devirtualize(method, receiverType)):
             self.callFunction(method)
         else:
             if method.isForeign():
@@ -1652,6 +2116,8 @@ class CompileVisitor(ast.NodeVisitor):
                 assert receiver is not self.HAVE_RECEIVER
                 compileReceiver()
             compileArgs()
+            if closureInfo is not None:
+                self.buildCapturedArguments(closureInfo)
             compileTypeArgs()
             self.callFunction(irDefn)
 
@@ -1740,21 +2206,8 @@ class CompileVisitor(ast.NodeVisitor):
                 left on the stack.
             loc: the location of the matching pattern. Used for errors.
         """
-        # Call the matcher function.
-        if irDefn.isMethod():
-            if not hasPrefix:
-                self.loadImplicitReceiver(irDefn)
-            self.dupi(1)
-            self.buildStaticTypeArguments(typeArgs)
-            self.callMethod(irDefn, receiverType)
-        else:
-            self.dup()
-            self.buildStaticTypeArguments(typeArgs)
-            self.callFunction(irDefn)
-        returnType = irDefn.returnType.substitute(irDefn.typeParameters, typeArgs)
-        optionClass = self.info.getStdClass("Option", loc)
-        optionType = returnType.substituteForBase(optionClass)
-        valueType = optionType.getTypeArguments()[0]
+        optionType, valueType = self.buildMatcherCall(irDefn, receiverType, hasPrefix,
+                                                      typeArgs, loc)
 
         # Check if it returned Some.
         self.dup()
@@ -1764,39 +2217,12 @@ class CompileVisitor(ast.NodeVisitor):
         dropBlock = self.newBlock()
         self.branchif(matcherSuccessBlock.id, dropBlock.id)
 
-        # Get the value out of the Some. Cast it to a tuple if we need to.
+        # Get the value out of the Some.
         self.setCurrentBlock(matcherSuccessBlock)
         self.buildStaticTypeArgument(valueType)
         self.buildCallNamedMethod(optionType, "get", COMPILE_FOR_VALUE)
-
-        # If there is just one sub-pattern, pass the value to that pattern. Otherwise, the
-        # value must be a tuple. Load each value out of the tuple and pass those to the
-        # sub-patterns.
-        successState = None
-        n = len(subPatterns)
-        if n == 1:
-            self.visit(subPatterns[0], COMPILE_FOR_MATCH, valueType, dropBlock)
-            successState = self.saveCurrentBlock()
-        else:
-            tupleClass = valueType.clas
-            valueTypeArgs = valueType.getTypeArguments()
-            dropFieldBlock = self.newBlock()
-            mustMatch = True
-            for i in xrange(n - 1):
-                self.dup()
-                self.loadField(tupleClass.fields[i])
-                self.visit(subPatterns[i], COMPILE_FOR_MATCH, valueTypeArgs[i], dropFieldBlock)
-                mustMatch &= type_analysis.patternMustMatch(subPatterns[i], valueTypeArgs[i],
-                                                           self.info)
-            self.loadField(tupleClass.fields[n - 1])
-            self.visit(subPatterns[-1], COMPILE_FOR_MATCH, valueTypeArgs[-1], dropBlock)
-            successState = self.saveCurrentBlock()
-
-            # If one of the sub-patterns failed to match, we need to drop the field.
-            if not mustMatch:
-                self.setCurrentBlock(dropFieldBlock)
-                self.drop()
-                self.branch(dropBlock.id)
+        self.buildDestructureSubPatterns(subPatterns, valueType, dropBlock)
+        successState = self.saveCurrentBlock()
 
         # If the matcher did not return Some, drop the return value.
         self.setCurrentBlock(dropBlock)
@@ -1807,6 +2233,68 @@ class CompileVisitor(ast.NodeVisitor):
         self.restoreCurrentBlock(successState)
         self.drop()
 
+    def buildMatcherCall(self, irDefn, receiverType, hasPrefix, typeArgs, loc):
+        """Generates code to call a matcher function for a destructuring pattern.
+
+        The value to be destructured should already be on the stack. It is left on the stack,
+        and the matcher's return value is pushed on top of it.
+
+        Returns:
+            (ClassType, Type): the `Option` type returned by the matcher, and the type of
+            the value inside the `Option`.
+        """
+        if irDefn.isMethod():
+            if not hasPrefix:
+                self.loadImplicitReceiver(irDefn)
+            self.dupi(1)
+            self.buildStaticTypeArguments(typeArgs)
+            self.callMethod(irDefn, receiverType)
+        else:
+            self.dup()
+            self.buildStaticTypeArguments(typeArgs)
+            self.callFunction(irDefn)
+        returnType = irDefn.returnType.substitute(irDefn.typeParameters, typeArgs)
+        optionClass = self.info.getStdClass("Option", loc)
+        optionType = returnType.substituteForBase(optionClass)
+        valueType = optionType.getTypeArguments()[0]
+        return optionType, valueType
+
+    def buildDestructureSubPatterns(self, subPatterns, valueType, failBlock):
+        """Generates code to match the value returned by a matcher against sub-patterns.
+
+        The value should be on top of the stack. If there is just one sub-pattern, the value
+        is passed to that pattern. Otherwise, the value must be a tuple. Each value is loaded
+        out of the tuple and passed to the corresponding sub-pattern.
+
+        On success, the value is consumed. On failure, code branches to `failBlock` with one
+        value (the matched value or one of its elements) left on the stack.
+        """
+        n = len(subPatterns)
+        if n == 1:
+            self.visit(subPatterns[0], COMPILE_FOR_MATCH, valueType, failBlock)
+            return
+
+        tupleClass = valueType.clas
+        valueTypeArgs = valueType.getTypeArguments()
+        dropFieldBlock = self.newBlock()
+        mustMatch = True
+        for i in xrange(n - 1):
+            self.dup()
+            self.loadField(tupleClass.fields[i])
+            self.visit(subPatterns[i], COMPILE_FOR_MATCH, valueTypeArgs[i], dropFieldBlock)
+            mustMatch &= type_analysis.patternMustMatch(subPatterns[i], valueTypeArgs[i],
+                                                       self.info)
+        self.loadField(tupleClass.fields[n - 1])
+        self.visit(subPatterns[-1], COMPILE_FOR_MATCH, valueTypeArgs[-1], failBlock)
+
+        # If one of the sub-patterns failed to match, we need to drop the field.
+        if not mustMatch:
+            successState = self.saveCurrentBlock()
+            self.setCurrentBlock(dropFieldBlock)
+            self.drop()
+            self.branch(failBlock.id)
+            self.restoreCurrentBlock(successState)
+
     def buildAssignment(self, lvalue, mode):
         if lvalue.onStack():
             self.swap()
@@ -1872,10 +2360,17 @@ class CompileVisitor(ast.NodeVisitor):
         Returns:
             (int): the index of the type. Instructions may encode this.
         """
+        if stats.enabled:
+            stats.count("compiler.findOrAddType.calls")
         try:
-            return self.types.index(ty)
+            index = self.types.index(ty)
+            if stats.enabled:
+                stats.count("compiler.findOrAddType.scanSteps", index + 1)
+            return index
         except ValueError:
             index = len(self.types)
+            if stats.enabled:
+                stats.count("compiler.findOrAddType.scanSteps", index)
             self.types.append(ty)
             externalizeType(self.info, ty)
             return index
@@ -1887,65 +2382,18 @@ class CompileVisitor(ast.NodeVisitor):
             astDefn = self.astDefn
         return self.info.getScope(astDefn).scopeId
 
-    def label(self, id):
-        inst = self.label_(id)
-        self.labels.append(inst)
-        return inst
-
     def orderBlocks(self):
-        # Clear the "id" attribute of each block. None will indicate a block has not been
-        # been visited yet. -1 indicates a block is being visited but doesn't have an id yet.
-        # Other values are new ids.
-        for block in self.blocks:
-            block.id = None
-
-        # Assign new ids to the blocks. Ids are assigned in post-order, and we reverse this
-        # after traversing the CFG. When visiting children, the last child is visited first so
-        # that true branches will be ordered before false branches.
-        self.nextBlockId = Counter()
-        def visitBlock(block):
-            if block.id is not None:
-                return
-            block.id = -1
-            for succ in reversed(block.successorIds()):
-                visitBlock(self.blocks[succ])
-            block.id = self.nextBlockId()
-        visitBlock(self.blocks[0])
-
-        # Reverse the order. The first block should come first.
-        liveBlockCount = self.nextBlockId.value()
-        for block in self.blocks:
-            if block.id is not None:
-                block.id = liveBlockCount - block.id - 1
-
-        # Update terminating instructions and labels to point to the new block ids.
-        for block in self.blocks:
-            if block.id is None:   # dead block
-                continue
-            inst = block.instructions[-1]
-            successorIds = [self.blocks[id].id for id in inst.successorIds()]
-            inst.setSuccessorIds(successorIds)
-
-        for label in self.labels:
-            newId = self.blocks[label.blockId()].id
-            if newId is None:
-                # Labels may point to dead blocks, likely because the corresponding branchl
-                # instruction was unreachable. When this happens, point to -1, which the
-                # interpreter will handle specially.
-                newId = -1
-            label.setBlockId(newId)
-
-        # Rebuild the block list with the new order.
-        orderedBlockList = [None] * liveBlockCount
-        for block in self.blocks:
-            if block.id is not None:
-                orderedBlockList[block.id] = block
-        self.blocks = orderedBlockList
+        # Sort the blocks in reverse-post-order. Unreachable blocks are removed. Terminating
+        # instructions and labels are updated to point to the new block ids.
+        cfg = ControlFlowGraph(self.blocks)
+        self.blocks = reorderBlocks(self.blocks, cfg.reversePostOrder())
 
 
 def _makeInstBuilder(instClass):
     def instBuilder(self, *operands):
         inst = instClass(*operands)
+        if self.instructionLog is not None:
+            self.instructionLog.append((inst, operands))
         self.add(inst)
         return inst
     return instBuilder
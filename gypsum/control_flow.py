@@ -0,0 +1,411 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import ir_instructions
+
+
+class ControlFlowGraph(object):
+    """Answers structural questions about the control flow of a compiled function.
+
+    The graph is built over a list of `BasicBlock`s. Each block's id must be its index in
+    the list, and block 0 is the entry block. Edges come from the terminating instruction of
+    each block: `branch`, `branchif`, `castcbr`, `pushtry` (both the try block and the catch
+    block), `poptry`, and `branchl` (every possible target). `label` instructions don't
+    transfer control themselves; the blocks they refer to are reached through `branchl`.
+    They are tracked separately, since blocks whose offsets are taken must be updated when
+    blocks are renumbered.
+
+    Blocks which don't end with a terminating instruction are treated as having no
+    successors. These can be left behind by the compiler in unreachable code.
+
+    All traversals are iterative, so very large functions won't exhaust the Python stack.
+    Results are computed lazily and cached, so the blocks should not be modified while the
+    graph is in use.
+
+    Attributes:
+        blocks (list[BasicBlock]): the blocks of the function.
+    """
+
+    def __init__(self, blocks):
+        assert all(block.id == i for i, block in enumerate(blocks))
+        self.blocks = blocks
+        self._successors = [tuple(block.successorIds()) if isTerminated(block) else ()
+                            for block in blocks]
+        self._predecessors = None
+        self._reversePostOrder = None
+        self._idoms = None
+        self._domTreeNumbers = None
+        self._handlerStacks = None
+
+    def successorIds(self, id):
+        """Returns the ids of blocks that control may flow to from block `id`."""
+        return self._successors[id]
+
+    def predecessorIds(self, id):
+        """Returns the ids of reachable blocks which may flow to block `id`."""
+        if self._predecessors is None:
+            predecessors = [[] for _ in self.blocks]
+            for blockId in self.reversePostOrder():
+                for succId in self._successors[blockId]:
+                    # A block may list the same successor more than once. Those appear
+                    # together, since we finish with each block before the next.
+                    if len(predecessors[succId]) == 0 or predecessors[succId][-1] != blockId:
+                        predecessors[succId].append(blockId)
+            self._predecessors = predecessors
+        return self._predecessors[id]
+
+    def reversePostOrder(self):
+        """Returns the ids of blocks reachable from the entry block in reverse post-order.
+
+        When a block has multiple successors, the first successor is ordered first. So for
+        a `branchif`, the true block comes before the false block.
+        """
+        if self._reversePostOrder is not None:
+            return self._reversePostOrder
+        if len(self.blocks) == 0:
+            self._reversePostOrder = []
+            return self._reversePostOrder
+
+        # Successors are visited last to first, so that the first successor gets the lowest
+        # post-order number of its siblings and appears first after reversing.
+        postOrder = []
+        visited = [False] * len(self.blocks)
+        visited[0] = True
+        stack = [(0, iter(reversed(self._successors[0])))]
+        while len(stack) > 0:
+            id, succIter = stack[-1]
+            for succId in succIter:
+                if not visited[succId]:
+                    visited[succId] = True
+                    stack.append((succId, iter(reversed(self._successors[succId]))))
+                    break
+            else:
+                stack.pop()
+                postOrder.append(id)
+        postOrder.reverse()
+        self._reversePostOrder = postOrder
+        return postOrder
+
+    def isReachable(self, id):
+        """Returns whether block `id` is reachable from the entry block."""
+        return self.immediateDominator(id) is not None
+
+    def immediateDominator(self, id):
+        """Returns the id of the immediate dominator of block `id`.
+
+        The entry block is its own immediate dominator. `None` is returned for unreachable
+        blocks. This uses the algorithm from "A Simple, Fast Dominance Algorithm" by Cooper,
+        Harvey, and Kennedy.
+        """
+        if self._idoms is None:
+            self._idoms = self._computeImmediateDominators()
+        return self._idoms[id]
+
+    def _computeImmediateDominators(self):
+        idoms = [None] * len(self.blocks)
+        order = self.reversePostOrder()
+        if len(order) == 0:
+            return idoms
+        orderIndex = [None] * len(self.blocks)
+        for i, id in enumerate(order):
+            orderIndex[id] = i
+
+        def intersect(a, b):
+            while a != b:
+                while orderIndex[a] > orderIndex[b]:
+                    a = idoms[a]
+                while orderIndex[b] > orderIndex[a]:
+                    b = idoms[b]
+            return a
+
+        idoms[0] = 0
+        changed = True
+        while changed:
+            changed = False
+            for id in order[1:]:
+                newIdom = None
+                for predId in self.predecessorIds(id):
+                    if idoms[predId] is None:
+                        continue
+                    newIdom = predId if newIdom is None else intersect(predId, newIdom)
+                if idoms[id] != newIdom:
+                    idoms[id] = newIdom
+                    changed = True
+        return idoms
+
+    def dominates(self, a, b):
+        """Returns whether every path from the entry block to block `b` goes through block `a`.
+
+        A block dominates itself. After the dominator tree is built, this takes constant time.
+        """
+        if self._domTreeNumbers is None:
+            self._domTreeNumbers = self._numberDominatorTree()
+        numbers = self._domTreeNumbers
+        if numbers[a] is None or numbers[b] is None:
+            return False
+        aPre, aPost = numbers[a]
+        bPre, bPost = numbers[b]
+        return aPre <= bPre and bPost <= aPost
+
+    def _numberDominatorTree(self):
+        # Number each block in pre-order and post-order in the dominator tree. `a` dominates
+        # `b` if `b` is within `a`'s subtree, which is true iff `a` comes first in pre-order
+        # and last in post-order.
+        children = [[] for _ in self.blocks]
+        for id in self.reversePostOrder()[1:]:
+            children[self.immediateDominator(id)].append(id)
+        numbers = [None] * len(self.blocks)
+        if len(self.reversePostOrder()) == 0:
+            return numbers
+        pre = [None] * len(self.blocks)
+        counter = 0
+        stack = [(0, iter(children[0]))]
+        pre[0] = counter
+        counter += 1
+        while len(stack) > 0:
+            id, childIter = stack[-1]
+            for childId in childIter:
+                pre[childId] = counter
+                counter += 1
+                stack.append((childId, iter(children[childId])))
+                break
+            else:
+                stack.pop()
+                numbers[id] = (pre[id], counter)
+                counter += 1
+        return numbers
+
+    def loops(self):
+        """Finds natural loops in the graph.
+
+        A loop is identified by a back edge: an edge whose target (the loop header) dominates
+        its source. The body of the loop contains the header and every block that can reach
+        the source of a back edge without going through the header. Back edges to the same
+        header are combined into one loop.
+
+        Returns:
+            (list[Loop]): the loops, ordered by header in reverse post-order.
+        """
+        loopsByHeader = {}
+        for id in self.reversePostOrder():
+            for succId in self._successors[id]:
+                if self.dominates(succId, id):
+                    if succId not in loopsByHeader:
+                        loopsByHeader[succId] = Loop(succId)
+                    loopsByHeader[succId].backEdgeSourceIds.add(id)
+
+        for loop in loopsByHeader.itervalues():
+            body = set([loop.headerId])
+            worklist = [id for id in loop.backEdgeSourceIds if id not in body]
+            body.update(worklist)
+            while len(worklist) > 0:
+                id = worklist.pop()
+                for predId in self.predecessorIds(id):
+                    if predId not in body:
+                        body.add(predId)
+                        worklist.append(predId)
+            loop.blockIds = frozenset(body)
+
+        return [loopsByHeader[id] for id in self.reversePostOrder() if id in loopsByHeader]
+
+    def labelTargetIds(self):
+        """Returns the set of ids of blocks referenced by `label` instructions in reachable
+        blocks. These blocks may be reached by `branchl`."""
+        targets = set()
+        for id in self.reversePostOrder():
+            for inst in self.blocks[id].instructions:
+                if isinstance(inst, ir_instructions.label):
+                    targets.add(inst.blockId())
+        return targets
+
+    def stackHeights(self):
+        """Returns the height of the value stack at the start of each block.
+
+        The exception is pushed onto the stack before a catch block is entered, so catch
+        blocks start one higher than the `pushtry` that refers to them.
+
+        Returns:
+            (list[int?]): the stack height for each block, indexed by block id. `None` for
+            unreachable blocks.
+        """
+        heights = [None] * len(self.blocks)
+        order = self.reversePostOrder()
+        if len(order) == 0:
+            return heights
+        heights[0] = 0
+        for id in order:
+            block = self.blocks[id]
+            height = heights[id]
+            assert height is not None
+            for inst in block.instructions:
+                height += inst.stackDelta()
+            term = block.instructions[-1]
+            for i, succId in enumerate(self._successors[id]):
+                succHeight = height
+                if isinstance(term, ir_instructions.pushtry) and i == 1:
+                    succHeight += 1
+                assert heights[succId] is None or heights[succId] == succHeight
+                heights[succId] = succHeight
+        return heights
+
+    def handlerStack(self, id):
+        """Returns the ids of catch blocks for exception handlers active at the start of
+        block `id`, outermost first.
+
+        A `pushtry` makes its catch block active in its try block, and a `poptry`
+        deactivates the innermost handler. `None` is returned for unreachable blocks.
+        """
+        if self._handlerStacks is None:
+            self._handlerStacks = self._computeHandlerStacks()
+        return self._handlerStacks[id]
+
+    def _computeHandlerStacks(self):
+        stacks = [None] * len(self.blocks)
+        order = self.reversePostOrder()
+        if len(order) == 0:
+            return stacks
+        stacks[0] = ()
+        worklist = [0]
+        while len(worklist) > 0:
+            id = worklist.pop()
+            stack = stacks[id]
+            term = self.blocks[id].instructions[-1]
+            if isinstance(term, ir_instructions.pushtry):
+                tryBlockId, catchBlockId = term.successorIds()
+                successors = [(tryBlockId, stack + (catchBlockId,)), (catchBlockId, stack)]
+            elif isinstance(term, ir_instructions.poptry):
+                successors = [(term.successorIds()[0], stack[:-1])]
+            else:
+                successors = [(succId, stack) for succId in self._successors[id]]
+            for succId, succStack in successors:
+                if stacks[succId] is None:
+                    stacks[succId] = succStack
+                    worklist.append(succId)
+        return stacks
+
+    def liveLocals(self):
+        """Determines which local variable and parameter slots are live at the start and end
+        of each block.
+
+        A slot is live if it may be read by `ldlocal` before it is written by `stlocal`. If an
+        exception handler is active in a block, the handler's catch block is treated as an
+        additional successor, since an exception may be thrown from any instruction.
+
+        Returns:
+            (list[frozenset[int]?], list[frozenset[int]?]): slots live on entry to and on exit
+            from each block, indexed by block id. `None` for unreachable blocks.
+        """
+        order = self.reversePostOrder()
+        uses = [None] * len(self.blocks)
+        defs = [None] * len(self.blocks)
+        for id in order:
+            blockUses = set()
+            blockDefs = set()
+            for inst in reversed(self.blocks[id].instructions):
+                if isinstance(inst, ir_instructions.stlocal):
+                    blockDefs.add(inst.op(0))
+                    blockUses.discard(inst.op(0))
+                elif isinstance(inst, ir_instructions.ldlocal):
+                    blockUses.add(inst.op(0))
+                    blockDefs.discard(inst.op(0))
+            uses[id] = blockUses
+            defs[id] = blockDefs
+
+        def flowSuccessorIds(id):
+            handlers = self.handlerStack(id)
+            if len(handlers) > 0:
+                return self._successors[id] + (handlers[-1],)
+            else:
+                return self._successors[id]
+
+        flowPredecessors = [[] for _ in self.blocks]
+        for id in order:
+            for succId in flowSuccessorIds(id):
+                flowPredecessors[succId].append(id)
+
+        liveIn = [None] * len(self.blocks)
+        liveOut = [None] * len(self.blocks)
+        for id in order:
+            liveIn[id] = frozenset()
+            liveOut[id] = frozenset()
+        worklist = list(order)
+        inWorklist = [False] * len(self.blocks)
+        for id in order:
+            inWorklist[id] = True
+        while len(worklist) > 0:
+            id = worklist.pop()
+            inWorklist[id] = False
+            out = set()
+            for succId in flowSuccessorIds(id):
+                out.update(liveIn[succId])
+            newIn = frozenset(uses[id] | (out - defs[id]))
+            liveOut[id] = frozenset(out)
+            if newIn != liveIn[id]:
+                liveIn[id] = newIn
+                for predId in flowPredecessors[id]:
+                    if not inWorklist[predId]:
+                        inWorklist[predId] = True
+                        worklist.append(predId)
+        return liveIn, liveOut
+
+
+class Loop(object):
+    """A natural loop in a control flow graph.
+
+    Attributes:
+        headerId (int): the id of the block where the loop is entered. It dominates every
+            other block in the loop.
+        backEdgeSourceIds (set[int]): ids of blocks in the loop which branch to the header.
+        blockIds (frozenset[int]): ids of all the blocks in the loop, including the header.
+    """
+
+    def __init__(self, headerId):
+        self.headerId = headerId
+        self.backEdgeSourceIds = set()
+        self.blockIds = None
+
+    def __repr__(self):
+        return "Loop(%d, %s)" % (self.headerId, sorted(self.blockIds))
+
+
+def isTerminated(block):
+    return len(block.instructions) > 0 and block.instructions[-1].isTerminator()
+
+
+def reorderBlocks(blocks, order):
+    """Renumbers blocks, dropping any blocks which are not included.
+
+    Terminating instructions and `label` instructions are updated to refer to the new ids.
+    Labels which refer to dropped blocks are set to -1, which the interpreter handles
+    specially. This can happen when the `branchl` instruction for a label is unreachable.
+
+    Args:
+        blocks (list[BasicBlock]): the blocks to reorder. Each block's id must be its index
+            in this list.
+        order (list[int]): ids of blocks to keep, in their new order. Typically this comes
+            from `ControlFlowGraph.reversePostOrder`.
+
+    Returns:
+        (list[BasicBlock]): the reordered blocks. The blocks themselves are modified.
+    """
+    newIds = [-1] * len(blocks)
+    for newId, oldId in enumerate(order):
+        newIds[oldId] = newId
+
+    orderedBlocks = []
+    for oldId in order:
+        block = blocks[oldId]
+        block.id = newIds[oldId]
+        for inst in block.instructions:
+            if isinstance(inst, ir_instructions.label):
+                inst.setBlockId(newIds[inst.blockId()])
+        term = block.instructions[-1]
+        term.setSuccessorIds([newIds[id] for id in term.successorIds()])
+        orderedBlocks.append(block)
+    return orderedBlocks
+
+
+__all__ = ["ControlFlowGraph", "Loop", "reorderBlocks"]
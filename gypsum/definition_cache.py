@@ -0,0 +1,1100 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import cPickle
+import cStringIO
+import hashlib
+import marshal
+import os
+import os.path
+import types
+
+import ast
+import builtins
+import compile_info
+from compile_cache import getCompilerHash, hashFile
+import data
+from errors import CompileException
+from externalization import externalizeType
+import flags
+import ids
+import ir
+import ir_instructions
+import ir_types
+from location import Location, NoLoc
+from name import Name
+import scope_analysis
+import utils
+
+
+DEFINITION_CACHE_VERSION = 1
+
+# Lists of definitions in a package, by definition kind.
+_DEFN_LIST_NAMES = {
+    ids.DefnId.GLOBAL: "globals",
+    ids.DefnId.FUNCTION: "functions",
+    ids.DefnId.CLASS: "classes",
+    ids.DefnId.TRAIT: "traits",
+    ids.DefnId.TYPE_PARAMETER: "typeParameters",
+}
+
+# `CompileInfo` methods whose calls are replayed when a function is restored.
+_RECORDED_METHODS = frozenset(
+    prefix + elemName
+    for prefix in ("set", "add")
+    for elemName in ("UseInfo", "Type", "CallInfo", "ScopePrefixInfo", "StdExternInfo"))
+
+# `CompileInfo` methods which are called when scopes for foreign definitions are created
+# lazily. Those scopes are created again when they're needed, so the calls aren't replayed.
+_IGNORED_METHODS = frozenset(
+    prefix + elemName
+    for prefix in ("set", "add")
+    for elemName in ("Scope", "ContextInfo", "ClosureInfo"))
+
+# Instructions whose second operand is an index into the package's name table.
+_NAME_OPERAND_INSTRUCTIONS = frozenset(["ldf", "stf", "ldff", "stff"])
+
+# Instructions whose operands may be changed after they're built, when blocks are ordered.
+_RENUMBERED_INSTRUCTIONS = frozenset(["label"])
+
+# Syntax trees which can't be part of a function that's cached. Definitions nested inside
+# a function are compiled on their own, and closure conversion changes the function.
+_NESTED_DEFINITION_TYPES = (ast.FunctionDefinition, ast.LambdaExpression,
+                            ast.ClassDefinition, ast.TraitDefinition)
+
+
+class StaleDefinitionError(Exception):
+    """Raised after type analysis if a function restored from a `DefinitionCache` depended
+    on type information that turned out to be different in this compilation."""
+    pass
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+class DefinitionCache(object):
+    """Keeps type information and instructions of functions between compilations.
+
+    While a package is analyzed, everything type analysis adds to `CompileInfo` for the body
+    of a function is recorded along with what the function depended on: the definitions it
+    refers to (with their declared signatures and inferred types), the names it looked up
+    (with the definitions bound to those names), and the other definitions it needed to
+    analyze first. The instructions generated for the function are recorded, too.
+
+    When the package is compiled again, a function whose source text hasn't changed and
+    whose dependencies have the same signatures is restored instead of being analyzed: the
+    recorded additions are replayed at the same point of the analysis, so tables are filled
+    in the same order, and indices and names in the output are the same as in a clean build.
+    Its instructions are restored if nothing they refer to changed. Types inferred for
+    other definitions can only be checked after analysis; if one of them changed,
+    `checkRestored` raises `StaleDefinitionError`, and the package must be compiled again
+    after calling `discard`.
+
+    Only functions without nested functions, lambdas, or classes are cached, since closure
+    conversion changes those. Instructions aren't cached when code is optimized, since
+    devirtualization depends on the whole package. Declarations, inheritance, closure
+    conversion, and externalization are still done for the whole package.
+
+    There is one cache file for each package (see `compileWithArgs`). Errors reading or
+    writing it are ignored, since the cache is only an optimization. Cache files are evicted
+    by `CompileCache` along with compiled packages.
+
+    Attributes:
+        fileName (str): the cache file.
+        restoredCount (int): the number of functions whose type information was restored.
+        recordedCount (int): the number of functions which were analyzed and recorded.
+        restoredCodeCount (int): the number of functions whose instructions were restored.
+    """
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.restoredCount = 0
+        self.recordedCount = 0
+        self.restoredCodeCount = 0
+        self.isDiscarded = False
+        self.info = None
+        self.units = {}
+        self.restoredUnits = []
+        self.savedData = None
+
+    def prepare(self, info, sources):
+        """Finds functions that can be cached and loads their records.
+
+        This must be called after inheritance analysis and before type analysis.
+
+        Args:
+            info (CompileInfo): the package being compiled.
+            sources (list[(str, str)]): the name and contents of each source file, in the
+                same order as the modules in `info`.
+        """
+        self.info = info
+        self.units = {}
+        self.restoredUnits = []
+        self.foreignPackages = {}
+        self.nameKeys = {}
+        self.bindingsByName = None
+        self.envKey = None
+        # Keys and references are computed many times for the same definitions, so they're
+        # kept for the rest of the compilation, keyed by object ids.
+        self.defnRefs = {}
+        self.scopeRefs = {}
+        self.declaredKeys = {}
+        self.loadedObjects = {}
+        try:
+            self.indexDefinitions()
+            self.findUnits(sources)
+            envKey = self.computeEnvKey(sources)
+        except _Uncacheable:
+            self.units = {}
+            return
+        if self.isDiscarded:
+            return
+
+        records = self.readRecords(envKey)
+        for record in records:
+            name, textHash = record[0], record[1]
+            unit = self.unitsByName.get(name)
+            if unit is None or unit.textHash != textHash:
+                continue
+            try:
+                if self.isValidRecord(unit, record):
+                    unit.record = record
+            except _Uncacheable:
+                pass
+
+    def analyzeFunction(self, visitor, function, analyze):
+        """Restores type information for a function, or analyzes and records it.
+
+        Args:
+            visitor (DefinitionTypeVisitor): the visitor analyzing the package.
+            function (ir.Function): the function to analyze.
+            analyze (callable): analyzes the function without the cache.
+        """
+        unit = self.units.get(function.id)
+        if unit is None:
+            analyze()
+            return
+        try:
+            context = self.contextKey(visitor)
+        except _Uncacheable:
+            analyze()
+            return
+
+        info = self.info
+        outerRecorder = info.recorder
+        if unit.record is not None and unit.record[2] == context:
+            try:
+                events, variableStates, typeParameterStates = self.load(unit, unit.record[5])
+                if len(variableStates) != len(function.variables) or \
+                   len(typeParameterStates) != len(unit.typeParameters):
+                    raise _Uncacheable
+            except _Uncacheable:
+                pass
+            else:
+                info.recorder = None
+                try:
+                    self.replay(visitor, function, events)
+                finally:
+                    info.recorder = outerRecorder
+                for var, (ty, kind) in zip(function.variables, variableStates):
+                    var.type = ty
+                    var.kind = kind
+                for (_, tp), (upperBound, lowerBound) in \
+                        zip(unit.typeParameters, typeParameterStates):
+                    tp.upperBound = upperBound
+                    tp.lowerBound = lowerBound
+                unit.isRestored = True
+                self.restoredUnits.append(unit)
+                self.restoredCount += 1
+                return
+
+        recorder = DefinitionRecorder(self, unit)
+        info.recorder = recorder
+        try:
+            analyze()
+        finally:
+            info.recorder = outerRecorder
+        unit.newRecord = recorder.finish(context)
+        if unit.newRecord is not None:
+            self.recordedCount += 1
+
+    def replay(self, visitor, function, events):
+        info = self.info
+        for event in events:
+            if event[0] == "ensure":
+                _, defn, variance, varianceClass = event
+                oldVariance, oldVarianceClass = visitor.variance, visitor.varianceClass
+                visitor.variance, visitor.varianceClass = variance, varianceClass
+                try:
+                    visitor.ensureTypeInfoForDefn(defn)
+                finally:
+                    visitor.variance, visitor.varianceClass = oldVariance, oldVarianceClass
+            elif event[0] == "returnType":
+                function.returnType = event[1]
+            else:
+                methodName, key, value = event
+                getattr(info, methodName)(key, value)
+
+    def hasRestored(self):
+        """Returns whether anything was restored from the cache in this compilation."""
+        return len(self.restoredUnits) > 0
+
+    def checkRestored(self):
+        """Checks that definitions restored functions depend on have the types they had
+        when the functions were recorded. This must be called after type analysis.
+
+        Raises:
+            StaleDefinitionError: if a type is different.
+        """
+        for unit in self.restoredUnits:
+            for ref, _, stateKey in unit.record[3]:
+                if stateKey is None:
+                    continue
+                try:
+                    if self.stateKey(self.resolveRef(ref)) != stateKey:
+                        raise StaleDefinitionError()
+                except _Uncacheable:
+                    raise StaleDefinitionError()
+
+    def discard(self):
+        """Stops restoring functions from the cache.
+
+        This is called before a package is compiled again after `StaleDefinitionError`
+        or an error in a restored function. Everything is analyzed and recorded again.
+        """
+        self.isDiscarded = True
+        self.restoredCount = 0
+        self.recordedCount = 0
+        self.restoredCodeCount = 0
+
+    def restoreCode(self, function):
+        """Restores instructions for a function whose type information was restored.
+
+        Strings and types are added to the package in the same order as when the
+        function was compiled.
+
+        Returns:
+            (bool): whether the instructions were restored. If not, the function must be
+            compiled.
+        """
+        unit = self.units.get(function.id)
+        if unit is None or not unit.isRestored or unit.record[6] is None:
+            return False
+        codeDeps, blob = unit.record[6]
+        try:
+            self.checkDeps(codeDeps)
+            entries, blocks, instTypes, variableIndices = self.load(unit, blob)
+            if len(variableIndices) != len(function.variables):
+                raise _Uncacheable
+        except _Uncacheable:
+            return False
+
+        package = self.info.package
+        insts = []
+        typeCount = 0
+        for instName, args in entries:
+            if instName == "string":
+                args = (package.findOrAddString(args[0]),)
+            elif instName in ("tys", "tyd"):
+                # `CompileVisitor.findOrAddType` externalizes each type when it's first used.
+                if args[0] == typeCount:
+                    externalizeType(self.info, instTypes[typeCount])
+                    typeCount += 1
+            elif instName in _NAME_OPERAND_INSTRUCTIONS:
+                args = (args[0], package.findName(args[1]))
+            insts.append(getattr(ir_instructions, instName)(*args))
+
+        irBlocks = []
+        for blockId, blockEntries in blocks:
+            instructions = []
+            for entry in blockEntries:
+                if isinstance(entry, int):
+                    instructions.append(insts[entry])
+                elif entry[0] == "raw":
+                    instructions.append(getattr(ir_instructions, entry[1])(*entry[2]))
+                else:
+                    inst = insts[entry[0]]
+                    inst.operands = tuple(entry[1])
+                    instructions.append(inst)
+            irBlocks.append(ir_instructions.BasicBlock(blockId, instructions))
+        function.blocks = irBlocks
+        function.instTypes = instTypes
+        for var, index in zip(function.variables, variableIndices):
+            if index is not None:
+                var.index = index
+        unit.isCodeRestored = True
+        self.restoredCodeCount += 1
+        return True
+
+    def recordCode(self, function, instructionLog):
+        """Records instructions generated for a function.
+
+        Args:
+            function (ir.Function): a function that was just compiled.
+            instructionLog (list[(Instruction, tuple)]): each instruction that was built,
+                with the operands it was built from.
+        """
+        unit = self.units.get(function.id)
+        if unit is None or not (unit.isRestored or unit.newRecord is not None):
+            return
+        package = self.info.package
+        entries = []
+        logIndices = {}
+        for inst, operands in instructionLog:
+            instName = inst.info.name
+            if instName == "string":
+                operands = (package.strings[operands[0]],)
+            elif instName in _NAME_OPERAND_INSTRUCTIONS:
+                operands = (operands[0], package.names[operands[1]])
+            logIndices[id(inst)] = len(entries)
+            entries.append((instName, operands))
+
+        try:
+            blocks = []
+            for block in function.blocks:
+                blockEntries = []
+                for inst in block.instructions:
+                    index = logIndices.get(id(inst))
+                    instName = inst.info.name
+                    if index is None:
+                        _checkPlainOperands(inst)
+                        blockEntries.append(("raw", instName, inst.operands))
+                    elif inst.isTerminator() or instName in _RENUMBERED_INSTRUCTIONS:
+                        _checkPlainOperands(inst)
+                        blockEntries.append((index, inst.operands))
+                    else:
+                        blockEntries.append(index)
+                blocks.append((block.id, blockEntries))
+            variableIndices = [getattr(var, "index", None) for var in function.variables]
+            pickler = _Pickler(self, unit)
+            blob = pickler.dumps((entries, blocks, function.instTypes, variableIndices))
+            codeDeps = self.depKeys(pickler.deps)
+        except _Uncacheable:
+            return
+        unit.newCode = (codeDeps, blob)
+
+    def save(self, dependencyFileNames):
+        """Writes records for this compilation to the cache file.
+
+        Args:
+            dependencyFileNames (list[str]): files of packages that were loaded. Records are
+                only valid while these files don't change.
+        """
+        if self.info is None:
+            return
+        manifest = []
+        for fileName in sorted(set(dependencyFileNames)):
+            fileHash = hashFile(fileName)
+            if fileHash is None:
+                return
+            manifest.append((fileName, fileHash))
+
+        records = []
+        for unit in sorted(self.units.itervalues(), key=lambda u: u.name):
+            if unit.isRestored:
+                record = unit.record
+                if unit.newCode is not None:
+                    record = record[:6] + (unit.newCode,)
+            elif unit.newRecord is not None:
+                record = unit.newRecord[:6] + (unit.newCode,)
+            else:
+                continue
+            records.append(record)
+        fileData = marshal.dumps((DEFINITION_CACHE_VERSION, getCompilerHash(), manifest,
+                                  self.envKey, records))
+        if fileData == self.savedData:
+            # The modification time records when the file was last used, so `CompileCache`
+            # evicts files that aren't used anymore first.
+            try:
+                os.utime(self.fileName, None)
+            except OSError:
+                pass
+            return
+        try:
+            dirName = os.path.dirname(self.fileName)
+            if not os.path.isdir(dirName):
+                os.makedirs(dirName)
+            utils.writeFileAtomically(self.fileName, fileData)
+        except (IOError, OSError):
+            pass
+
+    def readRecords(self, envKey):
+        try:
+            with open(self.fileName, "rb") as cacheFile:
+                self.savedData = cacheFile.read()
+            version, compilerHash, manifest, savedEnvKey, records = \
+                marshal.loads(self.savedData)
+        except (IOError, EOFError, ValueError, TypeError):
+            return ()
+        if version != DEFINITION_CACHE_VERSION or \
+           compilerHash != getCompilerHash() or \
+           savedEnvKey != envKey or \
+           any(hashFile(fileName) != fileHash for fileName, fileHash in manifest):
+            return ()
+        return records
+
+    def isValidRecord(self, unit, record):
+        _, _, _, deps, names, _, _ = record
+        for ref, declaredKey, _ in deps:
+            if self.declaredKey(self.resolveRef(ref)) != declaredKey:
+                return False
+        for name, nameKey in names:
+            if self.nameKey(name) != nameKey:
+                return False
+        return True
+
+    def checkDeps(self, deps):
+        for ref, declaredKey, stateKey in deps:
+            defn = self.resolveRef(ref)
+            if self.declaredKey(defn) != declaredKey or \
+               (stateKey is not None and self.stateKey(defn) != stateKey):
+                raise _Uncacheable
+
+    def depKeys(self, deps):
+        return [(ref, self.declaredKey(defn), self.stateKey(defn))
+                for ref, defn in sorted(deps.iteritems())]
+
+    def load(self, unit, blob):
+        unpickler = cPickle.Unpickler(cStringIO.StringIO(blob))
+        unpickler.persistent_load = lambda pid: self.persistentLoad(unit, pid)
+        try:
+            return unpickler.load()
+        except _Uncacheable:
+            raise
+        except Exception:
+            raise _Uncacheable
+
+    def persistentLoad(self, unit, pid):
+        obj = self.loadedObjects.get(pid)
+        if obj is not None:
+            return obj
+        obj = self.doPersistentLoad(unit, pid)
+        if not _isUnitPersistentId(pid):
+            self.loadedObjects[pid] = obj
+        return obj
+
+    def doPersistentLoad(self, unit, pid):
+        tag = pid[0]
+        try:
+            if tag == "k":
+                return _CONSTANTS[pid[1]]
+            elif tag == "a":
+                return unit.astIds[pid[1]]
+            elif tag == "s":
+                return self.resolveScopeRef(pid[1], unit)
+            elif tag == "d":
+                return self.resolveRef(pid[1], unit)
+            elif tag == "I":
+                return self.resolveRef(pid[1], unit).id
+            elif tag == "t":
+                return _SIMPLE_TYPES[pid[1]]
+            elif tag == "L":
+                return NoLoc
+        except (KeyError, IndexError):
+            pass
+        raise _Uncacheable
+
+    # Units and indices of definitions.
+
+    def indexDefinitions(self):
+        package = self.info.package
+        self.localDefns = {}
+        for kind, listName in _DEFN_LIST_NAMES.iteritems():
+            for defn in getattr(package, listName):
+                key = (kind, tuple(defn.name.components))
+                # Definitions with the same name can't be referred to by name.
+                self.localDefns[key] = defn if key not in self.localDefns else None
+        self.typeParametersByAstId = {}
+        for tp in package.typeParameters:
+            if tp.astDefn is not None:
+                self.typeParametersByAstId[tp.astDefn.id] = tp
+        self.moduleIndices = {}
+        for index, module in enumerate(self.info.ast.modules):
+            self.moduleIndices[self.info.getScope(module.id).scopeId] = index
+
+    def findUnits(self, sources):
+        self.unitsByName = {}
+        for module, (_, source) in zip(self.info.ast.modules, sources):
+            lines = source.splitlines(True)
+            astDefns = list(module.definitions)
+            while len(astDefns) > 0:
+                astDefn = astDefns.pop()
+                if isinstance(astDefn, (ast.ClassDefinition, ast.TraitDefinition)):
+                    astDefns.extend(utils.iterOpt(astDefn.members))
+                elif isinstance(astDefn, ast.FunctionDefinition) and astDefn.body is not None:
+                    unit = self.makeUnit(astDefn, lines)
+                    if unit is None:
+                        continue
+                    if unit.name in self.unitsByName:
+                        # Overloads that weren't renamed can't be told apart.
+                        self.unitsByName[unit.name] = None
+                    else:
+                        self.unitsByName[unit.name] = unit
+        for unit in self.unitsByName.itervalues():
+            if unit is not None:
+                self.units[unit.function.id] = unit
+
+    def makeUnit(self, astDefn, lines):
+        if not self.info.hasDefnInfo(astDefn):
+            return None
+        function = self.info.getDefnInfo(astDefn).irDefn
+        if not isinstance(function, ir.Function):
+            return None
+        astIds = []
+        nodes = [astDefn]
+        while len(nodes) > 0:
+            node = nodes.pop()
+            if node is not astDefn and isinstance(node, _NESTED_DEFINITION_TYPES):
+                return None
+            astIds.append(node.id)
+            if isinstance(node, (ast.UnaryPattern, ast.BinaryPattern)):
+                astIds.append(node.matcherId)
+            nodes.extend(reversed([c for c in node.children() if c is not None]))
+        if any(astId.id != astIds[0].id + i for i, astId in enumerate(astIds)):
+            return None
+        loc = astDefn.location
+        text = "".join(lines[loc.beginRow - 1:loc.endRow])
+        textHash = hashlib.sha1(text.encode("utf-8") if isinstance(text, unicode) else text)
+        return _Unit(self, function, astIds, textHash.hexdigest())
+
+    def computeEnvKey(self, sources):
+        """Returns a key for what all functions depend on: the language mode, the source
+        files, and the class hierarchy."""
+        package = self.info.package
+        hierarchy = []
+        for defn in package.classes + package.traits:
+            hierarchy.append((
+                self.defnRef(defn),
+                tuple(sorted(defn.flags)),
+                tuple((self.defnRef(tp), tuple(sorted(tp.flags)),
+                       self.typeKey(tp.upperBound), self.typeKey(tp.lowerBound))
+                      for tp in defn.typeParameters),
+                tuple(self.typeKey(t) for t in utils.iterOpt(defn.supertypes))))
+        hierarchy.sort()
+        env = (self.info.languageMode(), tuple(package.name.components),
+               tuple(fileName for fileName, _ in sources), hierarchy)
+        self.envKey = hashlib.sha1(repr(env)).hexdigest()
+        return self.envKey
+
+    def contextKey(self, visitor):
+        varianceClass = visitor.varianceClass
+        return (visitor.variance,
+                None if varianceClass is None else self.defnRef(varianceClass))
+
+    # References to definitions and scopes, which are the same between compilations.
+
+    def defnRef(self, defn, unit=None):
+        if unit is not None:
+            if isinstance(defn, ir.Variable):
+                index = unit.variableIndices().get(id(defn))
+                if index is None:
+                    raise _Uncacheable
+                return ("v", index)
+            if isinstance(defn, ir.TypeParameter) and defn.astDefn is not None:
+                offset = unit.astIdOffsets.get(defn.astDefn.id)
+                if offset is not None:
+                    return ("p", offset)
+        ref = self.defnRefs.get(id(defn))
+        if ref is None:
+            ref = self.computeDefnRef(defn)
+            self.defnRefs[id(defn)] = ref
+        return ref
+
+    def computeDefnRef(self, defn):
+        if isinstance(defn, ir.Field):
+            return ("f", self.defnRef(defn.definingClass), tuple(defn.name.components))
+        if not isinstance(defn, (ir.IrTopDefn, ir.TypeParameter)):
+            raise _Uncacheable
+        defnId = defn.id
+        if defnId.isBuiltin():
+            return ("b", defnId.kind, defnId.index)
+        elif defnId.isLocal():
+            key = (defnId.kind, tuple(defn.name.components))
+            if self.localDefns.get(key) is not defn:
+                raise _Uncacheable
+            return ("l",) + key
+        else:
+            packageName = tuple(defnId.packageId.name.components)
+            if self.resolveRef(("F", packageName, defnId.kind, defnId.index)) is not defn:
+                raise _Uncacheable
+            return ("F", packageName, defnId.kind, defnId.index)
+
+    def resolveRef(self, ref, unit=None):
+        tag = ref[0]
+        if tag == "v" and unit is not None:
+            return unit.function.variables[ref[1]]
+        elif tag == "p" and unit is not None:
+            tp = self.typeParametersByAstId.get(unit.astIds[ref[1]])
+            if tp is not None:
+                return tp
+        elif tag == "f":
+            clas = self.resolveRef(ref[1])
+            for field in utils.iterOpt(getattr(clas, "fields", None)):
+                if field.definingClass is clas and tuple(field.name.components) == ref[2]:
+                    return field
+        elif tag == "l":
+            defn = self.localDefns.get(ref[1:])
+            if defn is not None:
+                return defn
+        elif tag == "b":
+            try:
+                if ref[1] == ids.DefnId.CLASS:
+                    return builtins.getBuiltinClassById(ref[2])
+                elif ref[1] == ids.DefnId.FUNCTION:
+                    return builtins.getBuiltinFunctionById(ref[2])
+            except (KeyError, IndexError):
+                pass
+        elif tag == "F":
+            package = self.getForeignPackage(ref[1])
+            defns = getattr(package, _DEFN_LIST_NAMES.get(ref[2], ""), None)
+            if defns is not None and 0 <= ref[3] < len(defns):
+                return defns[ref[3]]
+        raise _Uncacheable
+
+    def getForeignPackage(self, components):
+        package = self.foreignPackages.get(components)
+        if package is None:
+            name = Name(list(components))
+            loader = self.info.packageLoader
+            package = next((p for p in loader.getLoadedPackages() if p.name == name), None)
+            if package is None:
+                try:
+                    package = loader.loadPackage(name, NoLoc)
+                except (CompileException, IOError, AssertionError):
+                    raise _Uncacheable
+            self.foreignPackages[components] = package
+        return package
+
+    def scopeRef(self, scopeId, unit):
+        offset = unit.scopeOffsets().get(id(scopeId))
+        if offset is not None:
+            return ("u", offset)
+        return self.staticScopeRef(scopeId)
+
+    def staticScopeRef(self, scopeId):
+        ref = self.scopeRefs.get(id(scopeId))
+        if ref is None:
+            ref = self.computeStaticScopeRef(scopeId)
+            self.scopeRefs[id(scopeId)] = ref
+        return ref
+
+    def computeStaticScopeRef(self, scopeId):
+        if scopeId is ids.GLOBAL_SCOPE_ID:
+            return ("g",)
+        elif scopeId is ids.BUILTIN_SCOPE_ID:
+            return ("b",)
+        elif scopeId is ids.PACKAGE_SCOPE_ID:
+            return ("P",)
+        moduleIndex = self.moduleIndices.get(scopeId)
+        if moduleIndex is not None:
+            return ("m", moduleIndex)
+        if not self.info.hasScope(scopeId):
+            raise _Uncacheable
+        scope = self.info.getScope(scopeId)
+        if isinstance(scope, (scope_analysis.ClassScope, scope_analysis.TraitScope)):
+            return ("c", self.defnRef(scope.getIrDefn()))
+        elif isinstance(scope, scope_analysis.NonLocalObjectTypeDefnScope):
+            return ("c", self.defnRef(scope.irDefn))
+        raise _Uncacheable
+
+    def resolveScopeRef(self, ref, unit):
+        tag = ref[0]
+        if tag == "u":
+            return self.info.getScope(unit.astIds[ref[1]]).scopeId
+        elif tag == "g":
+            return ids.GLOBAL_SCOPE_ID
+        elif tag == "b":
+            return ids.BUILTIN_SCOPE_ID
+        elif tag == "P":
+            return ids.PACKAGE_SCOPE_ID
+        elif tag == "m":
+            return self.info.getScope(self.info.ast.modules[ref[1]].id).scopeId
+        elif tag == "c":
+            defn = self.resolveRef(ref[1])
+            if defn.isLocal():
+                return self.info.getScope(defn.id).scopeId
+            return scope_analysis.NonLocalObjectTypeDefnScope.ensureForDefn(
+                defn, self.info).scopeId
+        raise _Uncacheable
+
+    # Keys describing definitions, which are compared between compilations.
+
+    def typeKey(self, ty):
+        if ty is None:
+            return None
+        elif isinstance(ty, ir_types.ClassType):
+            return ("C", self.defnRef(ty.clas), tuple(self.typeKey(a) for a in ty.typeArguments),
+                    tuple(sorted(ty.flags)))
+        elif isinstance(ty, ir_types.VariableType):
+            return ("V", self.defnRef(ty.typeParameter), tuple(sorted(ty.flags)))
+        elif isinstance(ty, ir_types.ExistentialType):
+            return ("E", tuple(self.defnRef(v) for v in ty.variables), self.typeKey(ty.ty))
+        elif _SIMPLE_TYPES.get(ty.name) is ty:
+            return ty.name
+        raise _Uncacheable
+
+    def declaredKey(self, defn):
+        """Returns a key for what's known about a definition before type analysis."""
+        key = self.declaredKeys.get(id(defn))
+        if key is None:
+            key = self.computeDeclaredKey(defn)
+            self.declaredKeys[id(defn)] = key
+        return key
+
+    def computeDeclaredKey(self, defn):
+        if isinstance(defn, ir.Function):
+            if isinstance(defn.astDefn, (ast.FunctionDefinition,
+                                         ast.PrimaryConstructorDefinition)):
+                parameterTypes = tuple(self.typeKey(t) for t in defn.parameterTypes)
+            else:
+                parameterTypes = None
+            definingClass = getattr(defn, "definingClass", None)
+            return ("function", tuple(sorted(defn.flags)),
+                    None if definingClass is None else self.defnRef(definingClass),
+                    tuple((self.defnRef(tp), tuple(sorted(tp.flags)))
+                          for tp in defn.typeParameters),
+                    parameterTypes,
+                    tuple(self.defnRef(o) for o in utils.iterOpt(defn.overrides)),
+                    defn.compileHint)
+        elif isinstance(defn, ir.ObjectTypeDefn):
+            fields = tuple((tuple(f.name.components), tuple(sorted(f.flags)))
+                           for f in utils.iterOpt(getattr(defn, "fields", None)))
+            return ("type", tuple(sorted(defn.flags)), fields)
+        elif isinstance(defn, (ir.Global, ir.Field, ir.TypeParameter)):
+            return ("value", tuple(sorted(defn.flags)))
+        raise _Uncacheable
+
+    def stateKey(self, defn):
+        """Returns a key for types of a definition that are inferred by type analysis, or
+        None if they aren't known yet."""
+        if isinstance(defn, ir.Function):
+            if defn.returnType is None:
+                return None
+            return (self.typeKey(defn.returnType),
+                    tuple(self.typeKey(t) for t in utils.iterOpt(defn.parameterTypes)))
+        elif isinstance(defn, (ir.Global, ir.Field)):
+            return self.typeKey(defn.type)
+        elif isinstance(defn, ir.TypeParameter):
+            if defn.upperBound is None or defn.lowerBound is None:
+                return None
+            return (self.typeKey(defn.upperBound), self.typeKey(defn.lowerBound))
+        return ()
+
+    def nameKey(self, name):
+        """Returns a key for the definitions bound to a name in scopes outside functions."""
+        key = self.nameKeys.get(name)
+        if key is None:
+            if self.bindingsByName is None:
+                self.indexBindings()
+            try:
+                bindings = sorted(
+                    (scopeRef, tuple(self.defnInfoKey(d) for d in nameInfo.overloads))
+                    for scopeRef, nameInfo in self.bindingsByName.get(name, ()))
+                key = hashlib.sha1(repr(bindings)).hexdigest()
+            except _Uncacheable:
+                key = ""
+            self.nameKeys[name] = key
+        return key
+
+    def indexBindings(self):
+        info = self.info
+        scopes = [info.getScope(ids.GLOBAL_SCOPE_ID)]
+        scopes.extend(info.getScope(module.id) for module in info.ast.modules)
+        package = info.package
+        scopes.extend(info.getScope(defn.id) for defn in package.classes + package.traits
+                      if info.hasScope(defn.id))
+        self.bindingsByName = {}
+        for scope in scopes:
+            scopeRef = self.staticScopeRef(scope.scopeId)
+            for name, nameInfo in scope.bindings.iteritems():
+                self.bindingsByName.setdefault(name, []).append((scopeRef, nameInfo))
+
+    def defnInfoKey(self, defnInfo):
+        irDefn = defnInfo.irDefn
+        if isinstance(irDefn, (ir.Package, ir.PackagePrefix)):
+            defnKey = ("package", tuple(irDefn.name.components))
+        else:
+            ref = self.defnRef(irDefn)
+            defnKey = (ref, self.declaredKey(irDefn)) if _isLocalRef(ref) else ref
+        importedTypeArguments = defnInfo.importedTypeArguments
+        if importedTypeArguments is not None:
+            importedTypeArguments = tuple(self.typeKey(t) for t in importedTypeArguments)
+        return (defnKey, defnInfo.isVisible, defnInfo.inheritanceDepth,
+                self.staticScopeRef(defnInfo.scopeId),
+                self.staticScopeRef(defnInfo.inheritedScopeId),
+                importedTypeArguments)
+
+
+class DefinitionRecorder(object):
+    """Records what type analysis of one function adds to `CompileInfo`.
+
+    `CompileInfo` notifies this of calls to its `set*` and `add*` methods and of names looked
+    up in scopes while `recorder` is set. `DefinitionTypeVisitor` notifies it when another
+    definition has to be analyzed first.
+    """
+
+    def __init__(self, cache, unit):
+        self.cache = cache
+        self.unit = unit
+        self.function = unit.function
+        self.returnType = self.function.returnType
+        self.events = []
+        self.names = set()
+        self.isCacheable = True
+        self.variableIds = frozenset(id(v) for v in self.function.variables)
+
+    def record(self, methodName, key, value):
+        if methodName in _IGNORED_METHODS:
+            return
+        if methodName not in _RECORDED_METHODS:
+            self.isCacheable = False
+            return
+        self.recordReturnType()
+        self.events.append((methodName, key, value))
+
+    def recordName(self, name):
+        self.names.add(name)
+
+    def isInside(self, defn):
+        return defn is self.function or id(defn) in self.variableIds
+
+    def recordEnsure(self, defn, variance, varianceClass):
+        self.recordReturnType()
+        self.events.append(("ensure", defn, variance, varianceClass))
+
+    def recordReturnType(self):
+        # The return type is set before the body is analyzed if it's declared. It's checked
+        # when other functions that call this one are analyzed, so it's restored at the
+        # same point.
+        if self.function.returnType is not self.returnType:
+            self.returnType = self.function.returnType
+            self.events.append(("returnType", self.returnType))
+
+    def finish(self, context):
+        """Returns a record of the analysis, or None if it can't be restored later."""
+        self.recordReturnType()
+        if not self.isCacheable:
+            return None
+        cache = self.cache
+        unit = self.unit
+        variableStates = [(v.type, v.kind) for v in self.function.variables]
+        typeParameterStates = [(tp.upperBound, tp.lowerBound)
+                               for _, tp in unit.typeParameters]
+        try:
+            pickler = _Pickler(cache, unit)
+            blob = pickler.dumps((self.events, variableStates, typeParameterStates))
+            deps = pickler.deps
+            deps[cache.defnRef(self.function)] = self.function
+            names = []
+            for name in sorted(self.names):
+                nameKey = cache.nameKey(name)
+                if nameKey == "":
+                    raise _Uncacheable
+                names.append((name, nameKey))
+            return (unit.name, unit.textHash, context, cache.depKeys(deps), names, blob, None)
+        except _Uncacheable:
+            return None
+
+
+class _Unit(object):
+    """A function whose analysis and instructions may be cached."""
+
+    def __init__(self, cache, function, astIds, textHash):
+        self.function = function
+        self.name = tuple(function.name.components)
+        self.astIds = astIds
+        self.astIdOffsets = dict((astId, i) for i, astId in enumerate(astIds))
+        self.textHash = textHash
+        self.typeParameters = [(i, cache.typeParametersByAstId[astId])
+                               for i, astId in enumerate(astIds)
+                               if astId in cache.typeParametersByAstId]
+        self.info = cache.info
+        self.record = None
+        self.newRecord = None
+        self.newCode = None
+        self.isRestored = False
+        self.isCodeRestored = False
+        self.scopeOffsets_ = None
+
+    def variableIndices(self):
+        return dict((id(v), i) for i, v in enumerate(self.function.variables))
+
+    def scopeOffsets(self):
+        if self.scopeOffsets_ is None:
+            self.scopeOffsets_ = {}
+            for i, astId in enumerate(self.astIds):
+                if self.info.hasScope(astId):
+                    self.scopeOffsets_[id(self.info.getScope(astId).scopeId)] = i
+        return self.scopeOffsets_
+
+
+class _Pickler(object):
+    """Serializes recorded data for a unit.
+
+    Definitions, ids, and scopes are saved as references (see `DefinitionCache.defnRef`),
+    so the same objects are found when the data is loaded in another compilation. Local
+    definitions that are referred to are collected in `deps`.
+    """
+
+    def __init__(self, cache, unit):
+        self.cache = cache
+        self.unit = unit
+        self.deps = {}
+        self.variableIndices = unit.variableIndices()
+
+    def dumps(self, obj):
+        out = cStringIO.StringIO()
+        pickler = cPickle.Pickler(out, cPickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = self.persistentId
+        pickler.dump(obj)
+        return out.getvalue()
+
+    def ref(self, defn):
+        if isinstance(defn, ir.Variable):
+            index = self.variableIndices.get(id(defn))
+            if index is None:
+                raise _Uncacheable
+            return ("v", index)
+        ref = self.cache.defnRef(defn, self.unit)
+        if _isLocalRef(ref):
+            self.deps[ref] = defn
+        return ref
+
+    def persistentId(self, obj):
+        kind = _PERSISTENT_KINDS.get(type(obj))
+        if kind is None:
+            kind = _persistentKind(type(obj))
+        if kind is _PLAIN:
+            return None
+        elif kind is _STRING:
+            if obj in _AMBIGUOUS_CONSTANTS:
+                raise _Uncacheable
+            index = _CONSTANT_INDICES.get(obj)
+            return ("k", index) if index is not None and _CONSTANTS[index] is obj else None
+        elif kind is _AST_ID:
+            offset = self.unit.astIdOffsets.get(obj)
+            if offset is None:
+                raise _Uncacheable
+            return ("a", offset)
+        elif kind is _SCOPE_ID:
+            return ("s", self.cache.scopeRef(obj, self.unit))
+        elif kind is _DEFN_ID:
+            defn = self.resolveId(obj)
+            return ("I", self.ref(defn))
+        elif kind is _DEFINITION:
+            return ("d", self.ref(obj))
+        elif kind is _SIMPLE_TYPE:
+            if _SIMPLE_TYPES.get(obj.name) is not obj:
+                raise _Uncacheable
+            return ("t", obj.name)
+        elif obj is NoLoc:
+            return ("L",)
+        else:
+            raise _Uncacheable
+
+    def resolveId(self, defnId):
+        if defnId.isBuiltin():
+            defn = self.cache.resolveRef(("b", defnId.kind, defnId.index))
+        else:
+            if defnId.isLocal():
+                package = self.cache.info.package
+            else:
+                package = self.cache.getForeignPackage(tuple(defnId.packageId.name.components))
+            defns = getattr(package, _DEFN_LIST_NAMES[defnId.kind])
+            defn = defns[defnId.index] if defnId.index < len(defns) else None
+        if defn is None or defn.id is not defnId:
+            raise _Uncacheable
+        return defn
+
+
+def _isUnitPersistentId(pid):
+    # Persistent ids for syntax trees, scopes, variables, and type parameters inside a
+    # function are loaded differently for each function.
+    tag = pid[0]
+    if tag == "a":
+        return True
+    elif tag == "s":
+        return pid[1][0] == "u"
+    elif tag == "d" or tag == "I":
+        return pid[1][0] in ("v", "p")
+    return False
+
+
+def _isLocalRef(ref):
+    return ref[0] == "l" or (ref[0] == "f" and ref[1][0] == "l")
+
+
+def _checkPlainOperands(inst):
+    # Instructions built from definitions can't be rebuilt from their operands.
+    initFunction = type(inst).__init__.im_func
+    if initFunction is not ir_instructions.Instruction.__init__.im_func and \
+       type(inst) is not ir_instructions.branchl:
+        raise _Uncacheable
+
+
+# Kinds of objects handled by `_Pickler.persistentId`. Classes and functions are saved by
+# name along with instances, so they're plain.
+_PLAIN = "plain"
+_STRING = "string"
+_AST_ID = "ast id"
+_SCOPE_ID = "scope id"
+_DEFN_ID = "defn id"
+_DEFINITION = "definition"
+_SIMPLE_TYPE = "simple type"
+_LOCATION = "location"
+_UNCACHEABLE = "uncacheable"
+
+_PERSISTENT_KINDS = dict((ty, _PLAIN) for ty in (
+    int, long, float, bool, type(None), tuple, list, dict, set, frozenset, unicode, type,
+    types.FunctionType, types.BuiltinFunctionType))
+_PERSISTENT_KINDS.update({
+    str: _STRING,
+    ids.AstId: _AST_ID,
+    ids.ScopeId: _SCOPE_ID,
+    ids.DefnId: _DEFN_ID,
+})
+
+def _persistentKind(ty):
+    if issubclass(ty, ir.IrDefinition):
+        kind = _DEFINITION
+    elif issubclass(ty, ir_types.SimpleType):
+        kind = _SIMPLE_TYPE
+    elif issubclass(ty, Location):
+        kind = _LOCATION
+    elif issubclass(ty, (data.Data, Name)):
+        kind = _PLAIN
+    else:
+        kind = _UNCACHEABLE
+    _PERSISTENT_KINDS[ty] = kind
+    return kind
+
+def _findConstants():
+    # Strings defined as constants are sometimes compared by identity, so the same objects
+    # must be used when they're loaded. They're saved as indices into a sorted list.
+    # Strings in persistent ids are saved like any others, so the tags must not be in the
+    # list, or saving them would never end.
+    flags._initialize()
+    constants = {}
+    ambiguous = set()
+    for module in (compile_info, flags, ids, ir, ir_types, scope_analysis):
+        for value in module.__dict__.itervalues():
+            if type(value) is str and len(value) > 1:
+                if constants.get(value, value) is not value:
+                    ambiguous.add(value)
+                constants[value] = value
+    for value in ambiguous:
+        del constants[value]
+    constantList = sorted(constants.itervalues())
+    return constantList, dict((c, i) for i, c in enumerate(constantList)), ambiguous
+
+_CONSTANTS, _CONSTANT_INDICES, _AMBIGUOUS_CONSTANTS = _findConstants()
+
+_SIMPLE_TYPES = dict((ty.name, ty) for ty in ir_types.__dict__.itervalues()
+                     if isinstance(ty, ir_types.SimpleType))
+
+
+__all__ = ["DefinitionCache", "DefinitionRecorder", "StaleDefinitionError"]
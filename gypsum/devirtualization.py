@@ -0,0 +1,100 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import itertools
+
+from flags import ABSTRACT, FINAL, PUBLIC
+from ir import Class
+from ir_types import ClassType
+
+
+class Devirtualizer(object):
+    """Decides which virtual method calls can be compiled as direct calls.
+
+    A `callv` instruction looks up the method to call in the receiver's vtable at run-time.
+    If we can prove at compile-time which method the lookup would find, we can use `callg`
+    (or `callgf`) instead, which skips the lookup and allows the callee to be inlined.
+
+    A virtual call can be made directly if either:
+    - The receiver's static type is a final class. The receiver can't be an instance of a
+      subclass, so the method found by type analysis is the one the vtable would contain.
+    - The method is defined in this package, it is not overridden anywhere in this package,
+      and none of the classes or traits derived from its defining class may be extended by
+      other packages. A class or trait may be extended by other packages if it's public and
+      not final.
+
+    Calls on receivers which may be null are always compiled virtually, since `callv`
+    checks the receiver for null, and `callg` does not.
+
+    `CompileVisitor` consults this object for every virtual call it compiles. The number of
+    calls checked and converted are recorded and can be printed with `report`.
+
+    Attributes:
+        callCount (int): the number of virtual calls checked.
+        convertedCounts (dict[DefnId, (Function, int)]): the number of call sites
+            converted, for each method that was called directly.
+    """
+
+    def __init__(self, package):
+        self.callCount = 0
+        self.convertedCounts = {}
+        self.openDefns = [defn for defn in itertools.chain(package.classes, package.traits)
+                          if PUBLIC in defn.flags and FINAL not in defn.flags]
+        self.closedMethods = {}
+
+    def devirtualize(self, method, receiverType):
+        """Checks whether a virtual call can be made directly and records the result.
+
+        Args:
+            method (Function): the non-final method being called.
+            receiverType (Type?): the static type of the receiver. May be `None` for calls
+                created by closure conversion; these are always called virtually.
+
+        Returns:
+            (bool): `True` if the method can be called with `callg` or `callgf`.
+        """
+        self.callCount += 1
+        if ABSTRACT in method.flags or \
+           receiverType is None or \
+           receiverType.isNullable():
+            return False
+        if not self.isReceiverFinal(receiverType) and not self.isMethodClosed(method):
+            return False
+        _, count = self.convertedCounts.get(method.id, (method, 0))
+        self.convertedCounts[method.id] = (method, count + 1)
+        return True
+
+    def convertedCount(self):
+        """Returns the total number of call sites converted to direct calls."""
+        return sum(count for _, count in self.convertedCounts.itervalues())
+
+    def report(self):
+        """Returns a string describing which call sites were converted."""
+        lines = ["devirtualized %d of %d virtual call sites" %
+                 (self.convertedCount(), self.callCount)]
+        convertedNames = sorted((str(method.name), count)
+                                for method, count in self.convertedCounts.itervalues())
+        lines.extend("  %s: %d" % (name, count) for name, count in convertedNames)
+        return "\n".join(lines) + "\n"
+
+    def isReceiverFinal(self, receiverType):
+        return isinstance(receiverType, ClassType) and \
+               isinstance(receiverType.clas, Class) and \
+               receiverType.clas.isFinal()
+
+    def isMethodClosed(self, method):
+        if method.id not in self.closedMethods:
+            self.closedMethods[method.id] = self.checkMethodClosed(method)
+        return self.closedMethods[method.id]
+
+    def checkMethodClosed(self, method):
+        if not method.isLocal() or len(method.overriddenBy) > 0:
+            return False
+        definingClass = method.definingClass
+        return not any(defn.isDerivedFrom(definingClass) for defn in self.openDefns)
+
+
+__all__ = ["Devirtualizer"]
@@ -0,0 +1,137 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import argparse
+import sys
+
+import builtins
+from errors import CompileException
+import ir_instructions
+from package_loader import PackageLoader
+
+
+def findFunctions(package, names):
+    """Returns functions in a package with the given names.
+
+    Only the names of functions are accessed, so if the package was loaded lazily, no other
+    parts of the functions are loaded.
+
+    Args:
+        package (Package): the package to search.
+        names (list[str]): full names of functions, like "Foo.bar". Names of overloaded
+            functions may be given without their mangled type signatures, in which case all
+            overloads are returned.
+
+    Returns:
+        (list[Function], list[str]): the matching functions in package order, and the names
+        that didn't match any function.
+    """
+    functions = []
+    found = set()
+    for function in package.functions:
+        functionName = str(function.name)
+        matches = [name for name in names if isNameMatch(name, functionName)]
+        if len(matches) > 0:
+            functions.append(function)
+            found.update(matches)
+    missing = [name for name in names if name not in found]
+    return functions, missing
+
+
+def isNameMatch(name, functionName):
+    return functionName == name or \
+           (functionName.startswith(name) and functionName[len(name)] in "[(")
+
+
+def disassemble(package, out, functions=None):
+    """Writes a listing of the instructions in some functions of a package.
+
+    Functions are written one at a time, so when the package is loaded lazily, only the
+    functions being listed are read, and output starts before the rest are loaded.
+
+    Args:
+        package (Package): the package containing the functions.
+        out (file): the stream to write to.
+        functions (list[Function]?): the functions to write. If `None`, all functions in
+            the package are written.
+    """
+    if functions is None:
+        functions = package.functions
+    for function in functions:
+        writeFunction(package, function, out)
+        out.flush()
+
+
+def writeFunction(package, function, out):
+    out.write("def %s" % function.name)
+    if len(function.typeParameters) > 0:
+        out.write("[%s]" % ", ".join(str(tp.name) for tp in function.typeParameters))
+    out.write("(%s): %s" % (", ".join(str(pt) for pt in function.parameterTypes),
+                            function.returnType))
+    if len(function.flags) > 0:
+        out.write(" (%s)" % ", ".join(sorted(function.flags)))
+    if function.blocks is None:
+        out.write("\n\n")
+        return
+    out.write(" =\n")
+    for block in function.blocks:
+        out.write("%d:\n" % block.id)
+        for inst in block.instructions:
+            callee = getCallee(package, inst)
+            if callee is None:
+                out.write("  %s\n" % inst)
+            else:
+                out.write("  %s  // %s\n" % (inst, callee.name))
+    out.write("\n")
+
+
+def getCallee(package, inst):
+    if isinstance(inst, (ir_instructions.callg, ir_instructions.callv)):
+        index = inst.op(0)
+        if index < 0:
+            return builtins.getBuiltinFunctionById(index)
+        return package.functions[index]
+    elif isinstance(inst, (ir_instructions.callgf, ir_instructions.callvf)):
+        depIndex, externIndex = inst.operands
+        return package.dependencies[depIndex].externFunctions[externIndex]
+    else:
+        return None
+
+
+def main():
+    cmdline = argparse.ArgumentParser(
+        description="Print the instructions of functions in a CodeSwitch package")
+    cmdline.add_argument("package", metavar="package", type=str,
+                         help="Package file to disassemble")
+    cmdline.add_argument("functions", metavar="function", type=str, nargs="*",
+                         help="Names of functions to print. All functions are printed " +
+                              "if none are given.")
+    cmdline.add_argument("-P", "--package-path", action="append", type=str, default=[],
+                         help="Directory where dependencies may be found")
+    args = cmdline.parse_args()
+
+    try:
+        loader = PackageLoader(args.package_path if len(args.package_path) > 0 else None)
+        loader.ensurePackageInfo()
+        package, = loader.loadPackageFiles([args.package])
+        functions = None
+        if len(args.functions) > 0:
+            functions, missing = findFunctions(package, args.functions)
+            for name in missing:
+                sys.stderr.write("%s: error: no function named %s\n" % (args.package, name))
+            if len(missing) > 0:
+                sys.exit(1)
+        disassemble(package, sys.stdout, functions)
+    except (CompileException, IOError) as err:
+        sys.stderr.write("%s: error: %s\n" % (args.package, str(err)))
+        sys.exit(1)
+
+
+__all__ = ["disassemble", "findFunctions"]
+
+
+if __name__ == "__main__":
+    main()
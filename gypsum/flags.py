@@ -5,7 +5,6 @@
 
 
 import utils
-import yaml
 
 
 def getFlagByName(name):
@@ -52,8 +51,7 @@ def _initialize():
     if _initialized:
         return
     _initialized = True
-    with utils.openCommonFile("flags.yaml") as flagsFile:
-        flagList = yaml.load(flagsFile.read())
+    flagList = utils.loadCommonData("flags.yaml")[0]
     code = 1
     for flagName in flagList:
         globals()[flagName] = flagName
@@ -0,0 +1,63 @@
+#!/usr/bin/env python2.7
+
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+# This script generates common_tables.py from the YAML files shared with CodeSwitch
+# (builtins.yaml, flags.yaml, and opcodes.yaml). The compiler reads the generated module
+# instead of parsing YAML when it starts. Run this after changing any of those files:
+#     python gypsum/gen_common_tables.py
+
+
+import hashlib
+import os.path
+import pprint
+import sys
+
+import yaml
+
+import utils
+
+
+COMMON_FILE_NAMES = ["builtins.yaml", "flags.yaml", "opcodes.yaml"]
+
+
+def generate(out):
+    out.write("""# DO NOT MODIFY
+# This file was automatically generated by gen_common_tables.py.
+#
+# Each entry maps the name of a YAML file to the SHA-1 hash of its contents and the list of
+# documents in it. See utils.loadCommonData.
+
+TABLES = {
+""")
+    for name in COMMON_FILE_NAMES:
+        with utils.openCommonFile(name) as inFile:
+            text = inFile.read()
+        documents = list(yaml.load_all(text))
+        out.write("    %r: (\n" % name)
+        out.write("        %r,\n" % hashlib.sha1(text).hexdigest())
+        for line in pprint.pformat(documents, width=88).splitlines():
+            out.write("        %s\n" % line)
+        out.write("    ),\n")
+    out.write("}\n")
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.stderr.write("usage: %s [common_tables.py]\n" % sys.argv[0])
+        sys.exit(1)
+    if len(sys.argv) == 2:
+        outFileName = sys.argv[1]
+    else:
+        outFileName = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                   "common_tables.py")
+    with open(outFileName, "w") as outFile:
+        generate(outFile)
+
+
+if __name__ == "__main__":
+    main()
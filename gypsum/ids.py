@@ -20,6 +20,9 @@ class AstId(Id):
     def __init__(self, id):
         self.id = id
 
+    def __hash__(self):
+        return self.id
+
     def __repr__(self):
         return "AstId(%d)" % self.id
 
@@ -34,6 +37,9 @@ class ScopeId(Id):
     def __init__(self, astIdOrComment):
         self.astIdOrComment = astIdOrComment
 
+    def __hash__(self):
+        return hash(self.astIdOrComment)
+
     def __repr__(self):
         return "ScopeId(%s)" % repr(self.astIdOrComment)
 
@@ -88,6 +94,9 @@ class DefnId(Id):
         self.index = index
         self.externIndex = externIndex
 
+    def __hash__(self):
+        return hash((self.kind, self.index))
+
     def __repr__(self):
         packageStr = str(self.packageId) if self.packageId else "BUILTIN"
         return "DefnId(%s, %s, %s, %s)" % (packageStr, self.kind, self.index, self.externIndex)
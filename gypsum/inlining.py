@@ -0,0 +1,279 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+from compile_info import PACKAGE_INITIALIZER_HINT
+from control_flow import ControlFlowGraph
+from externalization import externalizeType
+from flags import ABSTRACT, EXTERN, NATIVE
+from graph import Graph
+from ir import LOCAL, Variable
+import ir_instructions
+from name import INLINE_SUFFIX
+
+
+DEFAULT_INLINE_BUDGET = 16
+
+
+def inlineFunctions(info, budget=DEFAULT_INLINE_BUDGET):
+    """Replaces direct calls to small functions with copies of their bodies.
+
+    This pass runs after code generation, so it works on the basic blocks of each function
+    in the package being compiled. Only `callg` instructions are considered. Virtual calls
+    can't be inlined, since the callee isn't known until run-time. Foreign functions can't
+    be inlined either, since their bodies aren't available and may change independently of
+    this package.
+
+    A callee may be inlined if it is small (no more than `budget` instructions), it is not
+    recursive (directly or through other functions), and it is not `NATIVE`, `EXTERN`, or
+    `ABSTRACT`. Callees that set up exception handlers (`pushtry` / `poptry`) or use
+    labels for `branchl` are never inlined, since those instructions are tied to the
+    callee's frame. Callees that return with extra values on the stack are not inlined
+    either, since those values would be left behind in the caller.
+
+    Functions are processed in reverse topological order of the call graph, so callees are
+    fully processed before their callers. Parameters and locals of an inlined callee are
+    moved into fresh local slots in the caller. Types referenced by the callee's
+    instructions are substituted with the type arguments from the call site and merged into
+    the caller's `instTypes`.
+
+    Args:
+        info (CompileInfo): the compiled package.
+        budget (int): the maximum number of instructions in a function that can be inlined.
+
+    Returns:
+        (int): the number of call sites that were inlined.
+    """
+    package = info.package
+    callGraph = buildCallGraph(package)
+    sccGraph = callGraph.stronglyConnectedComponents()
+    recursiveIndices = set()
+    for scc in sccGraph.vertices():
+        if len(scc) > 1 or any(index in callGraph.neighbors(index) for index in scc):
+            recursiveIndices.update(scc)
+
+    inliner = Inliner(info, budget, recursiveIndices)
+    count = 0
+    for scc in reversed(sccGraph.topologicalSort()):
+        for index in sorted(scc):
+            count += inliner.inlineCallsInFunction(package.functions[index])
+    return count
+
+
+def buildCallGraph(package):
+    """Builds a graph of direct calls between functions in a package.
+
+    Vertices are indices of functions in `package.functions`. There is an edge from each
+    function to every local function it calls with `callg`.
+    """
+    callGraph = Graph()
+    for index, function in enumerate(package.functions):
+        callGraph.addVertex(index)
+        if function.blocks is None:
+            continue
+        for block in function.blocks:
+            for inst in block.instructions:
+                if isinstance(inst, ir_instructions.callg) and inst.op(0) >= 0:
+                    callGraph.addEdge(index, inst.op(0))
+    return callGraph
+
+
+class Inliner(object):
+    def __init__(self, info, budget, recursiveIndices):
+        self.info = info
+        self.package = info.package
+        self.budget = budget
+        self.recursiveIndices = recursiveIndices
+        self.inlinable = {}
+
+    def inlineCallsInFunction(self, function):
+        """Inlines eligible calls in `function`. Returns the number of calls inlined."""
+        if function.blocks is None:
+            return 0
+
+        # Blocks copied from callees were already processed before the callee was inlined,
+        # so we don't scan them again. Continuation blocks created by splitting a block at a
+        # call site are appended and scanned normally.
+        count = 0
+        copiedBlockIds = set()
+        blockIndex = 0
+        while blockIndex < len(function.blocks):
+            block = function.blocks[blockIndex]
+            blockIndex += 1
+            if block.id in copiedBlockIds:
+                continue
+            i = 0
+            while i < len(block.instructions):
+                callee = self.getInlinableCallee(function, block, i)
+                if callee is None:
+                    i += 1
+                    continue
+                i = self.inlineCall(function, block, i, callee, copiedBlockIds)
+                count += 1
+        return count
+
+    def getInlinableCallee(self, caller, block, i):
+        inst = block.instructions[i]
+        if not isinstance(inst, ir_instructions.callg) or inst.op(0) < 0:
+            return None
+        callee = self.package.functions[inst.op(0)]
+        if callee is caller or not self.isInlinable(callee):
+            return None
+
+        # Static type arguments are pushed immediately before the call. We substitute them
+        # into the callee's types, so we need to find them.
+        typeArgCount = len(callee.typeParameters)
+        if i < typeArgCount or \
+           not all(isinstance(typeArgInst, ir_instructions.tys)
+                   for typeArgInst in block.instructions[i - typeArgCount:i]):
+            return None
+        return callee
+
+    def isInlinable(self, function):
+        index = function.id.index
+        if index not in self.inlinable:
+            self.inlinable[index] = self.checkInlinable(function)
+        return self.inlinable[index]
+
+    def checkInlinable(self, function):
+        if function.id.index in self.recursiveIndices or \
+           function.blocks is None or \
+           function.instTypes is None or \
+           not frozenset([ABSTRACT, EXTERN, NATIVE]).isdisjoint(function.flags) or \
+           function.compileHint is PACKAGE_INITIALIZER_HINT:
+            return False
+        size = sum(len(block.instructions) for block in function.blocks)
+        if size > self.budget:
+            return False
+        for block in function.blocks:
+            for inst in block.instructions:
+                if isinstance(inst, (ir_instructions.pushtry, ir_instructions.poptry,
+                                     ir_instructions.label, ir_instructions.branchl)):
+                    return False
+            if 0 in block.successorIds():
+                # The entry block is spliced into the caller, so it can't be a branch target.
+                return False
+        return returnsWithSingleValue(function)
+
+    def inlineCall(self, caller, block, i, callee, copiedBlockIds):
+        """Replaces the call at `block.instructions[i]` with the body of `callee`.
+
+        Returns:
+            (int): the index in `block.instructions` where scanning for calls should resume.
+        """
+        typeArgCount = len(callee.typeParameters)
+        typeArgs = [caller.instTypes[inst.op(0)]
+                    for inst in block.instructions[i - typeArgCount:i]]
+        prefix = block.instructions[:i - typeArgCount]
+        suffix = block.instructions[i + 1:]
+
+        # Arguments are on the stack, with the last one on top. Store them into the slots
+        # allocated for the callee's parameters.
+        slots = self.allocateSlots(caller, callee, typeArgs)
+        stores = [ir_instructions.stlocal(slots[p])
+                  for p in reversed(xrange(len(callee.parameterTypes)))]
+
+        typeIndices = {}
+        def mapType(index):
+            if index not in typeIndices:
+                ty = callee.instTypes[index].substitute(callee.typeParameters, typeArgs)
+                typeIndices[index] = self.findOrAddType(caller, ty)
+            return typeIndices[index]
+
+        calleeBlocks = callee.blocks
+        entryInsts = calleeBlocks[0].instructions
+        if len(calleeBlocks) == 1 and isinstance(entryInsts[-1], ir_instructions.ret):
+            # Simple case: the callee is a single block that returns normally. Its body can be
+            # spliced directly into the current block.
+            body = [self.rewriteInstruction(inst, slots, mapType, None, None)
+                    for inst in entryInsts[:-1]]
+            block.instructions = prefix + stores + body + suffix
+            return len(prefix) + len(stores) + len(body)
+
+        # General case: split the current block after the call. The callee's entry block is
+        # spliced into the current block (it can't have any predecessors), and the rest of
+        # the callee's blocks are appended to the caller. Returns branch to the continuation.
+        baseId = len(caller.blocks) - 1
+        continuationId = baseId + len(calleeBlocks)
+        mapBlockId = lambda id: baseId + id
+        rewrite = lambda inst: self.rewriteInstruction(inst, slots, mapType,
+                                                       mapBlockId, continuationId)
+        block.instructions = prefix + stores + map(rewrite, entryInsts)
+        for calleeBlock in calleeBlocks[1:]:
+            copiedBlock = ir_instructions.BasicBlock(mapBlockId(calleeBlock.id),
+                                                     map(rewrite, calleeBlock.instructions))
+            assert copiedBlock.id == len(caller.blocks)
+            caller.blocks.append(copiedBlock)
+            copiedBlockIds.add(copiedBlock.id)
+        continuationBlock = ir_instructions.BasicBlock(continuationId, suffix)
+        assert continuationBlock.id == len(caller.blocks)
+        caller.blocks.append(continuationBlock)
+        return len(block.instructions)
+
+    def rewriteInstruction(self, inst, slots, mapType, mapBlockId, continuationId):
+        if isinstance(inst, ir_instructions.ret):
+            return ir_instructions.branch(continuationId)
+        elif isinstance(inst, (ir_instructions.ldlocal, ir_instructions.stlocal)):
+            return inst.withOperands(slots[inst.op(0)])
+        elif isinstance(inst, (ir_instructions.tys, ir_instructions.tyd)):
+            return inst.withOperands(mapType(inst.op(0)))
+        elif inst.isTerminator():
+            return inst.withOperands(*map(mapBlockId, inst.successorIds()))
+        else:
+            return inst.withOperands(*inst.operands)
+
+    def allocateSlots(self, caller, callee, typeArgs):
+        """Adds local variables to `caller` for each parameter and local of `callee`.
+
+        Returns:
+            (dict[int, int]): a map from slots in the callee to new slots in the caller.
+        """
+        name = callee.name.withSuffix(INLINE_SUFFIX)
+        localCount = len([v for v in caller.variables if v.kind is LOCAL])
+        slots = {}
+        def addSlot(calleeSlot, ty):
+            if ty is not None:
+                ty = ty.substitute(callee.typeParameters, typeArgs)
+            var = Variable(name, type=ty, kind=LOCAL)
+            var.index = -len(slots) - localCount - 1
+            caller.variables.append(var)
+            slots[calleeSlot] = var.index
+
+        for index, ty in enumerate(callee.parameterTypes):
+            addSlot(index, ty)
+        for var in callee.variables:
+            if var.kind is LOCAL:
+                addSlot(var.index, var.type)
+        return slots
+
+    def findOrAddType(self, function, ty):
+        try:
+            return function.instTypes.index(ty)
+        except ValueError:
+            index = len(function.instTypes)
+            function.instTypes.append(ty)
+            externalizeType(self.info, ty)
+            return index
+
+
+def returnsWithSingleValue(function):
+    """Returns whether every `ret` in `function` is executed with exactly one value on the
+    stack, and there is at least one `ret`."""
+    heights = ControlFlowGraph(function.blocks).stackHeights()
+    hasReturn = False
+    for block in function.blocks:
+        height = heights[block.id]
+        if height is None:
+            continue
+        for inst in block.instructions:
+            if isinstance(inst, ir_instructions.ret):
+                if height != 1:
+                    return False
+                hasReturn = True
+            height += inst.stackDelta()
+    return hasReturn
+
+
+__all__ = ["inlineFunctions", "DEFAULT_INLINE_BUDGET"]
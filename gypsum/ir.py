@@ -3,6 +3,7 @@
 # This file is part of Gypsum. Use of this source code is governed by
 # the GPL license that can be found in the LICENSE.txt file.
 
+import itertools
 import re
 import StringIO
 
@@ -14,6 +15,7 @@ import flags
 import ids
 import ir_types
 from name import Name
+import stats
 import bytecode
 from utils import (
     each,
@@ -164,6 +166,56 @@ class Package(object):
         self.dependencies.append(dep)
         return self.dependencies[-1]
 
+    def convertToDependency(self):
+        """Prepares a package that was just compiled to be used as a dependency.
+
+        Definitions in a package being compiled are identified by `TARGET_PACKAGE_ID`, so
+        the package gets its own id, like a package loaded from a file. Types in the package
+        already refer to definitions in its dependencies directly, so nothing else needs to
+        be linked. This should be called after the package is serialized.
+        """
+        assert self.id is ids.TARGET_PACKAGE_ID
+        self.id = ids.PackageId(name=self.name)
+        for defn in itertools.chain(self.globals, self.functions, self.classes, self.traits,
+                                    self.typeParameters):
+            if defn.id.packageId is ids.TARGET_PACKAGE_ID:
+                defn.id.packageId = self.id
+
+    def resetDependencyState(self):
+        """Clears state left on this package by compiling another package that depends on it.
+
+        `ensureDependency` and externalization record indices and flags on this package and
+        its definitions. These are only meaningful while compiling one dependent package,
+        so they must be cleared before this package is reused to compile another one.
+        Parts of definitions that haven't been loaded yet can't have been externalized, so
+        they are skipped (and not loaded).
+        """
+        self.id.index = None
+        types = []
+        for defn in itertools.chain(self.globals, self.functions, self.classes, self.traits):
+            defn.id.externIndex = None
+            # Only attributes that were already read are checked, so nothing is loaded.
+            attrs = defn.__dict__
+            types.append(attrs.get("type"))
+            for p in attrs.get("typeParameters") or ():
+                p.isExternalized = False
+                types.extend((p.upperBound, p.lowerBound))
+            types.append(attrs.get("returnType"))
+            types.extend(attrs.get("parameterTypes") or ())
+            types.extend(attrs.get("supertypes") or ())
+            types.extend(f.type for f in attrs.get("fields") or ())
+            types.append(attrs.get("elementType"))
+        # Type parameters of existential types are only reachable through other types.
+        while len(types) > 0:
+            ty = types.pop()
+            if isinstance(ty, ir_types.ClassType):
+                types.extend(ty.typeArguments)
+            elif isinstance(ty, ir_types.ExistentialType):
+                for v in ty.variables:
+                    v.isExternalized = False
+                    types.extend((v.upperBound, v.lowerBound))
+                types.append(ty.ty)
+
     def ensureExports(self):
         if self.exports is not None:
             return self.exports
@@ -220,6 +272,8 @@ class Package(object):
         return self.stringIndices.get(s)
 
     def findOrAddString(self, s):
+        if stats.enabled:
+            stats.count("package.findOrAddString")
         if isinstance(s, str):
             s = unicode(s)
         assert isinstance(s, unicode)
@@ -235,6 +289,8 @@ class Package(object):
         return self.nameIndices.get(name)
 
     def findOrAddName(self, name):
+        if stats.enabled:
+            stats.count("package.findOrAddName")
         assert self.names is not None
         index = self.findName(name)
         if index is None:
@@ -440,6 +496,23 @@ class IrTopDefn(IrDefinition):
         super(IrTopDefn, self).__init__(name, sourceName, astDefn)
         self.id = id
         self.isExternalized = False
+        self.lazyLoader = None
+
+    def __getattr__(self, name):
+        # This is only called for attributes that aren't set. Definitions loaded lazily from
+        # a package file are missing most of their attributes until one of them is accessed.
+        # See `serialize.Deserializer`.
+        lazyLoader = self.__dict__.get("lazyLoader")
+        if lazyLoader is None or name not in lazyLoader.attrNames:
+            raise AttributeError(name)
+        self.lazyLoader = None
+        lazyLoader.load(self)
+        return getattr(self, name)
+
+    def isLoaded(self):
+        """Returns whether all attributes of this definition are available. This is only
+        false for definitions that were loaded lazily and haven't been accessed yet."""
+        return self.lazyLoader is None
 
     def isBuiltin(self):
         return self.id.isBuiltin()
@@ -552,6 +625,9 @@ class Function(ParameterizedDefn):
         compileHint (symbol?): if set, the compiler will generate instructions for a specific
             kind of function (for example, an array getter) instead of generating instructions
             from a function body (which may not be present).
+        encodedBody (str?): the function's body, already encoded for the package file.
+            This is set instead of `blocks` and `instTypes` when the function is encoded
+            as soon as it's compiled (see `compiler.emitFunction`).
     """
 
     def __init__(self, name, id, sourceName=None, astDefn=None, returnType=None,
@@ -571,6 +647,7 @@ class Function(ParameterizedDefn):
         self.instTypes = instTypes
         self.overriddenBy = overriddenBy
         self.compileHint = compileHint
+        self.encodedBody = None
 
     def __repr__(self):
         return reprFormat(self, "name", "returnType", "typeParameters", "parameterTypes",
@@ -4,6 +4,8 @@
 # the GPL license that can be found in the LICENSE.txt file.
 
 
+import copy
+
 import data
 import bytecode
 import ir
@@ -33,6 +35,18 @@ class Instruction(object):
     def op(self, i):
         return self.operands[i]
 
+    def withOperands(self, *operands):
+        """Returns a copy of this instruction with different operands.
+
+        Instructions that refer to definitions (calls, field loads, etc.) are constructed from
+        definitions, but only their indices are kept. This is used by passes that rewrite
+        instructions in place, where those definitions are no longer available.
+        """
+        assert len(operands) == len(self.operands)
+        inst = copy.copy(self)
+        inst.operands = tuple(operands)
+        return inst
+
     def opcode(self):
         return self.info.opcode
 
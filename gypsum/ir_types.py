@@ -13,6 +13,7 @@ import data
 import errors
 import flags
 import ir_values
+import stats
 import utils
 
 NULLABLE_TYPE_FLAG = "nullable"
@@ -27,6 +28,8 @@ class Type(data.Data):
             flags = frozenset([flags])
         assert isinstance(flags, frozenset)
         self.flags = flags
+        if stats.enabled:
+            stats.count("types.allocated." + self.__class__.__name__)
 
     def withFlag(self, flag):
         ty = copy.copy(self)
@@ -47,12 +50,16 @@ class Type(data.Data):
         return self.isSubtypeOf_(other, SubstitutionEnvironment())
 
     def isSubtypeOf_(self, other, subEnv):
+        if stats.enabled:
+            stats.enter("types.isSubtypeOf")
         subEnv.beginTransaction()
         result = self.isSubtypeOfRules_(other, subEnv)
         if result:
             subEnv.commitTransaction()
         else:
             subEnv.rollbackTransaction()
+        if stats.enabled:
+            stats.leave("types.isSubtypeOf")
         return result
 
     def isSubtypeOfRules_(self, other, subEnv):
@@ -179,12 +186,16 @@ class Type(data.Data):
         return self.lub_(other, [], SubstitutionEnvironment())
 
     def lub_(self, other, stack, subEnv):
+        if stats.enabled:
+            stats.enter("types.lub")
         subEnv.beginTransaction()
         result = self.lubRules_(other, stack, subEnv)
         if result is not AnyType:
             subEnv.commitTransaction()
         else:
             subEnv.rollbackTransaction()
+        if stats.enabled:
+            stats.leave("types.lub")
         return result
 
     def lubRules_(self, other, stack, subEnv):
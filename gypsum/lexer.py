@@ -102,11 +102,11 @@ _spaceRx = _expressions[0][0]
 _newlineRx = _expressions[1][0]
 
 
-def lex(filename, source):
+def lex(filename, source, firstLine=1):
     tokens = []
     pos = 0
     end = len(source)
-    line = 1
+    line = firstLine
     column = 1
     indents = [""]
     blanks = []
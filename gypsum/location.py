@@ -22,6 +22,12 @@ class Location(Data):
         r = (other.filename, other.beginLine, other.beginColumn, other.endLine, other.endColumn)
         return cmp(l, r)
 
+    def __reduce__(self):
+        # Keep NoLoc unique when syntax trees are pickled, since it's compared by identity.
+        if self is NoLoc:
+            return "NoLoc"
+        return super(Location, self).__reduce__()
+
     def combine(self, other):
         assert self.fileName == other.fileName
         beginRow, beginColumn = min((self.beginRow, self.beginColumn),
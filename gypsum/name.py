@@ -83,3 +83,5 @@ EXISTENTIAL_SUFFIX = "$forsome"
 BLANK_SUFFIX = "$blank"
 LOCAL_SUFFIX = "$local"
 LAMBDA_SUFFIX = "$lambda"
+INLINE_SUFFIX = "$inline"
+INSTANCE_SUFFIX = "$instance"
@@ -0,0 +1,361 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import os.path
+import Queue
+import sys
+import time
+import traceback
+
+from __init__ import compilePackage
+from errors import CompileException
+from ir import Name, PackageVersion
+from package_loader import PackageLoader
+from serialize import serialize
+
+
+class PackageSpec(object):
+    """Describes how to build one package in a manifest.
+
+    Attributes:
+        name (Name): the name of the package.
+        version (PackageVersion): the version of the package.
+        sourceFileNames (list[str]): source files, in the order they're compiled.
+        depNames (list[Name]): packages this package depends on directly. Packages in the
+            same manifest are built first. Others are found on the package path.
+        isUsingStd (bool): whether the package depends on std.
+        optimize (bool): whether to optimize generated code.
+        outputFileName (str): where the package file is written.
+    """
+
+    def __init__(self, name, version, sourceFileNames, depNames, isUsingStd, optimize,
+                 outputFileName):
+        self.name = name
+        self.version = version
+        self.sourceFileNames = sourceFileNames
+        self.depNames = depNames
+        self.isUsingStd = isUsingStd
+        self.optimize = optimize
+        self.outputFileName = outputFileName
+
+    def getBuildDepNames(self, specsByName):
+        """Returns names of packages in the same manifest that must be built first."""
+        names = list(self.depNames)
+        if self.isUsingStd:
+            names.append(STD_NAME)
+        return [name for name in names if name in specsByName]
+
+
+STD_NAME = Name(["std"])
+
+
+def readManifest(fileName, outputDirName):
+    """Reads a JSON manifest describing packages to build.
+
+    The manifest is an object with a "packages" list. Each package has a "name", a list of
+    "sources" (file names or glob patterns relative to the manifest), and optionally a
+    "version" (default "0"), a list of "deps" (package names), "std" (default true),
+    "optimize" (default false), and "output" (a file name relative to the manifest). If
+    there's no output, the package is written to <name>-<version>.csp in `outputDirName`.
+
+    Returns:
+        (list[PackageSpec]): the packages, in the order they're listed.
+
+    Raises:
+        IOError: if the manifest can't be read or is invalid.
+    """
+    with open(fileName) as manifestFile:
+        try:
+            manifest = json.load(manifestFile)
+        except ValueError as exn:
+            raise IOError("invalid manifest: %s" % exn)
+    baseDirName = os.path.dirname(fileName)
+    specs = []
+    try:
+        for p in manifest["packages"]:
+            name = Name.fromString(str(p["name"]), isPackageName=True)
+            version = PackageVersion.fromString(str(p.get("version", "0")))
+            sourceFileNames = []
+            for pattern in p["sources"]:
+                pattern = os.path.join(baseDirName, pattern)
+                matches = sorted(glob.glob(pattern))
+                if len(matches) == 0:
+                    raise IOError("%s: no source files match %s" % (name, pattern))
+                sourceFileNames.extend(matches)
+            depNames = [Name.fromString(str(d), isPackageName=True)
+                        for d in p.get("deps", [])]
+            if "output" in p:
+                outputFileName = os.path.join(baseDirName, p["output"])
+            else:
+                outputFileName = os.path.join(outputDirName, "%s-%s.csp" % (name, version))
+            specs.append(PackageSpec(name, version, sourceFileNames, depNames,
+                                     bool(p.get("std", True)), bool(p.get("optimize", False)),
+                                     outputFileName))
+    except (KeyError, TypeError, AttributeError) as exn:
+        raise IOError("invalid manifest: %s" % exn)
+    return specs
+
+
+def sortSpecs(specs):
+    """Sorts packages so each one comes after the packages it depends on.
+
+    Raises:
+        IOError: if there's a dependency cycle or two packages have the same name.
+    """
+    specsByName = {}
+    for spec in specs:
+        if spec.name in specsByName:
+            raise IOError("%s: package is listed more than once" % spec.name)
+        specsByName[spec.name] = spec
+    sortedSpecs = []
+    visiting = set()
+    visited = set()
+
+    def visit(spec):
+        if spec.name in visited:
+            return
+        if spec.name in visiting:
+            raise IOError("%s: dependency cycle" % spec.name)
+        visiting.add(spec.name)
+        for depName in spec.getBuildDepNames(specsByName):
+            visit(specsByName[depName])
+        visiting.remove(spec.name)
+        visited.add(spec.name)
+        sortedSpecs.append(spec)
+
+    for spec in specs:
+        visit(spec)
+    return sortedSpecs
+
+
+class BuildPackageLoader(PackageLoader):
+    """Loads dependencies for packages being built together.
+
+    Packages in the build are indexed by their output file names, so they take precedence
+    over other versions on the package path. Packages compiled in this process are handed
+    to dependents directly with `addCompiledPackage` and are never read back from their
+    files. Packages compiled in other processes are loaded from their files when needed.
+    """
+
+    def __init__(self, paths, specs):
+        super(BuildPackageLoader, self).__init__(paths)
+        self.specs = specs
+
+    def ensurePackageInfo(self):
+        if self.packageInfoByName is not None:
+            return
+        super(BuildPackageLoader, self).ensurePackageInfo()
+        for spec in self.specs:
+            info = PackageLoader.Info(spec.name, spec.version, spec.outputFileName)
+            self.packageInfoByName[spec.name] = info
+            self.packageVersionsByName.setdefault(spec.name, {}) \
+                [tuple(spec.version.components)] = info
+            self.packageInfoByFile[spec.outputFileName] = info
+
+    def addCompiledPackage(self, package):
+        """Makes a package that was just compiled (and written) available to dependents."""
+        self.ensurePackageInfo()
+        package.convertToDependency()
+        info = self.packageInfoByName[package.name]
+        info.package = package
+        self.packageInfoById[package.id] = info
+        self._runLoadHooks(package)
+
+    def resetDependencyState(self):
+        """Clears state left on loaded packages by the last package compiled."""
+        self.ensurePackageInfo()
+        for package in self.getLoadedPackages():
+            package.resetDependencyState()
+
+
+def buildPackage(spec, loader, specsByName):
+    """Compiles one package, writes it, and hands it to `loader` for dependents.
+
+    Returns:
+        (str?): an error message, or `None` if the package was built.
+    """
+    try:
+        sources = []
+        for sourceFileName in spec.sourceFileNames:
+            with open(sourceFileName) as inFile:
+                sources.append((sourceFileName, inFile.read()))
+        loader.resetDependencyState()
+        dependFileNames = [specsByName[name].outputFileName if name in specsByName
+                           else loader.packageInfoByName[name].fileName
+                           for name in spec.depNames
+                           if name in specsByName or loader.isPackage(name)]
+        missing = [name for name in spec.depNames
+                   if name not in specsByName and not loader.isPackage(name)]
+        if len(missing) > 0:
+            return "%s: could not find package %s" % (spec.name, missing[0])
+        package = compilePackage(sources, spec.name, spec.version, loader, dependFileNames,
+                                 spec.isUsingStd, spec.optimize)
+        outputDirName = os.path.dirname(spec.outputFileName)
+        if outputDirName != "" and not os.path.isdir(outputDirName):
+            os.makedirs(outputDirName)
+        serialize(package, spec.outputFileName)
+        loader.addCompiledPackage(package)
+        return None
+    except CompileException as err:
+        return str(err)
+    except (IOError, OSError) as err:
+        return "%s: error: %s" % (spec.name, err)
+
+
+class PackageBuilder(object):
+    """Builds packages described by a manifest, in dependency order.
+
+    With one job, packages are compiled in this process, one at a time, and each compiled
+    package is handed to its dependents in memory. Nothing is read back from the files that
+    are written.
+
+    With more jobs, packages are compiled in a pool of processes. A package is started as
+    soon as everything it depends on is finished, so a full build takes about as long as
+    the longest chain of dependencies. IR can't be shared between processes, so a package
+    compiled in one process is loaded from its file by the others. Each process keeps the
+    packages it has compiled or loaded for later packages.
+
+    Attributes:
+        specs (list[PackageSpec]): the packages to build, sorted in dependency order.
+        paths (list[str]?): directories containing packages not in the manifest.
+        jobCount (int): the number of packages to compile at once.
+        out (file): where progress messages are written.
+    """
+
+    def __init__(self, specs, paths=None, jobCount=1, out=None):
+        self.specs = sortSpecs(specs)
+        self.specsByName = {spec.name: spec for spec in self.specs}
+        self.paths = paths
+        self.jobCount = jobCount
+        self.out = out
+
+    def build(self):
+        """Builds all the packages.
+
+        Returns:
+            (list[str]): error messages. If this is empty, all packages were built.
+        """
+        if self.jobCount <= 1:
+            return self.buildSerially()
+        else:
+            return self.buildConcurrently()
+
+    def buildSerially(self):
+        loader = BuildPackageLoader(self.paths, self.specs)
+        for spec in self.specs:
+            startTime = time.time()
+            error = buildPackage(spec, loader, self.specsByName)
+            if error is not None:
+                return [error]
+            self.report(spec, startTime)
+        return []
+
+    def buildConcurrently(self):
+        results = Queue.Queue()
+        remainingDeps = {spec.name: set(spec.getBuildDepNames(self.specsByName))
+                         for spec in self.specs}
+        dependents = {spec.name: [] for spec in self.specs}
+        for spec in self.specs:
+            for depName in remainingDeps[spec.name]:
+                dependents[depName].append(spec)
+        startTimes = {}
+        errors = []
+        pool = multiprocessing.Pool(self.jobCount, initializeBuildProcess,
+                                    (self.paths, self.specs))
+
+        def start(spec):
+            startTimes[spec.name] = time.time()
+            pool.apply_async(buildPackageInProcess, (spec.name,),
+                             callback=lambda error: results.put((spec, error)))
+
+        try:
+            for spec in self.specs:
+                if len(remainingDeps[spec.name]) == 0:
+                    start(spec)
+            runningCount = len(startTimes)
+            while runningCount > 0:
+                # A timeout keeps the wait interruptible.
+                spec, error = results.get(timeout=365 * 24 * 60 * 60)
+                runningCount -= 1
+                if error is not None:
+                    errors.append(error)
+                    continue
+                self.report(spec, startTimes[spec.name])
+                if len(errors) > 0:
+                    continue
+                for dependent in dependents[spec.name]:
+                    remainingDeps[dependent.name].remove(spec.name)
+                    if len(remainingDeps[dependent.name]) == 0:
+                        start(dependent)
+                        runningCount += 1
+        finally:
+            pool.terminate()
+            pool.join()
+        return errors
+
+    def report(self, spec, startTime):
+        if self.out is not None:
+            self.out.write("built %s (%dms)\n" %
+                           (spec.outputFileName, (time.time() - startTime) * 1000))
+
+
+# State of a process in the pool used by `PackageBuilder.buildConcurrently`.
+_processLoader = None
+_processSpecsByName = None
+
+def initializeBuildProcess(paths, specs):
+    global _processLoader, _processSpecsByName
+    _processLoader = BuildPackageLoader(paths, specs)
+    _processSpecsByName = {spec.name: spec for spec in specs}
+
+
+def buildPackageInProcess(name):
+    try:
+        return buildPackage(_processSpecsByName[name], _processLoader, _processSpecsByName)
+    except Exception:
+        # The pool doesn't call back if this raises, so the builder would wait forever.
+        return "%s: internal error:\n%s" % (name, traceback.format_exc())
+
+
+def main():
+    sys.setrecursionlimit(10000)
+    cmdline = argparse.ArgumentParser(
+        description="Build several CodeSwitch packages described by a manifest")
+    cmdline.add_argument("manifest", metavar="manifest", type=str,
+                         help="JSON file listing packages, their sources, and dependencies")
+    cmdline.add_argument("-P", "--package-path", action="append", type=str, default=[],
+                         help="Directories containing packages not in the manifest")
+    cmdline.add_argument("-o", "--output-dir", action="store", default=".",
+                         help="Directory where packages are written")
+    cmdline.add_argument("-j", "--jobs", action="store", type=int, default=1,
+                         help="Number of packages to compile at the same time")
+    args = cmdline.parse_args()
+
+    try:
+        specs = readManifest(args.manifest, args.output_dir)
+        builder = PackageBuilder(specs,
+                                 args.package_path if len(args.package_path) > 0 else None,
+                                 args.jobs, sys.stdout)
+    except IOError as err:
+        sys.stderr.write("%s: error: %s\n" % (args.manifest, err))
+        sys.exit(1)
+    errors = builder.build()
+    for error in errors:
+        sys.stderr.write("%s\n" % error)
+    if len(errors) > 0:
+        sys.exit(1)
+
+
+__all__ = ["BuildPackageLoader", "PackageBuilder", "PackageSpec", "buildPackage", "readManifest"]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import hashlib
+import marshal
+import os.path
+import zlib
+
+from flags import flagSetToFlagBits
+import ids
+from name import Name
+from utils import writeFileAtomically
+
+
+INDEX_SUFFIX = ".csi"
+INDEX_VERSION = 1
+
+DEFN_KINDS = (ids.DefnId.GLOBAL, ids.DefnId.FUNCTION, ids.DefnId.CLASS, ids.DefnId.TRAIT)
+
+
+def indexFileName(packageFileName):
+    """Returns the name of the export index file stored next to a package file."""
+    base, _ = os.path.splitext(packageFileName)
+    return base + INDEX_SUFFIX
+
+
+def hashPackageData(data):
+    """Returns a hash of the contents of a package file, used to validate its index.
+
+    Args:
+        data (str|mmap|buffer): the contents of the package file.
+    """
+    return hashlib.sha1(buffer(data)).hexdigest()
+
+
+class ExportIndex(object):
+    """A sidecar index which speeds up loading a package and linking against it.
+
+    Without an index, the deserializer has to scan every definition in a package to find
+    where each one starts, and `Package.ensureExports` has to load the parameter types of
+    every public function to compute its mangled name. The index records this information
+    when the package is written, so a loaded package's exports can be built directly, and
+    lazily loaded definitions can be read from their recorded offsets.
+
+    The index is stored in a separate file (see `indexFileName`) so that the package format
+    read by the VM is unchanged. The file is a compressed `marshal` dump, which is compact
+    and loads quickly. It's only used if its hash matches the package file, so a
+    stale index is ignored.
+
+    Attributes:
+        packageHash (str): the hash of the package file, from `hashPackageData`.
+        definitions (dict[str, list[(int, int, int, int)]]): for each definition kind (from
+            `DefnId`), a tuple for each definition in the package, in order. Each tuple
+            contains the offset of the definition in the package file, the index of its name,
+            the index of its source name (or -1), and its flag bits.
+        exports (list[(tuple[unicode], str, int)]): for each exported definition, the
+            components of its export name (mangled for functions), its kind, and its index.
+    """
+
+    def __init__(self, packageHash, definitions, exports):
+        self.packageHash = packageHash
+        self.definitions = definitions
+        self.exports = exports
+
+    @staticmethod
+    def build(package, packageHash):
+        """Builds an index for a package.
+
+        Export names of functions are mangled relative to the package they're loaded in, so
+        the index must be built from the package as it's loaded as a dependency, not from
+        the package being compiled.
+
+        Args:
+            package (Package): the package, loaded lazily from a file. None of its
+                definitions should be loaded yet, since their offsets are taken from their
+                lazy loaders.
+            packageHash (str): the hash of the package file.
+        """
+        nameIndices = {name: i for i, name in enumerate(package.names)}
+        stringIndices = {s: i for i, s in enumerate(package.strings)}
+        definitions = {}
+        for kind, defns in zip(DEFN_KINDS, getDefnLists(package)):
+            definitions[kind] = [(defn.lazyLoader.offset,
+                                  nameIndices[defn.name],
+                                  stringIndices[defn.sourceName]
+                                  if defn.sourceName is not None
+                                  else -1,
+                                  flagSetToFlagBits(defn.flags))
+                                 for defn in defns]
+        exports = sorted((tuple(name.components), defn.id.kind, defn.id.index)
+                         for name, defn in package.ensureExports().iteritems())
+        return ExportIndex(packageHash, definitions, exports)
+
+    @staticmethod
+    def load(packageFileName, data):
+        """Loads the index for a package file, if there is a valid one.
+
+        Args:
+            packageFileName (str): the name of the package file.
+            data (str|mmap|buffer): the contents of the package file.
+
+        Returns:
+            (ExportIndex?): the index, or `None` if the index file is missing, can't be read,
+            or doesn't match the package.
+        """
+        try:
+            with open(indexFileName(packageFileName), "rb") as indexFile:
+                contents = marshal.loads(zlib.decompress(indexFile.read()))
+            version, packageHash, definitions, exports = contents
+        except (IOError, EOFError, ValueError, TypeError, zlib.error):
+            return None
+        if version != INDEX_VERSION or packageHash != hashPackageData(data):
+            return None
+        return ExportIndex(packageHash, definitions, exports)
+
+    def write(self, packageFileName):
+        """Writes the index next to a package file."""
+        contents = (INDEX_VERSION, self.packageHash, self.definitions, self.exports)
+        writeFileAtomically(indexFileName(packageFileName),
+                            zlib.compress(marshal.dumps(contents)))
+
+    def buildExports(self, package):
+        """Returns a map of exported definitions, like `Package.ensureExports`.
+
+        This doesn't access any attributes of the package's definitions, so they don't need
+        to be loaded.
+        """
+        defnLists = dict(zip(DEFN_KINDS, getDefnLists(package)))
+        return {Name(list(components)): defnLists[kind][index]
+                for components, kind, index in self.exports}
+
+
+def getDefnLists(package):
+    return (package.globals, package.functions, package.classes, package.traits)
+
+
+__all__ = ["ExportIndex", "indexFileName", "hashPackageData"]
@@ -5,19 +5,23 @@
 
 
 import os
-import os.path
-import re
 
 import errors
-import ir
 from location import NoLoc
+from package_path_index import PackagePathIndex
 import serialize
+import utils
 
 
 class BasePackageLoader(object):
     def __init__(self):
         self.loadHooks = []
 
+        # Bindings of scopes created for definitions in loaded packages, keyed by the
+        # definition or package. Scope analysis saves these the first time it creates a
+        # scope, so later compilations using this loader don't bind everything again.
+        self.scopeSnapshots = {}
+
     def addLoadHook(self, hook):
         """Registers a function that should be called when a package is loaded from disk.
 
@@ -38,6 +42,13 @@ class BasePackageLoader(object):
 class PackageLoader(BasePackageLoader):
     """Loads packages from files, making them available to be used as dependencies. Also
     indexes available packages, used for package prefixes in the top-level scope.
+
+    If `loadThreadCount` is greater than 1, loading a package first discovers its
+    dependencies (and theirs) by reading package headers, then opens those package files
+    and validates their export indices on a pool of threads. Packages are still decoded
+    and linked one at a time on the calling thread in the same order as before, so load
+    hooks are called in the same order. Only the I/O, hashing, and decompression overlap,
+    since decoding holds the interpreter lock.
     """
 
     class Info(object):
@@ -47,7 +58,7 @@ class PackageLoader(BasePackageLoader):
             self.fileName = fileName
             self.package = package
 
-    def __init__(self, paths=None):
+    def __init__(self, paths=None, indexCacheDirName=None, loadThreadCount=1):
         super(PackageLoader, self).__init__()
         if paths is not None:
             self.paths = paths
@@ -56,10 +67,15 @@ class PackageLoader(BasePackageLoader):
         else:
             self.paths = []
 
+        self.pathIndex = PackagePathIndex(indexCacheDirName)
         self.packageInfoByName = None
+        self.packageVersionsByName = None
         self.packageInfoById = None
         self.packageInfoByFile = None
         self.loadHooks = []
+        self.loadThreadCount = loadThreadCount
+        self.loadDepth = 0
+        self.openedPackages = {}
 
     def ensurePackageInfo(self):
         """Scans packages directories and builds an index of available packages.
@@ -79,31 +95,54 @@ class PackageLoader(BasePackageLoader):
 
         This method may be called multiple times. The index is only built once. Most other
         methods call this internally.
+
+        Directory listings are cached by `PackagePathIndex` if `indexCacheDirName` was
+        passed to the constructor, so unchanged directories aren't listed again.
         """
         if self.packageInfoByName is not None:
             return
         self.packageInfoByName = {}
+        self.packageVersionsByName = {}
         self.packageInfoById = {}
         self.packageInfoByFile = {}
-        packageFileNameRex = re.compile(r"\A(%s)-(%s).csp\Z" %
-                                        (ir.Name.packageSrc, ir.PackageVersion.versionSrc))
         for dirName in self.paths:
-            try:
-                for baseName in os.listdir(dirName):
-                    m = packageFileNameRex.match(baseName)
-                    if m is None:
-                        continue
-                    name = ir.Name.fromString(m.group(1), isPackageName=True)
-                    version = ir.PackageVersion.fromString(m.group(2))
-                    fileName = os.path.join(dirName, baseName)
-                    if (name not in self.packageInfoByName or
-                        (self.packageInfoByName[name].package is None and
-                         version > self.packageInfoByName[name].version)):
-                        info = PackageLoader.Info(name, version, fileName)
-                        self.packageInfoByName[name] = info
-                        self.packageInfoByFile[fileName] = info
-            except OSError:
-                continue
+            for name, version, fileName in self.pathIndex.listPackages(dirName):
+                # PackageVersion isn't hashable, so versions are keyed by their components.
+                versions = self.packageVersionsByName.setdefault(name, {})
+                versionKey = tuple(version.components)
+                if versionKey in versions:
+                    continue
+                info = PackageLoader.Info(name, version, fileName)
+                versions[versionKey] = info
+                if (name not in self.packageInfoByName or
+                    (self.packageInfoByName[name].package is None and
+                     version > self.packageInfoByName[name].version)):
+                    self.packageInfoByName[name] = info
+                    self.packageInfoByFile[fileName] = info
+
+    def findPackageInfo(self, dependency):
+        """Returns the newest indexed version of a package within a dependency's range.
+
+        Calls `ensurePackageInfo` internally. Indexed directories are not scanned again.
+
+        Args:
+            dependency (PackageDependency): the name and version range to look for. The
+                minimum and maximum versions are inclusive, and `None` means unbounded.
+
+        Returns:
+            (PackageLoader.Info?): information about the package, or `None` if no version
+            in the range was found.
+        """
+        self.ensurePackageInfo()
+        versions = self.packageVersionsByName.get(dependency.name, {})
+        candidates = [info for info in versions.itervalues()
+                      if (dependency.minVersion is None or
+                          dependency.minVersion <= info.version) and
+                         (dependency.maxVersion is None or
+                          info.version <= dependency.maxVersion)]
+        if len(candidates) == 0:
+            return None
+        return max(candidates, key=lambda info: info.version)
 
     def getPackageNames(self):
         """Returns a selection of all known package names.
@@ -148,12 +187,28 @@ class PackageLoader(BasePackageLoader):
         if info.package is not None:
             return info.package
         fileName = self.packageInfoByName[name].fileName
-        package = serialize.deserialize(fileName, self)
-        info.package = package
-        self.packageInfoById[package.id] = info
+        if self.loadDepth == 0:
+            self.openPackagesConcurrently([name])
+        # Definitions are read lazily, since a dependent package usually uses only a small
+        # fraction of them. If the package has an export index, it's used for linking.
+        # Dependencies are loaded recursively while the package is deserialized. They were
+        # opened along with this package, so files aren't opened again until the outermost
+        # load finishes.
+        self.loadDepth += 1
+        try:
+            opened = self.openedPackages.pop(fileName, None)
+            if opened is not None:
+                data, index = opened
+                package = serialize.deserializeData(data, self, lazy=True, index=index)
+            else:
+                package = serialize.deserialize(fileName, self, lazy=True, useIndex=True)
+            info.package = package
+            self.packageInfoById[package.id] = info
 
-        for dep in package.dependencies:
-            dep.package = self.loadPackage(dep.name, loc)
+            for dep in package.dependencies:
+                dep.package = self.loadPackage(dep.name, loc)
+        finally:
+            self.finishLoad()
 
         self._runLoadHooks(package)
         return package
@@ -194,7 +249,7 @@ class PackageLoader(BasePackageLoader):
             else:
                 # We have never heard of this package before. We need to load some metadata
                 # to see what it is.
-                name, version = serialize.deserializeNameAndVersion(fileName)
+                name, version = self.pathIndex.readNameAndVersion(fileName)
                 names.append(name)
                 if name in self.packageInfoByName:
                     # We've indexed a package of the same name.
@@ -216,12 +271,70 @@ class PackageLoader(BasePackageLoader):
                     self.packageInfoByFile[fileName] = info
                 info = PackageLoader.Info(name, version, fileName)
 
-        # Load the packages, if they're not loaded already.
-        return map(self.loadPackage, names)
+        # Load the packages, if they're not loaded already. All of them are opened first,
+        # and they're kept open until the last one is loaded.
+        self.openPackagesConcurrently(names)
+        self.loadDepth += 1
+        try:
+            return map(self.loadPackage, names)
+        finally:
+            self.finishLoad()
+
+    def finishLoad(self):
+        self.loadDepth -= 1
+        if self.loadDepth == 0:
+            # Files opened ahead of time for packages that weren't loaded are released.
+            self.openedPackages.clear()
+
+    def openPackagesConcurrently(self, names):
+        """Opens files for packages and their dependencies in parallel, before loading them.
+
+        The dependency graph is explored one level at a time, starting with `names`. Each
+        level's files are opened on a pool of `loadThreadCount` threads (see
+        `serialize.openPackage`), and their headers are read to find the next level. Opened
+        files are saved in `openedPackages` for `loadPackage`.
+
+        Packages that are already loaded or already opened are skipped. Errors are ignored
+        here. Packages that couldn't be opened are loaded normally, which reports the error.
+        """
+        if self.loadThreadCount <= 1:
+            return
+        self.ensurePackageInfo()
+        seen = set()
+        level = []
+        for name in names:
+            if self.isUnopenedPackage(name) and name not in seen:
+                seen.add(name)
+                level.append(name)
+        while len(level) > 0:
+            fileNames = [self.packageInfoByName[name].fileName for name in level]
+            results = utils.mapConcurrently(openPackageAndDependencyNames, fileNames,
+                                            self.loadThreadCount)
+            nextLevel = []
+            for fileName, result in zip(fileNames, results):
+                if result is None:
+                    continue
+                data, index, depNames = result
+                self.openedPackages[fileName] = (data, index)
+                for depName in depNames:
+                    if self.isUnopenedPackage(depName) and depName not in seen:
+                        seen.add(depName)
+                        nextLevel.append(depName)
+            level = nextLevel
+
+    def isUnloadedPackage(self, name):
+        return name in self.packageInfoByName and self.packageInfoByName[name].package is None
+
+    def isUnopenedPackage(self, name):
+        return self.isUnloadedPackage(name) and \
+               self.packageInfoByName[name].fileName not in self.openedPackages
 
     def getLoadedPackages(self):
         return [packageInfo.package for packageInfo in self.packageInfoById.itervalues()]
 
+    def getLoadedPackageFileNames(self):
+        return [packageInfo.fileName for packageInfo in self.packageInfoById.itervalues()]
+
     def getPackageById(self, id):
         package = self.packageInfoById[id].package
         assert package is not None
@@ -236,3 +349,11 @@ class PackageLoader(BasePackageLoader):
             raise errors.PackageException(
                 loc, "package version in metadata (%s) differs from file version (%s)" % (
                     package.version, info.version))
+
+
+def openPackageAndDependencyNames(fileName):
+    try:
+        data, index = serialize.openPackage(fileName, useIndex=True)
+        return data, index, serialize.readDependencyNames(data)
+    except (IOError, OSError):
+        return None
@@ -0,0 +1,143 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import hashlib
+import marshal
+import os
+import os.path
+import re
+import time
+
+import ir
+import serialize
+import utils
+
+
+INDEX_VERSION = 1
+
+# A directory listing is only cached if the directory hasn't been modified for this many
+# seconds. Otherwise, a file could be added in the same clock tick as the listing, and the
+# directory's modification time wouldn't change.
+MIN_CACHED_DIR_AGE = 2
+
+PACKAGE_FILE_NAME_REX = re.compile(r"\A(%s)-(%s).csp\Z" %
+                                   (ir.Name.packageSrc, ir.PackageVersion.versionSrc))
+
+
+class PackagePathIndex(object):
+    """Finds packages in package directories, caching what it finds on disk.
+
+    Listing a directory and matching file names against the package file name pattern is
+    cheap on a local disk, but it's repeated on every compiler invocation, which adds up
+    for large, shared directories on slow file systems. This class stores the packages
+    found in each directory in a cache file, along with the directory's modification time.
+    If the directory hasn't changed, the cached list is used without listing it again.
+
+    Names and versions read from the headers of package files (see `readNameAndVersion`)
+    are cached in the same file, keyed by each file's size and modification time.
+
+    Attributes:
+        cacheDirName (str?): the directory where cache files are stored. If `None`, nothing
+            is cached, and every call scans the file system.
+    """
+
+    def __init__(self, cacheDirName=None):
+        self.cacheDirName = cacheDirName
+        self.records = {}
+
+    def listPackages(self, dirName):
+        """Returns the packages in a directory, based on their file names.
+
+        Package files are named <name>-<version>.csp. Other files are ignored.
+
+        Returns:
+            (list[(Name, PackageVersion, str)]): the name, version, and file name of each
+            package, sorted by file name. The list is empty if the directory can't be read.
+        """
+        try:
+            dirMtime = os.stat(dirName).st_mtime
+        except OSError:
+            return []
+        record = self.getRecord(dirName)
+        if record["mtime"] != dirMtime:
+            try:
+                baseNames = sorted(os.listdir(dirName))
+            except OSError:
+                return []
+            packages = []
+            for baseName in baseNames:
+                m = PACKAGE_FILE_NAME_REX.match(baseName)
+                if m is not None:
+                    packages.append((baseName,
+                                     m.group(1).split("."),
+                                     [int(c) for c in m.group(2).split(".")]))
+            record["packages"] = packages
+            record["mtime"] = dirMtime if time.time() - dirMtime >= MIN_CACHED_DIR_AGE \
+                              else None
+            self.saveRecord(dirName, record)
+        return [(ir.Name(list(nameComponents)),
+                 ir.PackageVersion(list(versionComponents)),
+                 os.path.join(dirName, baseName))
+                for baseName, nameComponents, versionComponents in record["packages"]]
+
+    def readNameAndVersion(self, fileName):
+        """Returns the name and version of a package stored in its file header.
+
+        Raises:
+            IOError: if the file can't be read or isn't a valid package.
+        """
+        try:
+            stat = os.stat(fileName)
+        except OSError as err:
+            raise IOError(err.errno, err.strerror, fileName)
+        dirName, baseName = os.path.split(fileName)
+        record = self.getRecord(dirName)
+        header = record["headers"].get(baseName)
+        if header is not None and header[:2] == (stat.st_size, stat.st_mtime):
+            return ir.Name(list(header[2])), ir.PackageVersion(list(header[3]))
+        name, version = serialize.deserializeNameAndVersion(fileName)
+        record["headers"][baseName] = (stat.st_size, stat.st_mtime,
+                                       tuple(name.components), tuple(version.components))
+        self.saveRecord(dirName, record)
+        return name, version
+
+    def getRecord(self, dirName):
+        dirName = os.path.abspath(dirName)
+        record = self.records.get(dirName)
+        if record is None:
+            record = self.loadRecord(dirName)
+            self.records[dirName] = record
+        return record
+
+    def loadRecord(self, dirName):
+        if self.cacheDirName is not None:
+            try:
+                with open(self.recordFileName(dirName), "rb") as recordFile:
+                    version, recordDirName, record = marshal.loads(recordFile.read())
+                if version == INDEX_VERSION and recordDirName == dirName:
+                    return record
+            except (IOError, EOFError, ValueError, TypeError):
+                pass
+        return {"mtime": None, "packages": [], "headers": {}}
+
+    def saveRecord(self, dirName, record):
+        if self.cacheDirName is None:
+            return
+        dirName = os.path.abspath(dirName)
+        try:
+            if not os.path.isdir(self.cacheDirName):
+                os.makedirs(self.cacheDirName)
+            utils.writeFileAtomically(self.recordFileName(dirName),
+                                      marshal.dumps((INDEX_VERSION, dirName, record)))
+        except (IOError, OSError):
+            # The cache is only an optimization.
+            pass
+
+    def recordFileName(self, dirName):
+        return os.path.join(self.cacheDirName, hashlib.sha1(dirName).hexdigest() + ".idx")
+
+
+__all__ = ["PackagePathIndex"]
@@ -0,0 +1,206 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import collections
+import cPickle
+import hashlib
+import marshal
+import os
+import os.path
+import re
+
+import ast
+from compile_cache import getCompilerHash
+from errors import LexException, ParseException
+from lexer import lex
+from location import Location, NoLoc
+from parser import Parser, parse
+import utils
+
+
+PARSE_CACHE_VERSION = 1
+
+# A line which could start a top-level definition or import. Lines starting with
+# whitespace, comments, and keywords that continue the previous definition can't.
+_definitionStartRx = re.compile(r"(?!//|else\b|catch\b|finally\b)[^\s]")
+
+
+class ParseCache(object):
+    """Keeps syntax trees of top-level definitions between compilations.
+
+    Each source file is split into chunks, each holding one top-level definition or import
+    along with any comments directly above it (see `splitDefinitions`). The syntax trees
+    parsed from each chunk are saved, keyed by a hash of the chunk's text. When a file is
+    parsed again, only chunks that changed are lexed and parsed. The others are loaded from
+    the cache, with their locations adjusted if lines were added or removed above them.
+    The resulting module is the same as if the whole file were parsed at once.
+
+    Chunks are split by looking at the text, so a chunk boundary may occasionally fall
+    inside a multi-line string or an expression that continues at the start of a line.
+    Chunks like that don't parse on their own. When that happens, the whole file is
+    parsed instead, and nothing is cached for it.
+
+    There is one cache file for each source file. Errors reading or writing cache files
+    are ignored, since the cache is only an optimization. Cache files are evicted by
+    `CompileCache` along with compiled packages.
+
+    Attributes:
+        dirName (str): the directory containing cache files.
+        hitCount (int): the number of chunks loaded from the cache.
+        missCount (int): the number of chunks that were lexed and parsed.
+    """
+
+    def __init__(self, dirName):
+        self.dirName = dirName
+        self.hitCount = 0
+        self.missCount = 0
+
+    def parse(self, fileName, source):
+        """Parses a source file, reusing definitions that haven't changed.
+
+        Args:
+            fileName (str): the name of the source file, used in locations.
+            source (str): the contents of the source file.
+
+        Returns:
+            (ast.Module): the parsed module, with node ids assigned, as `parser.parse`
+            would return.
+
+        Raises:
+            LexException, ParseException: if the file has a syntax error.
+        """
+        cacheFileName = self.cacheFileName(fileName)
+        oldEntries = self.readEntries(cacheFileName)
+        entries = []
+        modules = []
+        try:
+            for firstLine, text in splitDefinitions(source):
+                key = hashlib.sha1(text).hexdigest()
+                entry = oldEntries.get(key)
+                if entry is not None:
+                    # The saved tree has locations for the line where the chunk was when it
+                    # was parsed. It's saved again unchanged, with that line number.
+                    savedFirstLine, data = entry
+                    module = cPickle.loads(data)
+                    if savedFirstLine != firstLine:
+                        relocate(module, firstLine - savedFirstLine)
+                    self.hitCount += 1
+                else:
+                    module = parseChunk(fileName, text, firstLine)
+                    savedFirstLine = firstLine
+                    data = cPickle.dumps(module, cPickle.HIGHEST_PROTOCOL)
+                    self.missCount += 1
+                entries.append((key, savedFirstLine, data))
+                modules.append(module)
+        except (LexException, ParseException):
+            # A chunk may not parse on its own even if the file is fine. Parse the whole file
+            # to be sure; if there's a real error, it's reported here.
+            return parse(fileName, lex(fileName, source))
+
+        definitions = [d for module in modules for d in module.definitions]
+        location = modules[0].location.combine(modules[-1].location)
+        module = ast.Module(definitions, location)
+        ast.addNodeIds(module)
+        if [key for key, _, _ in entries] != oldEntries.keys():
+            self.writeEntries(cacheFileName, entries)
+        else:
+            self.touch(cacheFileName)
+        return module
+
+    def cacheFileName(self, fileName):
+        key = hashlib.sha1(fileName).hexdigest()
+        return os.path.join(self.dirName, key[:2], key)
+
+    def readEntries(self, cacheFileName):
+        try:
+            with open(cacheFileName, "rb") as cacheFile:
+                version, compilerHash, entries = marshal.loads(cacheFile.read())
+        except (IOError, EOFError, ValueError, TypeError):
+            return collections.OrderedDict()
+        if version != PARSE_CACHE_VERSION or compilerHash != getCompilerHash():
+            return collections.OrderedDict()
+        return collections.OrderedDict((key, (firstLine, data))
+                                       for key, firstLine, data in entries)
+
+    def touch(self, cacheFileName):
+        # The modification time records when the file was last used, so `CompileCache`
+        # evicts files that aren't used anymore first.
+        try:
+            os.utime(cacheFileName, None)
+        except OSError:
+            pass
+
+    def writeEntries(self, cacheFileName, entries):
+        try:
+            cacheDirName = os.path.dirname(cacheFileName)
+            if not os.path.isdir(cacheDirName):
+                os.makedirs(cacheDirName)
+            utils.writeFileAtomically(
+                cacheFileName,
+                marshal.dumps((PARSE_CACHE_VERSION, getCompilerHash(), entries)))
+        except (IOError, OSError):
+            pass
+
+
+def splitDefinitions(source):
+    """Splits source code into chunks that can be parsed separately.
+
+    A chunk starts at a line which starts at the beginning of the line with something other
+    than a comment (normally a definition or import). Comment lines directly above that line
+    are part of the same chunk, since the parser attaches them to the definition.
+
+    Returns:
+        (list[(int, str)]): the number of the first line of each chunk, and its text.
+            Joining the text of the chunks gives `source`.
+    """
+    lines = source.splitlines(True)
+    starts = []
+    for i, line in enumerate(lines):
+        if not _definitionStartRx.match(line):
+            continue
+        if i > 0 and lines[i - 1].rstrip("\r\n").endswith("\\"):
+            continue
+        start = i
+        while start > 0 and lines[start - 1].startswith("//"):
+            start -= 1
+        if len(starts) == 0 or starts[-1] < start:
+            starts.append(start)
+    if len(starts) == 0 or starts[0] != 0:
+        starts.insert(0, 0)
+    ends = starts[1:] + [len(lines)]
+    return [(start + 1, "".join(lines[start:end])) for start, end in zip(starts, ends)]
+
+
+def parseChunk(fileName, text, firstLine):
+    """Parses a chunk from `splitDefinitions` into a module without node ids."""
+    parser = Parser(fileName, lex(fileName, text, firstLine))
+    module = parser.module()
+    if not parser.atEnd():
+        raise ParseException(parser.location, "garbage at end of input")
+    return module
+
+
+def relocate(node, lineDelta):
+    """Moves the locations in a syntax tree down by `lineDelta` lines."""
+    def relocateValue(value):
+        if isinstance(value, Location):
+            if value is NoLoc:
+                return value
+            return Location(value.fileName, value.beginRow + lineDelta, value.beginColumn,
+                            value.endRow + lineDelta, value.endColumn)
+        elif isinstance(value, ast.Node):
+            for name, attr in value.__dict__.items():
+                setattr(value, name, relocateValue(attr))
+            return value
+        elif isinstance(value, list):
+            value[:] = [relocateValue(v) for v in value]
+            return value
+        else:
+            return value
+    relocateValue(node)
+
+
+__all__ = ["ParseCache", "splitDefinitions"]
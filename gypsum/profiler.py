@@ -0,0 +1,260 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import cProfile
+import gc
+import json
+import os
+import os.path
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows. Memory usage isn't reported there.
+    resource = None
+
+
+DEFAULT_FUNCTION_COUNT = 10
+
+
+class Profiler(object):
+    """Measures how much time and memory each phase of the compiler uses.
+
+    Each phase is measured with `phase`. A phase may be entered more than once (for example,
+    lexing is done once for each file); measurements are added together. For each phase,
+    the profiler records:
+
+    - wall time and CPU time (user and system) in seconds.
+    - the number of objects tracked by the garbage collector at the end of the phase,
+      minus the number at the beginning. This approximates net allocation, since most
+      objects the compiler creates are tracked.
+    - the process's peak resident set size at the end of the phase, and how much the
+      phase raised it. These are only available where the `resource` module is.
+
+    Phases that analyze or compile one function at a time may also report time spent on
+    each function with `enterFunction` and `exitFunction`. Time is exclusive: if another
+    function is entered before the first is exited (for example, to infer its return type),
+    time spent in the inner function isn't counted for the outer function.
+
+    Attributes:
+        pstatsDirName (str?): if set, each phase is run with `cProfile`, and the statistics
+            are written to a file named after the phase in this directory. The files can
+            be read with the `pstats` module.
+        functionCount (int): the number of slowest functions to report for each phase.
+        phases (list[PhaseInfo]): measurements for each phase, in the order the phases
+            were first entered.
+    """
+
+    def __init__(self, pstatsDirName=None, functionCount=DEFAULT_FUNCTION_COUNT):
+        self.pstatsDirName = pstatsDirName
+        self.functionCount = functionCount
+        self.phases = []
+        self.phasesByName = {}
+        self.currentPhase = None
+        self.functionStack = []
+
+    def phase(self, name):
+        """Returns a context manager that measures a phase while it's active."""
+        if name not in self.phasesByName:
+            info = PhaseInfo(name)
+            self.phases.append(info)
+            self.phasesByName[name] = info
+        return _PhaseContext(self, self.phasesByName[name])
+
+    def enterFunction(self, function):
+        """Starts measuring time spent on a function in the current phase.
+
+        Args:
+            function (ir.Function): the function being analyzed or compiled.
+        """
+        now = time.time()
+        if len(self.functionStack) > 0:
+            self.pauseFunction(now)
+        self.functionStack.append([str(function.name), now])
+
+    def exitFunction(self):
+        """Stops measuring the function most recently entered with `enterFunction`."""
+        now = time.time()
+        self.pauseFunction(now)
+        self.functionStack.pop()
+        if len(self.functionStack) > 0:
+            self.functionStack[-1][1] = now
+
+    def pauseFunction(self, now):
+        name, startTime = self.functionStack[-1]
+        functionTimes = self.currentPhase.functionTimes
+        functionTimes[name] = functionTimes.get(name, 0.) + now - startTime
+
+    def getReport(self):
+        """Returns all measurements as a JSON-compatible dict."""
+        phases = [p.getReport(self.functionCount) for p in self.phases]
+        total = {
+            "wallTime": sum(p.wallTime for p in self.phases),
+            "cpuTime": sum(p.cpuTime for p in self.phases),
+            "objectDelta": sum(p.objectDelta for p in self.phases),
+        }
+        if resource is not None and len(self.phases) > 0:
+            total["peakMemory"] = max(p.peakMemory for p in self.phases)
+        return {"phases": phases, "total": total}
+
+    def writeReport(self, fileName):
+        """Writes all measurements to a file as JSON."""
+        with open(fileName, "w") as reportFile:
+            json.dump(self.getReport(), reportFile, indent=2, separators=(",", ": "),
+                      sort_keys=True)
+            reportFile.write("\n")
+
+    def writeSummary(self, out):
+        """Writes a table of measurements for people to read."""
+        out.write("%-28s %10s %10s %10s %12s\n" %
+                  ("phase", "wall ms", "cpu ms", "objects", "peak mem KiB"))
+        for p in self.phases:
+            memory = "%d" % (p.peakMemory // 1024) if resource is not None else "-"
+            out.write("%-28s %10.1f %10.1f %+10d %12s\n" %
+                      (p.name, p.wallTime * 1000, p.cpuTime * 1000, p.objectDelta, memory))
+        total = self.getReport()["total"]
+        out.write("%-28s %10.1f %10.1f %+10d\n" %
+                  ("total", total["wallTime"] * 1000, total["cpuTime"] * 1000,
+                   total["objectDelta"]))
+        for p in self.phases:
+            functions = p.getSlowestFunctions(self.functionCount)
+            if len(functions) == 0:
+                continue
+            out.write("\nslowest functions in %s:\n" % p.name)
+            for name, seconds in functions:
+                out.write("%10.1f ms  %s\n" % (seconds * 1000, name))
+
+
+class PhaseInfo(object):
+    """Measurements for one phase.
+
+    Attributes:
+        name (str): the name of the phase.
+        callCount (int): the number of times the phase was entered.
+        wallTime (float): elapsed time in seconds.
+        cpuTime (float): user and system CPU time in seconds.
+        objectDelta (int): the change in the number of objects tracked by the garbage
+            collector.
+        peakMemory (int): the peak resident set size of the process in bytes, after the
+            phase finished.
+        memoryGrowth (int): how much the phase raised the peak resident set size, in bytes.
+        functionTimes (dict[str, float]): time spent on each function in seconds.
+        pstatsFileName (str?): the file `cProfile` statistics were written to.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.callCount = 0
+        self.wallTime = 0.
+        self.cpuTime = 0.
+        self.objectDelta = 0
+        self.peakMemory = 0
+        self.memoryGrowth = 0
+        self.functionTimes = {}
+        self.pstatsFileName = None
+        self.profile = None
+
+    def getSlowestFunctions(self, count):
+        functions = sorted(self.functionTimes.iteritems(), key=lambda f: (-f[1], f[0]))
+        return functions[:count]
+
+    def getReport(self, functionCount):
+        report = {
+            "name": self.name,
+            "callCount": self.callCount,
+            "wallTime": self.wallTime,
+            "cpuTime": self.cpuTime,
+            "objectDelta": self.objectDelta,
+        }
+        if resource is not None:
+            report["peakMemory"] = self.peakMemory
+            report["memoryGrowth"] = self.memoryGrowth
+        if len(self.functionTimes) > 0:
+            report["functionCount"] = len(self.functionTimes)
+            report["slowestFunctions"] = [{"name": name, "time": seconds}
+                                          for name, seconds
+                                          in self.getSlowestFunctions(functionCount)]
+        if self.pstatsFileName is not None:
+            report["pstats"] = self.pstatsFileName
+        return report
+
+
+class _PhaseContext(object):
+    def __init__(self, profiler, info):
+        self.profiler = profiler
+        self.info = info
+
+    def __enter__(self):
+        assert self.profiler.currentPhase is None, "phases can't be nested"
+        self.profiler.currentPhase = self.info
+        self.objectCount = len(gc.get_objects())
+        self.peakMemory = getPeakMemory()
+        if self.profiler.pstatsDirName is not None:
+            if self.info.profile is None:
+                self.info.profile = cProfile.Profile()
+            self.info.profile.enable()
+        self.cpuTime = getCpuTime()
+        self.wallTime = time.time()
+
+    def __exit__(self, excType, excValue, traceback):
+        wallTime = time.time()
+        cpuTime = getCpuTime()
+        info = self.info
+        if info.profile is not None:
+            info.profile.disable()
+            info.pstatsFileName = os.path.join(self.profiler.pstatsDirName,
+                                               "%s.pstats" % info.name)
+            if not os.path.isdir(self.profiler.pstatsDirName):
+                os.makedirs(self.profiler.pstatsDirName)
+            info.profile.dump_stats(info.pstatsFileName)
+        info.callCount += 1
+        info.wallTime += wallTime - self.wallTime
+        info.cpuTime += cpuTime - self.cpuTime
+        info.objectDelta += len(gc.get_objects()) - self.objectCount
+        info.peakMemory = getPeakMemory()
+        info.memoryGrowth += info.peakMemory - self.peakMemory
+        self.profiler.currentPhase = None
+        self.profiler.functionStack = []
+        return False
+
+
+class _NoPhaseContext(object):
+    def __enter__(self):
+        pass
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+_NO_PHASE = _NoPhaseContext()
+
+
+def measurePhase(profiler, name):
+    """Returns a context manager that measures a phase with `profiler` if it's not `None`."""
+    return profiler.phase(name) if profiler is not None else _NO_PHASE
+
+
+def getCpuTime():
+    """Returns user and system CPU time used by the process in seconds."""
+    if resource is not None:
+        # More precise than os.times on most systems.
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        return usage.ru_utime + usage.ru_stime
+    times = os.times()
+    return times[0] + times[1]
+
+
+def getPeakMemory():
+    """Returns the peak resident set size of the process in bytes, or 0 if unknown."""
+    if resource is None:
+        return 0
+    maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB. macOS reports bytes.
+    return maxRss if sys.platform == "darwin" else maxRss * 1024
+
+
+__all__ = ["DEFAULT_FUNCTION_COUNT", "Profiler", "measurePhase"]
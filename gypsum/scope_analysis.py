@@ -20,6 +20,7 @@ from ids import AstId, DefnId, PackageId, ScopeId, BUILTIN_SCOPE_ID, GLOBAL_SCOP
 import ir
 from ir_types import getRootClassType, getNothingClassType, ClassType, UnitType, I32Type
 from location import Location, NoLoc
+import stats
 from builtins import registerBuiltins, getBuiltinClasses, getNothingClass, getRootClass
 from utils import Counter, each
 from bytecode import BUILTIN_ROOT_CLASS_ID
@@ -148,11 +149,58 @@ def convertClosures(info):
           context.x = x
           var closure-g = Closure-g(context)
           closure-g.apply()
+
+    Immutable variables are usually captured differently: their values are copied directly
+    into fields of closure objects when the closures are created, and no context is needed
+    (see `canCaptureValue` for when this is possible). Since `x` is a parameter in the
+    example above, it becomes:
+
+        class Closure-g
+          let x: i64
+
+          def this(x: i64) =
+            this.x = x
+
+          def apply = this.x + 2
+
+        def f(x: i64) =
+          var closure-g = Closure-g(x)
+          closure-g.apply()
+
+    Local functions which don't escape are not converted to closures at all (see
+    `isLiftable`). They can only be called directly by the function that defines them, so
+    captured values and contexts are passed as extra parameters when they're called, and
+    no closure object is needed. This is actually what happens to `g` above:
+
+        def g(x: i64) = x + 2
+
+        def f(x: i64) =
+          g(x)
     """
+    # Decide which local functions can be called directly with extra parameters instead of
+    # being converted to closures.
+    capturingUseInfos = [u for u in info.iterUseInfo() if u.shouldCapture(info)]
+    escapingFunctions = set(u.defnInfo.irDefn for u in capturingUseInfos
+                            if isinstance(u.defnInfo.irDefn, ir.Function))
+    for scope in info.iterScope():
+        if isLiftable(scope, escapingFunctions):
+            scope.isLifted = True
+
+    # Decide which variables can be copied into closures. A variable is only copied if all
+    # of its captures allow it; otherwise it's stored in a context, and every closure that
+    # uses it shares the context.
+    assignedVars = findVariablesAssignedInClosures(info)
+    callLocations = findCallLocations(info)
+    contextVars = set(u.defnInfo.irDefn for u in capturingUseInfos
+                      if not canCaptureValue(u, info, assignedVars, callLocations))
+    isCopied = [u.defnInfo.irDefn not in contextVars for u in capturingUseInfos]
+
     # Do the actual closure conversion.
-    for useInfo in info.iterUseInfo():
-        if useInfo.shouldCapture(info):
-            useScope = info.getScope(useInfo.useScopeId)
+    for useInfo, shouldCopy in zip(capturingUseInfos, isCopied):
+        useScope = info.getScope(useInfo.useScopeId)
+        if shouldCopy:
+            useScope.captureValue(useInfo)
+        else:
             useScope.capture(useInfo)
 
     # We are done modifying scopes, and we made a mess. Call finish on scopes in no
@@ -161,6 +209,153 @@ def convertClosures(info):
         scope.finish()
 
 
+def isLiftable(scope, escapingFunctions):
+    """Returns whether a local function can be called directly instead of becoming a closure.
+
+    This is true for functions defined inside other functions, as long as they're only used
+    in the scope where they're defined. Closures for those functions would never be stored,
+    passed, or returned; they'd only be used to call the function. Functions used from
+    other scopes (`escapingFunctions`) must be captured.
+    """
+    return isinstance(scope, FunctionScope) and \
+           isinstance(scope.ast, ast.FunctionDefinition) and \
+           isinstance(scope.parent.topLocalScope(), FunctionScope) and \
+           scope.getIrDefn() not in escapingFunctions and \
+           NATIVE not in scope.getIrDefn().flags
+
+
+class AssignmentVisitor(ast.NodeVisitor):
+    def __init__(self):
+        self.assignedAstIds = set()
+
+    def visitAssignStatement(self, node):
+        if isinstance(node.left, ast.VariableExpression):
+            self.assignedAstIds.add(node.left.id)
+
+    def visitDefault(self, node):
+        pass
+
+    def postVisit(self, node):
+        self.visitChildren(node)
+
+
+def findVariablesAssignedInClosures(info):
+    """Returns variables assigned in scopes other than the ones they're defined in.
+
+    These are the only variables that can't be passed by value to functions called directly
+    (see `isLiftable`), since the function would assign its own copy.
+    """
+    visitor = AssignmentVisitor()
+    visitor.visit(info.ast)
+    assignedVars = set()
+    for astId in visitor.assignedAstIds:
+        if info.hasUseInfo(astId):
+            useInfo = info.getUseInfo(astId)
+            if useInfo.shouldCapture(info):
+                assignedVars.add(useInfo.defnInfo.irDefn)
+    return assignedVars
+
+
+class UseLocationVisitor(ast.NodeVisitor):
+    def __init__(self, info):
+        self.info = info
+        self.locations = {}
+
+    def visitDefault(self, node):
+        if self.info.hasUseInfo(node.id):
+            irDefn = self.info.getUseInfo(node).defnInfo.irDefn
+            if isinstance(irDefn, ir.Function):
+                self.locations.setdefault(irDefn, []).append(node.location)
+
+    def postVisit(self, node):
+        self.visitChildren(node)
+
+
+def findCallLocations(info):
+    """Returns the locations where each function is used, keyed by function.
+
+    Local functions that are called directly (see `isLiftable`) are only used in the
+    function that defines them, so these are the locations where they're called.
+    """
+    visitor = UseLocationVisitor(info)
+    visitor.visit(info.ast)
+    return visitor.locations
+
+
+def isAssignedBeforeCalls(irDefn, function, callLocations):
+    """Returns whether a variable is assigned before every call to a local function.
+
+    Parameters are always assigned. Other variables must be initialized where they're
+    defined, and every call must come after the definition in source. A variable read
+    before it's assigned must raise `UninitializedException`, which only happens when it's
+    loaded from a context.
+    """
+    if irDefn.kind is ir.PARAMETER:
+        return True
+    astVarDefn = irDefn.astVarDefn
+    if not isinstance(astVarDefn, ast.VariableDefinition) or astVarDefn.expression is None:
+        return False
+    assignLoc = astVarDefn.location
+    return all((assignLoc.endRow, assignLoc.endColumn) <= (loc.beginRow, loc.beginColumn)
+               for loc in callLocations.get(function, ()))
+
+
+def canCaptureValue(useInfo, info, assignedVars, callLocations):
+    """Returns whether a captured definition can be copied into closures.
+
+    This is true for immutable variables defined in functions, as long as they're assigned
+    before any closure that captures them is created. Closures are created in the function
+    that defines the variable, either where a lambda expression is evaluated, or at the
+    beginning of the block containing a local function definition. Closures nested inside
+    other closures are created later, when the outer closure is called. Parameters are
+    always assigned first. Other variables must be defined before the closure in source.
+
+    If every scope between the use and the definition is a function called directly (see
+    `isLiftable`), the value is copied when the function is called instead. In that case,
+    mutable variables may be copied, too, as long as they aren't assigned in one of those
+    functions, and they're definitely assigned before every call (see
+    `isAssignedBeforeCalls`).
+    """
+    irDefn = useInfo.defnInfo.irDefn
+    if not isinstance(irDefn, ir.Variable):
+        return False
+    defnScope = info.getScope(useInfo.defnInfo.scopeId)
+    if not isinstance(defnScope.topLocalScope(), FunctionScope):
+        return False
+
+    # Find the outermost closure scope.
+    scope = info.getScope(useInfo.useScopeId).topLocalScope(defnScope)
+    isLifted = True
+    while True:
+        if not isinstance(scope, FunctionScope):
+            return False
+        isLifted = isLifted and scope.isLifted
+        parentScope = scope.parent.topLocalScope(defnScope)
+        if parentScope is defnScope:
+            break
+        scope = parentScope
+
+    if isLifted:
+        return (LET in irDefn.flags or irDefn not in assignedVars) and \
+               isAssignedBeforeCalls(irDefn, scope.getIrDefn(), callLocations)
+    if LET not in irDefn.flags:
+        return False
+    if isinstance(scope.ast, ast.LambdaExpression):
+        createLoc = scope.ast.location
+    elif isinstance(scope.ast, ast.FunctionDefinition):
+        createLoc = scope.parent.ast.location
+    else:
+        return False
+    if irDefn.kind is ir.PARAMETER:
+        return True
+    astVarDefn = irDefn.astVarDefn if irDefn.astVarDefn is not None else irDefn.astDefn
+    if astVarDefn is None:
+        return False
+    assignLoc = astVarDefn.location
+    return (assignLoc.endRow, assignLoc.endColumn) <= \
+           (createLoc.beginRow, createLoc.beginColumn)
+
+
 def isHeritable(irDefn):
     """Returns true if the given irDefn can be inherited from a base class by a
     deriving class."""
@@ -186,6 +381,11 @@ class NameInfo(object):
     def addOverload(self, defnInfo):
         self.overloads.append(defnInfo)
 
+    def copy(self):
+        nameInfo = NameInfo(self.name)
+        nameInfo.overloads = list(self.overloads)
+        return nameInfo
+
     def isHeritable(self):
         return all(isHeritable(o.irDefn) for o in self.overloads)
 
@@ -275,6 +475,7 @@ class Scope(ast.NodeVisitor):
         self.defined = set()
         self.childScopes = {}
         self.imports = []
+        self.snapshot = None
         info.setScope(self.scopeId, self)
         if self.ast is not None:
             info.setScope(ast.id, self)
@@ -449,12 +650,20 @@ class Scope(ast.NodeVisitor):
 
         For non-function defintions, this requires the name is not already bound. For function
         definitions, multiple functions may share the same name. They are added to
-        OverloadInfo."""
+        OverloadInfo.
+
+        If this scope was saved in or restored from a `ScopeSnapshot`, `NameInfo` shared with
+        the snapshot is copied before it's changed."""
         assert isinstance(name, str) or isinstance(name, unicode)
         assert isinstance(defnInfo, DefnInfo)
-        if name not in self.bindings:
-            self.bindings[name] = NameInfo(name)
-        self.bindings[name].addOverload(defnInfo)
+        nameInfo = self.bindings.get(name)
+        if nameInfo is None:
+            nameInfo = NameInfo(name)
+            self.bindings[name] = nameInfo
+        elif self.snapshot is not None and nameInfo is self.snapshot.bindings.get(name):
+            nameInfo = nameInfo.copy()
+            self.bindings[name] = nameInfo
+        nameInfo.addOverload(defnInfo)
 
     def iterBindings(self):
         """Returns a iterator, which returns (str, DefnInfo) pairs for each binding.
@@ -585,9 +794,13 @@ class Scope(ast.NodeVisitor):
         For overloaded symbols, there may be several functions in there. If the symbol is not
         found, a ScopeException is raised. Callers should call `use` if they actually use
         the symbol."""
+        if stats.enabled:
+            stats.count("scope.lookups")
         defnScope = self
         while defnScope is not None and not defnScope.isBound(name):
             defnScope = defnScope.parent
+            if stats.enabled:
+                stats.count("scope.lookupSteps")
         if defnScope is None:
             if mayBeAssignment and name.endswith("=") and name != "==":
                 return self.lookupFromSelf(name[:-1], loc, mayBeAssignment=False,
@@ -674,6 +887,8 @@ class Scope(ast.NodeVisitor):
 
     def isBound(self, name, irDefn=None):
         """Returns whether a symbol and definition is bound in this scope."""
+        if self.info.recorder is not None:
+            self.info.recorder.recordName(name)
         return (name in self.bindings and
                 (irDefn is None or
                  any(d.irDefn is irDefn for d in self.bindings[name].overloads)))
@@ -690,6 +905,8 @@ class Scope(ast.NodeVisitor):
 
     def getDefinition(self, name):
         """Returns NameInfo for a symbol defined in this scope or None."""
+        if self.info.recorder is not None:
+            self.info.recorder.recordName(name)
         return self.bindings.get(name)
 
     def isDefined(self, name):
@@ -848,6 +1065,30 @@ class Scope(ast.NodeVisitor):
             useScope.makeClosure()
             useScope.closureCaptureContext(defnScope.scopeId)
 
+    def captureValue(self, useInfo):
+        """Makes a named immutable variable defined in an outer function accessible in this
+        scope by copying its value into closures.
+
+        Each closure scope between the definition and this scope gets a field, which is
+        initialized with the value when the closure object is created. `useInfo` is changed
+        to refer to the field in the closure for this scope. The variable itself is not
+        changed, so no context is needed for it."""
+        useInfo.defnInfo = self.getCapturedValue(useInfo.defnInfo)
+
+    def getCapturedValue(self, defnInfo):
+        """Returns a `DefnInfo` that may be used to load a captured value in this scope."""
+        defnScope = self.info.getScope(defnInfo.scopeId)
+        scope = self.topLocalScope(defnScope)
+        if scope is defnScope:
+            return defnInfo
+        return scope.closureCaptureValue(defnInfo)
+
+    def closureCaptureValue(self, defnInfo):
+        """Ensures a closure class has a field containing a captured value.
+
+        Returns a `DefnInfo` that may be used to load the field."""
+        raise NotImplementedError()
+
     def requiresCapture(self):
         """Returns True if definitions in this scope must be captured to be available in other
         scopes, for example for function and class scopes. Returns False if those definitions
@@ -1076,6 +1317,8 @@ class FunctionScope(Scope):
         super(FunctionScope, self).__init__(
             prefix, astDefn, ScopeId(astDefn.id), parent, parent.info)
         self.info.setScope(self.getIrDefn().id, self)
+        self.capturedValues = {}
+        self.isLifted = False
 
     def configureAsMethod(self, astClassScopeId, irClassDefn):
         """Configures this scope as a method scope.
@@ -1238,7 +1481,72 @@ class FunctionScope(Scope):
         else:
             raise NotImplementedError()
 
+    def closureCaptureValue(self, defnInfo):
+        irDefn = defnInfo.irDefn
+        if irDefn in self.capturedValues:
+            return self.capturedValues[irDefn]
+
+        # Make sure the value is available in the scope where the closure is created.
+        sourceDefnInfo = self.parent.getCapturedValue(defnInfo)
+        if self.isLifted:
+            # Pass the value as a parameter when the function is called.
+            irParam = self.addCapturedParameter(irDefn.name, irDefn.type)
+            closureInfo = self.info.getClosureInfo(self.scopeId)
+            closureInfo.irCapturedValues[irParam] = sourceDefnInfo
+            capturedDefnInfo = DefnInfo(irParam, self.scopeId, False)
+            self.capturedValues[irDefn] = capturedDefnInfo
+            return capturedDefnInfo
+        self.makeClosure()
+
+        # Add a field to hold the value. The closure object itself is the context for
+        # the field.
+        closureInfo = self.info.getClosureInfo(self.scopeId)
+        irClosureClass = closureInfo.irClosureClass
+        irValueField = self.info.package.addField(irClosureClass, irDefn.name,
+                                                  astDefn=irDefn.astDefn,
+                                                  type=irDefn.type,
+                                                  flags=irDefn.flags)
+        irClosureClass.constructors[0].parameterTypes.append(irDefn.type)
+        closureInfo.irCapturedValues[irValueField] = sourceDefnInfo
+        closureInfo.irClosureContexts[irClosureClass.id] = self.getIrDefn().variables[0]
+        capturedDefnInfo = DefnInfo(irValueField, irClosureClass.id, False)
+        self.capturedValues[irDefn] = capturedDefnInfo
+        return capturedDefnInfo
+
+    def closureCaptureContext(self, scopeId):
+        if not self.isLifted:
+            super(FunctionScope, self).closureCaptureContext(scopeId)
+            return
+        assert scopeId is not self.scopeId
+        closureInfo = self.info.getClosureInfo(self.scopeId)
+        if scopeId not in closureInfo.irClosureContexts:
+            # Pass the context as a parameter when the function is called.
+            irContextClass = self.info.getContextInfo(scopeId).irContextClass
+            contextParamName = self.info.makeUniqueName(
+                self.getIrDefn().name.withSuffix(CONTEXT_SUFFIX))
+            irParam = self.addCapturedParameter(contextParamName, ClassType(irContextClass))
+            closureInfo.irClosureContexts[scopeId] = irParam
+
+    def addCapturedParameter(self, name, type):
+        """Adds a parameter to a lifted function for a captured value or context.
+
+        Captured parameters come after the function's other parameters. They're listed in
+        `ClosureInfo.irCapturedParameters` in order, so callers know what to pass.
+        """
+        irDefn = self.getIrDefn()
+        irParam = self.info.package.newVariable(name, type=type, kind=ir.PARAMETER,
+                                                flags=frozenset([LET]))
+        irDefn.variables.insert(len(irDefn.parameterTypes), irParam)
+        irDefn.parameterTypes.append(type)
+        self.info.getClosureInfo(self.scopeId).irCapturedParameters.append(irParam)
+        return irParam
+
     def makeClosure(self):
+        if self.isLifted:
+            # Lifted functions are called directly. Captured definitions are passed as
+            # parameters instead of being stored in a closure.
+            return
+
         # Check if the function is already a closure.
         assert not self.isLocal()
         closureInfo = self.info.getClosureInfo(self.scopeId)
@@ -1730,19 +2038,77 @@ class ExistentialTypeScope(Scope):
         return ExistentialTypeScope(prefix, ast, self, self.index)
 
 
+class ScopeSnapshot(object):
+    """Bindings saved from a scope whose definitions don't change between compilations.
+
+    Scopes for builtins and for definitions in other packages are created again for each
+    `CompileInfo`, and they always end up with the same bindings. The first time one of
+    these scopes is created, its bindings are saved in a snapshot. Later scopes for the
+    same definition copy the snapshot instead of binding everything again. Snapshots of
+    builtin scopes are kept for the life of the process. Snapshots of scopes in other
+    packages are kept by the package loader, along with the packages.
+
+    `NameInfo` and `DefnInfo` objects in a snapshot are shared by every scope restored
+    from it, so they must not be changed. `Scope.bind` copies a shared `NameInfo` before
+    adding an overload to it.
+
+    `ScopeId` objects are only equal to themselves, so a restored scope uses the same id
+    as the scope the snapshot was saved from. Otherwise, the saved `DefnInfo` objects
+    would refer to a scope that doesn't exist in the new `CompileInfo`.
+
+    Attributes:
+        scopeId (ScopeId): the id of the saved scope.
+        bindings (dict[str, NameInfo]): the scope's bindings.
+        defined (frozenset[str]): names defined in the scope.
+        lists (dict[str, tuple]): other lists the scope built along with its bindings,
+            keyed by attribute name.
+    """
+
+    def __init__(self, scope, listNames=()):
+        self.scopeId = scope.scopeId
+        self.bindings = dict(scope.bindings)
+        self.defined = frozenset(scope.defined)
+        self.lists = {name: tuple(getattr(scope, name)) for name in listNames}
+        scope.snapshot = self
+
+    def restore(self, scope):
+        """Copies the saved bindings into a new scope created with the same id."""
+        assert scope.scopeId is self.scopeId
+        scope.bindings = dict(self.bindings)
+        scope.defined = set(self.defined)
+        for name, values in self.lists.iteritems():
+            setattr(scope, name, list(values))
+        scope.snapshot = self
+
+
+# Snapshots of builtin scopes, keyed by the builtin class (or `BUILTIN_SCOPE_ID` for the
+# scope containing all builtins). Builtins are the same in every compilation.
+_builtinScopeSnapshots = {}
+
+
 class BuiltinGlobalScope(Scope):
     def __init__(self, parent):
         super(BuiltinGlobalScope, self).__init__(
             prefix=[], ast=None, scopeId=BUILTIN_SCOPE_ID, parent=parent, info=parent.info)
+        if BUILTIN_SCOPE_ID in _builtinScopeSnapshots:
+            snapshot, classDefnInfos = _builtinScopeSnapshots[BUILTIN_SCOPE_ID]
+            snapshot.restore(self)
+            for defnInfo in classDefnInfos:
+                BuiltinClassScope(defnInfo, self.info)
+            return
+
+        classDefnInfos = []
         def bind(name, irDefn):
             # TODO: bind source names instead of short name.
             defnInfo = DefnInfo(irDefn, self.scopeId, isVisible=True)
             if isinstance(irDefn, ir.Class):
                 # This scope will automatically be registered.
                 BuiltinClassScope(defnInfo, self.info)
+                classDefnInfos.append(defnInfo)
             self.bind(name.short(), defnInfo)
             self.define(name.short())
         registerBuiltins(bind)
+        _builtinScopeSnapshots[BUILTIN_SCOPE_ID] = (ScopeSnapshot(self), classDefnInfos)
 
     def isStatic(self):
         return True
@@ -1753,6 +2119,10 @@ class BuiltinGlobalScope(Scope):
 
 class NonLocalObjectTypeDefnScope(Scope):
     def __init__(self, scopeId, irDefn, info):
+        snapshots = self.getSnapshots(info)
+        snapshot = snapshots.get(irDefn)
+        if snapshot is not None:
+            scopeId = snapshot.scopeId
         super(NonLocalObjectTypeDefnScope, self).__init__(
             prefix=[], ast=None, scopeId=scopeId, parent=None, info=info)
         self.info.setScope(irDefn.id, self)
@@ -1760,10 +2130,22 @@ class NonLocalObjectTypeDefnScope(Scope):
         self.flatFields = []
         self.flatMethods = []
 
+        if snapshot is not None:
+            # Base scopes are still created, since inherited definitions refer to them.
+            for supertype in irDefn.supertypes:
+                NonLocalObjectTypeDefnScope.ensureForDefn(supertype.clas, self.info)
+            snapshot.restore(self)
+            return
+
         if isinstance(irDefn, ir.Class) and irDefn is not getNothingClass():
             self.bindConstructors()
             self.bindFields()
         self.bindMethods()
+        snapshots[irDefn] = ScopeSnapshot(self, ("flatFields", "flatMethods"))
+
+    def getSnapshots(self, info):
+        """Returns a dict where snapshots of this kind of scope are kept."""
+        raise NotImplementedError()
 
     @staticmethod
     def ensureForDefn(irDefn, info):
@@ -1849,6 +2231,9 @@ class BuiltinClassScope(NonLocalObjectTypeDefnScope):
         super(BuiltinClassScope, self).__init__(scopeId, irClass, info)
         self.defnInfo = classDefnInfo
 
+    def getSnapshots(self, info):
+        return _builtinScopeSnapshots
+
     def getDefnInfo(self):
         return self.defnInfo
 
@@ -1861,6 +2246,9 @@ class ForeignObjectTypeDefnScope(NonLocalObjectTypeDefnScope):
         scopeId = ScopeId("foreign-" + irDefn.name.short())
         super(ForeignObjectTypeDefnScope, self).__init__(scopeId, irDefn, info)
 
+    def getSnapshots(self, info):
+        return info.packageLoader.scopeSnapshots
+
     def isForeign(self):
         return True
 
@@ -1870,6 +2258,11 @@ class PackageScope(Scope):
         assert package is None or \
                isinstance(package, ir.Package) or \
                isinstance(package, ir.PackagePrefix)
+        snapshot = None
+        if isinstance(package, ir.Package):
+            snapshot = info.packageLoader.scopeSnapshots.get(package)
+            if snapshot is not None:
+                scopeId = snapshot.scopeId
         super(PackageScope, self).__init__([], None, scopeId, parent, info)
         self.packageNames = []
         self.prefix = prefix
@@ -1877,23 +2270,12 @@ class PackageScope(Scope):
         self.prefixScopes = {}
 
         if isinstance(package, ir.Package):
-            def isDefnVisible(defn):
-                return PUBLIC in defn.flags and defn.sourceName is not None
-            def isFunctionVisible(f):
-                return PUBLIC in f.flags and METHOD not in f.flags and f.sourceName is not None
-
             info.setScope(package.id, self)
-            exportedDefns = []
-            exportedDefns.extend(filter(isDefnVisible, package.globals))
-            exportedDefns.extend(filter(isFunctionVisible, package.functions))
-            exportedClasses = filter(isDefnVisible, package.classes)
-            exportedDefns.extend(exportedClasses)
-            exportedTraits = filter(isDefnVisible, package.traits)
-            exportedDefns.extend(exportedTraits)
-            for defn in exportedDefns:
-                defnInfo = DefnInfo(defn, scopeId, True)
-                self.bind(defn.sourceName, defnInfo)
-                self.define(defn.sourceName)
+            if snapshot is not None:
+                snapshot.restore(self)
+            else:
+                self.bindExportedDefns(package)
+                info.packageLoader.scopeSnapshots[package] = ScopeSnapshot(self)
 
         packageBindings = {}
         for name in packageNames:
@@ -1915,6 +2297,24 @@ class PackageScope(Scope):
             self.bind(component, defnInfo)
             self.define(component)
 
+    def bindExportedDefns(self, package):
+        def isDefnVisible(defn):
+            return PUBLIC in defn.flags and defn.sourceName is not None
+        def isFunctionVisible(f):
+            return PUBLIC in f.flags and METHOD not in f.flags and f.sourceName is not None
+
+        exportedDefns = []
+        exportedDefns.extend(filter(isDefnVisible, package.globals))
+        exportedDefns.extend(filter(isFunctionVisible, package.functions))
+        exportedClasses = filter(isDefnVisible, package.classes)
+        exportedDefns.extend(exportedClasses)
+        exportedTraits = filter(isDefnVisible, package.traits)
+        exportedDefns.extend(exportedTraits)
+        for defn in exportedDefns:
+            defnInfo = DefnInfo(defn, self.scopeId, True)
+            self.bind(defn.sourceName, defnInfo)
+            self.define(defn.sourceName)
+
     def isForeign(self):
         return self.package is not None
 
@@ -4,11 +4,13 @@
 # the GPL license that can be found in the LICENSE.txt file.
 
 
+import mmap
 import struct
 import sys
 import os
 
 import builtins
+import bytecode
 from flags import (
     ABSTRACT,
     CONSTRUCTOR,
@@ -26,58 +28,171 @@ import ir
 import ir_instructions
 import ir_types
 from name import Name
+from package_index import DEFN_KINDS, ExportIndex, getDefnLists, hashPackageData
 import utils
 
 
 def serialize(package, fileName):
+    """Writes a package to a file, or to stdout if `fileName` is "-".
+
+    The whole package is encoded in memory first and written at once. The file is replaced
+    atomically, so if serialization fails, no partially written package is left behind.
+    """
+    data = Serializer(package).serialize()
     if fileName == "-":
-        outFile = sys.stdout
-        shouldClose = False
+        sys.stdout.write(data)
     else:
-        outFile = open(fileName, "wb")
-        shouldClose = True
+        utils.writeFileAtomically(fileName, data)
+
+
+def encodeFunctionBody(package, function):
+    """Encodes the body of a compiled function, the same way `serialize` would.
+
+    This is used to encode functions as soon as they're compiled, so their instructions
+    don't need to be kept until the whole package is written. The encoding refers to
+    strings, names, and definitions by their indices in `package`. Those don't change
+    when more are added, so the body can be encoded before the rest of the package is
+    finished.
+
+    Args:
+        package (Package): the package containing `function`.
+        function (Function): a function with `blocks` and `instTypes`.
+
+    Returns:
+        (str): the encoded instruction types, locals size, instructions, and block offset
+        table. If this is stored in the function's `encodedBody` attribute, `serialize`
+        writes it instead of encoding the function's blocks.
+    """
+    serializer = Serializer(package)
+    serializer.writeFunctionBody(function)
+    return str(serializer.buf)
+
+
+def deserialize(fileName, packageLoader, lazy=False, useIndex=False):
+    data, index = openPackage(fileName, useIndex)
+    return deserializeData(data, packageLoader, lazy, index)
+
+
+def openPackage(fileName, useIndex=False):
+    """Maps a package file into memory and loads its export index, if requested.
+
+    This doesn't decode anything, and it doesn't depend on other packages, so it may be
+    called on several files concurrently.
+
+    Returns:
+        (mmap|str, ExportIndex?): the contents of the file, and the index if `useIndex` is
+        true and there is a valid index.
+    """
+    with open(fileName, "rb") as inFile:
+        data = mapFile(inFile)
+    index = ExportIndex.load(fileName, data) if useIndex else None
+    return data, index
+
+
+def deserializeData(data, packageLoader, lazy=False, index=None):
+    """Deserializes a package from the contents of a file returned by `openPackage`."""
     try:
-        serializer = Serializer(package, outFile)
-        serializer.serialize()
-    except:
-        if fileName != "-":
-            os.remove(fileName)
-        raise
-    finally:
-        if shouldClose:
-            outFile.close()
-
-
-def deserialize(fileName, packageLoader):
+        deserializer = Deserializer(data, packageLoader, lazy, index)
+        deserializer.deserialize()
+        return deserializer.package
+    except (ValueError, IndexError, struct.error) as exn:
+        raise IOError(exn)
+
+
+def readDependencyNames(data):
+    """Returns the names of the packages a package depends on, without loading them.
+
+    Args:
+        data (mmap|str): the contents of a package file.
+
+    Returns:
+        (list[Name]): the names of the dependencies, in the order they're loaded.
+    """
+    try:
+        deserializer = Deserializer(data, None)
+        return deserializer.deserializeDependencyNames()
+    except (ValueError, IndexError, struct.error) as exn:
+        raise IOError(exn)
+
+
+def deserializeNameAndVersion(fileName):
+    try:
+        with open(fileName, "rb") as inFile:
+            deserializer = Deserializer(mapFile(inFile), None)
+            return deserializer.deserializeNameAndVersion()
+    except (ValueError, IndexError, struct.error) as exn:
+        raise IOError(exn)
+
+
+def writeExportIndex(fileName, packageLoader):
+    """Writes an `ExportIndex` next to a package file.
+
+    The index describes the package as it looks when loaded as a dependency, so the package
+    is loaded (lazily) from the file to build it. Dependencies are loaded with
+    `packageLoader`.
+    """
     try:
         with open(fileName, "rb") as inFile:
-            deserializer = Deserializer(inFile, packageLoader)
+            data = mapFile(inFile)
+            deserializer = Deserializer(data, packageLoader, lazy=True)
             deserializer.deserialize()
-            return deserializer.package
-    except (ValueError, IndexError) as exn:
+            index = ExportIndex.build(deserializer.package, hashPackageData(data))
+    except (ValueError, IndexError, struct.error) as exn:
         raise IOError(exn)
+    index.write(fileName)
 
 
-def deserializeNameAndVersion(fileName):
-    with open(fileName, "rb") as inFile:
-        deserializer = Deserializer(inFile, None)
-        return deserializer.deserializeNameAndVersion()
+def mapFile(inFile):
+    """Maps the contents of an open file into memory, read-only.
+
+    The mapping stays valid after the file is closed. It's released when the last reference
+    to it (including any `buffer` views) goes away. Empty files can't be mapped, so an empty
+    string is returned for those.
+    """
+    if os.fstat(inFile.fileno()).st_size == 0:
+        return ""
+    return mmap.mmap(inFile.fileno(), 0, access=mmap.ACCESS_READ)
 
 
 HEADER_FORMAT = "<Ihhqiiiiiiiii"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
 MAGIC = 0x676b7073
 MAJOR_VERSION = 0
 MINOR_VERSION = 23
 
 FLAG_FORMAT = "<i"
+FLAG_SIZE = struct.calcsize(FLAG_FORMAT)
+
+# Attributes which are missing from lazily loaded definitions until they are loaded.
+LAZY_GLOBAL_ATTRS = frozenset(["type"])
+LAZY_FUNCTION_BODY_ATTRS = frozenset(["instTypes", "blocks"])
+LAZY_FUNCTION_ATTRS = frozenset(["typeParameters", "returnType", "parameterTypes",
+                                 "definingClass", "overrides", "overriddenBy"]) | \
+                      LAZY_FUNCTION_BODY_ATTRS
+LAZY_CLASS_ATTRS = frozenset(["typeParameters", "supertypes", "fields", "constructors",
+                              "methods", "elementType"])
+LAZY_TRAIT_ATTRS = frozenset(["typeParameters", "supertypes", "methods"])
+
+CALL_INST_NAMES = frozenset(["callg", "callgf", "callv", "callvf"])
+
+# Number of definition counts after the name in each dependency header.
+DEPENDENCY_COUNT_FIELDS = 5
 
 
 class Serializer(object):
-    def __init__(self, package, outFile):
+    """Encodes a package into an in-memory buffer.
+
+    Attributes:
+        package (Package): the package being serialized.
+        buf (bytearray): the encoded package. Each `write` method appends to this.
+    """
+
+    def __init__(self, package):
         self.package = package
-        self.outFile = outFile
+        self.buf = bytearray()
 
     def serialize(self):
+        """Encodes the package and returns the buffer containing it."""
         self.writeHeader()
         for d in self.package.dependencies:
             self.writeDependencyHeader(d)
@@ -95,6 +210,7 @@ class Serializer(object):
             self.writeClass(c)
         for t in self.package.traits:
             self.writeTrait(t)
+        return self.buf
 
     def writeHeader(self):
         entryFunctionIndex = self.package.entryFunction.index \
@@ -103,33 +219,28 @@ class Serializer(object):
         initFunctionIndex = self.package.initFunction.index \
                             if self.package.initFunction is not None \
                             else -1
-        self.outFile.write(struct.pack(HEADER_FORMAT,
-                                       MAGIC,
-                                       MAJOR_VERSION,
-                                       MINOR_VERSION,
-                                       0,
-                                       len(self.package.strings),
-                                       len(self.package.names),
-                                       len(self.package.globals),
-                                       len(self.package.functions),
-                                       len(self.package.classes),
-                                       len(self.package.traits),
-                                       len(self.package.dependencies),
-                                       entryFunctionIndex,
-                                       initFunctionIndex))
+        self.buf += struct.pack(HEADER_FORMAT,
+                                MAGIC,
+                                MAJOR_VERSION,
+                                MINOR_VERSION,
+                                0,
+                                len(self.package.strings),
+                                len(self.package.names),
+                                len(self.package.globals),
+                                len(self.package.functions),
+                                len(self.package.classes),
+                                len(self.package.traits),
+                                len(self.package.dependencies),
+                                entryFunctionIndex,
+                                initFunctionIndex)
         self.writeString(str(self.package.name))
         self.writeString(str(self.package.version))
 
-    def rewrite(self, format, value, offset, whence=os.SEEK_SET):
-        self.outFile.seek(offset, whence)
-        self.outFile.write(struct.pack("<" + format, value))
-        self.outFile.seek(0, os.SEEK_END)
-
     def writeString(self, s):
         encoded = s.encode("utf-8")
         length = len(encoded)
         self.writeVbn(length)
-        self.outFile.write(encoded)
+        self.buf += encoded
 
     def writeStringIndex(self, s):
         index = self.package.findString(s)
@@ -155,19 +266,23 @@ class Serializer(object):
         if function.overrides is not None:
             self.writeList(self.writeMethodId, function.overrides)
         assert (function.instTypes is None) == (function.blocks is None)
-        if function.instTypes is not None:
-            self.writeList(self.writeType, function.instTypes)
-
-        assert function.blocks is not None or \
+        assert function.encodedBody is None or function.blocks is None
+        assert function.blocks is not None or function.encodedBody is not None or \
                0 < len(frozenset([ABSTRACT, EXTERN, NATIVE]) & function.flags)
 
-        if function.blocks is not None:
-            localsSize = 8 * len(filter(lambda v: v.kind is ir.LOCAL, function.variables))
-            self.writeVbn(localsSize)
-            instructions, blockOffsetTable = self.encodeInstructions(function)
-            self.writeVbn(len(instructions))
-            self.outFile.write(instructions)
-            self.writeList(self.writeVbn, blockOffsetTable)
+        if function.encodedBody is not None:
+            self.buf += function.encodedBody
+        elif function.blocks is not None:
+            self.writeFunctionBody(function)
+
+    def writeFunctionBody(self, function):
+        self.writeList(self.writeType, function.instTypes)
+        localsSize = 8 * len(filter(lambda v: v.kind is ir.LOCAL, function.variables))
+        self.writeVbn(localsSize)
+        instructions, blockOffsetTable = self.encodeInstructions(function)
+        self.writeVbn(len(instructions))
+        self.buf += instructions
+        self.writeVbnList(blockOffsetTable)
 
     def encodeInstructions(self, function):
         buf = bytearray()
@@ -180,15 +295,13 @@ class Serializer(object):
                 buf.append(inst.opcode())
                 if isinstance(inst, ir_instructions.branchl):
                     self.encodeVbn(inst.operandCount(), buf)
-                    for i in xrange(inst.operandCount()):
-                        self.encodeVbn(inst.op(i), buf)
+                    self.encodeVbns(inst.operands, buf)
                 elif isinstance(inst, ir_instructions.f32):
                     self.encodeFloat(32, inst.op(0), buf)
                 elif isinstance(inst, ir_instructions.f64):
                     self.encodeFloat(64, inst.op(0), buf)
                 else:
-                    for i in xrange(inst.operandCount()):
-                        self.encodeVbn(inst.op(i), buf)
+                    self.encodeVbns(inst.operands, buf)
         return buf, blockOffsetTable
 
     def writeClass(self, clas):
@@ -254,23 +367,8 @@ class Serializer(object):
         # TODO: serialize this in a way that doesn't couple us so closely to Type::Form
         packageIndex = None
         defnIndex = None
-        if type is ir_types.UnitType:
-            form = 0
-        elif type is ir_types.BooleanType:
-            form = 1
-        elif type is ir_types.I8Type:
-            form = 2
-        elif type is ir_types.I16Type:
-            form = 3
-        elif type is ir_types.I32Type:
-            form = 4
-        elif type is ir_types.I64Type:
-            form = 5
-        elif type is ir_types.F32Type:
-            form = 6
-        elif type is ir_types.F64Type:
-            form = 7
-        elif isinstance(type, ir_types.ClassType):
+        # Class types are by far the most common, so they're checked first.
+        if isinstance(type, ir_types.ClassType):
             clas = type.clas
             packageIndex = clas.id.getPackageIndex()
             defnIndex = clas.id.getDefnIndex()
@@ -283,13 +381,29 @@ class Serializer(object):
             form = 10
             assert type.typeParameter.index is not None
             defnIndex = type.typeParameter.index
-        else:
-            assert isinstance(type, ir_types.ExistentialType)
+        elif isinstance(type, ir_types.ExistentialType):
             form = 11
             self.writeVbn(form)
             self.writeList(self.writeTypeParameter, type.variables)
             self.writeType(type.ty)
             return
+        elif type is ir_types.UnitType:
+            form = 0
+        elif type is ir_types.BooleanType:
+            form = 1
+        elif type is ir_types.I8Type:
+            form = 2
+        elif type is ir_types.I16Type:
+            form = 3
+        elif type is ir_types.I32Type:
+            form = 4
+        elif type is ir_types.I64Type:
+            form = 5
+        elif type is ir_types.F32Type:
+            form = 6
+        else:
+            assert type is ir_types.F64Type
+            form = 7
         flags = 0
         if ir_types.NULLABLE_TYPE_FLAG in type.flags:
             flags = flags | 1
@@ -303,10 +417,7 @@ class Serializer(object):
             self.writeList(self.writeType, type.typeArguments)
 
     def writeName(self, name):
-        def writeComponent(comp):
-            index = self.package.findString(comp)
-            self.writeVbn(index)
-        self.writeList(writeComponent, name.components)
+        self.writeVbnList(map(self.package.findString, name.components))
 
     def writeNameIndex(self, name):
         index = self.package.findName(name)
@@ -314,16 +425,13 @@ class Serializer(object):
 
     def writeFlags(self, flags_var):
         bits = flagSetToFlagBits(flags_var)
-        self.outFile.write(struct.pack(FLAG_FORMAT, bits))
+        self.buf += struct.pack(FLAG_FORMAT, bits)
 
     def writeTypeParameterList(self, list):
         assert all(not p.isBuiltin() for p in list)
         assert all(p.isForeign() for p in list) or all(not p.isForeign() for p in list)
-        def writeId(typeParam):
-            self.writeVbn(typeParam.id.externIndex
-                          if EXTERN in typeParam.flags \
-                          else typeParam.id.index)
-        self.writeList(writeId, list)
+        self.writeVbnList([p.id.externIndex if EXTERN in p.flags else p.id.index
+                           for p in list])
 
     def writeMethodList(self, list):
         self.writeList(self.writeMethodId, list)
@@ -336,7 +444,7 @@ class Serializer(object):
         self.writeVbn(index)
 
     def writeForeignMethodList(self, list):
-        self.writeList(self.writeVbn, [m.id.index for m in list])
+        self.writeVbnList([m.id.index for m in list])
 
     def writeDefiningClassId(self, classOrTrait):
         if classOrTrait is None:
@@ -362,9 +470,24 @@ class Serializer(object):
             writer(opt)
 
     def writeVbn(self, value):
-        buf = bytearray()
-        self.encodeVbn(value, buf)
-        self.outFile.write(buf)
+        if -0x40 <= value < 0x40:
+            # Most numbers (lengths, indices) fit in a single byte.
+            self.buf.append(value & 0x7F)
+        else:
+            self.encodeVbn(value, self.buf)
+
+    def writeVbnList(self, values):
+        """Writes a list of numbers. Equivalent to `writeList(self.writeVbn, values)`."""
+        self.writeVbn(len(values))
+        self.encodeVbns(values, self.buf)
+
+    def encodeVbns(self, values, buf):
+        encodeVbn = self.encodeVbn
+        for value in values:
+            if -0x40 <= value < 0x40:
+                buf.append(value & 0x7F)
+            else:
+                encodeVbn(value, buf)
 
     def encodeVbn(self, value, buf):
         sign = 1 if value < 0 else 0
@@ -391,19 +514,61 @@ class Serializer(object):
 
 
 class Deserializer(object):
-    def __init__(self, inFile, packageLoader):
-        self.inFile = inFile
+    """Reads a package from a buffer containing a serialized package.
+
+    The whole package is read out of a single buffer with an integer cursor, rather than
+    through a file object. Usually the buffer is a read-only `mmap` of a package file (see
+    `mapFile`), so nothing is copied until definitions are built. Strings are decoded
+    directly from slices of the buffer, and instruction blobs are passed to
+    `decodeInstructions` as `buffer` views without copying.
+
+    In lazy mode, only the name, source name, and flags of each global, function, class,
+    and trait in the package are read up front. This is enough to build scopes and export
+    tables. The rest of each definition is skipped, and its offset is recorded in a
+    `LazyLoader`, which reads the definition the first time one of its missing attributes
+    is accessed (see `IrTopDefn.__getattr__`). Function bodies are deferred separately, so
+    they aren't read unless `instTypes` or `blocks` are accessed. Definitions in dependency
+    sections are small and needed for linking, so they are always read eagerly.
+
+    If an `ExportIndex` is provided, the package's export table is built from it, so
+    linking against the package doesn't require loading its public functions. In lazy mode,
+    definitions aren't scanned at all; their names, flags, and offsets come from the index.
+
+    Attributes:
+        data (str|mmap|buffer): the serialized package. Indexing must produce single
+            character strings, as it does for `str`, `mmap`, and `buffer`.
+        offset (int): the position of the next byte to read in `data`.
+        lazy (bool): whether definitions are read when they're first used instead of when
+            the package is loaded.
+        index (ExportIndex?): an index which matches `data`.
+    """
+
+    def __init__(self, data, packageLoader, lazy=False, index=None):
+        self.data = data
+        self.offset = 0
+        self.lazy = lazy
+        self.index = index
         self.packageLoader = packageLoader
         self.package = ir.Package()
         self.isLinked = False
         self.entryFunctionIndex = None
         self.initFunctionIndex = None
         self.typeParameters = []
+        self.unresolvedCalls = []
 
     def deserializeNameAndVersion(self):
         self.readHeader()
         return self.package.name, self.package.version
 
+    def deserializeDependencyNames(self):
+        self.readHeader()
+        names = []
+        for _ in xrange(len(self.package.dependencies)):
+            names.append(ir.PackageDependency.fromString(self.readString()).name)
+            for _ in xrange(DEPENDENCY_COUNT_FIELDS):
+                self.readVbn()
+        return names
+
     def deserialize(self):
         self.readHeader()
         for i in xrange(len(self.package.dependencies)):
@@ -416,19 +581,46 @@ class Deserializer(object):
             self.readDependency(dep)
         self.package.link()
         self.isLinked = True
-        for gbl in self.package.globals:
-            self.readGlobal(gbl)
-        for func in self.package.functions:
-            self.readFunction(func)
-        for clas in self.package.classes:
-            self.readClass(clas)
-        for trait in self.package.traits:
-            self.readTrait(trait)
+        if self.index is not None:
+            if any(len(self.index.definitions[kind]) != len(defns)
+                   for kind, defns in zip(DEFN_KINDS, getDefnLists(self.package))):
+                raise IOError("export index does not match package")
+            self.package.exports = self.index.buildExports(self.package)
+        if self.lazy and self.index is not None:
+            self.readIndexedDefns(self.package.globals, ids.DefnId.GLOBAL,
+                                  self.readGlobal, LAZY_GLOBAL_ATTRS)
+            self.readIndexedDefns(self.package.functions, ids.DefnId.FUNCTION,
+                                  self.readFunction, LAZY_FUNCTION_ATTRS)
+            self.readIndexedDefns(self.package.classes, ids.DefnId.CLASS,
+                                  self.readClass, LAZY_CLASS_ATTRS)
+            self.readIndexedDefns(self.package.traits, ids.DefnId.TRAIT,
+                                  self.readTrait, LAZY_TRAIT_ATTRS)
+        elif self.lazy:
+            for gbl in self.package.globals:
+                self.readLazyDefn(gbl, self.readGlobal, self.skipGlobal, LAZY_GLOBAL_ATTRS)
+            for func in self.package.functions:
+                self.readLazyDefn(func, self.readFunction, self.skipFunction,
+                                  LAZY_FUNCTION_ATTRS)
+            for clas in self.package.classes:
+                self.readLazyDefn(clas, self.readClass, self.skipClass, LAZY_CLASS_ATTRS)
+            for trait in self.package.traits:
+                self.readLazyDefn(trait, self.readTrait, self.skipTrait, LAZY_TRAIT_ATTRS)
+        else:
+            for gbl in self.package.globals:
+                self.readGlobal(gbl)
+            for func in self.package.functions:
+                self.readFunction(func)
+            for clas in self.package.classes:
+                self.readClass(clas)
+            for trait in self.package.traits:
+                self.readTrait(trait)
+        for inst, callee in self.unresolvedCalls:
+            inst.popCount_ = len(callee.parameterTypes)
+        del self.unresolvedCalls[:]
 
     def readHeader(self):
-        headerSize = struct.calcsize(HEADER_FORMAT)
-        headerBytes = self.inFile.read(headerSize)
-        headers = struct.unpack(HEADER_FORMAT, headerBytes)
+        headers = struct.unpack_from(HEADER_FORMAT, self.data, self.offset)
+        self.offset += HEADER_SIZE
         magic, major, minor = headers[0:3]
         if magic != MAGIC or major != MAJOR_VERSION or minor != MINOR_VERSION:
             raise IOError("package headers don't look valid")
@@ -497,8 +689,9 @@ class Deserializer(object):
 
     def readString(self):
         length = self.readVbn()
-        encoded = self.inFile.read(length)
-        return encoded.decode("utf-8")
+        start = self.offset
+        self.skip(length)
+        return self.data[start:self.offset].decode("utf-8")
 
     def readStringIndex(self):
         index = self.readVbn()
@@ -524,21 +717,116 @@ class Deserializer(object):
             if OVERRIDE in function.flags:
                 function.overrides = self.readList(self.readMethodId)
             if frozenset([ABSTRACT, NATIVE]).isdisjoint(function.flags):
-                function.instTypes = self.readList(self.readType)
-                localsSize = self.readVbn()
-                instructionsSize = self.readVbn()
-                instructionsBuffer = self.inFile.read(instructionsSize)
-                blockOffsets = self.readList(self.readVbn)
-                function.blocks = self.decodeInstructions(instructionsBuffer, blockOffsets)
+                if self.lazy:
+                    self.deferRead(function, self.offset, self.readFunctionBody,
+                                   LAZY_FUNCTION_BODY_ATTRS)
+                    self.skipFunctionBody()
+                else:
+                    self.readFunctionBody(function)
         if METHOD in function.flags and \
            CONSTRUCTOR not in function.flags and \
            STATIC not in function.flags:
             function.overriddenBy = {}
         del self.typeParameters[:]
 
+    def readFunctionBody(self, function):
+        function.instTypes = self.readList(self.readType)
+        localsSize = self.readVbn()
+        instructionsSize = self.readVbn()
+        instructionsBuffer = buffer(self.data, self.offset, instructionsSize)
+        self.skip(instructionsSize)
+        blockOffsets = self.readList(self.readVbn)
+        function.blocks = self.decodeInstructions(instructionsBuffer, blockOffsets)
+
     def decodeInstructions(self, instructionsBuffer, blockOffsets):
-        # TODO: implement if we ever actually need this.
-        return None
+        """Decodes a function's bytecode into a list of basic blocks.
+
+        This is the inverse of `Serializer.encodeInstructions`. Most operands are VBNs;
+        `branchl` has a VBN count followed by that many VBNs, and `f32` and `f64` have
+        little-endian floating point immediates. Call instructions get their pop counts
+        from the functions they call. If a callee hasn't been read yet, its pop count is
+        filled in at the end of `deserialize`.
+
+        Args:
+            instructionsBuffer (str|buffer): the function's instructions.
+            blockOffsets (list[int]): the offset of the first instruction in each block.
+
+        Returns:
+            (list[BasicBlock]): the decoded blocks.
+        """
+        if any(not (0 <= offset <= len(instructionsBuffer)) for offset in blockOffsets) or \
+           any(a >= b for a, b in zip(blockOffsets, blockOffsets[1:])):
+            raise IOError("invalid block offsets")
+        # Operands are read with `readVbn`, so the instructions temporarily replace the
+        # package data. Callees are looked up afterward, since that may load them lazily
+        # from the package data.
+        savedData, savedOffset = self.data, self.offset
+        self.data = instructionsBuffer
+        blocks = []
+        calls = []
+        try:
+            ends = blockOffsets[1:] + [len(instructionsBuffer)]
+            for id, (start, end) in enumerate(zip(blockOffsets, ends)):
+                self.offset = start
+                instructions = []
+                while self.offset < end:
+                    inst = self.decodeInstruction()
+                    if inst.info.name in CALL_INST_NAMES:
+                        calls.append(inst)
+                    instructions.append(inst)
+                if self.offset != end:
+                    raise IOError("instruction crosses block boundary")
+                blocks.append(ir_instructions.BasicBlock(id, instructions))
+        finally:
+            self.data, self.offset = savedData, savedOffset
+
+        for inst in calls:
+            callee = self.getCallee(inst)
+            if callee.parameterTypes is None:
+                self.unresolvedCalls.append((inst, callee))
+            else:
+                inst.popCount_ = len(callee.parameterTypes)
+        return blocks
+
+    def decodeInstruction(self):
+        opcode = ord(self.data[self.offset])
+        self.offset += 1
+        if opcode >= len(bytecode.instInfoByCode):
+            raise IOError("invalid opcode: %d" % opcode)
+        info = bytecode.instInfoByCode[opcode]
+        if info.name == "branchl":
+            count = self.readVbn()
+            operands = tuple(self.readVbn() for _ in xrange(count))
+        elif info.name in ("f32", "f64"):
+            format = "<f" if info.name == "f32" else "<d"
+            operands = struct.unpack_from(format, self.data, self.offset)
+            self.skip(struct.calcsize(format))
+        else:
+            operands = tuple(self.readVbn() for _ in xrange(info.operandCount))
+
+        # Instructions are normally constructed from the definitions they refer to, so we
+        # bypass their constructors here and set operands directly.
+        cls = getattr(ir_instructions, info.name)
+        inst = cls.__new__(cls)
+        inst.operands = operands
+        return inst
+
+    def getCallee(self, inst):
+        if isinstance(inst, (ir_instructions.callgf, ir_instructions.callvf)):
+            depIndex, externIndex = inst.operands
+            if not (0 <= depIndex < len(self.package.dependencies)):
+                raise IOError("invalid dependency index")
+            return self.getIndexed(self.package.dependencies[depIndex].externFunctions,
+                                 externIndex)
+        index = inst.op(0)
+        if index < 0:
+            return builtins.getBuiltinFunctionById(index)
+        return self.getIndexed(self.package.functions, index)
+
+    def getIndexed(self, collection, index):
+        if index < 0 or index >= len(collection):
+            raise IOError("invalid index")
+        return collection[index]
 
     def readClass(self, clas, dep=None):
         assert len(self.typeParameters) == 0
@@ -595,6 +883,7 @@ class Deserializer(object):
         return p
 
     def readDependencyHeader(self, index):
+        # Keep deserializeDependencyNames in sync with this.
         depStr = self.readString()
         dep = ir.PackageDependency.fromString(depStr)
         # TODO: pass in version when that's supported
@@ -726,8 +1015,8 @@ class Deserializer(object):
             raise IOError("invalid defining class id")
 
     def readFlags(self):
-        size = struct.calcsize(FLAG_FORMAT)
-        bits = struct.unpack(FLAG_FORMAT, self.inFile.read(size))[0]
+        bits = struct.unpack_from(FLAG_FORMAT, self.data, self.offset)[0]
+        self.offset += FLAG_SIZE
         flagSet = flagBitsToFlagSet(bits)
         return flagSet
 
@@ -770,22 +1059,204 @@ class Deserializer(object):
             raise IOError("invalid index")
         return collection[index]
 
+    def readLazyDefn(self, defn, reader, skipper, attrNames):
+        """Reads the name, source name, and flags of a definition and defers the rest.
+
+        Args:
+            defn (IrTopDefn): the empty definition to read into.
+            reader (function(IrTopDefn)): reads the whole definition. Called later by the
+                definition's `LazyLoader`.
+            skipper (function(IrTopDefn)): skips the rest of the definition after its flags.
+            attrNames (frozenset[str]): attributes set by `reader` which aren't read now.
+        """
+        offset = self.offset
+        defn.name = self.readNameIndex()
+        defn.sourceName = self.readOption(self.readStringIndex)
+        defn.flags = self.readFlags()
+        skipper(defn)
+        self.deferRead(defn, offset, reader, attrNames)
+
+    def readIndexedDefns(self, defns, kind, reader, attrNames):
+        """Sets the name, source name, and flags of each definition from the index and
+        defers the rest, like `readLazyDefn`. The package data is not read at all."""
+        for defn, entry in zip(defns, self.index.definitions[kind]):
+            offset, nameIndex, sourceNameIndex, flagBits = entry
+            defn.name = self.package.names[nameIndex]
+            defn.sourceName = self.package.strings[sourceNameIndex] \
+                              if sourceNameIndex != -1 \
+                              else None
+            defn.flags = flagBitsToFlagSet(flagBits)
+            self.deferRead(defn, offset, reader, attrNames)
+
+    def deferRead(self, defn, offset, reader, attrNames):
+        """Defers reading some attributes of a definition, starting at `offset`.
+
+        Type parameters in scope are saved, since types read later may refer to them.
+        """
+        for name in attrNames:
+            defn.__dict__.pop(name, None)
+        defn.lazyLoader = LazyLoader(self, offset, reader, attrNames,
+                                     list(self.typeParameters))
+
+    def skipGlobal(self, globl):
+        self.skipType()
+
+    def skipFunction(self, function):
+        self.skipList(self.skipTypeParameter)
+        self.skipType()
+        self.skipList(self.skipType)
+        if self.readVbn() != 0:
+            self.skipVbn()
+        if OVERRIDE in function.flags:
+            self.skipList(self.skipMethodId)
+        if frozenset([ABSTRACT, NATIVE]).isdisjoint(function.flags):
+            self.skipFunctionBody()
+
+    def skipFunctionBody(self):
+        self.skipList(self.skipType)
+        self.skipVbn()
+        self.skip(self.readVbn())
+        self.skipList(self.skipVbn)
+
+    def skipClass(self, clas):
+        self.skipList(self.skipTypeParameter)
+        self.skipList(self.skipType)
+        self.skipList(self.skipField)
+        self.skipList(self.skipMethodId)
+        self.skipList(self.skipMethodId)
+        self.skipOption(self.skipType)
+
+    def skipTrait(self, trait):
+        self.skipList(self.skipTypeParameter)
+        self.skipList(self.skipType)
+        self.skipList(self.skipMethodId)
+
+    def skipField(self):
+        self.skipVbn()
+        self.skipOption(self.skipVbn)
+        self.skip(FLAG_SIZE)
+        self.skipType()
+
+    def skipTypeParameter(self):
+        self.skipVbn()
+        self.skipOption(self.skipVbn)
+        self.skip(FLAG_SIZE)
+        self.skipType()
+        self.skipType()
+
+    def skipType(self):
+        form = self.readVbn() & 0xF
+        if form == 8 or form == 9:
+            # CLASS_TYPE or TRAIT_TYPE
+            self.skipVbn()
+            self.skipVbn()
+            self.skipList(self.skipType)
+        elif form == 10:
+            # VARIABLE_TYPE
+            self.skipVbn()
+        elif form == 11:
+            # EXISTENTIAL_TYPE
+            self.skipList(self.skipTypeParameter)
+            self.skipType()
+
+    def skipMethodId(self):
+        # Method ids outside of dependency sections always have a package index.
+        self.skipVbn()
+        self.skipVbn()
+
+    def skipList(self, skipper):
+        for i in xrange(self.readVbn()):
+            skipper()
+
+    def skipOption(self, skipper):
+        if self.readVbn() != 0:
+            skipper()
+
+    def skipVbn(self):
+        data = self.data
+        offset = self.offset
+        for i in xrange(9):
+            b = ord(data[offset])
+            offset += 1
+            if b < 0x80:
+                break
+        else:
+            offset += 1
+        self.offset = offset
+
     def readVbn(self):
-        n = 0
-        shift = 0
+        data = self.data
+        offset = self.offset
+        b = ord(data[offset])
+        offset += 1
+        if b < 0x80:
+            # Most numbers (lengths, indices) fit in a single byte.
+            self.offset = offset
+            return b - 0x80 if b >= 0x40 else b
+
+        n = b & 0x7F
+        shift = 7
         more = True
         while shift < 63 and more:
-            b = ord(self.inFile.read(1))
+            b = ord(data[offset])
+            offset += 1
             more = (b & 0x80) != 0
             n |= (b & 0x7F) << shift
             shift += 7
         if more:
-            b = ord(self.inFile.read(1))
+            b = ord(data[offset])
+            offset += 1
             if (b & 1) > 1:
                 raise IOError("VBN overflow")
             n |= b << shift
             shift += 1
+        self.offset = offset
         negate = (n & (1 << (shift - 1))) != 0
         if negate:
             n = -(1 << shift) + n
         return n
+
+    def skip(self, n):
+        """Advances past `n` bytes, checking that they are within the buffer."""
+        end = self.offset + n
+        if n < 0 or end > len(self.data):
+            raise IOError("read off the end of the package")
+        self.offset = end
+
+
+class LazyLoader(object):
+    """Reads part of a lazily loaded definition when it's needed.
+
+    Attributes:
+        deserializer (Deserializer): the deserializer that skipped the definition.
+        offset (int): the offset in the deserializer's buffer to read from.
+        reader (function(IrTopDefn)): the `Deserializer` method that reads the definition.
+        attrNames (frozenset[str]): names of attributes set by `reader`. Accessing one of
+            these triggers the read.
+        typeParameters (list[TypeParameter]): type parameters in scope at `offset`.
+    """
+
+    def __init__(self, deserializer, offset, reader, attrNames, typeParameters):
+        self.deserializer = deserializer
+        self.offset = offset
+        self.reader = reader
+        self.attrNames = attrNames
+        self.typeParameters = typeParameters
+
+    def load(self, defn):
+        # Loading may be triggered while the deserializer is reading something else, so we
+        # save and restore its state.
+        des = self.deserializer
+        savedOffset = des.offset
+        savedTypeParameters = des.typeParameters
+        des.offset = self.offset
+        des.typeParameters = list(self.typeParameters)
+        for name in self.attrNames:
+            setattr(defn, name, None)
+        try:
+            self.reader(defn)
+        except (ValueError, IndexError, struct.error) as exn:
+            raise IOError(exn)
+        finally:
+            des.offset = savedOffset
+            des.typeParameters = savedTypeParameters
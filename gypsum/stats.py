@@ -0,0 +1,72 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+# Counters for operations inside the compiler, used to find out which operations dominate
+# compile time and to catch inputs that make them blow up.
+#
+# Counters are only recorded when `enabled` is true (the --stats option). Passes check
+# `enabled` before calling anything here, so disabled counters cost one attribute lookup:
+#
+#     if stats.enabled:
+#         stats.count("scope.lookupSteps")
+#
+# Counter names are dotted, starting with the part of the compiler they measure. Recursive
+# operations can use `enter` and `leave` to record the deepest recursion seen. Counts are
+# approximate when packages are loaded on several threads.
+
+
+import json
+
+
+enabled = False
+
+_counters = {}
+_depths = {}
+
+
+def reset():
+    """Clears all counters."""
+    _counters.clear()
+    _depths.clear()
+
+
+def count(name, n=1):
+    """Adds `n` to a counter."""
+    _counters[name] = _counters.get(name, 0) + n
+
+
+def enter(name):
+    """Counts a call to a recursive operation and records the recursion depth.
+
+    The number of calls is recorded in "<name>.calls". The deepest recursion is recorded
+    in "<name>.maxDepth". `leave` must be called when the operation returns.
+    """
+    depth = _depths.get(name, 0) + 1
+    _depths[name] = depth
+    count(name + ".calls")
+    maxDepthName = name + ".maxDepth"
+    if depth > _counters.get(maxDepthName, 0):
+        _counters[maxDepthName] = depth
+
+
+def leave(name):
+    """Records that a recursive operation started with `enter` returned."""
+    _depths[name] -= 1
+
+
+def getCounters():
+    """Returns a copy of all counters, keyed by name."""
+    return dict(_counters)
+
+
+def writeCounters(fileName):
+    """Writes all counters to a file as a JSON object."""
+    with open(fileName, "w") as outFile:
+        json.dump(_counters, outFile, indent=2, separators=(",", ": "), sort_keys=True)
+        outFile.write("\n")
+
+
+__all__ = ["count", "enter", "getCounters", "leave", "reset", "writeCounters"]
@@ -0,0 +1,116 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+from control_flow import ControlFlowGraph
+from flags import ABSTRACT, EXTERN, NATIVE
+import ir_instructions
+from ir_types import VariableType
+
+
+def eliminateTailCalls(info):
+    """Replaces self-recursive calls in tail position with branches to the entry block.
+
+    A call is in tail position if its result is returned immediately: the `callg` is
+    followed by `ret`, or by a chain of `branch` instructions leading to a block that only
+    contains `ret`. This covers calls in `return` expressions and calls at the end of
+    `if` and `match` branches and block expressions, since the compiler joins those at a
+    common return block.
+
+    A tail call is replaced by instructions which store the arguments into the function's
+    parameters, followed by a `branch` to block 0. The function's stack frame is reused,
+    so a recursion that used O(n) stack space becomes a loop.
+
+    Only direct calls (`callg`) are considered, since the target of a virtual call isn't
+    known until run-time. Calls are not converted if:
+    - The call is inside a `try` block, since the handler would no longer apply after the
+      branch. Blocks reached through `pushtry` are tracked until the matching `poptry`.
+    - Values other than the arguments are on the stack, since they would accumulate with
+      each iteration.
+    - The call has different type arguments than the function's own type parameters, since
+      the types used in the function body would be different.
+
+    Args:
+        info (CompileInfo): the compiled package.
+
+    Returns:
+        (int): the number of tail calls eliminated.
+    """
+    count = 0
+    for function in info.package.functions:
+        if isEligible(function):
+            count += eliminateTailCallsInFunction(function)
+    return count
+
+
+def isEligible(function):
+    return function.blocks is not None and \
+           function.compileHint is None and \
+           not function.isConstructor() and \
+           function.isFinal() and \
+           frozenset([ABSTRACT, EXTERN, NATIVE]).isdisjoint(function.flags)
+
+
+def eliminateTailCallsInFunction(function):
+    cfg = ControlFlowGraph(function.blocks)
+    heights = cfg.stackHeights()
+    parameterCount = len(function.parameterTypes)
+    typeArgCount = len(function.typeParameters)
+    count = 0
+    for block in function.blocks:
+        height = heights[block.id]
+        if height is None or len(cfg.handlerStack(block.id)) > 0:
+            continue
+        for i, inst in enumerate(block.instructions):
+            if isSelfCall(function, inst) and \
+               height == parameterCount and \
+               isReturnedImmediately(function, block, i) and \
+               hasOwnTypeArguments(function, block, i):
+                stores = [ir_instructions.stlocal(p)
+                          for p in reversed(xrange(parameterCount))]
+                block.instructions = block.instructions[:i - typeArgCount] + \
+                                     stores + \
+                                     [ir_instructions.branch(0)]
+                count += 1
+                break
+            height += inst.stackDelta()
+    return count
+
+
+def isSelfCall(function, inst):
+    return isinstance(inst, ir_instructions.callg) and inst.op(0) == function.id.index
+
+
+def isReturnedImmediately(function, block, i):
+    insts = block.instructions[i + 1:]
+    visited = set([block.id])
+    while True:
+        if len(insts) != 1:
+            return False
+        inst = insts[0]
+        if isinstance(inst, ir_instructions.ret):
+            return True
+        if not isinstance(inst, ir_instructions.branch):
+            return False
+        succId = inst.op(0)
+        if succId in visited:
+            return False
+        visited.add(succId)
+        insts = function.blocks[succId].instructions
+
+
+def hasOwnTypeArguments(function, block, i):
+    typeArgCount = len(function.typeParameters)
+    if i < typeArgCount:
+        return False
+    typeArgInsts = block.instructions[i - typeArgCount:i]
+    for param, inst in zip(function.typeParameters, typeArgInsts):
+        if not isinstance(inst, ir_instructions.tys) or \
+           function.instTypes[inst.op(0)] != VariableType(param):
+            return False
+    return True
+
+
+__all__ = ["eliminateTailCalls"]
@@ -56,22 +56,78 @@ class TestClosureConversion(TestCaseWithDefinitions):
         fAst = info.ast.modules[0].definitions[0]
         fScopeId = info.getScope(info.getDefnInfo(fAst).irDefn).scopeId
         gAst = fAst.body.statements[1]
-        gScopeId = info.getScope(info.getDefnInfo(gAst).irDefn).scopeId
+        g = info.getDefnInfo(gAst).irDefn
+        gScopeId = info.getScope(g).scopeId
 
-        fContextInfo = info.getContextInfo(fScopeId)
-        fContextClass = fContextInfo.irContextClass
-        self.assertEquals([self.makeField("f.x", type=I64Type)], fContextClass.fields)
+        self.assertIsNone(info.getContextInfo(fScopeId).irContextClass)
         xDefnInfo = info.getDefnInfo(fAst.body.statements[0].pattern)
-        self.assertEquals(self.makeField("f.x", type=I64Type), xDefnInfo.irDefn)
-        self.assertIs(xDefnInfo, info.getUseInfo(gAst.body).defnInfo)
+        self.assertEquals(self.makeVariable("f.x", type=I64Type), xDefnInfo.irDefn)
         gClosureInfo = info.getClosureInfo(gScopeId)
-        gClosureClass = gClosureInfo.irClosureClass
-        self.assertEquals([self.makeField(Name(["f", "g", CLOSURE_SUFFIX, CONTEXT_SUFFIX]),
-                                          type=ClassType(fContextClass))],
-                          gClosureClass.fields)
+        self.assertIsNone(gClosureInfo.irClosureClass)
+        self.assertIsNone(gClosureInfo.irClosureVar)
+        self.assertEquals([I64Type], g.parameterTypes)
+        xParam = self.makeVariable("f.x", type=I64Type, kind=PARAMETER, flags=frozenset([LET]))
+        self.assertEquals([xParam], g.variables)
+        self.assertEquals([xParam], gClosureInfo.irCapturedParameters)
+        self.assertIs(xDefnInfo, gClosureInfo.irCapturedValues[g.variables[0]])
+        self.assertIs(g.variables[0], info.getUseInfo(gAst.body).defnInfo.irDefn)
 
-        self.assertEquals(self.makeVariable(Name(["f", "g"]), type=ClassType(gClosureClass)),
-                          gClosureInfo.irClosureVar)
+    def testAssignFunctionVarInFunction(self):
+        source = "def f =\n" + \
+                 "  var x = 12\n" + \
+                 "  def g =\n" + \
+                 "    x = 34\n" + \
+                 "  g\n" + \
+                 "  x"
+        info = self.analyzeFromSource(source)
+        fAst = info.ast.modules[0].definitions[0]
+        fScopeId = info.getScope(info.getDefnInfo(fAst).irDefn).scopeId
+        g = info.getDefnInfo(fAst.body.statements[1]).irDefn
+        gScopeId = info.getScope(g).scopeId
+
+        fContextClass = info.getContextInfo(fScopeId).irContextClass
+        self.assertEquals([self.makeField("f.x", type=I64Type)], fContextClass.fields)
+        gClosureInfo = info.getClosureInfo(gScopeId)
+        self.assertIsNone(gClosureInfo.irClosureClass)
+        self.assertEquals([ClassType(fContextClass)], g.parameterTypes)
+        self.assertEquals({}, gClosureInfo.irCapturedValues)
+        self.assertEquals({fScopeId: g.variables[0]}, gClosureInfo.irClosureContexts)
+        self.assertEquals([g.variables[0]], gClosureInfo.irCapturedParameters)
+
+    def testLiftNestedFunction(self):
+        source = "def f(x: i64) =\n" + \
+                 "  def g(y: i64) =\n" + \
+                 "    def h = x + y\n" + \
+                 "    h\n" + \
+                 "  g(1)"
+        info = self.analyzeFromSource(source)
+        fAst = info.ast.modules[0].definitions[0]
+        gAst = fAst.body.statements[0]
+        hAst = gAst.body.statements[0]
+        g = info.getDefnInfo(gAst).irDefn
+        h = info.getDefnInfo(hAst).irDefn
+        xDefnInfo = info.getDefnInfo(fAst.parameters[0].pattern)
+        yDefnInfo = info.getDefnInfo(gAst.parameters[0].pattern)
+        self.assertEquals([I64Type, I64Type], g.parameterTypes)
+        self.assertEquals([I64Type, I64Type], h.parameterTypes)
+        gClosureInfo = info.getClosureInfo(gAst)
+        hClosureInfo = info.getClosureInfo(hAst)
+        self.assertEquals([g.variables[1]], gClosureInfo.irCapturedParameters)
+        self.assertIs(xDefnInfo, gClosureInfo.irCapturedValues[g.variables[1]])
+        self.assertEquals(h.variables, hClosureInfo.irCapturedParameters)
+        self.assertIs(g.variables[1], hClosureInfo.irCapturedValues[h.variables[0]].irDefn)
+        self.assertIs(yDefnInfo, hClosureInfo.irCapturedValues[h.variables[1]])
+
+    def testLiftGenericFunction(self):
+        source = FUNCTION_SOURCE + \
+                 "def f(s: String) =\n" + \
+                 "  def g[static T] = s\n" + \
+                 "  ()"
+        info = self.analyzeFromSource(source, name=STD_NAME)
+        g = info.package.findFunction(name="f.g")
+        self.assertIsNone(info.package.findClass(name=Name(["f", "g", CLOSURE_SUFFIX])))
+        self.assertEquals(1, len(g.typeParameters))
+        self.assertEquals([getStringType()], g.parameterTypes)
 
     def testUseFieldInMethod(self):
         source = "class C\n" + \
@@ -104,118 +160,189 @@ class TestClosureConversion(TestCaseWithDefinitions):
     def testCaptureThis(self):
         source = "class C\n" + \
                  "  def f =\n" + \
-                 "    def g = this"
+                 "    lambda () this"
         info = self.analyzeFromSource(source)
-        cAst = info.ast.modules[0].definitions[0]
         C = info.package.findClass(name="C")
         CType = ClassType(C)
         f = info.package.findFunction(name="C.f")
         fScopeId = info.getScope(f).scopeId
-        fContextInfo = info.getContextInfo(fScopeId)
-        fContextClass = info.package.findClass(name=Name(["C", "f", CONTEXT_SUFFIX]))
-        self.assertIs(fContextClass, fContextInfo.irContextClass)
-        self.assertEquals(1, len(fContextClass.constructors))
-        self.assertEquals([self.makeField(Name(["C", "f", RECEIVER_SUFFIX]),
-                                          type=CType, flags=frozenset([LET]))],
-                          fContextClass.fields)
+        self.assertIsNone(info.getContextInfo(fScopeId).irContextClass)
+        self.assertIsNone(info.package.findClass(name=Name(["C", "f", CONTEXT_SUFFIX])))
+        lambdaAst = info.ast.modules[0].definitions[0].members[0].body.statements[0]
+        lambdaClosureInfo = info.getClosureInfo(lambdaAst)
+        lambdaClass = lambdaClosureInfo.irClosureClass
+        lambdaFunction = info.getDefnInfo(lambdaAst).irDefn
+        self.assertEquals({lambdaClass.id: lambdaFunction.variables[0]},
+                          lambdaClosureInfo.irClosureContexts)
+        self.assertEquals(1, len(lambdaClass.constructors))
+        self.assertEquals([ClassType(lambdaClass), CType],
+                          lambdaClass.constructors[0].parameterTypes)
+        thisField = self.makeField(Name(["C", "f", RECEIVER_SUFFIX]),
+                                   type=CType, flags=frozenset([LET]))
+        self.assertEquals([thisField], lambdaClass.fields)
+        self.assertIs(f.variables[0],
+                      lambdaClosureInfo.irCapturedValues[lambdaClass.fields[0]].irDefn)
+
+    def testCaptureThisInLiftedFunction(self):
+        source = "class C\n" + \
+                 "  def f =\n" + \
+                 "    def g = this"
+        info = self.analyzeFromSource(source)
+        CType = ClassType(info.package.findClass(name="C"))
+        f = info.package.findFunction(name="C.f")
         g = info.package.findFunction(name="C.f.g")
-        gScopeId = info.getScope(g).scopeId
-        gClosureInfo = info.getClosureInfo(gScopeId)
-        gClosureClass = info.package.findClass(name=Name(["C", "f", "g", CLOSURE_SUFFIX]))
-        self.assertIs(gClosureClass, gClosureInfo.irClosureClass)
-        self.assertEquals({fScopeId: gClosureClass.fields[0]}, gClosureInfo.irClosureContexts)
-        self.assertTrue(gClosureInfo.irClosureVar in f.variables)
-        self.assertEquals(1, len(gClosureClass.constructors))
-        self.assertEquals([ClassType(gClosureClass), ClassType(fContextClass)],
-                          gClosureClass.constructors[0].parameterTypes)
-        self.assertEquals([self.makeField(Name(["C", "f", "g", CLOSURE_SUFFIX, CONTEXT_SUFFIX]),
-                                          type=ClassType(fContextClass))],
-                          gClosureClass.fields)
+        self.assertIsNone(info.package.findClass(name=Name(["C", "f", "g", CLOSURE_SUFFIX])))
+        self.assertEquals(frozenset(), g.flags)
+        self.assertEquals([CType], g.parameterTypes)
+        gClosureInfo = info.getClosureInfo(info.getScope(g).scopeId)
+        self.assertIs(f.variables[0], gClosureInfo.irCapturedValues[g.variables[0]].irDefn)
+
+    def testCaptureLetValue(self):
+        source = "def f =\n" + \
+                 "  let x = 12\n" + \
+                 "  lambda (y: i64) x + y"
+        info = self.analyzeFromSource(source)
+        fAst = info.ast.modules[0].definitions[0]
+        f = info.package.findFunction(name="f")
+        fScopeId = info.getScope(f).scopeId
+        self.assertIsNone(info.getContextInfo(fScopeId).irContextClass)
+        xDefnInfo = info.getDefnInfo(fAst.body.statements[0].pattern)
+        self.assertEquals(self.makeVariable("f.x", type=I64Type, flags=frozenset([LET])),
+                          xDefnInfo.irDefn)
+
+        lambdaAst = fAst.body.statements[1]
+        lambdaClosureInfo = info.getClosureInfo(lambdaAst)
+        lambdaClass = lambdaClosureInfo.irClosureClass
+        xField = self.makeField("f.x", type=I64Type, flags=frozenset([LET]))
+        self.assertEquals([xField], lambdaClass.fields)
+        self.assertEquals({lambdaClass.fields[0]: xDefnInfo},
+                          lambdaClosureInfo.irCapturedValues)
+        xUseInfo = info.getUseInfo(lambdaAst.body.left)
+        self.assertIs(lambdaClass.fields[0], xUseInfo.defnInfo.irDefn)
+        self.assertIs(lambdaClass.id, xUseInfo.defnInfo.scopeId)
+
+    def testCaptureNestedValue(self):
+        source = "def f(x: i64) =\n" + \
+                 "  lambda (y: i64) lambda (z: i64) x + y + z"
+        info = self.analyzeFromSource(source)
+        fAst = info.ast.modules[0].definitions[0]
+        xDefnInfo = info.getDefnInfo(fAst.parameters[0].pattern)
+        outerAst = fAst.body.statements[0]
+        innerAst = outerAst.body
+        outerClosureInfo = info.getClosureInfo(outerAst)
+        innerClosureInfo = info.getClosureInfo(innerAst)
+        outerClass = outerClosureInfo.irClosureClass
+        innerClass = innerClosureInfo.irClosureClass
+        self.assertEquals({outerClass.fields[0]: xDefnInfo}, outerClosureInfo.irCapturedValues)
+        self.assertEquals(2, len(innerClass.fields))
+        innerXSource = innerClosureInfo.irCapturedValues[innerClass.fields[0]]
+        self.assertIs(outerClass.fields[0], innerXSource.irDefn)
+        innerYSource = innerClosureInfo.irCapturedValues[innerClass.fields[1]]
+        self.assertIs(info.getDefnInfo(outerAst.parameters[0].pattern), innerYSource)
+
+    def testCaptureLetBeforeAssignment(self):
+        source = "def f =\n" + \
+                 "  let x = 12\n" + \
+                 "  def g = lambda () x\n" + \
+                 "  g"
+        info = self.analyzeFromSource(source)
+        fAst = info.ast.modules[0].definitions[0]
+        f = info.package.findFunction(name="f")
+        fScopeId = info.getScope(f).scopeId
+        fContextClass = info.getContextInfo(fScopeId).irContextClass
+        xField = self.makeField("f.x", type=I64Type, flags=frozenset([LET]))
+        self.assertEquals([xField], fContextClass.fields)
+        self.assertEquals(xField, info.getDefnInfo(fAst.body.statements[0].pattern).irDefn)
+        g = info.package.findFunction(name="f.g")
+        gClosureInfo = info.getClosureInfo(info.getScope(g).scopeId)
+        self.assertEquals({fScopeId: g.variables[0]}, gClosureInfo.irClosureContexts)
+
+    def testCaptureSameValueInContextAndLambda(self):
+        source = "def f =\n" + \
+                 "  let x = 12\n" + \
+                 "  def g = lambda () x\n" + \
+                 "  lambda () x"
+        info = self.analyzeFromSource(source)
+        fAst = info.ast.modules[0].definitions[0]
+        xDefnInfo = info.getDefnInfo(fAst.body.statements[0].pattern)
+        self.assertIsInstance(xDefnInfo.irDefn, Field)
+        lambdaAst = fAst.body.statements[2]
+        self.assertEquals({}, info.getClosureInfo(lambdaAst).irCapturedValues)
+        self.assertIs(xDefnInfo, info.getUseInfo(lambdaAst.body).defnInfo)
+
+    def getLambdaClosureClass(self, info):
+        fAst = info.ast.modules[0].definitions[-1]
+        return info.getClosureInfo(fAst.body.statements[0]).irClosureClass
 
     def testFunctionTraitNotUsedWithoutStd(self):
         source = "def f(x: i64) =\n" + \
-                 "  def g =\n" + \
+                 "  lambda ()\n" + \
                  "    x\n" + \
-                 "    Object()\n" + \
-                 "  ()"
+                 "    Object()"
         info = self.analyzeFromSource(source)
-        gClosureClass = info.package.findClass(name=Name(["f", "g", CLOSURE_SUFFIX]))
-        self.assertEquals([getRootClassType()], gClosureClass.supertypes)
+        lambdaClass = self.getLambdaClosureClass(info)
+        self.assertEquals([getRootClassType()], lambdaClass.supertypes)
 
     def testFunctionTraitUsedWithFewObjectParams(self):
         source = FUNCTION_SOURCE + \
                  "def f(x: i64) =\n" + \
-                 "  def g(a: Object, b: Object) =\n" + \
+                 "  lambda (a: Object, b: Object)\n" + \
                  "    x\n" + \
-                 "    Object()\n" + \
-                 "  ()"
+                 "    Object()"
         info = self.analyzeFromSource(source, name=STD_NAME)
-        gClosureClass = info.package.findClass(name=Name(["f", "g", CLOSURE_SUFFIX]))
+        lambdaClass = self.getLambdaClosureClass(info)
         functionTrait = info.package.findTrait(name="Function2")
         rootType = getRootClassType()
         functionTraitType = ClassType(functionTrait, (rootType, rootType, rootType))
-        self.assertEquals([getRootClassType(), functionTraitType], gClosureClass.supertypes)
+        self.assertEquals([getRootClassType(), functionTraitType], lambdaClass.supertypes)
 
     def testFunctionTraitNotUsedWithPrimitiveParams(self):
         source = FUNCTION_SOURCE + \
                  "def f(x: i64) =\n" + \
-                 "  def g(a: i64) =\n" + \
+                 "  lambda (a: i64)\n" + \
                  "    x\n" + \
-                 "    Object()\n" + \
-                 "  ()"
+                 "    Object()"
         info = self.analyzeFromSource(source, name=STD_NAME)
-        gClosureClass = info.package.findClass(name=Name(["f", "g", CLOSURE_SUFFIX]))
-        self.assertEquals([getRootClassType()], gClosureClass.supertypes)
+        lambdaClass = self.getLambdaClosureClass(info)
+        self.assertEquals([getRootClassType()], lambdaClass.supertypes)
 
     def testFunctionTraitNotUsedWithPrimitiveReturn(self):
         source = FUNCTION_SOURCE + \
                  "def f(x: i64) =\n" + \
-                 "  def g = x\n" + \
-                 "  ()"
+                 "  lambda () x"
         info = self.analyzeFromSource(source, name=STD_NAME)
-        gClosureClass = info.package.findClass(name=Name(["f", "g", CLOSURE_SUFFIX]))
-        self.assertEquals([getRootClassType()], gClosureClass.supertypes)
+        lambdaClass = self.getLambdaClosureClass(info)
+        self.assertEquals([getRootClassType()], lambdaClass.supertypes)
 
     def testFunctionTraitNotUsedWithManyParams(self):
         source = FUNCTION_SOURCE + \
                  "def f(x: i64) =\n" + \
-                 "  def g(a: Object, b: Object, c: Object) =\n" + \
+                 "  lambda (a: Object, b: Object, c: Object)\n" + \
                  "    x\n" + \
-                 "    Object()\n" + \
-                 "  ()"
+                 "    Object()"
         info = self.analyzeFromSource(source, name=STD_NAME)
-        gClosureClass = info.package.findClass(name=Name(["f", "g", CLOSURE_SUFFIX]))
-        self.assertEquals([getRootClassType()], gClosureClass.supertypes)
+        lambdaClass = self.getLambdaClosureClass(info)
+        self.assertEquals([getRootClassType()], lambdaClass.supertypes)
 
     def testClosureMethodFlagsPrimitive(self):
         source = "def f(x: i64) =\n" + \
-                 "  def g = x\n" + \
-                 "  ()"
+                 "  lambda () x"
         info = self.analyzeFromSource(source)
-        g = info.package.findFunction(name="f.g")
-        self.assertEquals(frozenset([PUBLIC, METHOD, FINAL]), g.flags)
+        fAst = info.ast.modules[0].definitions[0]
+        lambdaFunction = info.getDefnInfo(fAst.body.statements[0]).irDefn
+        self.assertEquals(frozenset([PUBLIC, METHOD, FINAL]), lambdaFunction.flags)
 
     def testClosureMethodFlagsFunction(self):
         source = FUNCTION_SOURCE + \
                  "def f(s: String) =\n" + \
-                 "  def g = s\n" + \
-                 "  ()"
+                 "  lambda () s"
         info = self.analyzeFromSource(source, name=STD_NAME)
-        g = info.package.findFunction(name="f.g")
+        fAst = info.ast.modules[0].definitions[-1]
+        lambdaFunction = info.getDefnInfo(fAst.body.statements[0]).irDefn
         call = info.package.findFunction(name="Function0.call")
-        self.assertEquals(frozenset([PUBLIC, METHOD, FINAL, OVERRIDE]), g.flags)
-        self.assertEquals(1, len(g.overrides))
-        self.assertIs(call, g.overrides[0])
-
-    def testClosureWithTypeParametersNotFunction(self):
-        source = FUNCTION_SOURCE + \
-                 "def f(s: String) =\n" + \
-                 "  def g[static T] = s\n" + \
-                 "  ()"
-        info = self.analyzeFromSource(source, name=STD_NAME)
-        gClosureClass = info.package.findClass(name=Name(["f", "g", CLOSURE_SUFFIX]))
-        self.assertEquals([getRootClassType()], gClosureClass.supertypes)
-
+        self.assertEquals(frozenset([PUBLIC, METHOD, FINAL, OVERRIDE]), lambdaFunction.flags)
+        self.assertEquals(1, len(lambdaFunction.overrides))
+        self.assertIs(call, lambdaFunction.overrides[0])
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,110 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from compile_cache import CompileCache, DEFINITIONS_DIR_NAME
+from ir import Name, PackageVersion
+from package_loader import PackageLoader
+
+
+class TestCompileCache(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.cache = CompileCache(os.path.join(self.dirName, "cache"))
+        self.loader = PackageLoader([self.dirName])
+        self.depFileName = self.writeFile("dep-1.csp", "dep")
+        self.outFileName = os.path.join(self.dirName, "out.csp")
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def writeFile(self, baseName, contents):
+        fileName = os.path.join(self.dirName, baseName)
+        with open(fileName, "wb") as f:
+            f.write(contents)
+        return fileName
+
+    def readFile(self, fileName):
+        with open(fileName, "rb") as f:
+            return f.read()
+
+    def computeKey(self, source="def f = 12", flags=()):
+        return self.cache.computeKey([("foo.gy", source)], Name(["foo"]),
+                                     PackageVersion([1]), list(flags), self.loader)
+
+    def store(self, key, contents="package"):
+        self.writeFile("out.csp", contents)
+        self.cache.store(key, self.outFileName, [self.depFileName])
+        os.remove(self.outFileName)
+
+    def testKeyDependsOnInputs(self):
+        key = self.computeKey()
+        self.assertEquals(key, self.computeKey())
+        self.assertNotEquals(key, self.computeKey(source="def f = 34"))
+        self.assertNotEquals(key, self.computeKey(flags=["optimize=True"]))
+
+    def testMiss(self):
+        self.assertFalse(self.cache.fetch(self.computeKey(), self.outFileName))
+        self.assertFalse(os.path.exists(self.outFileName))
+
+    def testHit(self):
+        key = self.computeKey()
+        self.store(key)
+        self.assertTrue(self.cache.fetch(key, self.outFileName))
+        self.assertEquals("package", self.readFile(self.outFileName))
+        self.assertTrue(self.cache.fetch(key, self.outFileName))
+        self.assertEquals(["cache", "dep-1.csp", "out.csp"], sorted(os.listdir(self.dirName)))
+
+    def testMissWhenDependencyChanges(self):
+        key = self.computeKey()
+        self.store(key)
+        self.writeFile("dep-1.csp", "changed")
+        self.assertFalse(self.cache.fetch(key, self.outFileName))
+
+    def testMissWhenIndexMissing(self):
+        key = self.computeKey()
+        self.store(key)
+        self.assertFalse(self.cache.fetch(key, self.outFileName, withIndex=True))
+
+    def testEvictLeastRecentlyUsed(self):
+        keys = [self.computeKey(source=str(i)) for i in xrange(3)]
+        for i, key in enumerate(keys):
+            self.store(key, "x" * 100)
+            manifestFileName = self.cache.entryFileName(key, ".deps")
+            os.utime(manifestFileName, (i, i))
+        self.assertTrue(self.cache.fetch(keys[0], self.outFileName))
+        self.cache.maxSize = 2 * (100 + os.path.getsize(manifestFileName))
+        self.cache.evict()
+        self.assertTrue(self.cache.fetch(keys[0], self.outFileName))
+        self.assertFalse(self.cache.fetch(keys[1], self.outFileName))
+        self.assertTrue(self.cache.fetch(keys[2], self.outFileName))
+
+    def testEvictDefinitions(self):
+        key = self.computeKey()
+        self.store(key, "x" * 100)
+        manifestFileName = self.cache.entryFileName(key, ".deps")
+        os.utime(manifestFileName, (2, 2))
+        definitionsDirName = os.path.join(self.cache.dirName, DEFINITIONS_DIR_NAME, "ab")
+        os.makedirs(definitionsDirName)
+        definitionFileNames = [os.path.join(definitionsDirName, "ab%d" % i) for i in xrange(2)]
+        for i, fileName in enumerate(definitionFileNames):
+            with open(fileName, "wb") as f:
+                f.write("x" * 100)
+            os.utime(fileName, (i * 3, i * 3))
+        self.cache.maxSize = 200 + os.path.getsize(manifestFileName)
+        self.cache.evict()
+        self.assertFalse(os.path.exists(definitionFileNames[0]))
+        self.assertTrue(os.path.exists(definitionFileNames[1]))
+        self.assertTrue(self.cache.fetch(key, self.outFileName))
+
+
+if __name__ == "__main__":
+    unittest.main()
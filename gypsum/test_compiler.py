@@ -23,6 +23,8 @@ from ir_types import *
 from lexer import *
 from parser import *
 from scope_analysis import *
+from serialize import Serializer
+from tail_calls import eliminateTailCalls
 from type_analysis import *
 from utils_test import (
     FUNCTION_SOURCE,
@@ -40,6 +42,7 @@ from name import (
     CONSTRUCTOR_SUFFIX,
     CONTEXT_SUFFIX,
     EXISTENTIAL_SUFFIX,
+    INSTANCE_SUFFIX,
     Name,
     PACKAGE_INIT_NAME,
     RECEIVER_SUFFIX,
@@ -51,7 +54,8 @@ class TestCompiler(TestCaseWithDefinitions):
         super(TestCompiler, self).__init__(*args)
         sys.setrecursionlimit(10000)
 
-    def compileFromSource(self, source, name=None, packageNames=None, packageLoader=None):
+    def compileFromSource(self, source, name=None, packageNames=None, packageLoader=None,
+                          optimizeMatches=False):
         assert packageNames is None or packageLoader is None
         filename = "(test)"
         tokens = lex(filename, source)
@@ -71,7 +75,7 @@ class TestCompiler(TestCaseWithDefinitions):
         analyzeTypes(info)
         convertClosures(info)
         externalize(info)
-        compile(info)
+        compile(info, optimizeMatches=optimizeMatches)
         return info.package
 
     def makePackage(self, input):
@@ -1930,6 +1934,210 @@ class TestCompiler(TestCaseWithDefinitions):
                                         self.makeVariable(Name(["f", LOCAL_SUFFIX, "y"]), type=I64Type,
                                                           kind=LOCAL, flags=frozenset([LET]))]))
 
+    def testMatchDecisionTreeIntegerSwitch(self):
+        source = "def f(n: i64) =\n" + \
+                 "  match (n)\n" + \
+                 "    case 3 => 30\n" + \
+                 "    case 1 => 10\n" + \
+                 "    case 4 => 40\n" + \
+                 "    case 1 => 99\n" + \
+                 "    case 2 => 20\n" + \
+                 "    case _ => 0"
+        package = self.compileFromSource(source, optimizeMatches=True)
+        self.checkFunction(package,
+                           self.makeSimpleFunction("f", I64Type, [[
+                               ldlocal(0),
+                               dup(),
+                               i64(3),
+                               lti64(),
+                               branchif(1, 5),
+                             ], [
+                               dup(),
+                               i64(1),
+                               eqi64(),
+                               branchif(2, 3),
+                             ], [
+                               drop(),
+                               i64(10),
+                               branch(10),
+                             ], [
+                               dup(),
+                               i64(2),
+                               eqi64(),
+                               branchif(4, 9),
+                             ], [
+                               drop(),
+                               i64(20),
+                               branch(10),
+                             ], [
+                               dup(),
+                               i64(3),
+                               eqi64(),
+                               branchif(6, 7),
+                             ], [
+                               drop(),
+                               i64(30),
+                               branch(10),
+                             ], [
+                               dup(),
+                               i64(4),
+                               eqi64(),
+                               branchif(8, 9),
+                             ], [
+                               drop(),
+                               i64(40),
+                               branch(10),
+                             ], [
+                               drop(),
+                               i64(0),
+                               branch(10),
+                             ], [
+                               ret(),
+                             ]],
+                             parameterTypes=[I64Type],
+                             variables=[self.makeVariable("f.n", type=I64Type,
+                                                          kind=PARAMETER, flags=frozenset([LET]))]))
+
+    def testMatchDecisionTreeFewIntegerCases(self):
+        source = "def f(n: i64) =\n" + \
+                 "  match (n)\n" + \
+                 "    case 1 => 10\n" + \
+                 "    case 2 => 20\n" + \
+                 "    case 3 => 30\n" + \
+                 "    case _ => 0"
+        expected = self.compileFromSource(source).findFunction(name="f")
+        package = self.compileFromSource(source, optimizeMatches=True)
+        self.assertEquals(expected.blocks, package.findFunction(name="f").blocks)
+
+    def testMatchDecisionTreeSharedTypeTest(self):
+        source = "class Foo\n" + \
+                 "def f(obj: Object, b: boolean) =\n" + \
+                 "  match (obj)\n" + \
+                 "    case x: Foo if b => 1\n" + \
+                 "    case _: Foo => 2\n" + \
+                 "    case _ => 3"
+        package = self.compileFromSource(source, optimizeMatches=True)
+        Foo = package.findClass(name="Foo")
+        self.checkFunction(package,
+                           self.makeSimpleFunction("f", I64Type, [[
+                               ldlocal(0),
+                               tyd(0),
+                               castcbr(1, 4),
+                             ], [
+                               dup(),
+                               stlocal(-1),
+                               ldlocal(1),
+                               branchif(2, 3),
+                             ], [
+                               drop(),
+                               i64(1),
+                               branch(5),
+                             ], [
+                               drop(),
+                               i64(2),
+                               branch(5),
+                             ], [
+                               drop(),
+                               i64(3),
+                               branch(5),
+                             ], [
+                               ret(),
+                             ]],
+                             parameterTypes=[getRootClassType(), BooleanType],
+                             variables=[self.makeVariable("f.obj", type=getRootClassType(),
+                                                          kind=PARAMETER, flags=frozenset([LET])),
+                                        self.makeVariable("f.b", type=BooleanType,
+                                                          kind=PARAMETER, flags=frozenset([LET])),
+                                        self.makeVariable(Name(["f", LOCAL_SUFFIX, "x"]),
+                                                          type=ClassType(Foo), kind=LOCAL,
+                                                          flags=frozenset([LET]))],
+                             instTypes=[ClassType(Foo)]))
+
+    def testMatchDecisionTreeSharedDestructure(self):
+        source = OPTION_SOURCE + \
+                 "class Foo\n" + \
+                 "def Matcher(obj: Object) = Some[Object](obj)\n" + \
+                 "def f(obj: Object) =\n" + \
+                 "  match (obj)\n" + \
+                 "    case Matcher(x: Foo) => 1\n" + \
+                 "    case Matcher(y) => 2\n" + \
+                 "    case _ => 3"
+        package = self.compileFromSource(source, name=STD_NAME, optimizeMatches=True)
+        Matcher = package.findFunction(name="Matcher")
+        Option = package.findClass(name="Option")
+        isDefined = Option.findMethodBySourceName("is-defined")
+        get = Option.findMethodBySourceName("get")
+        Foo = package.findClass(name="Foo")
+        self.checkFunction(package, self.makeSimpleFunction(
+            "f", I64Type, [[
+                # block 0 [obj]
+                ldlocal(0),
+                dup(),
+                callg(Matcher),
+                dup(),
+                tys(0),
+                callv(isDefined),
+                branchif(1, 5),
+            ], [
+                # block 1 [obj, some value]
+                tys(0),
+                callv(get),
+                dup(),
+                tyd(1),
+                castcbr(2, 3),
+            ], [
+                # block 2 [obj, value, foo value]
+                stlocal(-1),
+                drop(),
+                drop(),
+                i64(1),
+                branch(7),
+            ], [
+                # block 3 [obj, value, value]
+                drop(),
+                branch(4),
+            ], [
+                # block 4 [obj, value]
+                dup(),
+                stlocal(-2),
+                drop(),
+                drop(),
+                i64(2),
+                branch(7),
+            ], [
+                # block 5 [obj, option]
+                drop(),
+                branch(6),
+            ], [
+                # block 6 [obj]
+                drop(),
+                i64(3),
+                branch(7),
+            ], [
+                # block 7 [result]
+                ret(),
+            ]],
+            variables=[self.makeVariable("f.obj", type=getRootClassType(),
+                                         kind=PARAMETER, flags=frozenset([LET])),
+                       self.makeVariable(Name(["f", LOCAL_SUFFIX, "x"]), type=ClassType(Foo),
+                                         kind=LOCAL, flags=frozenset([LET])),
+                       self.makeVariable(Name(["f", LOCAL_SUFFIX, "y"]),
+                                         type=getRootClassType(), kind=LOCAL,
+                                         flags=frozenset([LET]))],
+            instTypes=[getRootClassType(), ClassType(Foo)]))
+
+    def testMatchDecisionTreeAllCasesTerminate(self):
+        source = "def f(n: i64): i64 =\n" + \
+                 "  match (n)\n" + \
+                 "    case 1 => return 10\n" + \
+                 "    case 2 => return 20\n" + \
+                 "    case 3 => return 30\n" + \
+                 "    case 4 => return 40\n" + \
+                 "    case _ => return 0"
+        package = self.compileFromSource(source, optimizeMatches=True)
+        blocks = package.findFunction(name="f").blocks
+        self.assertEquals(5, len([b for b in blocks if isinstance(b.instructions[-1], ret)]))
+
     def testTryValueMustCatch(self):
         exnClass = getExceptionClass()
         exnTy = ClassType(exnClass)
@@ -3179,13 +3387,24 @@ class TestCompiler(TestCaseWithDefinitions):
         package = self.compileFromSource(source)
         lambdaClass = package.findClass(name=Name(["f", LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
         lambdaType = ClassType.forReceiver(lambdaClass)
+        instance = package.findGlobal(name=lambdaClass.name.withSuffix(INSTANCE_SUFFIX))
+        self.assertEquals(ClassType(lambdaClass), instance.type)
+        self.assertEquals(frozenset([LET]), instance.flags)
         self.checkFunction(
             package,
-            self.makeSimpleFunction("f", lambdaType, [[
+            self.makeSimpleFunction(PACKAGE_INIT_NAME, UnitType, [[
                 allocobj(lambdaClass),
                 dup(),
                 callg(lambdaClass.constructors[0]),
                 drop(),
+                stg(instance),
+                unit(),
+                ret(),
+            ]]))
+        self.checkFunction(
+            package,
+            self.makeSimpleFunction("f", lambdaType, [[
+                ldg(instance),
                 ret(),
             ]]))
         self.checkFunction(
@@ -3207,7 +3426,7 @@ class TestCompiler(TestCaseWithDefinitions):
                         kind=PARAMETER, type=I32Type, flags=frozenset([LET]))]))
 
     def testLambdaCapture(self):
-        source = "def f(x: i32) = lambda (y: i32) x + y"
+        source = "def f(var x: i32) = lambda (y: i32) x + y"
         package = self.compileFromSource(source)
         lambdaClass = package.findClass(name=Name(["f", LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
         lambdaType = ClassType.forReceiver(lambdaClass)
@@ -3263,6 +3482,54 @@ class TestCompiler(TestCaseWithDefinitions):
                         Name(["f", LAMBDA_SUFFIX, "y"]),
                         kind=PARAMETER, type=I32Type, flags=frozenset([LET]))]))
 
+    def testLambdaCaptureValue(self):
+        source = "def f =\n" + \
+                 "  let x = 12i32\n" + \
+                 "  lambda (y: i32) x + y"
+        package = self.compileFromSource(source)
+        self.assertIsNone(package.findClass(name=Name(["f", CONTEXT_SUFFIX])))
+        lambdaClass = package.findClass(name=Name(["f", LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
+        lambdaType = ClassType.forReceiver(lambdaClass)
+        xNameIndex = package.findName(lambdaClass.fields[0].name)
+        self.checkFunction(
+            package,
+            self.makeSimpleFunction(
+                "f",
+                lambdaType,
+                [[
+                    i32(12),
+                    stlocal(-1),
+                    allocobj(lambdaClass),
+                    dup(),
+                    ldlocal(-1),
+                    callg(lambdaClass.constructors[0]),
+                    drop(),
+                    ret(),
+                ]],
+                variables=[
+                    self.makeVariable(
+                        "f.x", kind=LOCAL, type=I32Type, flags=frozenset([LET]))]))
+        self.checkFunction(
+            package,
+            self.makeSimpleFunction(
+                Name(["f", LAMBDA_SUFFIX]),
+                I32Type,
+                [[
+                    ldlocal(0),
+                    ldf(lambdaClass, xNameIndex),
+                    ldlocal(1),
+                    addi32(),
+                    ret(),
+                ]],
+                parameterTypes=[lambdaType, I32Type],
+                variables=[
+                    self.makeVariable(
+                        Name(["f", LAMBDA_SUFFIX, RECEIVER_SUFFIX]),
+                        kind=PARAMETER, type=lambdaType, flags=frozenset([LET])),
+                    self.makeVariable(
+                        Name(["f", LAMBDA_SUFFIX, "y"]),
+                        kind=PARAMETER, type=I32Type, flags=frozenset([LET]))]))
+
     def testLambdaParameterized(self):
         source = "def f[static T] = lambda (x: T) x"
         package = self.compileFromSource(source)
@@ -3311,7 +3578,7 @@ class TestCompiler(TestCaseWithDefinitions):
                         flags=frozenset([LET]))]))
 
     def testLambdaNestedCapture(self):
-        source = "def f = lambda (x: i32) lambda (y: i32) x + y"
+        source = "def f = lambda (var x: i32) lambda (y: i32) x + y"
         package = self.compileFromSource(source)
         outerLambdaClass = package.findClass(name=Name(["f", LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
         outerLambdaType = ClassType.forReceiver(outerLambdaClass)
@@ -3374,6 +3641,59 @@ class TestCompiler(TestCaseWithDefinitions):
                         kind=PARAMETER, type=I32Type, flags=frozenset([LET])),
                 ]))
 
+    def testLambdaNestedCaptureValue(self):
+        source = "def f = lambda (x: i32) lambda (y: i32) x + y"
+        package = self.compileFromSource(source)
+        outerLambdaClass = package.findClass(name=Name(["f", LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
+        outerLambdaType = ClassType.forReceiver(outerLambdaClass)
+        innerLambdaClass = package.findClass(
+            name=Name(["f", LAMBDA_SUFFIX, LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
+        innerLambdaType = ClassType.forReceiver(innerLambdaClass)
+        xNameIndex = package.findName(innerLambdaClass.fields[0].name)
+        self.assertEquals([], outerLambdaClass.fields)
+        self.checkFunction(
+            package,
+            self.makeSimpleFunction(
+                Name(["f", LAMBDA_SUFFIX]),
+                innerLambdaType,
+                [[
+                    allocobj(innerLambdaClass),
+                    dup(),
+                    ldlocal(1),
+                    callg(innerLambdaClass.constructors[0]),
+                    drop(),
+                    ret(),
+                ]],
+                parameterTypes=[outerLambdaType, I32Type],
+                variables=[
+                    self.makeVariable(
+                        Name(["f", LAMBDA_SUFFIX, RECEIVER_SUFFIX]),
+                        kind=PARAMETER, type=outerLambdaType, flags=frozenset([LET])),
+                    self.makeVariable(
+                        Name(["f", LAMBDA_SUFFIX, "x"]),
+                        kind=PARAMETER, type=I32Type, flags=frozenset([LET]))]))
+        self.checkFunction(
+            package,
+            self.makeSimpleFunction(
+                Name(["f", LAMBDA_SUFFIX, LAMBDA_SUFFIX]),
+                I32Type,
+                [[
+                    ldlocal(0),
+                    ldf(innerLambdaClass, xNameIndex),
+                    ldlocal(1),
+                    addi32(),
+                    ret(),
+                ]],
+                parameterTypes=[innerLambdaType, I32Type],
+                variables=[
+                    self.makeVariable(
+                        Name(["f", LAMBDA_SUFFIX, LAMBDA_SUFFIX, RECEIVER_SUFFIX]),
+                        kind=PARAMETER, type=innerLambdaType, flags=frozenset([LET])),
+                    self.makeVariable(
+                        Name(["f", LAMBDA_SUFFIX, LAMBDA_SUFFIX, "y"]),
+                        kind=PARAMETER, type=I32Type, flags=frozenset([LET])),
+                ]))
+
     def testUnreachableTry(self):
         exnTy = ClassType(getExceptionClass())
         source = "def f =\n" + \
@@ -3799,36 +4119,74 @@ class TestCompiler(TestCaseWithDefinitions):
                  "  def f =\n" + \
                  "    def g = this.x"
         package = self.compileFromSource(source)
-        closureClass = package.findClass(name=Name(["Foo", "f", "g", CLOSURE_SUFFIX]))
-        closureType = ClassType(closureClass)
-        contextNameIndex = package.findName(closureClass.fields[0].name)
-        contextClass = package.findClass(name=Name(["Foo", "f", CONTEXT_SUFFIX]))
-        thisNameIndex = package.findName(contextClass.fields[0].name)
+        self.assertIsNone(package.findClass(name=Name(["Foo", "f", "g", CLOSURE_SUFFIX])))
         Foo = package.findClass(name="Foo")
+        FooType = ClassType(Foo)
         xNameIndex = package.findName(Foo.fields[0].name)
         self.checkFunction(package,
                            self.makeSimpleFunction("Foo.f.g", I64Type, [[
                                ldlocal(0),
-                               ldf(closureClass, contextNameIndex),
-                               ldf(contextClass, thisNameIndex),
                                ldf(Foo, xNameIndex),
                                ret()
                              ]],
-                             variables=[self.makeVariable(Name(["Foo", "f", "g", RECEIVER_SUFFIX]),
-                                                          type=closureType,
+                             variables=[self.makeVariable(Name(["Foo", "f", RECEIVER_SUFFIX]),
+                                                          type=FooType,
                                                           kind=PARAMETER, flags=frozenset([LET]))],
-                             parameterTypes=[closureType],
-                             flags=frozenset([METHOD, PUBLIC, FINAL])))
+                             parameterTypes=[FooType]))
 
     def testCallClosure(self):
         source = "def foo(x: i64) =\n" + \
                  "  def bar = x\n" + \
                  "  bar"
         package = self.compileFromSource(source)
+        self.assertIsNone(package.findClass(name=Name(["foo", CONTEXT_SUFFIX])))
+        self.assertIsNone(package.findClass(name=Name(["foo", "bar", CLOSURE_SUFFIX])))
+        bar = package.findFunction(name="foo.bar")
+        self.checkFunction(package,
+                           self.makeSimpleFunction("foo", I64Type, [[
+                               ldlocal(0),
+                               callg(bar),
+                               ret()]],
+                             variables=[self.makeVariable("foo.x", type=I64Type,
+                                                          kind=PARAMETER, flags=frozenset([LET]))],
+                             parameterTypes=[I64Type]))
+        self.checkFunction(package,
+                           self.makeSimpleFunction("foo.bar", I64Type, [[
+                               ldlocal(0),
+                               ret()]],
+                             variables=[self.makeVariable("foo.x", type=I64Type,
+                                                          kind=PARAMETER, flags=frozenset([LET]))],
+                             parameterTypes=[I64Type]))
+
+    def testCallClosureWithArguments(self):
+        source = "def foo(var x: i64) =\n" + \
+                 "  def bar(y: i64) = x + y\n" + \
+                 "  x = 12\n" + \
+                 "  bar(34)"
+        package = self.compileFromSource(source)
+        bar = package.findFunction(name="foo.bar")
+        self.checkFunction(package,
+                           self.makeSimpleFunction("foo", I64Type, [[
+                               i64(12),
+                               stlocal(0),
+                               i64(34),
+                               ldlocal(0),
+                               callg(bar),
+                               ret()]],
+                             variables=[self.makeVariable("foo.x", type=I64Type,
+                                                          kind=PARAMETER)],
+                             parameterTypes=[I64Type]))
+        self.assertEquals([I64Type, I64Type], bar.parameterTypes)
+
+    def testCallClosureAssignsVar(self):
+        source = "def foo(var x: i64) =\n" + \
+                 "  def bar =\n" + \
+                 "    x = 12\n" + \
+                 "  bar\n" + \
+                 "  x"
+        package = self.compileFromSource(source)
         contextClass = package.findClass(name=Name(["foo", CONTEXT_SUFFIX]))
         contextType = ClassType(contextClass)
-        closureClass = package.findClass(name=Name(["foo", "bar", CLOSURE_SUFFIX]))
-        closureType = ClassType(closureClass)
         xNameIndex = package.findName(contextClass.fields[0].name)
         bar = package.findFunction(name="foo.bar")
         self.checkFunction(package,
@@ -3841,18 +4199,61 @@ class TestCompiler(TestCaseWithDefinitions):
                                ldlocal(0),
                                ldlocal(-1),
                                stf(contextClass, xNameIndex),
-                               allocobj(closureClass),
-                               dup(),
                                ldlocal(-1),
-                               callg(closureClass.constructors[0]),
-                               drop(),
-                               stlocal(-2),
-                               ldlocal(-2),
                                callg(bar),
+                               drop(),
+                               ldlocal(-1),
+                               ldf(contextClass, xNameIndex),
                                ret()]],
-                             variables=[self.makeVariable(Name(["foo", CONTEXT_SUFFIX]), type=contextType),
-                                        self.makeVariable("foo.bar", type=closureType)],
+                             variables=[self.makeVariable(Name(["foo", CONTEXT_SUFFIX]),
+                                                          type=contextType)],
                              parameterTypes=[I64Type]))
+        self.checkFunction(package,
+                           self.makeSimpleFunction("foo.bar", UnitType, [[
+                               i64(12),
+                               ldlocal(0),
+                               stf(contextClass, xNameIndex),
+                               unit(),
+                               ret()]],
+                             variables=[self.makeVariable(Name(["foo", "bar", CONTEXT_SUFFIX]),
+                                                          type=contextType, kind=PARAMETER,
+                                                          flags=frozenset([LET]))],
+                             parameterTypes=[contextType]))
+
+    def testCallClosureCapturesUninitializedVar(self):
+        source = "def foo =\n" + \
+                 "  var x: String\n" + \
+                 "  def bar = x\n" + \
+                 "  bar"
+        package = self.compileFromSource(source)
+        contextClass = package.findClass(name=Name(["foo", CONTEXT_SUFFIX]))
+        contextType = ClassType(contextClass)
+        xNameIndex = package.findName(contextClass.fields[0].name)
+        bar = package.findFunction(name="foo.bar")
+        self.checkFunction(package,
+                           self.makeSimpleFunction("foo", getStringType(), [[
+                               allocobj(contextClass),
+                               dup(),
+                               callg(contextClass.constructors[0]),
+                               drop(),
+                               stlocal(-1),
+                               uninitialized(),
+                               ldlocal(-1),
+                               stf(contextClass, xNameIndex),
+                               ldlocal(-1),
+                               callg(bar),
+                               ret()]],
+                             variables=[self.makeVariable(Name(["foo", CONTEXT_SUFFIX]),
+                                                          type=contextType)]))
+        self.checkFunction(package,
+                           self.makeSimpleFunction("foo.bar", getStringType(), [[
+                               ldlocal(0),
+                               ldf(contextClass, xNameIndex),
+                               ret()]],
+                             variables=[self.makeVariable(Name(["foo", "bar", CONTEXT_SUFFIX]),
+                                                          type=contextType, kind=PARAMETER,
+                                                          flags=frozenset([LET]))],
+                             parameterTypes=[contextType]))
 
     def testCallLambda(self):
         source = "def f = (lambda (x: i64) x)(12)"
@@ -3865,21 +4266,43 @@ class TestCompiler(TestCaseWithDefinitions):
                 "f",
                 I64Type,
                 [[
-                    allocobj(closureClass),
-                    dup(),
-                    callg(closureClass.constructors[0]),
-                    drop(),
+                    ldg(package.findGlobal(name=closureClass.name.withSuffix(INSTANCE_SUFFIX))),
                     i64(12),
                     callg(lambdaFunction),
                     ret(),
                 ]]))
 
+    def testCallLambdaInGenericFunction(self):
+        source = "def f[static T](x: T) = (lambda (y: T) y)(x)"
+        package = self.compileFromSource(source)
+        closureClass = package.findClass(name=Name(["f", LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
+        self.assertEquals(1, len(closureClass.typeParameters))
+        self.assertEquals([], package.globals)
+
     def testCallGlobal(self):
         source = "let g = lambda (x: i64) x\n" + \
                  "def f = g(12)"
         package = self.compileFromSource(source)
         g = package.findGlobal(name="g")
         call = package.findFunction(name=Name([LAMBDA_SUFFIX]))
+        closureClass = package.findClass(name=Name([LAMBDA_SUFFIX, CLOSURE_SUFFIX]))
+        instance = package.findGlobal(name=closureClass.name.withSuffix(INSTANCE_SUFFIX))
+        self.checkFunction(
+            package,
+            self.makeSimpleFunction(
+                PACKAGE_INIT_NAME,
+                UnitType,
+                [[
+                    allocobj(closureClass),
+                    dup(),
+                    callg(closureClass.constructors[0]),
+                    drop(),
+                    stg(instance),
+                    ldg(instance),
+                    stg(g),
+                    unit(),
+                    ret(),
+                ]]))
         self.checkFunction(
             package,
             self.makeSimpleFunction(
@@ -4246,39 +4669,16 @@ class TestCompiler(TestCaseWithDefinitions):
         package = self.compileFromSource(source)
         T = package.findTypeParameter(name="id-outer.T")
         Tty = VariableType(T)
-        idOuter = package.findFunction(name="id-outer")
-        contextClass = package.findClass(name=Name(["id-outer", CONTEXT_SUFFIX]))
-        xNameIndex = package.findName(contextClass.fields[0].name)
-        closureClass = package.findClass(name=Name(["id-outer", "id-inner", CLOSURE_SUFFIX]))
         idInner = package.findFunction(name="id-outer.id-inner")
         self.checkFunction(package, self.makeSimpleFunction(
             "id-outer", Tty, [[
-                tys(0),
-                allocobj(contextClass),
-                dup(),
-                tys(0),
-                callg(contextClass.constructors[0]),
-                drop(),
-                stlocal(-1),
                 ldlocal(0),
-                ldlocal(-1),
-                stf(contextClass, xNameIndex),
-                tys(0),
-                allocobj(closureClass),
-                dup(),
-                ldlocal(-1),
-                tys(0),
-                callg(closureClass.constructors[0]),
-                drop(),
-                stlocal(-2),
-                ldlocal(-2),
                 tys(0),
                 callg(idInner),
                 ret()
             ]],
-            variables=[self.makeVariable(Name(["id-outer", CONTEXT_SUFFIX]),
-                                         type=ClassType(contextClass)),
-                       self.makeVariable("id-outer.id-inner", type=ClassType(closureClass))],
+            variables=[self.makeVariable("id-outer.x", type=Tty,
+                                         kind=PARAMETER, flags=frozenset([LET]))],
             typeParameters=[T],
             parameterTypes=[Tty],
             instTypes=[Tty]))
@@ -4718,5 +5118,52 @@ class TestCompiler(TestCaseWithDefinitions):
             instTypes=[VariableType(S), VariableType(T)]))
 
 
+class TestStreaming(unittest.TestCase):
+    SOURCE = "class Box(value: i64)\n" + \
+             "  def get = value\n" + \
+             "def sum(n: i64, acc: i64): i64 =\n" + \
+             "  if (n == 0) acc else sum(n - 1, acc + n)\n" + \
+             "def f(x: i64) =\n" + \
+             "  let box = Box(x)\n" + \
+             "  let g = lambda (y: i64) box.get + y\n" + \
+             "  def h(z: i64) = g(z) * 2\n" + \
+             "  h(sum(x, 0))\n" + \
+             "let y = f(3)\n"
+
+    def compileAndSerialize(self, streaming):
+        filename = "(test)"
+        ast_ = parse(filename, lex(filename, self.SOURCE))
+        package = Package(id=TARGET_PACKAGE_ID, name=Name(["test"]))
+        info = CompileInfo(ast_, package, FakePackageLoader([]), isUsingStd=False)
+        analyzeDeclarations(info)
+        analyzeTypeDeclarations(info)
+        analyzeInheritance(info)
+        analyzeTypes(info)
+        convertClosures(info)
+        externalize(info)
+        compile(info, streaming=streaming)
+        eliminateTailCalls(info)
+        return package, info, str(Serializer(package).serialize())
+
+    def testSameOutput(self):
+        _, _, expected = self.compileAndSerialize(False)
+        _, _, actual = self.compileAndSerialize(True)
+        self.assertEquals(expected, actual)
+
+    def testReleaseFunctions(self):
+        _, fullInfo, _ = self.compileAndSerialize(False)
+        package, info, _ = self.compileAndSerialize(True)
+        for function in package.functions:
+            self.assertIsNone(function.blocks)
+            self.assertIsNone(function.instTypes)
+            self.assertIsNotNone(function.encodedBody)
+            if isinstance(function.astDefn, (ast.FunctionDefinition, ast.LambdaExpression)):
+                self.assertIsNone(function.astDefn.body)
+        # Information about parameters and global initializers is kept.
+        self.assertLess(len(info.typeInfo), len(fullInfo.typeInfo))
+        self.assertLess(len(info.useInfo), len(fullInfo.useInfo))
+        self.assertLess(len(info.callInfo), len(fullInfo.callInfo))
+
+
 if __name__ == "__main__":
     unittest.main()
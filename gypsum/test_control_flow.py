@@ -0,0 +1,166 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import unittest
+
+from control_flow import *
+from ir_instructions import *
+
+
+def makeBlocks(*instructionLists):
+    return [BasicBlock(id, insts) for id, insts in enumerate(instructionLists)]
+
+
+class TestControlFlow(unittest.TestCase):
+    def makeDiamond(self):
+        return makeBlocks([true(), branchif(1, 2)],
+                          [i64(1), branch(3)],
+                          [i64(2), branch(3)],
+                          [ret()])
+
+    def makeLoop(self):
+        # while (x) { y } with x in slot -1.
+        return makeBlocks([branch(1)],
+                          [ldlocal(-1), branchif(2, 3)],
+                          [unit(), stlocal(-1), branch(1)],
+                          [unit(), ret()])
+
+    def testReversePostOrderDiamond(self):
+        cfg = ControlFlowGraph(self.makeDiamond())
+        self.assertEquals([0, 1, 2, 3], cfg.reversePostOrder())
+
+    def testReversePostOrderSkipsUnreachable(self):
+        blocks = makeBlocks([branch(2)],
+                            [unit(), ret()],
+                            [unit(), ret()],
+                            [])
+        cfg = ControlFlowGraph(blocks)
+        self.assertEquals([0, 2], cfg.reversePostOrder())
+        self.assertFalse(cfg.isReachable(1))
+        self.assertFalse(cfg.isReachable(3))
+        self.assertEquals((), cfg.successorIds(3))
+
+    def testReversePostOrderLongChain(self):
+        count = 20000
+        blocks = makeBlocks(*([[branch(i + 1)] for i in xrange(count - 1)] +
+                              [[unit(), ret()]]))
+        cfg = ControlFlowGraph(blocks)
+        self.assertEquals(range(count), cfg.reversePostOrder())
+        self.assertEquals(count - 2, cfg.immediateDominator(count - 1))
+
+    def testPredecessors(self):
+        cfg = ControlFlowGraph(self.makeDiamond())
+        self.assertEquals([], cfg.predecessorIds(0))
+        self.assertEquals([0], cfg.predecessorIds(1))
+        self.assertEquals([1, 2], sorted(cfg.predecessorIds(3)))
+
+    def testPredecessorsDuplicateEdge(self):
+        blocks = makeBlocks([true(), branchif(1, 1)],
+                            [unit(), ret()])
+        cfg = ControlFlowGraph(blocks)
+        self.assertEquals([0], cfg.predecessorIds(1))
+
+    def testDominators(self):
+        cfg = ControlFlowGraph(self.makeDiamond())
+        self.assertEquals(0, cfg.immediateDominator(0))
+        self.assertEquals(0, cfg.immediateDominator(1))
+        self.assertEquals(0, cfg.immediateDominator(2))
+        self.assertEquals(0, cfg.immediateDominator(3))
+        self.assertTrue(cfg.dominates(0, 3))
+        self.assertTrue(cfg.dominates(3, 3))
+        self.assertFalse(cfg.dominates(1, 3))
+        self.assertFalse(cfg.dominates(3, 0))
+
+    def testLoops(self):
+        cfg = ControlFlowGraph(self.makeLoop())
+        loops = cfg.loops()
+        self.assertEquals(1, len(loops))
+        self.assertEquals(1, loops[0].headerId)
+        self.assertEquals(set([2]), loops[0].backEdgeSourceIds)
+        self.assertEquals(frozenset([1, 2]), loops[0].blockIds)
+
+    def testNoLoops(self):
+        cfg = ControlFlowGraph(self.makeDiamond())
+        self.assertEquals([], cfg.loops())
+
+    def testStackHeights(self):
+        blocks = makeBlocks([i64(1), pushtry(1, 2)],
+                            [i64(2), poptry(3)],
+                            [drop(), i64(3), branch(3)],
+                            [addi64(), ret()],
+                            [ret()])
+        cfg = ControlFlowGraph(blocks)
+        self.assertEquals([0, 1, 2, 2, None], cfg.stackHeights())
+
+    def testHandlerStack(self):
+        blocks = makeBlocks([pushtry(1, 4)],
+                            [pushtry(2, 3)],
+                            [poptry(5)],
+                            [drop(), branch(5)],
+                            [drop(), unit(), ret()],
+                            [poptry(6)],
+                            [unit(), ret()])
+        cfg = ControlFlowGraph(blocks)
+        self.assertEquals((), cfg.handlerStack(0))
+        self.assertEquals((4,), cfg.handlerStack(1))
+        self.assertEquals((4, 3), cfg.handlerStack(2))
+        self.assertEquals((4,), cfg.handlerStack(3))
+        self.assertEquals((), cfg.handlerStack(4))
+        self.assertEquals((4,), cfg.handlerStack(5))
+        self.assertEquals((), cfg.handlerStack(6))
+
+    def testLiveLocals(self):
+        cfg = ControlFlowGraph(self.makeLoop())
+        liveIn, liveOut = cfg.liveLocals()
+        self.assertEquals(frozenset([-1]), liveIn[0])
+        self.assertEquals(frozenset([-1]), liveIn[1])
+        self.assertEquals(frozenset(), liveIn[2])
+        self.assertEquals(frozenset([-1]), liveOut[2])
+        self.assertEquals(frozenset(), liveIn[3])
+
+    def testLiveLocalsThroughHandler(self):
+        blocks = makeBlocks([pushtry(1, 2)],
+                            [unit(), stlocal(-2), poptry(3)],
+                            [drop(), ldlocal(-1), ret()],
+                            [ldlocal(-2), ret()])
+        cfg = ControlFlowGraph(blocks)
+        liveIn, _ = cfg.liveLocals()
+        self.assertEquals(frozenset([-1]), liveIn[0])
+        self.assertEquals(frozenset([-1]), liveIn[1])
+
+    def testLabelTargets(self):
+        blocks = makeBlocks([label(1), branch(1)],
+                            [branchl(2)],
+                            [unit(), ret()])
+        cfg = ControlFlowGraph(blocks)
+        self.assertEquals(set([1]), cfg.labelTargetIds())
+
+    def testReorderBlocks(self):
+        blocks = makeBlocks([label(3), branch(2)],
+                            [label(1), branch(2)],
+                            [branchl(3)],
+                            [unit(), ret()])
+        cfg = ControlFlowGraph(blocks)
+        order = cfg.reversePostOrder()
+        self.assertEquals([0, 2, 3], order)
+        reordered = reorderBlocks(blocks, order)
+        self.assertEquals(makeBlocks([label(2), branch(1)],
+                                     [branchl(2)],
+                                     [unit(), ret()]),
+                          reordered)
+
+    def testReorderBlocksDropsLabel(self):
+        blocks = makeBlocks([label(2), branch(1)],
+                            [unit(), ret()],
+                            [unit(), ret()])
+        reordered = reorderBlocks(blocks, ControlFlowGraph(blocks).reversePostOrder())
+        self.assertEquals(makeBlocks([label(-1), branch(1)],
+                                     [unit(), ret()]),
+                          reordered)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -9,6 +9,7 @@ import unittest
 import ast
 from lexer import *
 from parser import *
+from builtins import getStringClass
 from compile_info import *
 from scope_analysis import *
 from ir import *
@@ -706,6 +707,55 @@ class TestDeclarationAnalysis(TestCaseWithDefinitions):
         self.assertEquals([0, 1, 2, 3], [p.index for p in [A, B, C, D]])
 
 
+    def testBuiltinScopesSharedBetweenCompiles(self):
+        info1 = self.analyzeFromSource("def f = 12")
+        info2 = self.analyzeFromSource("def f = 12")
+        stringClass = getStringClass()
+        scope1 = info1.getScope(stringClass.id)
+        scope2 = info2.getScope(stringClass.id)
+        self.assertIsNot(scope1, scope2)
+        self.assertIs(scope1.scopeId, scope2.scopeId)
+        self.assertIs(scope1.bindings["+"], scope2.bindings["+"])
+        self.assertEquals(scope1.flatMethods, scope2.flatMethods)
+
+        method = Function(Name(["String", "+"]), None, sourceName="+",
+                          flags=frozenset([PUBLIC, METHOD]))
+        scope2.bind("+", DefnInfo(method, scope2.scopeId, True))
+        self.assertEquals(len(scope1.bindings["+"].overloads) + 1,
+                          len(scope2.bindings["+"].overloads))
+        info3 = self.analyzeFromSource("def f = 12")
+        self.assertIs(scope1.bindings["+"], info3.getScope(stringClass.id).bindings["+"])
+
+    def testForeignScopesSharedWithSameLoader(self):
+        package = Package(name=Name(["foo"]))
+        clas = package.addClass(Name(["C"]), sourceName="C", typeParameters=[],
+                                supertypes=[getRootClassType()], fields=[],
+                                flags=frozenset([PUBLIC]))
+        method = package.addFunction(Name(["C", "m"]), sourceName="m", returnType=UnitType,
+                                     typeParameters=[], parameterTypes=[ClassType(clas)],
+                                     flags=frozenset([PUBLIC, METHOD, EXTERN]))
+        clas.methods = [method]
+        packageLoader = FakePackageLoader([package])
+        source = "def f = 12"
+        info1 = self.analyzeFromSource(source, packageLoader=packageLoader)
+        info2 = self.analyzeFromSource(source, packageLoader=packageLoader)
+        packageScope1 = info1.getScope(PACKAGE_SCOPE_ID).scopeForPrefix("foo", NoLoc)
+        packageScope2 = info2.getScope(PACKAGE_SCOPE_ID).scopeForPrefix("foo", NoLoc)
+        self.assertIs(packageScope1.scopeId, packageScope2.scopeId)
+        self.assertIs(packageScope1.bindings["C"], packageScope2.bindings["C"])
+        classScope1 = NonLocalObjectTypeDefnScope.ensureForDefn(clas, info1)
+        classScope2 = NonLocalObjectTypeDefnScope.ensureForDefn(clas, info2)
+        self.assertIsNot(classScope1, classScope2)
+        defnInfo = classScope2.lookupFromSelf("m", NoLoc).getDefnInfo()
+        self.assertIs(method, defnInfo.irDefn)
+        self.assertIs(classScope2.scopeId, defnInfo.scopeId)
+        self.assertIs(classScope1.bindings["m"], classScope2.bindings["m"])
+
+        otherInfo = self.analyzeFromSource(source, packageLoader=FakePackageLoader([package]))
+        otherScope = NonLocalObjectTypeDefnScope.ensureForDefn(clas, otherInfo)
+        self.assertIsNot(classScope1.bindings["m"], otherScope.bindings["m"])
+
+
 class TestPackageScope(unittest.TestCase):
     def infoAndScopeWithPackageNames(self, args):
         packageNameFromString = lambda s: Name.fromString(s, isPackageName=True)
@@ -0,0 +1,103 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from __init__ import compilePackage
+from definition_cache import DefinitionCache
+from errors import ScopeException
+from ir import Name, PackageVersion
+from serialize import Serializer
+from utils_test import FakePackageLoader
+
+
+SOURCE = """def add(x: i64, y: i64) = x + y
+
+def twice(x: i64) = add(x, x)
+
+def describe(x: i64) = twice(x).to-string
+
+class Counter
+  var count = 0
+
+  def increment =
+    count += 1
+    count
+
+  def advance(n: i64) = count + n
+
+def outer(n: i64) =
+  def inner(x: i64) = x + n
+  inner(n)
+"""
+
+
+class TestDefinitionCache(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.dirName, "definitions")
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def compile(self, source, definitionCache=None):
+        package = compilePackage([("foo.gy", source)], Name(["foo"]), PackageVersion([1]),
+                                 FakePackageLoader([]), isUsingStd=False,
+                                 definitionCache=definitionCache)
+        return str(Serializer(package).serialize())
+
+    def checkCompile(self, source, expectedRestored, expectedRecorded):
+        cache = DefinitionCache(self.fileName)
+        data = self.compile(source, cache)
+        cache.save([])
+        self.assertEquals(self.compile(source), data)
+        self.assertEquals((expectedRestored, expectedRecorded),
+                          (cache.restoredCount, cache.recordedCount))
+        return cache
+
+    def testRestoreUnchanged(self):
+        self.checkCompile(SOURCE, 0, 5)
+        cache = self.checkCompile(SOURCE, 5, 0)
+        self.assertEquals(5, cache.restoredCodeCount)
+
+    def testReanalyzeEditedBody(self):
+        self.checkCompile(SOURCE, 0, 5)
+        self.checkCompile(SOURCE.replace("count += 1", "count += 2"), 4, 1)
+
+    def testReanalyzeDependentsOfChangedSignature(self):
+        self.checkCompile(SOURCE, 0, 5)
+        edited = SOURCE.replace("def add(x: i64, y: i64) = x + y",
+                                "def add(x: i64, y: i32) = x + y.to-i64") \
+                       .replace("add(x, x)", "add(x, 1i32)")
+        self.checkCompile(edited, 3, 2)
+
+    def testChangedInferredType(self):
+        self.checkCompile(SOURCE, 0, 5)
+        edited = SOURCE.replace("def twice(x: i64) = add(x, x)",
+                                "def twice(x: i64) = add(x, x).to-i32")
+        self.checkCompile(edited, 0, 5)
+        self.checkCompile(edited, 5, 0)
+
+    def testNewDefinition(self):
+        self.checkCompile(SOURCE, 0, 5)
+        self.checkCompile("def zero = 0\n\n" + SOURCE, 5, 1)
+
+    def testDiscardIncompatibleFile(self):
+        with open(self.fileName, "w") as f:
+            f.write("garbage")
+        self.checkCompile(SOURCE, 0, 5)
+        self.checkCompile(SOURCE, 5, 0)
+
+    def testErrorBeforeTypeAnalysis(self):
+        cache = DefinitionCache(self.fileName)
+        self.assertRaises(ScopeException, self.compile, "def f = g", cache)
+
+
+if __name__ == "__main__":
+    unittest.main()
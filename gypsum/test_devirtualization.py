@@ -0,0 +1,153 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import unittest
+
+from compile_info import CompileInfo
+from compiler import compile
+from devirtualization import Devirtualizer
+from externalization import externalize
+from ids import TARGET_PACKAGE_ID
+from inheritance_analysis import analyzeInheritance
+from inlining import inlineFunctions
+from ir import Package
+from ir_instructions import *
+from lexer import lex
+from name import Name
+from parser import parse
+from scope_analysis import analyzeDeclarations, convertClosures
+from type_analysis import analyzeTypeDeclarations, analyzeTypes
+from utils_test import FakePackageLoader
+
+
+class TestDevirtualization(unittest.TestCase):
+    def compileFromSource(self, source):
+        filename = "(test)"
+        tokens = lex(filename, source)
+        ast = parse(filename, tokens)
+        package = Package(id=TARGET_PACKAGE_ID, name=Name(["test"]))
+        info = CompileInfo(ast, package, FakePackageLoader([]), isUsingStd=False)
+        analyzeDeclarations(info)
+        analyzeTypeDeclarations(info)
+        analyzeInheritance(info)
+        analyzeTypes(info)
+        convertClosures(info)
+        externalize(info)
+        self.devirtualizer = Devirtualizer(package)
+        compile(info, self.devirtualizer)
+        self.info = info
+        return package
+
+    def getInstructions(self, package, name):
+        function = package.findFunction(name=name)
+        return [block.instructions for block in function.blocks]
+
+    def getMethod(self, package, className, methodName):
+        return package.findFunction(name=Name([className, methodName]))
+
+    def checkCall(self, source, className, methodName, isDirect, callerName="g"):
+        package = self.compileFromSource(source)
+        method = self.getMethod(package, className, methodName)
+        call = callg(method) if isDirect else callv(method)
+        self.assertEquals([[ldlocal(0), call, ret()]],
+                          self.getInstructions(package, callerName))
+
+    def testFinalReceiverClass(self):
+        source = "public class A\n" + \
+                 "  def f = 12\n" + \
+                 "public final class B <: A\n" + \
+                 "def g(b: B) = b.f"
+        self.checkCall(source, "A", "f", True)
+
+    def testFinalReceiverClassOverride(self):
+        source = "public class A\n" + \
+                 "  def f = 12\n" + \
+                 "public final class B <: A\n" + \
+                 "  override def f = 34\n" + \
+                 "def g(b: B) = b.f"
+        self.checkCall(source, "B", "f", True)
+
+    def testClosedClassNotOverridden(self):
+        source = "class A\n" + \
+                 "  def f = 12\n" + \
+                 "class B <: A\n" + \
+                 "def g(a: A) = a.f"
+        self.checkCall(source, "A", "f", True)
+
+    def testClosedClassOverridden(self):
+        source = "class A\n" + \
+                 "  def f = 12\n" + \
+                 "class B <: A\n" + \
+                 "  override def f = 34\n" + \
+                 "def g(a: A) = a.f"
+        self.checkCall(source, "A", "f", False)
+
+    def testPublicClass(self):
+        source = "public class A\n" + \
+                 "  def f = 12\n" + \
+                 "def g(a: A) = a.f"
+        self.checkCall(source, "A", "f", False)
+
+    def testPublicFinalClass(self):
+        source = "public final class A\n" + \
+                 "  def f = 12\n" + \
+                 "def g(a: A) = a.f"
+        self.checkCall(source, "A", "f", True)
+
+    def testClosedTrait(self):
+        source = "trait T\n" + \
+                 "  def f = 12\n" + \
+                 "class C <: T\n" + \
+                 "def g(t: T) = t.f"
+        self.checkCall(source, "T", "f", True)
+
+    def testPublicTrait(self):
+        source = "public trait T\n" + \
+                 "  def f = 12\n" + \
+                 "class C <: T\n" + \
+                 "def g(t: T) = t.f"
+        self.checkCall(source, "T", "f", False)
+
+    def testAbstractMethod(self):
+        source = "abstract class A\n" + \
+                 "  abstract def f: i64\n" + \
+                 "def g(a: A) = a.f"
+        self.checkCall(source, "A", "f", False)
+
+    def testNullableReceiver(self):
+        source = "final class A\n" + \
+                 "  def f = 12\n" + \
+                 "def g(a: A?) = a.f"
+        self.checkCall(source, "A", "f", False)
+
+    def testReport(self):
+        source = "class A\n" + \
+                 "  def f = 12\n" + \
+                 "  def h = 34\n" + \
+                 "class B <: A\n" + \
+                 "  override def h = 56\n" + \
+                 "def g(a: A) = a.f + a.f + a.h"
+        self.compileFromSource(source)
+        self.assertEquals(3, self.devirtualizer.callCount)
+        self.assertEquals(2, self.devirtualizer.convertedCount())
+        self.assertEquals("devirtualized 2 of 3 virtual call sites\n" +
+                          "  A.f(C:A): 2\n",
+                          self.devirtualizer.report())
+
+    def testDevirtualizedCallInlined(self):
+        source = "class A(x: i64)\n" + \
+                 "  def f = x\n" + \
+                 "def g(a: A) = a.f"
+        package = self.compileFromSource(source)
+        self.assertEquals(2, inlineFunctions(self.info))
+        A = package.findClass(name="A")
+        xNameIndex = package.findName(Name(["A", "x"]))
+        self.assertEquals([[ldlocal(0), stlocal(-1), ldlocal(-1), ldf(A, xNameIndex), ret()]],
+                          self.getInstructions(package, "g"))
+
+
+if __name__ == "__main__":
+    unittest.main()
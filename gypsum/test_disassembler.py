@@ -0,0 +1,62 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import StringIO
+import unittest
+
+from disassembler import disassemble, findFunctions
+import ids
+import ir
+import ir_instructions
+import ir_types
+from name import Name
+
+
+class TestDisassembler(unittest.TestCase):
+    def setUp(self):
+        self.package = ir.Package(id=ids.TARGET_PACKAGE_ID)
+        self.package.buildNameIndex()
+        self.g = self.package.addFunction(Name(["g"]), returnType=ir_types.I64Type,
+                                          typeParameters=[],
+                                          parameterTypes=[ir_types.I64Type],
+                                          flags=frozenset())
+        self.g.blocks = [ir_instructions.BasicBlock(0, [ir_instructions.ldlocal(0),
+                                                        ir_instructions.ret()])]
+        self.f = self.package.addFunction(Name(["f"]), returnType=ir_types.I64Type,
+                                          typeParameters=[], parameterTypes=[],
+                                          flags=frozenset())
+        self.f.blocks = [ir_instructions.BasicBlock(0, [ir_instructions.i64(12),
+                                                        ir_instructions.callg(self.g),
+                                                        ir_instructions.ret()])]
+        self.h = self.package.addFunction(Name(["h[i64]"]), returnType=ir_types.UnitType,
+                                          typeParameters=[],
+                                          parameterTypes=[ir_types.I64Type],
+                                          flags=frozenset())
+
+    def testDisassembleFunction(self):
+        out = StringIO.StringIO()
+        disassemble(self.package, out, [self.f])
+        self.assertEquals("def f(): i64 =\n" +
+                          "0:\n" +
+                          "  i64 12\n" +
+                          "  callg 0  // g\n" +
+                          "  ret \n" +
+                          "\n",
+                          out.getvalue())
+
+    def testDisassembleWithoutBody(self):
+        out = StringIO.StringIO()
+        disassemble(self.package, out, [self.h])
+        self.assertEquals("def h[i64](i64): unit\n\n", out.getvalue())
+
+    def testFindFunctions(self):
+        functions, missing = findFunctions(self.package, ["f", "h", "x"])
+        self.assertEquals([self.f, self.h], functions)
+        self.assertEquals(["x"], missing)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import unittest
+
+from builtins import getRootClass
+from compile_info import CompileInfo
+from compiler import compile
+from externalization import externalize
+from ids import TARGET_PACKAGE_ID
+from inheritance_analysis import analyzeInheritance
+from inlining import inlineFunctions
+from ir import LOCAL, Package
+from ir_instructions import *
+from lexer import lex
+from name import INLINE_SUFFIX, Name
+from parser import parse
+from scope_analysis import analyzeDeclarations, convertClosures
+from type_analysis import analyzeTypeDeclarations, analyzeTypes
+from utils_test import FakePackageLoader
+
+
+class TestInlining(unittest.TestCase):
+    def compileFromSource(self, source, budget=None):
+        filename = "(test)"
+        tokens = lex(filename, source)
+        ast = parse(filename, tokens)
+        package = Package(id=TARGET_PACKAGE_ID, name=Name(["test"]))
+        info = CompileInfo(ast, package, FakePackageLoader([]), isUsingStd=False)
+        analyzeDeclarations(info)
+        analyzeTypeDeclarations(info)
+        analyzeInheritance(info)
+        analyzeTypes(info)
+        convertClosures(info)
+        externalize(info)
+        compile(info)
+        if budget is None:
+            self.count = inlineFunctions(info)
+        else:
+            self.count = inlineFunctions(info, budget)
+        return info.package
+
+    def getInstructions(self, package, name):
+        function = package.findFunction(name=name)
+        return [block.instructions for block in function.blocks]
+
+    def getInlineVariables(self, package, name):
+        function = package.findFunction(name=name)
+        return [v for v in function.variables
+                if v.kind is LOCAL and v.name.short().endswith(INLINE_SUFFIX)]
+
+    def testInlineConstant(self):
+        source = "def f = 12\n" + \
+                 "def g = f"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+        self.assertEquals([[i64(12), ret()]], self.getInstructions(package, "g"))
+
+    def testInlineParameters(self):
+        source = "def f(x: i64, y: i64) = x - y\n" + \
+                 "def g = f(1, 2)"
+        package = self.compileFromSource(source)
+        self.assertEquals([[i64(1), i64(2),
+                            stlocal(-2), stlocal(-1),
+                            ldlocal(-1), ldlocal(-2), subi64(),
+                            ret()]],
+                          self.getInstructions(package, "g"))
+        function = package.findFunction(name="g")
+        self.assertEquals(2, len(self.getInlineVariables(package, "g")))
+        self.assertEquals([-1, -2], [v.index for v in function.variables])
+
+    def testInlineAfterLocals(self):
+        source = "def f(x: i64) = x\n" + \
+                 "def g =\n" + \
+                 "  let y = 1\n" + \
+                 "  f(y)"
+        package = self.compileFromSource(source)
+        self.assertEquals([[i64(1), stlocal(-1),
+                            ldlocal(-1), stlocal(-2), ldlocal(-2),
+                            ret()]],
+                          self.getInstructions(package, "g"))
+
+    def testInlineMultipleBlocks(self):
+        source = "def abs(n: i64) = if (n < 0) -n else n\n" + \
+                 "def g(n: i64) = abs(n) + 1"
+        package = self.compileFromSource(source)
+        self.assertEquals([[ldlocal(0), stlocal(-1),
+                            ldlocal(-1), i64(0), lti64(), branchif(1, 2)],
+                           [ldlocal(-1), negi64(), branch(3)],
+                           [ldlocal(-1), branch(3)],
+                           [branch(4)],
+                           [i64(1), addi64(), ret()]],
+                          self.getInstructions(package, "g"))
+
+    def testInlineTransitive(self):
+        source = "def f = 12\n" + \
+                 "def g = f\n" + \
+                 "def h = g"
+        package = self.compileFromSource(source)
+        self.assertEquals([[i64(12), ret()]], self.getInstructions(package, "h"))
+
+    def testInlineGenericSubstitutesTypes(self):
+        source = "class C\n" + \
+                 "def f[static T](x: T) = x\n" + \
+                 "def g(c: C) = f[C](c)"
+        package = self.compileFromSource(source)
+        self.assertEquals([[ldlocal(0), stlocal(-1), ldlocal(-1), ret()]],
+                          self.getInstructions(package, "g"))
+        var = self.getInlineVariables(package, "g")[0]
+        self.assertEquals(package.findFunction(name="g").parameterTypes[0], var.type)
+
+    def testInlineFinalMethod(self):
+        source = "final class C(x: i64)\n" + \
+                 "  final def get = x\n" + \
+                 "def g(c: C) = c.get"
+        package = self.compileFromSource(source)
+        C = package.findClass(name="C")
+        xNameIndex = package.findName(Name(["C", "x"]))
+        self.assertEquals([[ldlocal(0), stlocal(-1), ldlocal(-1), ldf(C, xNameIndex), ret()]],
+                          self.getInstructions(package, "g"))
+
+    def testNoInlineRecursive(self):
+        source = "def f(n: i64): i64 = if (n == 0) 0 else f(n - 1)\n" + \
+                 "def g = f(3)"
+        package = self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testNoInlineMutuallyRecursive(self):
+        source = "def f(n: i64): i64 = if (n == 0) 0 else g(n - 1)\n" + \
+                 "def g(n: i64): i64 = if (n == 0) 1 else f(n - 1)\n" + \
+                 "def h = f(3)"
+        package = self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testNoInlineOverBudget(self):
+        source = "def f(x: i64) = x + 1\n" + \
+                 "def g = f(1)"
+        self.compileFromSource(source, budget=2)
+        self.assertEquals(0, self.count)
+        self.compileFromSource(source, budget=4)
+        self.assertEquals(1, self.count)
+
+    def testNoInlineTry(self):
+        source = "def f = try 12 catch\n" + \
+                 "  case _ => 34\n" + \
+                 "def g = f"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testNoInlineFinally(self):
+        source = "def f = try 12 finally 34\n" + \
+                 "def g = f"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testNoInlineNative(self):
+        source = "native def f: i64\n" + \
+                 "def g = f"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testNoInlineVirtual(self):
+        source = "class C\n" + \
+                 "  def f = 12\n" + \
+                 "def g(c: C) = c.f"
+        package = self.compileFromSource(source)
+        f = package.findFunction(name=Name(["C", "f"]))
+        self.assertEquals([[ldlocal(0), callv(f), ret()]],
+                          self.getInstructions(package, "g"))
+
+    def testInlineInitializerIntoConstructor(self):
+        source = "class C"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+        rootCtor = getRootClass().constructors[0]
+        self.assertEquals([[ldlocal(0), callg(rootCtor), drop(),
+                            ldlocal(0), stlocal(-1), unit(), drop(),
+                            unit(), ret()]],
+                          self.getInstructions(package, Name(["C", "$constructor"])))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import json
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from ir import Name, PackageVersion
+from location import NoLoc
+from package_builder import *
+from package_builder import sortSpecs
+from package_loader import PackageLoader
+
+
+class TestPackageBuilder(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def makeSpec(self, name, depNames=(), source=""):
+        sourceFileName = os.path.join(self.dirName, name + ".gy")
+        with open(sourceFileName, "w") as f:
+            f.write(source)
+        return PackageSpec(Name([name]), PackageVersion([1]), [sourceFileName],
+                           [Name([d]) for d in depNames], False, False,
+                           os.path.join(self.dirName, "%s-1.csp" % name))
+
+    def testSortSpecs(self):
+        specs = [self.makeSpec("a", ["b", "c"]), self.makeSpec("b", ["c"]),
+                 self.makeSpec("c")]
+        self.assertEquals(["c", "b", "a"], [str(s.name) for s in sortSpecs(specs)])
+
+    def testSortSpecsCycle(self):
+        specs = [self.makeSpec("a", ["b"]), self.makeSpec("b", ["a"])]
+        self.assertRaises(IOError, sortSpecs, specs)
+
+    def testReadManifest(self):
+        self.makeSpec("foo")
+        manifestFileName = os.path.join(self.dirName, "manifest.json")
+        with open(manifestFileName, "w") as f:
+            json.dump({"packages": [{"name": "foo", "sources": ["*.gy"], "version": "1.2",
+                                     "deps": ["std.io"], "optimize": True}]}, f)
+        spec, = readManifest(manifestFileName, "out")
+        self.assertEquals(Name(["foo"]), spec.name)
+        self.assertEquals(PackageVersion([1, 2]), spec.version)
+        self.assertEquals([os.path.join(self.dirName, "foo.gy")], spec.sourceFileNames)
+        self.assertEquals([Name(["std", "io"])], spec.depNames)
+        self.assertTrue(spec.isUsingStd)
+        self.assertTrue(spec.optimize)
+        self.assertEquals(os.path.join("out", "foo-1.2.csp"), spec.outputFileName)
+
+    def testBuildSeriallyUsesCompiledPackages(self):
+        specs = [self.makeSpec("foo", source="public def f = 12\n"),
+                 self.makeSpec("bar", ["foo"], "def g = foo.f() + 1\n"),
+                 self.makeSpec("baz", ["foo", "bar"], "def h = foo.f()\n")]
+        loader = BuildPackageLoader(None, specs)
+        compiledPackages = []
+        loader.addLoadHook(compiledPackages.append)
+        builder = PackageBuilder(specs)
+        for spec in builder.specs:
+            self.assertIsNone(buildPackage(spec, loader, builder.specsByName))
+            self.assertTrue(os.path.exists(spec.outputFileName))
+        self.assertEquals(["foo", "bar", "baz"], [str(p.name) for p in compiledPackages])
+        foo = loader.loadPackage(Name(["foo"]), NoLoc)
+        self.assertIs(compiledPackages[0], foo)
+        self.assertIs(foo, compiledPackages[2].dependencies[0].package)
+
+        # The written package can be loaded normally.
+        bar = PackageLoader([self.dirName]).loadPackage(Name(["bar"]), NoLoc)
+        self.assertEquals(Name(["foo"]), bar.dependencies[0].name)
+
+    def testBuildError(self):
+        specs = [self.makeSpec("foo", source="def f = undefined\n"),
+                 self.makeSpec("bar", ["foo"])]
+        errors = PackageBuilder(specs).build()
+        self.assertEquals(1, len(errors))
+        self.assertFalse(os.path.exists(specs[1].outputFileName))
+
+
+if __name__ == "__main__":
+    unittest.main()
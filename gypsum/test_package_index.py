@@ -0,0 +1,123 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from flags import LET, METHOD, PUBLIC, STATIC
+import ids
+import ir
+import ir_instructions
+import ir_types
+from name import CONSTRUCTOR_SUFFIX, Name
+from package_index import ExportIndex, indexFileName
+import serialize
+import utils_test
+
+
+class TestPackageIndex(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.fileName = os.path.join(self.dirName, "foo-1.csp")
+        self.loader = utils_test.FakePackageLoader([])
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def makePackage(self):
+        package = ir.Package(ids.TARGET_PACKAGE_ID, Name(["foo"]))
+        package.buildNameIndex()
+        rootType = ir_types.getRootClassType()
+        package.addGlobal(Name(["g"]), sourceName="g", type=ir_types.I64Type,
+                          flags=frozenset([PUBLIC, LET]))
+        package.addGlobal(Name(["h"]), sourceName="h", type=ir_types.I64Type,
+                          flags=frozenset([LET]))
+        clas = package.addClass(Name(["C"]), sourceName="C", typeParameters=[],
+                                supertypes=[rootType], constructors=[], fields=[],
+                                methods=[], flags=frozenset([PUBLIC]))
+        classType = ir_types.ClassType(clas)
+        ctor = package.addFunction(Name(["C", CONSTRUCTOR_SUFFIX]),
+                                   returnType=ir_types.UnitType, typeParameters=[],
+                                   parameterTypes=[classType], variables=[],
+                                   flags=frozenset([PUBLIC, METHOD]), instTypes=[])
+        ctor.blocks = [ir_instructions.BasicBlock(0, [ir_instructions.unit(),
+                                                      ir_instructions.ret()])]
+        ctor.definingClass = clas
+        clas.constructors = [ctor]
+        f = package.addFunction(Name(["f"]), sourceName="f", returnType=ir_types.UnitType,
+                                typeParameters=[], parameterTypes=[classType],
+                                variables=[], flags=frozenset([PUBLIC]), instTypes=[])
+        package.addTypeParameter(f, Name(["f", "T"]), upperBound=rootType,
+                                     lowerBound=ir_types.getNothingClassType(),
+                                     flags=frozenset([STATIC]))
+        f.blocks = [ir_instructions.BasicBlock(0, [ir_instructions.unit(),
+                                                   ir_instructions.ret()])]
+        return package
+
+    def writePackage(self):
+        serialize.serialize(self.makePackage(), self.fileName)
+        serialize.writeExportIndex(self.fileName, self.loader)
+
+    def testIndexFileName(self):
+        self.assertEquals("/a/foo-1.csi", indexFileName("/a/foo-1.csp"))
+
+    def testLoadWithIndex(self):
+        self.writePackage()
+        self.assertTrue(os.path.exists(indexFileName(self.fileName)))
+        indexed = serialize.deserialize(self.fileName, self.loader,
+                                        lazy=True, useIndex=True)
+        unindexed = serialize.deserialize(self.fileName, self.loader)
+
+        # Exports are available without loading any definitions.
+        self.assertIsNotNone(indexed.exports)
+        indexedExports = indexed.ensureExports()
+        self.assertFalse(any(defn.isLoaded() for defn in indexed.functions))
+        unindexedExports = unindexed.ensureExports()
+        self.assertEquals(sorted(unindexedExports.keys()), sorted(indexedExports.keys()))
+        for name, defn in unindexedExports.iteritems():
+            self.assertEquals(defn.id.kind, indexedExports[name].id.kind)
+            self.assertEquals(defn.id.index, indexedExports[name].id.index)
+
+        # Headers come from the index, and the rest is read from recorded offsets.
+        for indexedDefn, defn in zip(indexed.globals + indexed.functions + indexed.classes,
+                                     unindexed.globals + unindexed.functions +
+                                     unindexed.classes):
+            self.assertEquals(defn.name, indexedDefn.name)
+            self.assertEquals(defn.sourceName, indexedDefn.sourceName)
+            self.assertEquals(defn.flags, indexedDefn.flags)
+            self.assertEquals(repr(defn), repr(indexedDefn))
+
+    def testStaleIndexIgnored(self):
+        self.writePackage()
+        index = ExportIndex.load(self.fileName, open(self.fileName, "rb").read())
+        self.assertIsNotNone(index)
+        with open(self.fileName, "ab") as packageFile:
+            packageFile.write("\0")
+        data = open(self.fileName, "rb").read()
+        self.assertIsNone(ExportIndex.load(self.fileName, data))
+
+    def testCorruptIndexIgnored(self):
+        self.writePackage()
+        with open(indexFileName(self.fileName), "wb") as indexFile:
+            indexFile.write("garbage")
+        data = open(self.fileName, "rb").read()
+        self.assertIsNone(ExportIndex.load(self.fileName, data))
+        package = serialize.deserialize(self.fileName, self.loader, lazy=True, useIndex=True)
+        unindexed = serialize.deserialize(self.fileName, self.loader)
+        self.assertEquals(sorted(unindexed.ensureExports().keys()),
+                          sorted(package.ensureExports().keys()))
+
+    def testMissingIndexIgnored(self):
+        serialize.serialize(self.makePackage(), self.fileName)
+        data = open(self.fileName, "rb").read()
+        self.assertIsNone(ExportIndex.load(self.fileName, data))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import ir
+from ir import Name, PackageDependency, PackageVersion
+from location import NoLoc
+from package_loader import PackageLoader
+import serialize
+
+
+class TestPackageLoader(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.packages = {}
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def writePackage(self, name, depNames=()):
+        package = ir.Package(name=Name([name]), version=PackageVersion([1]))
+        package.buildNameIndex()
+        for depName in depNames:
+            package.dependencies.append(PackageDependency.fromPackage(self.packages[depName]))
+        serialize.serialize(package, os.path.join(self.dirName, "%s-1.csp" % name))
+        self.packages[name] = package
+
+    def writeDiamond(self):
+        self.writePackage("d")
+        self.writePackage("c", ["d"])
+        self.writePackage("b", ["d"])
+        self.writePackage("a", ["b", "c"])
+
+    def load(self, loadThreadCount, name):
+        loader = PackageLoader([self.dirName], loadThreadCount=loadThreadCount)
+        loadedNames = []
+        loader.addLoadHook(lambda package: loadedNames.append(str(package.name)))
+        package = loader.loadPackage(Name([name]), NoLoc)
+        return loader, package, loadedNames
+
+    def testConcurrentLoadOrder(self):
+        self.writeDiamond()
+        _, _, expected = self.load(1, "a")
+        loader, package, loadedNames = self.load(4, "a")
+        self.assertEquals(expected, loadedNames)
+        self.assertEquals(["b", "c"], [str(dep.name) for dep in package.dependencies])
+        self.assertIs(package.dependencies[0].package.dependencies[0].package,
+                      package.dependencies[1].package.dependencies[0].package)
+        self.assertEquals({}, loader.openedPackages)
+
+    def testConcurrentLoadSkipsLoadedPackages(self):
+        self.writeDiamond()
+        loader = PackageLoader([self.dirName], loadThreadCount=4)
+        loader.loadPackage(Name(["b"]), NoLoc)
+        loadedNames = []
+        loader.addLoadHook(lambda package: loadedNames.append(str(package.name)))
+        loader.loadPackage(Name(["a"]), NoLoc)
+        self.assertEquals(["c", "a"], loadedNames)
+
+    def countOpens(self):
+        openedFileNames = []
+        openPackage = serialize.openPackage
+        def countingOpenPackage(fileName, *args, **kwargs):
+            openedFileNames.append(os.path.basename(fileName))
+            return openPackage(fileName, *args, **kwargs)
+        serialize.openPackage = countingOpenPackage
+        self.addCleanup(setattr, serialize, "openPackage", openPackage)
+        return openedFileNames
+
+    def testConcurrentLoadOpensEachPackageOnce(self):
+        self.writeDiamond()
+        openedFileNames = self.countOpens()
+        self.load(4, "a")
+        self.assertEquals(["a-1.csp", "b-1.csp", "c-1.csp", "d-1.csp"], sorted(openedFileNames))
+
+    def testConcurrentLoadFilesOpensEachPackageOnce(self):
+        self.writeDiamond()
+        self.writePackage("e", ["d"])
+        openedFileNames = self.countOpens()
+        loader = PackageLoader([self.dirName], loadThreadCount=4)
+        loader.ensurePackageInfo()
+        fileNames = [os.path.join(self.dirName, "%s-1.csp" % name) for name in ("a", "e")]
+        packages = loader.loadPackageFiles(fileNames)
+        self.assertEquals(["a", "e"], [str(package.name) for package in packages])
+        self.assertEquals(["a-1.csp", "b-1.csp", "c-1.csp", "d-1.csp", "e-1.csp"],
+                          sorted(openedFileNames))
+        self.assertEquals({}, loader.openedPackages)
+
+    def testConcurrentLoadCorruptDependency(self):
+        self.writeDiamond()
+        with open(os.path.join(self.dirName, "c-1.csp"), "wb") as f:
+            f.write("bogus")
+        self.assertRaises(IOError, self.load, 4, "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import ir
+from ir import Name, PackageDependency, PackageVersion
+from package_loader import PackageLoader
+import package_path_index
+from package_path_index import PackagePathIndex
+import serialize
+
+
+class TestPackagePathIndex(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.packageDirName = os.path.join(self.dirName, "packages")
+        self.cacheDirName = os.path.join(self.dirName, "cache")
+        os.mkdir(self.packageDirName)
+        self.savedMinAge = package_path_index.MIN_CACHED_DIR_AGE
+        package_path_index.MIN_CACHED_DIR_AGE = 0
+
+    def tearDown(self):
+        package_path_index.MIN_CACHED_DIR_AGE = self.savedMinAge
+        shutil.rmtree(self.dirName)
+
+    def touch(self, baseName):
+        fileName = os.path.join(self.packageDirName, baseName)
+        with open(fileName, "wb"):
+            pass
+        return fileName
+
+    def setDirMtime(self, mtime):
+        os.utime(self.packageDirName, (mtime, mtime))
+
+    def testListPackages(self):
+        fooFileName = self.touch("foo.bar-1.2.csp")
+        self.touch("README")
+        index = PackagePathIndex(self.cacheDirName)
+        self.assertEquals([(Name(["foo", "bar"]), PackageVersion([1, 2]), fooFileName)],
+                          index.listPackages(self.packageDirName))
+
+    def testListPackagesMissingDir(self):
+        index = PackagePathIndex(self.cacheDirName)
+        self.assertEquals([], index.listPackages(os.path.join(self.dirName, "bogus")))
+
+    def testListPackagesCached(self):
+        self.touch("foo-1.csp")
+        self.setDirMtime(1000)
+        PackagePathIndex(self.cacheDirName).listPackages(self.packageDirName)
+
+        # The listing isn't repeated if the directory's modification time is the same.
+        self.touch("bar-1.csp")
+        self.setDirMtime(1000)
+        packages = PackagePathIndex(self.cacheDirName).listPackages(self.packageDirName)
+        self.assertEquals([Name(["foo"])], [name for name, _, _ in packages])
+
+        # It is repeated if the time changes.
+        self.setDirMtime(2000)
+        packages = PackagePathIndex(self.cacheDirName).listPackages(self.packageDirName)
+        self.assertEquals([Name(["bar"]), Name(["foo"])], [name for name, _, _ in packages])
+
+    def testRecentDirNotCached(self):
+        package_path_index.MIN_CACHED_DIR_AGE = 1000000
+        self.touch("foo-1.csp")
+        PackagePathIndex(self.cacheDirName).listPackages(self.packageDirName)
+        self.touch("bar-1.csp")
+        packages = PackagePathIndex(self.cacheDirName).listPackages(self.packageDirName)
+        self.assertEquals(2, len(packages))
+
+    def testReadNameAndVersionCached(self):
+        package = ir.Package(name=Name(["foo"]), version=PackageVersion([3]))
+        package.buildNameIndex()
+        fileName = os.path.join(self.packageDirName, "foo.csp")
+        serialize.serialize(package, fileName)
+        os.utime(fileName, (1000, 1000))
+        index = PackagePathIndex(self.cacheDirName)
+        self.assertEquals((Name(["foo"]), PackageVersion([3])),
+                          index.readNameAndVersion(fileName))
+
+        # The cached header is used while the size and modification time are unchanged, so
+        # the file isn't read again.
+        with open(fileName, "r+b") as f:
+            f.write("\0")
+        os.utime(fileName, (1000, 1000))
+        index = PackagePathIndex(self.cacheDirName)
+        self.assertEquals((Name(["foo"]), PackageVersion([3])),
+                          index.readNameAndVersion(fileName))
+
+        os.utime(fileName, (2000, 2000))
+        index = PackagePathIndex(self.cacheDirName)
+        self.assertRaises(IOError, index.readNameAndVersion, fileName)
+
+    def testReadNameAndVersionMissingFile(self):
+        index = PackagePathIndex(self.cacheDirName)
+        fileName = os.path.join(self.packageDirName, "missing-1.csp")
+        self.assertRaises(IOError, index.readNameAndVersion, fileName)
+
+    def testFindPackageInfo(self):
+        for version in ("1", "1.5", "2", "3"):
+            self.touch("foo-%s.csp" % version)
+        loader = PackageLoader([self.packageDirName], self.cacheDirName)
+
+        def check(depString, expectedVersion):
+            info = loader.findPackageInfo(PackageDependency.fromString(depString))
+            if expectedVersion is None:
+                self.assertIsNone(info)
+            else:
+                self.assertEquals(PackageVersion.fromString(expectedVersion), info.version)
+
+        check("foo", "3")
+        check("foo:1-2", "2")
+        check("foo:1.5", "1.5")
+        check("foo:1.6-1.9", None)
+        check("foo:4-", None)
+        check("bar", None)
+        self.assertEquals(PackageVersion([3]), loader.packageInfoByName[Name(["foo"])].version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import cPickle
+import shutil
+import tempfile
+import unittest
+
+import ast
+from lexer import lex
+from location import Location, NoLoc
+from parse_cache import *
+from parser import parse
+
+
+SOURCE = """// Comment about f.
+def f = 12
+
+class C
+  def g(x: i64) =
+    x + 1
+// Trailing comment.
+
+let x = 3
+
+import foo.bar
+"""
+
+
+def getLocations(node):
+    """Returns the locations of all nodes in a syntax tree, in order."""
+    locations = []
+    def walk(value):
+        if isinstance(value, Location):
+            locations.append(value)
+        elif isinstance(value, ast.Node):
+            for name in sorted(value.__dict__):
+                walk(value.__dict__[name])
+        elif isinstance(value, list):
+            for v in value:
+                walk(v)
+    walk(node)
+    return locations
+
+
+class TestParseCache(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def checkParse(self, source, expectedHits, expectedMisses):
+        cache = ParseCache(self.dirName)
+        module = cache.parse("foo.gy", source)
+        expected = parse("foo.gy", lex("foo.gy", source))
+        self.assertEquals(str(expected), str(module))
+        self.assertEquals(getLocations(expected), getLocations(module))
+        self.assertEquals((expectedHits, expectedMisses), (cache.hitCount, cache.missCount))
+
+    def testSplitDefinitions(self):
+        chunks = splitDefinitions(SOURCE)
+        self.assertEquals(SOURCE, "".join(text for _, text in chunks))
+        self.assertEquals([1, 4, 9, 11], [firstLine for firstLine, _ in chunks])
+
+    def testReuseDefinitions(self):
+        self.checkParse(SOURCE, 0, 4)
+        self.checkParse(SOURCE, 4, 0)
+        edited = SOURCE.replace("x + 1", "let y = x\n    y + 1")
+        self.checkParse(edited, 3, 1)
+        self.checkParse("\n\n" + edited, 4, 1)
+
+    def testChunkWithSyntaxError(self):
+        source = 'let s = "\ndef f = 12\n"\n'
+        self.assertEquals(3, len(splitDefinitions(source)))
+        self.checkParse(source, 0, 0)
+
+    def testPickleNoLoc(self):
+        self.assertIs(NoLoc, cPickle.loads(cPickle.dumps(NoLoc, cPickle.HIGHEST_PROTOCOL)))
+
+
+if __name__ == "__main__":
+    unittest.main()
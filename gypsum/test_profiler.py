@@ -0,0 +1,106 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import json
+import os
+import os.path
+import shutil
+import StringIO
+import sys
+import tempfile
+import time
+import unittest
+
+from __init__ import compileMain
+from ir import Name
+from profiler import *
+
+
+class FakeFunction(object):
+    def __init__(self, name):
+        self.name = Name([name])
+
+
+class TestProfiler(unittest.TestCase):
+    def testPhasesAccumulate(self):
+        profiler = Profiler()
+        with profiler.phase("lex"):
+            pass
+        with profiler.phase("parse"):
+            pass
+        with profiler.phase("lex"):
+            pass
+        report = profiler.getReport()
+        self.assertEquals(["lex", "parse"], [p["name"] for p in report["phases"]])
+        self.assertEquals(2, report["phases"][0]["callCount"])
+
+    def testMeasurePhaseWithoutProfiler(self):
+        with measurePhase(None, "lex"):
+            pass
+
+    def testExclusiveFunctionTime(self):
+        profiler = Profiler(functionCount=1)
+        with profiler.phase("analyzeTypes"):
+            profiler.enterFunction(FakeFunction("outer"))
+            profiler.enterFunction(FakeFunction("inner"))
+            time.sleep(0.05)
+            profiler.exitFunction()
+            profiler.exitFunction()
+        functionTimes = profiler.phases[0].functionTimes
+        self.assertGreater(functionTimes["inner"], 0.04)
+        self.assertLess(functionTimes["outer"], 0.04)
+        slowest = profiler.getReport()["phases"][0]["slowestFunctions"]
+        self.assertEquals(["inner"], [f["name"] for f in slowest])
+
+    def testSummary(self):
+        profiler = Profiler()
+        with profiler.phase("compile"):
+            profiler.enterFunction(FakeFunction("f"))
+            profiler.exitFunction()
+        out = StringIO.StringIO()
+        profiler.writeSummary(out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[1].startswith("compile "))
+        self.assertTrue(lines[2].startswith("total "))
+        self.assertEquals("slowest functions in compile:", lines[4])
+        self.assertTrue(lines[5].endswith(" ms  f"))
+
+
+class TestProfileOption(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def testProfileCompile(self):
+        sourceFileName = os.path.join(self.dirName, "foo.gy")
+        with open(sourceFileName, "w") as f:
+            f.write("def f = 12\n")
+        reportFileName = os.path.join(self.dirName, "profile.json")
+        pstatsDirName = os.path.join(self.dirName, "pstats")
+        summary = StringIO.StringIO()
+        stderr = sys.stderr
+        sys.stderr = summary
+        try:
+            exitCode = compileMain(["--no-std", "--profile", reportFileName,
+                                    "--profile-pstats", pstatsDirName,
+                                    "-o", os.path.join(self.dirName, "foo.csp"),
+                                    sourceFileName])
+        finally:
+            sys.stderr = stderr
+        self.assertEquals(0, exitCode)
+        with open(reportFileName) as f:
+            report = json.load(f)
+        phases = {p["name"]: p for p in report["phases"]}
+        self.assertIn("analyzeTypes", phases)
+        self.assertIn("f", [f["name"] for f in phases["compile"]["slowestFunctions"]])
+        self.assertTrue(os.path.exists(phases["compile"]["pstats"]))
+        self.assertIn("slowest functions in compile:", summary.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -13,46 +13,34 @@ from externalization import externalizeDefn
 from flags import ABSTRACT, ARRAY, CONSTRUCTOR, EXTERN, FINAL, LET, METHOD, NATIVE, OVERRIDE, PRIVATE, PUBLIC, STATIC
 import ids
 import ir
+import ir_instructions
 import ir_types
 from name import CLASS_INIT_SUFFIX, CONSTRUCTOR_SUFFIX, Name
 import serialize
 import utils_test
 
 
-class MockFile(object):
-    def __init__(self, bytes=None):
-        self.bytes = bytearray(bytes) if bytes is not None else bytearray()
-        self.readPtr = 0
-
-    def read(self, n):
-        if self.readPtr + n > len(self.bytes):
-            raise IOError("read off the end of the file")
-        result = self.bytes[self.readPtr : self.readPtr + n]
-        self.readPtr += n
-        return str(result)
-
-    def write(self, s):
-        self.bytes.extend(s)
-
-
 class TestSerialize(utils_test.TestCaseWithDefinitions):
     def setUp(self):
-        self.file = MockFile()
-        self.ser = serialize.Serializer(None, self.file)
-        self.des = serialize.Deserializer(self.file, utils_test.FakePackageLoader([]))
-
-    def copyPackage(self, package):
-        file = MockFile()
-        ser = serialize.Serializer(package, file)
-        ser.serialize()
+        self.ser = serialize.Serializer(None)
+        self.des = serialize.Deserializer(buffer(self.ser.buf),
+                                          utils_test.FakePackageLoader([]))
+
+    def resetBuffer(self, bytes=()):
+        # The buffer is modified in place, since the deserializer reads it through a
+        # buffer view.
+        self.ser.buf[:] = bytearray(bytes)
+
+    def copyPackage(self, package, lazy=False):
+        data = serialize.Serializer(package).serialize()
         loader = utils_test.FakePackageLoader([])
-        des = serialize.Deserializer(file, loader)
+        des = serialize.Deserializer(str(data), loader, lazy)
         des.deserialize()
         return des.package
 
     def checkType(self, ty, package=None):
-        self.file.bytes = bytearray()
-        self.file.readPtr = 0
+        self.resetBuffer()
+        self.des.offset = 0
         if package is not None:
             self.ser.package = package
             self.des.package = package
@@ -63,14 +51,18 @@ class TestSerialize(utils_test.TestCaseWithDefinitions):
 
     def testWriteVbn(self):
         def checkVbn(n, bytes):
-            self.file.bytes = bytearray()
+            self.resetBuffer()
             self.ser.writeVbn(n)
             expected = bytearray(''.join(map(chr, bytes)))
-            self.assertEquals(expected, self.file.bytes)
+            self.assertEquals(expected, self.ser.buf)
 
         checkVbn(0, [0])
         checkVbn(1, [1])
         checkVbn(-1, [0x7F])
+        checkVbn(63, [0x3F])
+        checkVbn(64, [0xC0, 0x00])
+        checkVbn(-64, [0x40])
+        checkVbn(-65, [0xBF, 0x7F])
         checkVbn(1000, [0xE8, 0x07])
         checkVbn(-1000, [0x98, 0x78])
         checkVbn(0x7FFFFFFFFFFFFFFF, [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00])
@@ -78,11 +70,11 @@ class TestSerialize(utils_test.TestCaseWithDefinitions):
 
     def testReadVbn(self):
         def checkVbn(n, bytes):
-            self.file.readPtr = 0
-            self.file.bytes = bytearray(bytes)
+            self.resetBuffer(bytes)
+            self.des.offset = 0
             value = self.des.readVbn()
             self.assertEquals(n, value)
-            self.assertEquals(self.file.readPtr, len(bytes))
+            self.assertEquals(self.des.offset, len(bytes))
 
         checkVbn(0, [0])
         checkVbn(1, [1])
@@ -92,16 +84,34 @@ class TestSerialize(utils_test.TestCaseWithDefinitions):
         checkVbn(0x7FFFFFFFFFFFFFFF, [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0x00])
         checkVbn(-0x8000000000000000, [0x80, 0x80, 0x80, 0x80, 0x80, 0x80, 0x80, 0x80, 0x80, 0x01])
 
+    def testReadVbnOffEnd(self):
+        self.resetBuffer([0xE8])
+        self.assertRaises(IndexError, self.des.readVbn)
+
     def testRewriteList(self):
-        def write(s):
-            self.file.write(s)
-        def read():
-            return self.file.read(1)
-        expected = ['a', 'b', 'c']
-        self.ser.writeList(write, expected)
-        lst = self.des.readList(read)
+        expected = [1, -1, 1000]
+        self.ser.writeList(self.ser.writeVbn, expected)
+        lst = self.des.readList(self.des.readVbn)
         self.assertEquals(expected, lst)
 
+    def testWriteVbnList(self):
+        values = [0, -1, 63, 64, -65, 1000, -0x8000000000000000]
+        self.ser.writeVbnList(values)
+        expected = bytearray()
+        self.ser.encodeVbn(len(values), expected)
+        for value in values:
+            self.ser.encodeVbn(value, expected)
+        self.assertEquals(expected, self.ser.buf)
+        self.assertEquals(values, self.des.readList(self.des.readVbn))
+
+    def testRewriteString(self):
+        self.ser.writeString(u"foo\u00e9")
+        self.assertEquals(u"foo\u00e9", self.des.readString())
+
+    def testReadStringOffEnd(self):
+        self.resetBuffer([5, ord("a")])
+        self.assertRaises(IOError, self.des.readString)
+
     def testRewriteBuiltinFunctionId(self):
         function = builtins.getBuiltinFunctionById(bytecode.BUILTIN_ROOT_CLASS_TO_STRING_ID)
         self.ser.writeMethodId(function)
@@ -350,6 +360,118 @@ class TestSerialize(utils_test.TestCaseWithDefinitions):
         self.des.readClass(outClass)
         self.assertEquals(clas, outClass)
 
+    def testLazyDeserialize(self):
+        package = ir.Package(id=ids.TARGET_PACKAGE_ID)
+        package.buildNameIndex()
+        rootType = ir_types.getRootClassType()
+        globl = package.addGlobal(Name(["g"]), sourceName="g", type=ir_types.I64Type,
+                                  flags=frozenset([PUBLIC, LET]))
+        clas = package.addClass(Name(["Foo"]), sourceName="Foo", typeParameters=[],
+                                supertypes=[rootType], constructors=[], fields=[],
+                                methods=[], flags=frozenset([PUBLIC]))
+        fooType = ir_types.ClassType(clas)
+        function = package.addFunction(Name(["f"]), sourceName="f",
+                                       returnType=ir_types.UnitType, typeParameters=[],
+                                       parameterTypes=[fooType], flags=frozenset([PUBLIC]))
+        T = package.addTypeParameter(function, Name(["f", "T"]), upperBound=rootType,
+                                     lowerBound=ir_types.getNothingClassType(),
+                                     flags=frozenset([STATIC]))
+        function.variables = []
+        function.instTypes = [ir_types.VariableType(T)]
+        function.blocks = [ir_instructions.BasicBlock(0, [ir_instructions.unit(),
+                                                          ir_instructions.ret()])]
+
+        lazyPackage = self.copyPackage(package, lazy=True)
+        lazyGlobal, = lazyPackage.globals
+        lazyClass, = lazyPackage.classes
+        lazyFunction, = lazyPackage.functions
+        for defn in (lazyGlobal, lazyClass, lazyFunction):
+            self.assertFalse(defn.isLoaded())
+
+        # Scopes and exports only need names and flags.
+        self.assertEquals(function.name, lazyFunction.name)
+        self.assertEquals(u"f", lazyFunction.sourceName)
+        self.assertEquals(function.flags, lazyFunction.flags)
+        self.assertFalse(lazyFunction.isLoaded())
+
+        # Reading the signature doesn't read the body.
+        self.assertEquals([ir_types.ClassType(lazyClass)], lazyFunction.parameterTypes)
+        self.assertFalse(lazyClass.isLoaded())
+        self.assertFalse(lazyFunction.isLoaded())
+        self.assertEquals([ir_types.VariableType(lazyFunction.typeParameters[0])],
+                          lazyFunction.instTypes)
+        self.assertTrue(lazyFunction.isLoaded())
+
+        self.assertEquals(ir_types.I64Type, lazyGlobal.type)
+        self.assertTrue(lazyGlobal.isLoaded())
+        self.assertEquals([rootType], lazyClass.supertypes)
+        self.assertTrue(lazyClass.isLoaded())
+        self.assertFalse(hasattr(lazyClass, "bogus"))
+
+    def testRewriteInstructions(self):
+        package = ir.Package(id=ids.TARGET_PACKAGE_ID)
+        package.buildNameIndex()
+        self.des.package = package
+        callee = package.addFunction(Name(["g"]), returnType=ir_types.UnitType,
+                                     typeParameters=[],
+                                     parameterTypes=[ir_types.I64Type, ir_types.I64Type],
+                                     flags=frozenset())
+        builtin = builtins.getBuiltinFunctionById(bytecode.BUILTIN_ROOT_CLASS_TO_STRING_ID)
+        blocks = [ir_instructions.BasicBlock(0, [ir_instructions.i64(-1 << 40),
+                                                 ir_instructions.i64(1000),
+                                                 ir_instructions.callg(callee),
+                                                 ir_instructions.label(2),
+                                                 ir_instructions.branch(1)]),
+                  ir_instructions.BasicBlock(1, [ir_instructions.f32(1.5),
+                                                 ir_instructions.f64(0.1),
+                                                 ir_instructions.dropi(2),
+                                                 ir_instructions.null(),
+                                                 ir_instructions.callg(builtin),
+                                                 ir_instructions.drop(),
+                                                 ir_instructions.branchl(2, 3)]),
+                  ir_instructions.BasicBlock(2, [ir_instructions.unit(),
+                                                 ir_instructions.ret()]),
+                  ir_instructions.BasicBlock(3, [ir_instructions.unit(),
+                                                 ir_instructions.ret()])]
+        function = ir.Function(Name(["f"]), None, blocks=blocks)
+        buf, blockOffsets = self.ser.encodeInstructions(function)
+        decodedBlocks = self.des.decodeInstructions(str(buf), blockOffsets)
+        self.assertEquals(blocks, decodedBlocks)
+        self.assertEquals(2, decodedBlocks[0].instructions[2].popCount())
+        self.assertEquals(1, decodedBlocks[1].instructions[4].popCount())
+
+    def testDecodeInvalidOpcode(self):
+        with self.assertRaises(IOError):
+            self.des.decodeInstructions("\xff", [0])
+
+    def testDecodeInstructionCrossesBlock(self):
+        buf, _ = self.ser.encodeInstructions(
+            ir.Function(Name(["f"]), None, blocks=[ir_instructions.BasicBlock(0, [
+                ir_instructions.i64(1000), ir_instructions.ret()])]))
+        with self.assertRaises(IOError):
+            self.des.decodeInstructions(str(buf), [0, 1])
+
+    def testDeserializeForwardCall(self):
+        package = ir.Package(id=ids.TARGET_PACKAGE_ID)
+        package.buildNameIndex()
+        caller = package.addFunction(Name(["f"]), returnType=ir_types.UnitType,
+                                     typeParameters=[], parameterTypes=[], variables=[],
+                                     flags=frozenset(), instTypes=[])
+        callee = package.addFunction(Name(["g"]), returnType=ir_types.UnitType,
+                                     typeParameters=[], parameterTypes=[ir_types.I64Type],
+                                     variables=[], flags=frozenset(), instTypes=[])
+        caller.blocks = [ir_instructions.BasicBlock(0, [ir_instructions.i64(1),
+                                                        ir_instructions.callg(callee),
+                                                        ir_instructions.ret()])]
+        callee.blocks = [ir_instructions.BasicBlock(0, [ir_instructions.unit(),
+                                                        ir_instructions.ret()])]
+        for lazy in (False, True):
+            outPackage = self.copyPackage(package, lazy)
+            outCaller, outCallee = outPackage.functions
+            self.assertEquals(caller.blocks, outCaller.blocks)
+            self.assertEquals(callee.blocks, outCallee.blocks)
+            self.assertEquals(1, outCaller.blocks[0].instructions[1].popCount())
+
     def testRewriteForeignClass(self):
         # "Compile" a foreign package with a class we'll depend on.
         otherPackage = ir.Package(id=ids.TARGET_PACKAGE_ID, name=Name(["foo", "bar"]))
@@ -411,7 +533,7 @@ class TestSerialize(utils_test.TestCaseWithDefinitions):
         self.ser.serialize()
         loadedPackage = self.copyPackage(otherPackage)
         desLoader = utils_test.FakePackageLoader([loadedPackage])
-        self.des = serialize.Deserializer(self.file, desLoader)
+        self.des = serialize.Deserializer(str(self.ser.buf), desLoader)
         self.des.deserialize()
         rewrittenPackage = self.des.package
         rewrittenClass = rewrittenPackage.dependencies[0].externClasses[0]
@@ -488,7 +610,7 @@ class TestSerialize(utils_test.TestCaseWithDefinitions):
         self.ser.serialize()
         loadedPackage = self.copyPackage(otherPackage)
         desLoader = utils_test.FakePackageLoader([loadedPackage])
-        self.des = serialize.Deserializer(self.file, desLoader)
+        self.des = serialize.Deserializer(str(self.ser.buf), desLoader)
         self.des.deserialize()
         rewrittenPackage = self.des.package
         rewrittenTrait = rewrittenPackage.dependencies[0].externTraits[0]
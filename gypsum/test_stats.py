@@ -0,0 +1,77 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import json
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from __init__ import compileMain
+import ir_types
+import stats
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self):
+        stats.reset()
+
+    def tearDown(self):
+        stats.enabled = False
+        stats.reset()
+
+    def testCount(self):
+        stats.count("a")
+        stats.count("a", 2)
+        self.assertEquals({"a": 3}, stats.getCounters())
+
+    def testDepth(self):
+        stats.enter("f")
+        stats.enter("f")
+        stats.leave("f")
+        stats.leave("f")
+        stats.enter("f")
+        stats.leave("f")
+        self.assertEquals({"f.calls": 3, "f.maxDepth": 2}, stats.getCounters())
+
+    def testDisabled(self):
+        ir_types.UnitType.isSubtypeOf(ir_types.UnitType)
+        self.assertEquals({}, stats.getCounters())
+
+    def testEnabled(self):
+        stats.enabled = True
+        ir_types.UnitType.isSubtypeOf(ir_types.UnitType)
+        self.assertEquals({"types.isSubtypeOf.calls": 1, "types.isSubtypeOf.maxDepth": 1},
+                          stats.getCounters())
+
+
+class TestStatsOption(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+        stats.reset()
+
+    def testCompileWithStats(self):
+        sourceFileName = os.path.join(self.dirName, "foo.gy")
+        with open(sourceFileName, "w") as f:
+            f.write("def f(x: i64) = x + 1\n")
+        statsFileName = os.path.join(self.dirName, "stats.json")
+        self.assertEquals(0, compileMain(["--no-std", "--stats", statsFileName,
+                                          "-o", os.path.join(self.dirName, "foo.csp"),
+                                          sourceFileName]))
+        self.assertFalse(stats.enabled)
+        with open(statsFileName) as f:
+            counters = json.load(f)
+        self.assertGreater(counters["visitor.FunctionDefinition"], 0)
+        self.assertGreater(counters["scope.lookups"], 0)
+        self.assertGreater(counters["typeAnalysis.overloadCandidates"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,159 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import unittest
+
+from compile_info import CompileInfo
+from compiler import compile
+from externalization import externalize
+from ids import TARGET_PACKAGE_ID
+from inheritance_analysis import analyzeInheritance
+from ir import Package
+from ir_instructions import *
+from lexer import lex
+from name import Name
+from parser import parse
+from scope_analysis import analyzeDeclarations, convertClosures
+from tail_calls import eliminateTailCalls
+from type_analysis import analyzeTypeDeclarations, analyzeTypes
+from utils_test import FakePackageLoader
+
+
+class TestTailCalls(unittest.TestCase):
+    def compileFromSource(self, source):
+        filename = "(test)"
+        tokens = lex(filename, source)
+        ast = parse(filename, tokens)
+        package = Package(id=TARGET_PACKAGE_ID, name=Name(["test"]))
+        info = CompileInfo(ast, package, FakePackageLoader([]), isUsingStd=False)
+        analyzeDeclarations(info)
+        analyzeTypeDeclarations(info)
+        analyzeInheritance(info)
+        analyzeTypes(info)
+        convertClosures(info)
+        externalize(info)
+        compile(info)
+        self.count = eliminateTailCalls(info)
+        return package
+
+    def getInstructions(self, package, name):
+        function = package.findFunction(name=name)
+        return [block.instructions for block in function.blocks]
+
+    def testReturn(self):
+        source = "def f(n: i64, acc: i64): i64 =\n" + \
+                 "  if (n == 0)\n" + \
+                 "    return acc\n" + \
+                 "  return f(n - 1, acc + n)"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+        self.assertEquals([[ldlocal(0), i64(0), eqi64(), branchif(1, 2)],
+                           [ldlocal(1), ret()],
+                           [ldlocal(0), i64(1), subi64(), ldlocal(1), ldlocal(0), addi64(),
+                            stlocal(1), stlocal(0), branch(0)]],
+                          self.getInstructions(package, "f"))
+
+    def testIfBranch(self):
+        source = "def f(n: i64): i64 = if (n == 0) 0 else f(n - 1)"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+        self.assertEquals([[ldlocal(0), i64(0), eqi64(), branchif(1, 2)],
+                           [i64(0), branch(3)],
+                           [ldlocal(0), i64(1), subi64(), stlocal(0), branch(0)],
+                           [ret()]],
+                          self.getInstructions(package, "f"))
+
+    def testMatchCase(self):
+        source = "def f(n: i64): i64 =\n" + \
+                 "  match (n)\n" + \
+                 "    case 0 => 0\n" + \
+                 "    case _ => f(n - 1)"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+        self.assertEquals([drop(), ldlocal(0), i64(1), subi64(), stlocal(0), branch(0)],
+                          self.getInstructions(package, "f")[2])
+
+    def testBlockExpression(self):
+        source = "def f(n: i64): i64 =\n" + \
+                 "  if (n == 0)\n" + \
+                 "    0\n" + \
+                 "  else\n" + \
+                 "    let m = n - 1\n" + \
+                 "    f(m)"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+
+    def testNotTailCall(self):
+        source = "def f(n: i64): i64 = if (n == 0) 1 else n * f(n - 1)"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testOtherFunction(self):
+        source = "def f(n: i64): i64 = n\n" + \
+                 "def g(n: i64): i64 = f(n)"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testInsideTry(self):
+        source = "def f(n: i64): i64 =\n" + \
+                 "  try\n" + \
+                 "    f(n - 1)\n" + \
+                 "  catch\n" + \
+                 "    case _ => 0"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testInsideFinally(self):
+        source = "def f(n: i64): i64 =\n" + \
+                 "  try\n" + \
+                 "    return f(n - 1)\n" + \
+                 "  finally\n" + \
+                 "    0"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testInsideCatch(self):
+        source = "def f(n: i64): i64 =\n" + \
+                 "  try\n" + \
+                 "    n\n" + \
+                 "  catch\n" + \
+                 "    case _ => f(n - 1)"
+        self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+
+    def testGenericSameTypeArgs(self):
+        source = "def f[static T](x: T, n: i64): T = if (n == 0) x else f[T](x, n - 1)"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+        self.assertEquals([ldlocal(0), ldlocal(1), i64(1), subi64(),
+                           stlocal(1), stlocal(0), branch(0)],
+                          self.getInstructions(package, "f")[2])
+
+    def testGenericDifferentTypeArgs(self):
+        source = "class C\n" + \
+                 "def f[static T](x: T, n: i64): Object =\n" + \
+                 "  if (n == 0) x else f[C](C(), n - 1)"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+    def testFinalMethod(self):
+        source = "class C\n" + \
+                 "  final def f(n: i64): i64 = if (n == 0) 0 else f(n - 1)"
+        package = self.compileFromSource(source)
+        self.assertEquals(1, self.count)
+        self.assertEquals([ldlocal(0), ldlocal(1), i64(1), subi64(),
+                           stlocal(1), stlocal(0), branch(0)],
+                          self.getInstructions(package, Name(["C", "f"]))[2])
+
+    def testVirtualMethod(self):
+        source = "class C\n" + \
+                 "  def f(n: i64): i64 = if (n == 0) 0 else f(n - 1)"
+        self.compileFromSource(source)
+        self.assertEquals(0, self.count)
+
+
+if __name__ == "__main__":
+    unittest.main()
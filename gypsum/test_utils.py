@@ -4,8 +4,15 @@
 # the GPL license that can be found in the LICENSE.txt file.
 
 
+import errno
+import os
+import os.path
+import shutil
+import tempfile
 import unittest
+import yaml
 
+import common_tables
 from utils import *
 
 
@@ -58,6 +65,73 @@ class TestUtils(unittest.TestCase):
         for expected, str in pairs:
             self.assertEquals(expected, encodeString(str))
 
+    def testWriteFileAtomically(self):
+        dirName = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(dirName, "foo.csp")
+            writeFileAtomically(fileName, "foo")
+            writeFileAtomically(fileName, bytearray("bar"))
+            with open(fileName) as f:
+                self.assertEquals("bar", f.read())
+            self.assertEquals(["foo.csp"], os.listdir(dirName))
+        finally:
+            shutil.rmtree(dirName)
+
+    def testWriteFileAtomicallyFailure(self):
+        dirName = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(dirName, "foo.csp")
+            writeFileAtomically(fileName, "foo")
+            with self.assertRaises(TypeError):
+                writeFileAtomically(fileName, object())
+            with open(fileName) as f:
+                self.assertEquals("foo", f.read())
+            self.assertEquals(["foo.csp"], os.listdir(dirName))
+        finally:
+            shutil.rmtree(dirName)
+
+    def testWriteFileAtomicallyMissingDirectory(self):
+        dirName = tempfile.mkdtemp()
+        try:
+            fileName = os.path.join(dirName, "missing", "foo.csp")
+            with self.assertRaises(IOError) as cm:
+                writeFileAtomically(fileName, "foo")
+            self.assertEquals(errno.ENOENT, cm.exception.errno)
+            self.assertEquals(fileName, cm.exception.filename)
+            self.assertEquals([], os.listdir(dirName))
+        finally:
+            shutil.rmtree(dirName)
+
+    def testMapConcurrently(self):
+        items = range(20)
+        self.assertEquals([i * i for i in items],
+                          mapConcurrently(lambda i: i * i, items, 4))
+
+    def testMapConcurrentlyError(self):
+        def f(i):
+            if i == 7:
+                raise IOError("bad item")
+            return i
+        with self.assertRaises(IOError):
+            mapConcurrently(f, range(20), 4)
+
+    def testCommonTablesUpToDate(self):
+        for name in common_tables.TABLES:
+            with openCommonFile(name) as dataFile:
+                documents = list(yaml.load_all(dataFile.read()))
+            self.assertEquals(documents, common_tables.TABLES[name][1],
+                              "%s is stale; run gen_common_tables.py" % name)
+            self.assertIs(common_tables.TABLES[name][1], loadCommonData(name))
+
+    def testLoadCommonDataStaleTable(self):
+        savedTable = common_tables.TABLES["flags.yaml"]
+        try:
+            common_tables.TABLES["flags.yaml"] = ("stale", [["BOGUS"]])
+            flagList = loadCommonData("flags.yaml")[0]
+        finally:
+            common_tables.TABLES["flags.yaml"] = savedTable
+        self.assertEquals(savedTable[1][0], flagList)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,208 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import json
+import os
+import os.path
+import shutil
+import StringIO
+import sys
+import tempfile
+import unittest
+
+import __init__ as gypsum
+from __init__ import compileMain
+import ir
+from ir import Name, PackageDependency, PackageVersion
+from location import NoLoc
+import serialize
+from worker import *
+from worker import (
+    JsonChannel,
+    ProtoChannel,
+    decodeMessage,
+    encodeMessage,
+    encodeVarint,
+    processRequests,
+    readVarint,
+)
+
+
+def fakeCompile(arguments, loaderPool):
+    sys.stdout.write("compiling %s\n" % " ".join(arguments))
+    return len(arguments)
+
+
+class TestWorkerProtocol(unittest.TestCase):
+    def testRunCompileCapturesOutput(self):
+        self.assertEquals((2, "compiling a b\n"), runCompile(fakeCompile, ["a", "b"], None))
+
+    def testRunCompileCatchesExit(self):
+        def compileFunction(arguments, loaderPool):
+            sys.stderr.write("usage\n")
+            sys.exit(2)
+        self.assertEquals((2, "usage\n"), runCompile(compileFunction, [], None))
+
+    def testProtoRequests(self):
+        inFile = StringIO.StringIO()
+        for requestId, arguments in [(0, ["a"]), (7, ["b", "c"])]:
+            message = encodeMessage([(1, a) for a in arguments] + [(3, requestId)])
+            buf = bytearray()
+            encodeVarint(len(message), buf)
+            inFile.write(str(buf) + message)
+        inFile.seek(0)
+        outFile = StringIO.StringIO()
+        processRequests(ProtoChannel(inFile, outFile), fakeCompile, None)
+
+        data = outFile.getvalue()
+        responses = []
+        offset = 0
+        while offset < len(data):
+            length, offset = readVarint(data, offset)
+            responses.append(decodeMessage(data[offset:offset + length]))
+            offset += length
+        self.assertEquals([[(1, 1), (2, "compiling a\n")],
+                           [(1, 2), (2, "compiling b c\n"), (3, 7)]],
+                          responses)
+
+    def testNegativeVarint(self):
+        buf = bytearray()
+        encodeVarint(-1, buf)
+        self.assertEquals(10, len(buf))
+        self.assertEquals((2 ** 64 - 1, 10), readVarint(str(buf), 0))
+
+    def testJsonRequests(self):
+        inFile = StringIO.StringIO('{"arguments": ["a"]}\n' +
+                                   '{\n  "arguments": ["b"],\n  "requestId": 3\n}\n')
+        outFile = StringIO.StringIO()
+        processRequests(JsonChannel(inFile, outFile), fakeCompile, None)
+        responses = [json.loads(line) for line in outFile.getvalue().splitlines()]
+        self.assertEquals([{"exitCode": 1, "output": "compiling a\n", "requestId": 0},
+                           {"exitCode": 1, "output": "compiling b\n", "requestId": 3}],
+                          responses)
+
+    def testIsWorkerCommand(self):
+        self.assertTrue(isWorkerCommand(["--persistent_worker"]))
+        self.assertTrue(isWorkerCommand(["--serve=/tmp/gypsum.sock"]))
+        self.assertFalse(isWorkerCommand(["-o", "out.csp", "foo.gy"]))
+
+
+class TestLoaderPool(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.pool = LoaderPool()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def writePackage(self, name, depPackages=()):
+        package = ir.Package(name=Name([name]), version=PackageVersion([1]))
+        package.buildNameIndex()
+        for depPackage in depPackages:
+            package.dependencies.append(PackageDependency.fromPackage(depPackage))
+        fileName = os.path.join(self.dirName, "%s-1.csp" % name)
+        serialize.serialize(package, fileName)
+        return package, fileName
+
+    def getLoader(self, dependFileNames=()):
+        return self.pool.getLoader([self.dirName], None, 1, list(dependFileNames))
+
+    def testReuseLoader(self):
+        self.writePackage("foo")
+        loader = self.getLoader()
+        package = loader.loadPackage(Name(["foo"]), NoLoc)
+        package.id.index = 0
+        self.pool.release(loader)
+
+        self.assertIs(loader, self.getLoader())
+        self.assertIsNone(package.id.index)
+
+    def testDiscardLoader(self):
+        loader = self.getLoader()
+        self.pool.discard(loader)
+        self.assertIsNot(loader, self.getLoader())
+
+    def testChangedPackage(self):
+        _, fileName = self.writePackage("foo")
+        loader = self.getLoader()
+        loader.loadPackage(Name(["foo"]), NoLoc)
+        self.pool.release(loader)
+
+        with open(fileName, "ab") as f:
+            f.write("\0")
+        self.assertIsNot(loader, self.getLoader())
+
+    def testAddedPackage(self):
+        loader = self.getLoader()
+        self.pool.release(loader)
+        self.writePackage("foo")
+        os.utime(self.dirName, (1000, 1000))
+        newLoader = self.getLoader()
+        self.assertIsNot(loader, newLoader)
+        self.assertTrue(newLoader.isPackage(Name(["foo"])))
+
+    def testConflictingDependFile(self):
+        foo, _ = self.writePackage("foo")
+        loader = self.getLoader()
+        loader.loadPackage(Name(["foo"]), NoLoc)
+        self.pool.release(loader)
+
+        otherDirName = os.path.join(self.dirName, "other")
+        os.mkdir(otherDirName)
+        otherFileName = os.path.join(otherDirName, "foo-1.csp")
+        shutil.copyfile(os.path.join(self.dirName, "foo-1.csp"), otherFileName)
+        self.assertIsNot(loader, self.getLoader([otherFileName]))
+
+
+class TestWorkerCompile(unittest.TestCase):
+    def setUp(self):
+        self.dirName = tempfile.mkdtemp()
+        self.pool = LoaderPool()
+
+    def tearDown(self):
+        shutil.rmtree(self.dirName)
+
+    def compile(self, name, source, *args):
+        sourceFileName = os.path.join(self.dirName, name + ".gy")
+        with open(sourceFileName, "w") as f:
+            f.write(source)
+        arguments = ["--no-std", "-P", self.dirName, "-p", name, "-v", "1",
+                     "-o", os.path.join(self.dirName, "%s-1.csp" % name)] + \
+                    list(args) + [sourceFileName]
+        return runCompile(compileMain, arguments, self.pool)
+
+    def testCompileTwiceWithSameDependency(self):
+        self.assertEquals(0, self.compile("foo",
+            "public class Box[static T](value: T)\n" +
+            "  public def get = value\n" +
+            "public def id[static T](x: T) = x\n")[0])
+        self.pool = LoaderPool()
+        source = "def f = foo.id[String](foo.Box[String](\"x\").get)\n"
+        self.assertEquals((0, ""), self.compile("bar", source))
+        self.assertEquals((0, ""), self.compile("bar", source))
+
+
+    def testCompileCacheHitReleasesLoader(self):
+        cacheDirName = os.path.join(self.dirName, "cache")
+        for _ in xrange(3):
+            self.assertEquals((0, ""), self.compile("foo", "def f = 12\n",
+                                                    "--cache-dir", cacheDirName))
+            self.assertEquals({}, self.pool.checkedOut)
+            self.assertEquals(1, len(self.pool.entries))
+
+    def testUnexpectedErrorDiscardsLoader(self):
+        def fail(*args, **kwargs):
+            raise OSError("unexpected")
+        compilePackage = gypsum.compilePackage
+        gypsum.compilePackage = fail
+        self.addCleanup(setattr, gypsum, "compilePackage", compilePackage)
+        self.assertEquals(1, self.compile("foo", "def f = 12\n")[0])
+        self.assertEquals({}, self.pool.checkedOut)
+        self.assertEquals({}, self.pool.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,6 +23,7 @@ from utils import (
 from compile_info import USE_AS_VALUE, USE_AS_TYPE, USE_AS_PROPERTY, USE_AS_CONSTRUCTOR, NORMAL_MODE, STD_MODE, NOSTD_MODE, CallInfo, ScopePrefixInfo
 from flags import ARRAY, COVARIANT, CONTRAVARIANT, CONSTRUCTOR, INITIALIZER, METHOD, PROTECTED, PUBLIC, STATIC
 import scope_analysis
+import stats
 from name import (
     BLANK_SUFFIX,
     CLOSURE_SUFFIX,
@@ -57,15 +58,21 @@ def analyzeTypeDeclarations(info):
     info.package.buildNameIndex()
 
 
-def analyzeTypes(info):
-    """Analyzes a syntax, determines a type for each node, and reports any inconsistencies."""
+def analyzeTypes(info, profiler=None, definitionCache=None):
+    """Analyzes a syntax, determines a type for each node, and reports any inconsistencies.
+
+    If `profiler` is set, time spent analyzing each function is recorded. If
+    `definitionCache` is set, functions that haven't changed since they were last analyzed
+    are restored from it instead of being analyzed again, and other functions are recorded
+    in it.
+    """
     # Establish type information for class supertypes, type parameter upper/lower bounds,
     # and function parameter types. This is needed for `Type.isSubtypeOf` and for typing
     # function calls in expressions.
 
     # Add type annotations for AST nodes which need them, and add type information to
     # the package.
-    analysis = DefinitionTypeVisitor(info)
+    analysis = DefinitionTypeVisitor(info, profiler, definitionCache)
     analysis.visit(info.ast)
 
     # Check that each overriding function has a return type which is a subtype of the
@@ -867,8 +874,10 @@ class DefinitionTypeVisitor(TypeVisitorBase):
     analysis does not traverse the AST in order. When a function with no explicit return type
     is called in an expression, this visitor jumps to the function definition to determine the
     return type so the call expression can be typed."""
-    def __init__(self, info):
+    def __init__(self, info, profiler=None, definitionCache=None):
         super(DefinitionTypeVisitor, self).__init__(info)
+        self.profiler = profiler
+        self.definitionCache = definitionCache
 
         # functionStack keeps track of the function we're currently analyzing. It contains
         # FunctionState for functions or None if we're analyzing something that is not a
@@ -897,6 +906,8 @@ class DefinitionTypeVisitor(TypeVisitorBase):
             self.functionStack.append(None)
         elif isinstance(irDefn, ir.Function):
             self.functionStack.append(FunctionState(irDefn))
+            if self.profiler is not None:
+                self.profiler.enterFunction(irDefn)
 
     def postVisit(self, node, *args, **kwargs):
         super(DefinitionTypeVisitor, self).postVisit(node, *args, **kwargs)
@@ -905,6 +916,8 @@ class DefinitionTypeVisitor(TypeVisitorBase):
         irDefn = self.info.getDefnInfo(node).irDefn
         if isinstance(irDefn, ir.Class) or isinstance(irDefn, ir.Function):
             self.functionStack.pop()
+        if isinstance(irDefn, ir.Function) and self.profiler is not None:
+            self.profiler.exitFunction()
 
     def visitPackage(self, node):
         self.visitChildren(node)
@@ -1484,70 +1497,92 @@ class DefinitionTypeVisitor(TypeVisitorBase):
             # Recursive or mutually recursive function without full type info
             raise TypeException(node.location,
                                 "recursive function must have full type specified")
+        elif self.definitionCache is not None:
+            self.definitionCache.analyzeFunction(
+                self, irFunction, lambda: self.analyzeFunction(node, astReturnType, astBody))
         else:
-            # Found function with unknown type, process it. We can't patiently wait until we
-            # get to its AST node, since we need to know its return type.
+            self.analyzeFunction(node, astReturnType, astBody)
 
-            # Process parameter types first. We already know the types, but we need to ensure
-            # that variant type parameters are being used correctly.
-            # TODO: should variance checks in general be done in DeclarationTypeVisitor?
-            if isinstance(node, ast.PrimaryConstructorDefinition):
+    def analyzeFunction(self, node, astReturnType, astBody):
+        # Found function with unknown type, process it. We can't patiently wait until we
+        # get to its AST node, since we need to know its return type.
+        irFunction = self.info.getDefnInfo(node).irDefn
+
+        # Process parameter types first. We already know the types, but we need to ensure
+        # that variant type parameters are being used correctly.
+        # TODO: should variance checks in general be done in DeclarationTypeVisitor?
+        if isinstance(node, ast.PrimaryConstructorDefinition):
+            vscope = VarianceScope(self, COVARIANT, irFunction.definingClass)
+        elif irFunction.isMethod() and not irFunction.isConstructor():
+            vscope = VarianceScope(self, CONTRAVARIANT, irFunction.definingClass)
+        else:
+            vscope = VarianceScope.clear(self)
+        with vscope:
+            for param in iterOpt(node.parameters):
+                self.visit(param)
+
+        # Process return type, if specified.
+        if astReturnType is not None:
+            if irFunction.isConstructor():
+                raise TypeException(node.location,
+                                    "constructors must not declare return type")
+            if irFunction.isMethod():
                 vscope = VarianceScope(self, COVARIANT, irFunction.definingClass)
-            elif irFunction.isMethod() and not irFunction.isConstructor():
-                vscope = VarianceScope(self, CONTRAVARIANT, irFunction.definingClass)
             else:
                 vscope = VarianceScope.clear(self)
             with vscope:
-                for param in iterOpt(node.parameters):
-                    self.visit(param)
-
-            # Process return type, if specified.
-            if astReturnType is not None:
-                if irFunction.isConstructor():
-                    raise TypeException(node.location,
-                                        "constructors must not declare return type")
-                if irFunction.isMethod():
+                irFunction.returnType = self.visit(astReturnType)
+        self.functionStack[-1].declaredReturnType = irFunction.returnType
+
+        # Process body.
+        if astBody is None:
+            if irFunction.isConstructor():
+                bodyType = ir_t.UnitType
+            elif astReturnType is not None:
+                bodyType = irFunction.returnType
+            else:
+                raise TypeException(node.location,
+                                    "return type must be specified for abstract function")
+        else:
+            bodyType = self.visit(astBody)
+            if bodyType is not ir_t.NoType:
+                if irFunction.isMethod() and not irFunction.isConstructor():
                     vscope = VarianceScope(self, COVARIANT, irFunction.definingClass)
                 else:
                     vscope = VarianceScope.clear(self)
                 with vscope:
-                    irFunction.returnType = self.visit(astReturnType)
-            self.functionStack[-1].declaredReturnType = irFunction.returnType
-
-            # Process body.
-            if astBody is None:
-                if irFunction.isConstructor():
-                    bodyType = ir_t.UnitType
-                elif astReturnType is not None:
-                    bodyType = irFunction.returnType
-                else:
-                    raise TypeException(node.location,
-                                        "return type must be specified for abstract function")
+                    bodyType = self.checkAndHandleReturnType(bodyType, astBody.location)
             else:
-                bodyType = self.visit(astBody)
-                if bodyType is not ir_t.NoType:
-                    if irFunction.isMethod() and not irFunction.isConstructor():
-                        vscope = VarianceScope(self, COVARIANT, irFunction.definingClass)
-                    else:
-                        vscope = VarianceScope.clear(self)
-                    with vscope:
-                        bodyType = self.checkAndHandleReturnType(bodyType, astBody.location)
-                else:
-                    bodyType = self.functionStack[-1].getReturnType()
-            if irFunction.returnType is None:
-                if irFunction.isConstructor():
-                    irFunction.returnType = ir_t.UnitType
-                else:
-                    irFunction.returnType = bodyType
+                bodyType = self.functionStack[-1].getReturnType()
+        if irFunction.returnType is None:
+            if irFunction.isConstructor():
+                irFunction.returnType = ir_t.UnitType
             else:
-                if irFunction.returnType != bodyType:
-                    raise TypeException(node.location,
-                                        "body type does not match declared return type")
+                irFunction.returnType = bodyType
+        else:
+            if irFunction.returnType != bodyType:
+                raise TypeException(node.location,
+                                    "body type does not match declared return type")
 
     def isConditionType(self, ty):
         return ty == ir_t.BooleanType or ty == ir_t.NoType
 
     def ensureTypeInfoForDefn(self, irDefn):
+        recorder = self.info.recorder
+        if recorder is not None and not recorder.isInside(irDefn):
+            # Other definitions are recorded on their own, if at all. The recorded definition
+            # only notes that they were needed here, so they're analyzed at the same point
+            # when it's restored.
+            recorder.recordEnsure(irDefn, self.variance, self.varianceClass)
+            self.info.recorder = None
+            try:
+                self.doEnsureTypeInfoForDefn(irDefn)
+            finally:
+                self.info.recorder = recorder
+        else:
+            self.doEnsureTypeInfoForDefn(irDefn)
+
+    def doEnsureTypeInfoForDefn(self, irDefn):
         if isinstance(irDefn, ir.Function):
             if irDefn.returnType is None:
                 self.visit(irDefn.astDefn)
@@ -2271,7 +2306,11 @@ class DefinitionTypeVisitor(TypeVisitorBase):
         """
         name = nameInfo.name
         candidate = None
+        if stats.enabled:
+            stats.count("typeAnalysis.overloadResolutions")
         for defnInfo in nameInfo.overloads:
+            if stats.enabled:
+                stats.count("typeAnalysis.overloadCandidates")
             irDefn = defnInfo.irDefn
 
             if not isinstance(irDefn, ir.Function) and \
@@ -4,11 +4,17 @@
 # the GPL license that can be found in the LICENSE.txt file.
 
 
+import hashlib
+import os
 import os.path
 import string
 import sys
+import tempfile
+import threading
 from StringIO import StringIO
 
+import common_tables
+
 
 def each(f, iterable):
     for elem in iterable:
@@ -192,6 +198,116 @@ def openCommonFile(name):
     return open(file_name)
 
 
+def loadCommonData(name):
+    """Returns the documents in a YAML file shared with CodeSwitch.
+
+    The documents are normally taken from `common_tables`, which gen_common_tables.py
+    generates from the YAML files, so YAML doesn't need to be parsed (and PyYAML doesn't need
+    to be installed). If the YAML file doesn't match the hash recorded in the table, the
+    table is stale, and the file is parsed instead. The returned documents are shared and
+    must not be modified.
+
+    Args:
+        name (str): the name of the file, like "opcodes.yaml".
+
+    Returns:
+        (list): the documents in the file.
+    """
+    fileHash, documents = common_tables.TABLES[name]
+    try:
+        with openCommonFile(name) as dataFile:
+            text = dataFile.read()
+    except IOError:
+        # Only the tables were installed.
+        return documents
+    if hashlib.sha1(text).hexdigest() == fileHash:
+        return documents
+    import yaml
+    return list(yaml.load_all(text))
+
+
+def writeFileAtomically(fileName, data):
+    """Writes data to a file, replacing it all at once.
+
+    The data is written to a temporary file in the same directory, which is then renamed.
+    Readers see either the old contents or the new contents, never a partially written
+    file. If writing fails, the temporary file is removed and the original file is left
+    alone.
+
+    Raises:
+        IOError: if the file can't be written (for example, if its directory doesn't exist).
+    """
+    dirName = os.path.dirname(fileName) or os.curdir
+    try:
+        fd, tempFileName = tempfile.mkstemp(dir=dirName,
+                                            prefix=os.path.basename(fileName) + ".",
+                                            suffix=".tmp")
+    except OSError as err:
+        raise IOError(err.errno, err.strerror, fileName)
+    try:
+        with os.fdopen(fd, "wb") as tempFile:
+            tempFile.write(data)
+        # mkstemp creates files that only the owner can read. Use the same permissions as
+        # a file created with open().
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tempFileName, 0666 & ~umask)
+        if os.name == "nt" and os.path.exists(fileName):
+            # rename doesn't replace existing files on Windows.
+            os.remove(fileName)
+        os.rename(tempFileName, fileName)
+    except:
+        excType, excValue, excTraceback = sys.exc_info()
+        try:
+            os.remove(tempFileName)
+        except OSError:
+            pass
+        if isinstance(excValue, OSError):
+            raise IOError(excValue.errno, excValue.strerror, fileName)
+        raise excType, excValue, excTraceback
+
+
+def mapConcurrently(function, items, threadCount):
+    """Calls a function on each item using a number of threads.
+
+    This is only useful for functions that spend most of their time in I/O or in library
+    code that releases the interpreter lock (file reads, hashing, decompression).
+
+    Returns:
+        (list): the results, in the same order as `items`.
+
+    Raises:
+        Exception: the first exception raised by `function`, after all threads finish.
+    """
+    if threadCount <= 1 or len(items) <= 1:
+        return map(function, items)
+    results = [None] * len(items)
+    errors = []
+    indices = iter(xrange(len(items)))
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            with lock:
+                i = next(indices, None)
+            if i is None:
+                return
+            try:
+                results[i] = function(items[i])
+            except Exception as exn:
+                errors.append(exn)
+                return
+
+    threads = [threading.Thread(target=work) for _ in xrange(min(threadCount, len(items)))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if len(errors) > 0:
+        raise errors[0]
+    return results
+
+
 class Counter(object):
     def __init__(self, start=0, inc=1):
         self.n = start
@@ -213,5 +329,6 @@ COMPILE_FOR_UNINITIALIZED = "compile-for-uninitialized"
 
 
 __all__ = ["decodeString", "each", "encodeString", "tryDecodeString", "openCommonFile",
-           "Counter", "hashList", "COMPILE_FOR_VALUE", "COMPILE_FOR_EFFECT",
-           "COMPILE_FOR_MATCH", "COMPILE_FOR_UNINITIALIZED", "iterOpt", "listOpt"]
+           "loadCommonData", "writeFileAtomically", "mapConcurrently", "Counter", "hashList", "COMPILE_FOR_VALUE",
+           "COMPILE_FOR_EFFECT", "COMPILE_FOR_MATCH", "COMPILE_FOR_UNINITIALIZED", "iterOpt",
+           "listOpt"]
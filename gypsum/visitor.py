@@ -4,10 +4,15 @@
 # the GPL license that can be found in the LICENSE.txt file.
 
 
+import stats
+
+
 class Visitor(object):
     def visit(self, obj, *args, **kwargs):
         self.preVisit(obj, *args, **kwargs)
         className = obj.__class__.__name__
+        if stats.enabled:
+            stats.count("visitor." + className)
         methodName = self.getMethodName(className)
         if hasattr(self, methodName):
             method = getattr(self, methodName)
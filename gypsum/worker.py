@@ -0,0 +1,394 @@
+# Copyright Jay Conrod. All rights reserved.
+#
+# This file is part of Gypsum. Use of this source code is governed by
+# the GPL license that can be found in the LICENSE.txt file.
+
+
+import argparse
+import json
+import os
+import os.path
+import socket
+import StringIO
+import sys
+import traceback
+
+from compile_cache import hashFile
+from package_loader import PackageLoader
+
+
+class LoaderPool(object):
+    """Keeps package loaders and the packages they've loaded between compilations.
+
+    A persistent compiler process uses this to avoid reading the same dependency packages
+    (usually at least std) for every package it compiles. Loaders are kept separately for
+    each package path and index cache directory.
+
+    Before a loader is reused, the files of all packages it loaded are hashed and compared
+    with their contents when they were loaded. The directories on the package path are
+    checked for added or removed packages, and packages passed with `--depends` are checked
+    for conflicts with packages that are already loaded. If anything has changed, a new
+    loader is created. Loaded packages are linked to each other, so they aren't replaced
+    individually.
+
+    A loader is taken out of the pool by `getLoader` and put back by `release` after a
+    successful compilation. If it's never put back (because of an error), it's dropped.
+    """
+
+    class Entry(object):
+        def __init__(self, key, loader):
+            self.key = key
+            self.loader = loader
+            loader.ensurePackageInfo()
+            self.dirListings = [(dirName, loader.pathIndex.listPackages(dirName))
+                                for dirName in loader.paths]
+            self.fileHashes = {}
+
+        def isValid(self, dependFileNames):
+            for dirName, listing in self.dirListings:
+                if self.loader.pathIndex.listPackages(dirName) != listing:
+                    return False
+            for fileName, fileHash in self.fileHashes.iteritems():
+                if hashFile(fileName) != fileHash:
+                    return False
+            for fileName in dependFileNames:
+                if fileName in self.loader.packageInfoByFile:
+                    continue
+                try:
+                    name, _ = self.loader.pathIndex.readNameAndVersion(fileName)
+                except (IOError, OSError):
+                    return False
+                info = self.loader.packageInfoByName.get(name)
+                if info is not None and info.package is not None:
+                    return False
+            return True
+
+        def recordLoadedFiles(self):
+            for fileName in self.loader.getLoadedPackageFileNames():
+                if fileName not in self.fileHashes:
+                    self.fileHashes[fileName] = hashFile(fileName)
+
+    def __init__(self):
+        self.entries = {}
+        self.checkedOut = {}
+
+    def getLoader(self, paths, indexCacheDirName, loadThreadCount, dependFileNames):
+        """Returns a loader for a compilation, reusing one from the pool if it's still valid.
+
+        The arguments are the same as the arguments of the `PackageLoader` constructor,
+        plus the file names of packages that will be loaded with `loadPackageFiles`.
+        """
+        key = (tuple(paths) if paths is not None else None,
+               os.environ.get("CS_PACKAGE_PATH"),
+               indexCacheDirName)
+        entry = self.entries.pop(key, None)
+        if entry is not None and not entry.isValid(dependFileNames):
+            entry = None
+        if entry is None:
+            entry = LoaderPool.Entry(key, PackageLoader(paths, indexCacheDirName))
+        loader = entry.loader
+        loader.loadThreadCount = loadThreadCount
+        for package in loader.getLoadedPackages():
+            package.resetDependencyState()
+        self.checkedOut[loader] = entry
+        return loader
+
+    def release(self, loader):
+        """Returns a loader to the pool after it was used to compile a package."""
+        entry = self.checkedOut.pop(loader)
+        entry.recordLoadedFiles()
+        self.entries[entry.key] = entry
+
+    def discard(self, loader):
+        """Drops a loader that may be in an inconsistent state."""
+        self.checkedOut.pop(loader, None)
+
+
+def runCompile(compileFunction, arguments, loaderPool):
+    """Runs the compiler once, capturing everything it writes to stdout and stderr.
+
+    Args:
+        compileFunction (function): the compiler's entry point. It's called with a list
+            of arguments and `loaderPool`, and it returns an exit code.
+        arguments (list[str]): command line arguments for the compiler.
+        loaderPool (LoaderPool): passed to `compileFunction`.
+
+    Returns:
+        (int, str): the exit code and the captured output.
+    """
+    output = StringIO.StringIO()
+    savedStdout, savedStderr = sys.stdout, sys.stderr
+    sys.stdout = sys.stderr = output
+    try:
+        exitCode = compileFunction(arguments, loaderPool)
+    except SystemExit as exn:
+        # argparse exits after printing usage errors.
+        exitCode = exn.code if isinstance(exn.code, int) else 1
+    except Exception:
+        traceback.print_exc(file=output)
+        exitCode = 1
+    finally:
+        sys.stdout, sys.stderr = savedStdout, savedStderr
+    return exitCode, output.getvalue()
+
+
+# Field numbers from Bazel's worker_protocol.proto.
+REQUEST_ARGUMENTS_FIELD = 1
+REQUEST_ID_FIELD = 3
+RESPONSE_EXIT_CODE_FIELD = 1
+RESPONSE_OUTPUT_FIELD = 2
+RESPONSE_REQUEST_ID_FIELD = 3
+
+VARINT_WIRE_TYPE = 0
+FIXED64_WIRE_TYPE = 1
+LENGTH_WIRE_TYPE = 2
+FIXED32_WIRE_TYPE = 5
+
+
+def readVarint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        if offset >= len(data):
+            raise IOError("truncated varint")
+        b = ord(data[offset])
+        offset += 1
+        value |= (b & 0x7F) << shift
+        shift += 7
+        if (b & 0x80) == 0:
+            return value, offset
+
+
+def encodeVarint(value, buf):
+    # Negative int32 values are encoded as 64-bit two's complement.
+    value &= 0xFFFFFFFFFFFFFFFF
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def decodeMessage(data):
+    """Decodes the fields of a protocol buffer message.
+
+    Only varint and length-delimited fields are returned. Nested messages aren't decoded.
+
+    Returns:
+        (list[(int, int|str)]): field numbers and values, in the order they appear.
+    """
+    fields = []
+    offset = 0
+    while offset < len(data):
+        tag, offset = readVarint(data, offset)
+        number, wireType = tag >> 3, tag & 7
+        if wireType == VARINT_WIRE_TYPE:
+            value, offset = readVarint(data, offset)
+            fields.append((number, value))
+        elif wireType == LENGTH_WIRE_TYPE:
+            length, offset = readVarint(data, offset)
+            if offset + length > len(data):
+                raise IOError("truncated field")
+            fields.append((number, data[offset:offset + length]))
+            offset += length
+        elif wireType == FIXED64_WIRE_TYPE:
+            offset += 8
+        elif wireType == FIXED32_WIRE_TYPE:
+            offset += 4
+        else:
+            raise IOError("unsupported wire type: %d" % wireType)
+    return fields
+
+
+def encodeMessage(fields):
+    """Encodes a protocol buffer message with int and str fields, in the given order."""
+    buf = bytearray()
+    for number, value in fields:
+        if isinstance(value, (int, long)):
+            encodeVarint(number << 3 | VARINT_WIRE_TYPE, buf)
+            encodeVarint(value, buf)
+        else:
+            if isinstance(value, unicode):
+                value = value.encode("utf-8")
+            encodeVarint(number << 3 | LENGTH_WIRE_TYPE, buf)
+            encodeVarint(len(value), buf)
+            buf.extend(value)
+    return str(buf)
+
+
+class ProtoChannel(object):
+    """Reads work requests and writes responses as length-delimited protocol buffers.
+
+    This is Bazel's default worker protocol. Only the fields the compiler needs are
+    decoded. Inputs and their digests aren't used, since package files are hashed by
+    `LoaderPool` anyway.
+    """
+
+    def __init__(self, inFile, outFile):
+        self.inFile = inFile
+        self.outFile = outFile
+
+    def readRequest(self):
+        prefix = ""
+        while True:
+            b = self.inFile.read(1)
+            if b == "":
+                if prefix == "":
+                    return None
+                raise IOError("truncated request")
+            prefix += b
+            if (ord(b) & 0x80) == 0:
+                break
+        length, _ = readVarint(prefix, 0)
+        data = self.inFile.read(length)
+        if len(data) != length:
+            raise IOError("truncated request")
+        arguments = []
+        requestId = 0
+        for number, value in decodeMessage(data):
+            if number == REQUEST_ARGUMENTS_FIELD:
+                arguments.append(value)
+            elif number == REQUEST_ID_FIELD:
+                requestId = value
+        return arguments, requestId
+
+    def writeResponse(self, exitCode, output, requestId):
+        fields = [(RESPONSE_EXIT_CODE_FIELD, exitCode),
+                  (RESPONSE_OUTPUT_FIELD, output),
+                  (RESPONSE_REQUEST_ID_FIELD, requestId)]
+        message = encodeMessage([(n, v) for n, v in fields if v != 0 and v != ""])
+        buf = bytearray()
+        encodeVarint(len(message), buf)
+        buf.extend(message)
+        self.outFile.write(str(buf))
+        self.outFile.flush()
+
+
+class JsonChannel(object):
+    """Reads work requests and writes responses as JSON objects.
+
+    This is Bazel's JSON worker protocol, which is also used by `serve`. Requests may span
+    several lines. Each response is written on one line.
+    """
+
+    def __init__(self, inFile, outFile):
+        self.inFile = inFile
+        self.outFile = outFile
+        self.decoder = json.JSONDecoder()
+
+    def readRequest(self):
+        text = ""
+        while True:
+            line = self.inFile.readline()
+            if line == "":
+                if text.strip() == "":
+                    return None
+                raise IOError("truncated request")
+            text += line
+            try:
+                request, _ = self.decoder.raw_decode(text.strip())
+                break
+            except ValueError:
+                continue
+        if not isinstance(request, dict):
+            raise IOError("request must be a JSON object")
+        arguments = [a.encode("utf-8") if isinstance(a, unicode) else a
+                     for a in request.get("arguments", [])]
+        return arguments, request.get("requestId", 0)
+
+    def writeResponse(self, exitCode, output, requestId):
+        response = {"exitCode": exitCode,
+                    "output": output.decode("utf-8", "replace"),
+                    "requestId": requestId}
+        self.outFile.write(json.dumps(response) + "\n")
+        self.outFile.flush()
+
+
+def processRequests(channel, compileFunction, loaderPool):
+    """Compiles packages for requests from a channel until there are no more."""
+    while True:
+        request = channel.readRequest()
+        if request is None:
+            return
+        arguments, requestId = request
+        exitCode, output = runCompile(compileFunction, arguments, loaderPool)
+        channel.writeResponse(exitCode, output, requestId)
+
+
+def serve(socketName, compileFunction, loaderPool):
+    """Accepts connections on a Unix domain socket and compiles packages for them.
+
+    Clients send requests and receive responses in the same JSON format as the persistent
+    worker. Connections are handled one at a time, since loaders in the pool aren't
+    thread-safe.
+    """
+    if os.path.exists(socketName):
+        os.remove(socketName)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(socketName)
+        server.listen(5)
+        while True:
+            conn, _ = server.accept()
+            try:
+                connFile = conn.makefile("r+b")
+                processRequests(JsonChannel(connFile, connFile), compileFunction, loaderPool)
+                connFile.close()
+            except (IOError, socket.error) as exn:
+                sys.stderr.write("%s: error: %s\n" % (socketName, exn))
+            finally:
+                conn.close()
+    finally:
+        server.close()
+        os.remove(socketName)
+
+
+WORKER_FLAGS = ("--persistent_worker", "--serve")
+
+
+def isWorkerCommand(argv):
+    """Returns whether command line arguments request a persistent worker or server."""
+    return any(arg.split("=", 1)[0] in WORKER_FLAGS for arg in argv)
+
+
+def runWorkerCommand(argv, compileFunction):
+    """Runs the compiler as a persistent worker or server.
+
+    With `--persistent_worker`, requests are read from stdin, and responses are written to
+    stdout. This is how Bazel starts persistent workers. With `--serve`, requests are
+    read from connections to a Unix domain socket, for tools like editors.
+
+    Args:
+        argv (list[str]): command line arguments, not including the program name.
+        compileFunction (function): the compiler's entry point. See `runCompile`.
+
+    Returns:
+        (int): the exit code.
+    """
+    cmdline = argparse.ArgumentParser(description="Run the Gypsum compiler persistently")
+    cmdline.add_argument("--persistent_worker", action="store_true",
+                         help="Read work requests from stdin")
+    cmdline.add_argument("--worker-protocol", choices=["proto", "json"], default="proto",
+                         help="Format of work requests and responses")
+    cmdline.add_argument("--serve", metavar="SOCKET", action="store",
+                         help="Listen for requests on a Unix domain socket")
+    args = cmdline.parse_args(argv)
+    if args.persistent_worker and args.serve is not None:
+        cmdline.error("--persistent_worker and --serve can't be used together")
+
+    loaderPool = LoaderPool()
+    try:
+        if args.serve is not None:
+            serve(args.serve, compileFunction, loaderPool)
+        else:
+            channelClass = ProtoChannel if args.worker_protocol == "proto" else JsonChannel
+            channel = channelClass(sys.stdin, sys.stdout)
+            processRequests(channel, compileFunction, loaderPool)
+    except KeyboardInterrupt:
+        pass
+    except IOError as exn:
+        sys.stderr.write("error: %s\n" % exn)
+        return 1
+    return 0
+
+
+__all__ = ["LoaderPool", "isWorkerCommand", "runCompile", "runWorkerCommand"]